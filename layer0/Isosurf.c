@@ -31,6 +31,7 @@ Z* -------------------------------------------------------------------
 #include"PConv.h"
 #include"P.h"
 #include"Util.h"
+#include"Thread.h"
 
 #define Trace_OFF
 
@@ -58,6 +59,17 @@ Z* -------------------------------------------------------------------
 
 #define I4Ptr(field,P1,P2,P3,P4) Fint4p(field,P1,P2,P3,P4)
 
+/* phases of contouring a tile, for timing */
+#define cIsosurfCode   0        /* IsosurfCodeVertices */
+#define cIsosurfEdges  1        /* IsosurfFindActiveEdges */
+#define cIsosurfLines  2        /* IsosurfFindLines */
+#define cIsosurfDraw   3        /* IsosurfDrawLines or IsosurfDrawPoints */
+#define cIsosurfPhases 4
+
+/* most threads a single volume is split across: each one needs its own
+   CIsosurf work fields, about 45 MB */
+#define cIsosurfMaxWorkers 4
+
 typedef struct PointType {
   float Point[3];
   int NLink;
@@ -85,8 +97,32 @@ struct _CIsosurf {
   int NSeg;
   float *Line;
 
+  double PhaseTime[cIsosurfPhases];     /* seconds spent in each phase */
 };
 
+/* where each tile's output went, so that the output of tiles contoured
+   on different threads can be stitched back together in tile order */
+
+typedef struct {
+  int tile;
+  int line_start, n_line;
+  int seg_start, n_seg;
+} IsosurfTileOutput;
+
+typedef struct {
+  CIsosurf *iso;
+  CTileQueue *queue;
+  int worker;
+  int mode;
+  int *range, *steps;
+  IsosurfTileOutput *output;    /* VLA, in the order the tiles were done */
+  int n_output;
+  float *line;                  /* the thread's Line and Num VLAs */
+  int *num;
+  int ok;
+  double busy;
+} IsosurfWorker;
+
 static int IsosurfAlloc(PyMOLGlobals * G, CIsosurf * II);
 static void IsosurfPurge(CIsosurf * II);
 static int IsosurfCurrent(CIsosurf * II);
@@ -482,6 +518,8 @@ static CIsosurf *IsosurfNew(PyMOLGlobals * G)
 {
   int c;
   register CIsosurf *I = Calloc(CIsosurf, 1);
+  if(!I)
+    return NULL;
   I->G = G;
   I->VertexCodes = NULL;
   I->ActiveEdges = NULL;
@@ -875,6 +913,246 @@ int IsosurfGetRange(PyMOLGlobals * G, Isofield * field,
 }
 
 
+/*===========================================================================*/
+/* the range is contoured one tile of IsosurfSubSize^3 cells at a time,
+   each tile starting its own line segments */
+
+static void IsosurfResetPoints(CIsosurf * I)
+{
+  int x, y, z, c;
+  for(x = 0; x < I->CurDim[0]; x++)
+    for(y = 0; y < I->CurDim[1]; y++)
+      for(z = 0; z < I->CurDim[2]; z++)
+        for(c = 0; c < 3; c++)
+          EdgePt(I->Point, x, y, z, c).NLink = 0;
+}
+
+static int IsosurfVolumeTile(CIsosurf * I, int *range, int *steps, int tile, int mode)
+{
+  int ok = true;
+  int c, ijk[3];
+
+  ijk[0] = tile / (steps[1] * steps[2]);
+  ijk[1] = (tile / steps[2]) % steps[1];
+  ijk[2] = tile % steps[2];
+  for(c = 0; c < 3; c++) {
+    I->CurOff[c] = IsosurfSubSize * ijk[c] + range[c];
+    I->Max[c] = range[3 + c] - I->CurOff[c];
+    if(I->Max[c] > (IsosurfSubSize + 1))
+      I->Max[c] = (IsosurfSubSize + 1);
+  }
+#ifdef Trace
+  for(c = 0; c < 3; c++)
+    printf(" IsosurfVolume: c: %i CurOff[c]: %i Max[c] %i\n", c,
+           I->CurOff[c], I->Max[c]);
+#endif
+
+  switch (mode) {
+  case 0:                      /* standard mode - want lines */
+    ok = IsosurfCurrent(I);
+    break;
+  case 1:                      /* point mode - just want points on the isosurface */
+    ok = IsosurfPoints(I);
+    break;
+  case 2:
+    /* reserved */
+    break;
+  }
+  if(I->G->Interrupt) {
+    ok = false;
+  }
+  return (ok);
+}
+
+static void IsosurfVolumeThread(void *arg)
+{
+  IsosurfWorker *W = (IsosurfWorker *) arg;
+  CIsosurf *I = W->iso;
+  PyMOLGlobals *G = I->G;
+  int tile;
+
+  while(W->ok && TileQueueNext(W->queue, W->worker, &tile)) {
+    double start = UtilGetSeconds(G);
+    IsosurfTileOutput *out;
+    int line_start = I->NLine;
+    int seg_start = I->NSeg;
+    W->ok = IsosurfVolumeTile(I, W->range, W->steps, tile, W->mode);
+    if(W->ok) {
+      VLACheck(W->output, IsosurfTileOutput, W->n_output);
+      out = W->output + W->n_output++;
+      out->tile = tile;
+      out->line_start = line_start;
+      out->n_line = I->NLine - line_start;
+      out->seg_start = seg_start;
+      out->n_seg = I->NSeg - seg_start;
+    }
+    W->busy += UtilGetSeconds(G) - start;
+  }
+}
+
+static int IsosurfVolumeTiles(PyMOLGlobals * G, CIsosurf * I, int *range, int *steps,
+                              int mode)
+{
+  int ok = true;
+  int n_tile = steps[0] * steps[1] * steps[2];
+  int n_thread = SettingGetGlobal_i(G, cSetting_max_threads);
+  double timing = UtilGetSeconds(G);
+  double phase[cIsosurfPhases];
+  double stitch = 0.0;
+  IsosurfWorker *worker = NULL;
+  CTileQueue *queue = NULL;
+  int a, c, t;
+  int n_ran = 1;
+
+  if(n_thread > n_tile)
+    n_thread = n_tile;
+  if(n_thread > cIsosurfMaxWorkers)
+    n_thread = cIsosurfMaxWorkers;
+  if(n_thread > 1) {
+    /* each thread needs its own CIsosurf; if they can't all be had,
+       make do with fewer threads */
+    worker = Calloc(IsosurfWorker, n_thread);
+    if(worker) {
+      worker[0].iso = I;
+      for(a = 1; a < n_thread; a++)
+        if(!(worker[a].iso = IsosurfNew(G)))
+          break;
+      n_thread = a;
+      if(n_thread > 1)
+        queue = TileQueueNew(n_tile, n_thread);
+      if(!queue) {
+        for(a = 1; a < n_thread; a++)
+          _IsosurfFree(worker[a].iso);
+        FreeP(worker);
+      }
+    }
+  }
+
+  if(!worker) {
+    /* one thread: tiles in order, straight into the output */
+    n_thread = 1;
+    IsosurfResetPoints(I);
+    for(t = 0; ok && (t < n_tile); t++)
+      ok = IsosurfVolumeTile(I, range, steps, t, mode);
+    for(c = 0; c < cIsosurfPhases; c++)
+      phase[c] = I->PhaseTime[c];
+  } else {
+    float *line = I->Line;
+    int *num = I->Num;
+    IsosurfTileOutput **by_tile = Calloc(IsosurfTileOutput *, n_tile);
+    IsosurfWorker **by_worker = Calloc(IsosurfWorker *, n_tile);
+
+    for(a = 0; a < n_thread; a++) {
+      IsosurfWorker *W = worker + a;
+      CIsosurf *J = W->iso;
+      if(J != I) {
+        J->Skip = I->Skip;
+        J->Coord = I->Coord;
+        J->Data = I->Data;
+        J->Level = I->Level;
+        for(c = 0; c < 3; c++) {
+          J->AbsDim[c] = I->AbsDim[c];
+          J->CurDim[c] = I->CurDim[c];
+        }
+        W->ok = IsosurfAlloc(G, J);
+      } else {
+        W->ok = true;
+      }
+      /* every thread collects its own output, stitched below */
+      J->Line = VLAlloc(float, 10000);
+      J->Num = VLAlloc(int, 1000);
+      J->NLine = 0;
+      J->NSeg = 0;
+      J->Num[0] = 0;
+      if(W->ok)
+        IsosurfResetPoints(J);
+      W->iso = J;
+      W->queue = queue;
+      W->worker = a;
+      W->mode = mode;
+      W->range = range;
+      W->steps = steps;
+      W->output = VLAlloc(IsosurfTileOutput, n_tile / n_thread + 1);
+      W->n_output = 0;
+      W->busy = 0.0;
+    }
+
+    n_ran = ThreadRun(IsosurfVolumeThread, worker, sizeof(IsosurfWorker), n_thread);
+
+    for(c = 0; c < cIsosurfPhases; c++)
+      phase[c] = 0.0;
+    for(a = 0; a < n_thread; a++) {
+      IsosurfWorker *W = worker + a;
+      W->line = W->iso->Line;
+      W->num = W->iso->Num;
+      for(t = 0; t < W->n_output; t++) {
+        by_tile[W->output[t].tile] = W->output + t;
+        by_worker[W->output[t].tile] = W;
+      }
+      for(c = 0; c < cIsosurfPhases; c++)
+        phase[c] += W->iso->PhaseTime[c];
+    }
+    if(G->Interrupt)
+      ok = false;
+
+    /* stitch the tiles back together in order */
+    stitch = UtilGetSeconds(G);
+    I->Line = line;
+    I->Num = num;
+    I->NLine = 0;
+    I->NSeg = 0;
+    I->Num[0] = 0;
+    for(t = 0; ok && (t < n_tile); t++) {
+      IsosurfTileOutput *out = by_tile[t];
+      IsosurfWorker *W = by_worker[t];
+      if(!out) {
+        ok = false;             /* never done: interrupted */
+        break;
+      }
+      VLACheck(I->Line, float, (I->NLine + out->n_line) * 3);
+      VLACheck(I->Num, int, I->NSeg + out->n_seg + 1);
+      memcpy(I->Line + I->NLine * 3, W->line + out->line_start * 3,
+             sizeof(float) * 3 * out->n_line);
+      memcpy(I->Num + I->NSeg, W->num + out->seg_start, sizeof(int) * out->n_seg);
+      I->NLine += out->n_line;
+      I->NSeg += out->n_seg;
+      I->Num[I->NSeg] = I->NLine;
+    }
+    stitch = UtilGetSeconds(G) - stitch;
+
+    if(Feedback(G, FB_Isomesh, FB_Debugging)) {
+      for(a = 0; a < n_thread; a++) {
+        PRINTF " IsosurfVolume: thread %d busy %4.3f sec., stole %d tiles.\n",
+          a, worker[a].busy, TileQueueGetStolen(queue, a) ENDF(G);
+      }
+    }
+    for(a = 0; a < n_thread; a++) {
+      IsosurfWorker *W = worker + a;
+      VLAFreeP(W->output);
+      VLAFreeP(W->line);
+      VLAFreeP(W->num);
+      if(W->iso != I) {
+        IsosurfPurge(W->iso);
+        _IsosurfFree(W->iso);
+      }
+    }
+    FreeP(by_tile);
+    FreeP(by_worker);
+    FreeP(worker);
+    TileQueueFree(queue);
+  }
+
+  PRINTFB(G, FB_Isomesh, FB_Blather)
+    " IsosurfVolume: %d tiles on %d threads in %4.3f sec.\n",
+    n_tile, n_ran, UtilGetSeconds(G) - timing ENDFB(G);
+  PRINTFB(G, FB_Isomesh, FB_Blather)
+    " IsosurfVolume: vertices %4.3f, edges %4.3f, lines %4.3f, output %4.3f, stitching %4.3f sec.\n",
+    phase[cIsosurfCode], phase[cIsosurfEdges], phase[cIsosurfLines],
+    phase[cIsosurfDraw], stitch ENDFB(G);
+  return (ok);
+}
+
+
 /*===========================================================================*/
 int IsosurfVolume(PyMOLGlobals * G, CSetting * set1, CSetting * set2,
                   Isofield * field, float level, int **num,
@@ -885,16 +1163,19 @@ int IsosurfVolume(PyMOLGlobals * G, CSetting * set1, CSetting * set2,
     I = G->Isosurf;
   } else {
     I = IsosurfNew(G);
+    if(!I)
+      return false;
   }
   {
     int ok = true;
     int Steps[3];
-    int c, i, j, k;
-    int x, y, z;
+    int c;
     int range_store[6];
     I->Num = *num;
     I->Line = *vert;
     I->Skip = skip;
+    for(c = 0; c < cIsosurfPhases; c++)
+      I->PhaseTime[c] = 0.0;
     if(range) {
       for(c = 0; c < 3; c++) {
         I->AbsDim[c] = field->dimensions[c];
@@ -930,52 +1211,7 @@ int IsosurfVolume(PyMOLGlobals * G, CSetting * set1, CSetting * set2,
         IsosurfPurge(I);
         break;
       default:
-        for(i = 0; i < Steps[0]; i++) {
-          for(j = 0; j < Steps[1]; j++) {
-            for(k = 0; k < Steps[2]; k++) {
-              if(ok) {
-                I->CurOff[0] = IsosurfSubSize * i;
-                I->CurOff[1] = IsosurfSubSize * j;
-                I->CurOff[2] = IsosurfSubSize * k;
-                for(c = 0; c < 3; c++)
-                  I->CurOff[c] += range[c];
-                for(c = 0; c < 3; c++) {
-                  I->Max[c] = range[3 + c] - I->CurOff[c];
-                  if(I->Max[c] > (IsosurfSubSize + 1))
-                    I->Max[c] = (IsosurfSubSize + 1);
-                }
-                if(!(i || j || k)) {
-                  for(x = 0; x < I->Max[0]; x++)
-                    for(y = 0; y < I->Max[1]; y++)
-                      for(z = 0; z < I->Max[2]; z++)
-                        for(c = 0; c < 3; c++)
-                          EdgePt(I->Point, x, y, z, c).NLink = 0;
-                }
-#ifdef Trace
-                for(c = 0; c < 3; c++)
-                  printf(" IsosurfVolume: c: %i CurOff[c]: %i Max[c] %i\n", c,
-                         I->CurOff[c], I->Max[c]);
-#endif
-
-                if(ok)
-                  switch (mode) {
-                  case 0:      /* standard mode - want lines */
-                    ok = IsosurfCurrent(I);
-                    break;
-                  case 1:      /* point mode - just want points on the isosurface */
-                    ok = IsosurfPoints(I);
-                    break;
-                  case 2:
-                    /* reserved */
-                    break;
-                  }
-                if(G->Interrupt) {
-                  ok = false;
-                }
-              }
-            }
-          }
-        }
+        ok = IsosurfVolumeTiles(G, I, range, Steps, mode);
         IsosurfPurge(I);
         break;
       }
@@ -1058,18 +1294,36 @@ static void IsosurfPurge(CIsosurf * II)
 }
 
 
+/*===========================================================================*/
+static void IsosurfLap(CIsosurf * I, int phase, double *start)
+{
+  double now = UtilGetSeconds(I->G);
+  I->PhaseTime[phase] += now - *start;
+  *start = now;
+}
+
+
 /*===========================================================================*/
 static int IsosurfCurrent(CIsosurf * II)
 {
   register CIsosurf *I = II;
   int ok = true;
-  if(IsosurfCodeVertices(I)) {
-    if(ok)
+  double start = UtilGetSeconds(I->G);
+  int n_vert = IsosurfCodeVertices(I);
+  IsosurfLap(I, cIsosurfCode, &start);
+  if(n_vert) {
+    if(ok) {
       ok = IsosurfFindActiveEdges(I);
-    if(ok)
+      IsosurfLap(I, cIsosurfEdges, &start);
+    }
+    if(ok) {
       ok = IsosurfFindLines(I);
-    if(ok)
+      IsosurfLap(I, cIsosurfLines, &start);
+    }
+    if(ok) {
       ok = IsosurfDrawLines(I);
+      IsosurfLap(I, cIsosurfDraw, &start);
+    }
   }
   return (ok);
 }
@@ -1080,11 +1334,18 @@ static int IsosurfPoints(CIsosurf * II)
 {
   register CIsosurf *I = II;
   int ok = true;
-  if(IsosurfCodeVertices(I)) {
-    if(ok)
+  double start = UtilGetSeconds(I->G);
+  int n_vert = IsosurfCodeVertices(I);
+  IsosurfLap(I, cIsosurfCode, &start);
+  if(n_vert) {
+    if(ok) {
       ok = IsosurfFindActiveEdges(I);
-    if(ok)
+      IsosurfLap(I, cIsosurfEdges, &start);
+    }
+    if(ok) {
       ok = IsosurfDrawPoints(I);
+      IsosurfLap(I, cIsosurfDraw, &start);
+    }
   }
   return (ok);
 }
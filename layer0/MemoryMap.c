@@ -0,0 +1,112 @@
+/*
+A* -------------------------------------------------------------------
+B* This file contains source code for the PyMOL computer program
+C* Copyright (c) Schrodinger, LLC.
+D* -------------------------------------------------------------------
+E* It is unlawful to modify or remove this copyright notice.
+F* -------------------------------------------------------------------
+G* Please see the accompanying LICENSE file for further information.
+H* -------------------------------------------------------------------
+I* Additional authors of this source file include:
+-*
+-*
+-*
+Z* -------------------------------------------------------------------
+*/
+
+#include"os_predef.h"
+#include"os_std.h"
+
+#ifdef _WIN32
+#include<windows.h>
+#else
+#include<sys/types.h>
+#include<sys/stat.h>
+#include<sys/mman.h>
+#include<fcntl.h>
+#include<unistd.h>
+#endif
+
+#include"Base.h"
+#include"MemoryMap.h"
+#include"MemoryDebug.h"
+
+struct _CMemoryMap {
+  char *data;
+  size_t size;
+#ifdef _WIN32
+  HANDLE file, mapping;
+#endif
+};
+
+CMemoryMap *MemoryMapOpen(char *fname)
+{
+  CMemoryMap *I = Calloc(CMemoryMap, 1);
+  if(!I)
+    return NULL;
+#ifdef _WIN32
+  {
+    LARGE_INTEGER size;
+    I->file = CreateFileA(fname, GENERIC_READ, FILE_SHARE_READ, NULL,
+                          OPEN_EXISTING, FILE_ATTRIBUTE_NORMAL, NULL);
+    if(I->file != INVALID_HANDLE_VALUE) {
+      if(GetFileSizeEx(I->file, &size) && size.QuadPart &&
+         ((ULONGLONG) size.QuadPart == (size_t) size.QuadPart)) {
+        I->size = (size_t) size.QuadPart;
+        I->mapping = CreateFileMappingA(I->file, NULL, PAGE_WRITECOPY, 0, 0, NULL);
+        if(I->mapping)
+          I->data = (char *) MapViewOfFile(I->mapping, FILE_MAP_COPY, 0, 0, 0);
+      }
+    }
+  }
+#else
+  {
+    int fd = open(fname, O_RDONLY);
+    struct stat st;
+    if(fd >= 0) {
+      if((!fstat(fd, &st)) && (st.st_size > 0) &&
+         ((off_t) (size_t) st.st_size == st.st_size)) {
+        void *data;
+        I->size = (size_t) st.st_size;
+        data = mmap(NULL, I->size, PROT_READ | PROT_WRITE, MAP_PRIVATE, fd, 0);
+        if(data != MAP_FAILED)
+          I->data = (char *) data;
+      }
+      close(fd);                /* the mapping keeps its own reference */
+    }
+  }
+#endif
+  if(!I->data) {
+    MemoryMapFree(I);
+    I = NULL;
+  }
+  return I;
+}
+
+void MemoryMapFree(CMemoryMap * I)
+{
+  if(I) {
+#ifdef _WIN32
+    if(I->data)
+      UnmapViewOfFile(I->data);
+    if(I->mapping)
+      CloseHandle(I->mapping);
+    if(I->file && (I->file != INVALID_HANDLE_VALUE))
+      CloseHandle(I->file);
+#else
+    if(I->data)
+      munmap(I->data, I->size);
+#endif
+    FreeP(I);
+  }
+}
+
+char *MemoryMapGetData(CMemoryMap * I)
+{
+  return I ? I->data : NULL;
+}
+
+size_t MemoryMapGetSize(CMemoryMap * I)
+{
+  return I ? I->size : 0;
+}
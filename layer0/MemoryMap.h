@@ -0,0 +1,34 @@
+/*
+A* -------------------------------------------------------------------
+B* This file contains source code for the PyMOL computer program
+C* Copyright (c) Schrodinger, LLC.
+D* -------------------------------------------------------------------
+E* It is unlawful to modify or remove this copyright notice.
+F* -------------------------------------------------------------------
+G* Please see the accompanying LICENSE file for further information.
+H* -------------------------------------------------------------------
+I* Additional authors of this source file include:
+-*
+-*
+-*
+Z* -------------------------------------------------------------------
+*/
+
+#ifndef _H_MemoryMap
+#define _H_MemoryMap
+
+#include<stddef.h>
+
+/* read-only files mapped into memory (mmap, or file mappings under
+   _WIN32).  Mappings are private copy-on-write: the data may be
+   modified in place without changing the file, and pages are only read
+   from disk once they are touched. */
+
+typedef struct _CMemoryMap CMemoryMap;
+
+CMemoryMap *MemoryMapOpen(char *fname);
+void MemoryMapFree(CMemoryMap * I);
+char *MemoryMapGetData(CMemoryMap * I);
+size_t MemoryMapGetSize(CMemoryMap * I);
+
+#endif
@@ -57,7 +57,9 @@ typedef struct _CTexture CTexture;
 typedef struct _CType CType;
 typedef struct _CMain CMain;
 typedef struct _CPlugIOManager CPlugIOManager;
+typedef struct _CPlugIOTraj CPlugIOTraj;
 typedef struct _CShaderMgr CShaderMgr;
+typedef struct _CSurfaceBatch CSurfaceBatch;
 
 #ifndef _PYMOL_NOPY
 typedef struct _CP_inst CP_inst;
@@ -139,6 +141,7 @@ struct _PyMOLGlobals {
   OVLexicon *Lexicon;           /* lexicon for data (e.g. label) strings */
   CPlugIOManager *PlugIOManager;
   CShaderMgr* ShaderMgr;
+  CSurfaceBatch *SurfaceBatch;  /* open batch of surface jobs, see RepSurface.h */
 
 #ifndef _PYMOL_NOPY
   CP_inst *P_inst;
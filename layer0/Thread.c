@@ -0,0 +1,239 @@
+/*
+A* -------------------------------------------------------------------
+B* This file contains source code for the PyMOL computer program
+C* Copyright (c) Schrodinger, LLC.
+D* -------------------------------------------------------------------
+E* It is unlawful to modify or remove this copyright notice.
+F* -------------------------------------------------------------------
+G* Please see the accompanying LICENSE file for further information.
+H* -------------------------------------------------------------------
+I* Additional authors of this source file include:
+-*
+-*
+-*
+Z* -------------------------------------------------------------------
+*/
+
+#include"os_predef.h"
+#include"os_std.h"
+
+#ifdef _WIN32
+#include<windows.h>
+#include<process.h>
+#else
+#include<pthread.h>
+#endif
+
+#include"Base.h"
+#include"Thread.h"
+#include"MemoryDebug.h"
+
+#ifdef _WIN32
+typedef CRITICAL_SECTION ThreadMutex;
+#define ThreadMutexInit(m) InitializeCriticalSection(m)
+#define ThreadMutexDone(m) DeleteCriticalSection(m)
+#define ThreadMutexLock(m) EnterCriticalSection(m)
+#define ThreadMutexUnlock(m) LeaveCriticalSection(m)
+#else
+typedef pthread_mutex_t ThreadMutex;
+#define ThreadMutexInit(m) pthread_mutex_init(m, NULL)
+#define ThreadMutexDone(m) pthread_mutex_destroy(m)
+#define ThreadMutexLock(m) pthread_mutex_lock(m)
+#define ThreadMutexUnlock(m) pthread_mutex_unlock(m)
+#endif
+
+/* ThreadRun */
+
+typedef struct {
+  ThreadFn *fn;
+  void *arg;
+#ifdef _WIN32
+  HANDLE handle;
+#else
+  pthread_t handle;
+#endif
+  int started;
+} ThreadSlot;
+
+#ifdef _WIN32
+static unsigned __stdcall ThreadMain(void *p)
+{
+  ThreadSlot *slot = (ThreadSlot *) p;
+  slot->fn(slot->arg);
+  return 0;
+}
+#else
+static void *ThreadMain(void *p)
+{
+  ThreadSlot *slot = (ThreadSlot *) p;
+  slot->fn(slot->arg);
+  return NULL;
+}
+#endif
+
+int ThreadRun(ThreadFn * fn, void *arg, size_t stride, int n_thread)
+{
+  int a;
+  int n_started = 1;
+  ThreadSlot *slot;
+
+  if(n_thread < 2) {
+    if(n_thread > 0)
+      fn(arg);
+    return n_thread;
+  }
+
+  slot = Calloc(ThreadSlot, n_thread);
+  if(!slot) {
+    for(a = 0; a < n_thread; a++)
+      fn(((char *) arg) + a * stride);
+    return 1;
+  }
+
+  for(a = 1; a < n_thread; a++) {
+    slot[a].fn = fn;
+    slot[a].arg = ((char *) arg) + a * stride;
+#ifdef _WIN32
+    slot[a].handle = (HANDLE) _beginthreadex(NULL, 0, ThreadMain, slot + a, 0, NULL);
+    slot[a].started = (slot[a].handle != 0);
+#else
+    slot[a].started = !pthread_create(&slot[a].handle, NULL, ThreadMain, slot + a);
+#endif
+    if(slot[a].started)
+      n_started++;
+  }
+
+  fn(arg);                      /* slot 0 runs here */
+
+  for(a = 1; a < n_thread; a++) {
+    if(slot[a].started) {
+#ifdef _WIN32
+      WaitForSingleObject(slot[a].handle, INFINITE);
+      CloseHandle(slot[a].handle);
+#else
+      pthread_join(slot[a].handle, NULL);
+#endif
+    } else {
+      fn(slot[a].arg);
+    }
+  }
+  FreeP(slot);
+  return n_started;
+}
+
+/* TileQueue */
+
+typedef struct {
+  ThreadMutex lock;
+  int head, tail;               /* owner pops head, thieves take from tail */
+  int stolen;
+  char pad[64];                 /* keep deques on separate cache lines */
+} TileDeque;
+
+struct _CTileQueue {
+  int n_worker;
+  TileDeque *deque;
+};
+
+CTileQueue *TileQueueNew(int n_tile, int n_worker)
+{
+  CTileQueue *I = NULL;
+  int a;
+
+  if(n_worker < 1)
+    n_worker = 1;
+  if(n_tile < 0)
+    n_tile = 0;
+  I = Calloc(CTileQueue, 1);
+  if(I) {
+    I->n_worker = n_worker;
+    I->deque = Calloc(TileDeque, n_worker);
+    if(!I->deque) {
+      FreeP(I);
+      return NULL;
+    }
+    for(a = 0; a < n_worker; a++) {
+      TileDeque *d = I->deque + a;
+      ThreadMutexInit(&d->lock);
+      /* contiguous runs keep each worker on neighboring tiles
+         until it has to steal */
+      d->head = (int) (((double) n_tile * a) / n_worker);
+      d->tail = (int) (((double) n_tile * (a + 1)) / n_worker);
+    }
+  }
+  return I;
+}
+
+void TileQueueFree(CTileQueue * I)
+{
+  if(I) {
+    int a;
+    for(a = 0; a < I->n_worker; a++)
+      ThreadMutexDone(&I->deque[a].lock);
+    FreeP(I->deque);
+    FreeP(I);
+  }
+}
+
+int TileQueueGetStolen(CTileQueue * I, int worker)
+{
+  if(I && (worker >= 0) && (worker < I->n_worker))
+    return I->deque[worker].stolen;
+  return 0;
+}
+
+int TileQueueNext(CTileQueue * I, int worker, int *tile)
+{
+  TileDeque *own;
+  int ok = false;
+
+  if((!I) || (worker < 0) || (worker >= I->n_worker))
+    return false;
+  own = I->deque + worker;
+
+  ThreadMutexLock(&own->lock);
+  if(own->head < own->tail) {
+    *tile = own->head++;
+    ok = true;
+  }
+  ThreadMutexUnlock(&own->lock);
+
+  while(!ok) {
+    /* pick the fullest deque without locking (a hint only)... */
+    int a, victim = -1, most = 0;
+    for(a = 0; a < I->n_worker; a++) {
+      if(a != worker) {
+        TileDeque *d = I->deque + a;
+        int left = d->tail - d->head;
+        if(left > most) {
+          most = left;
+          victim = a;
+        }
+      }
+    }
+    if(victim < 0)
+      break;                    /* nothing left anywhere */
+    {
+      /* ...then take the back half of it under its lock */
+      TileDeque *d = I->deque + victim;
+      int start = 0, stop = 0;
+      ThreadMutexLock(&d->lock);
+      if(d->head < d->tail) {
+        stop = d->tail;
+        start = d->tail - (d->tail - d->head + 1) / 2;
+        d->tail = start;
+      }
+      ThreadMutexUnlock(&d->lock);
+      if(start < stop) {
+        *tile = start;
+        ok = true;
+        ThreadMutexLock(&own->lock);
+        own->head = start + 1;
+        own->tail = stop;
+        own->stolen += stop - start;
+        ThreadMutexUnlock(&own->lock);
+      }
+    }
+  }
+  return ok;
+}
@@ -0,0 +1,48 @@
+/*
+A* -------------------------------------------------------------------
+B* This file contains source code for the PyMOL computer program
+C* Copyright (c) Schrodinger, LLC.
+D* -------------------------------------------------------------------
+E* It is unlawful to modify or remove this copyright notice.
+F* -------------------------------------------------------------------
+G* Please see the accompanying LICENSE file for further information.
+H* -------------------------------------------------------------------
+I* Additional authors of this source file include:
+-*
+-*
+-*
+Z* -------------------------------------------------------------------
+*/
+
+#ifndef _H_Thread
+#define _H_Thread
+
+#include<stddef.h>
+
+/* native worker threads (pthreads, or the Win32 API under _WIN32) which
+   do not involve the Python interpreter, so they can be started without
+   holding the GIL */
+
+typedef void ThreadFn(void *arg);
+
+/* calls fn(arg + a * stride) for a = 0..n_thread-1, each on its own
+   native thread; slot 0 always runs on the calling thread.  Returns once
+   every slot has finished.  If a thread can't be created, its slot is
+   run on the calling thread instead.  Returns the number of slots which
+   ran concurrently (1..n_thread). */
+
+int ThreadRun(ThreadFn * fn, void *arg, size_t stride, int n_thread);
+
+/* a fixed set of tasks (tiles) numbered 0..n_tile-1 split into one
+   contiguous deque per worker.  Workers pop from the front of their own
+   deque and, once it is empty, steal the back half of the fullest deque
+   of another worker. */
+
+typedef struct _CTileQueue CTileQueue;
+
+CTileQueue *TileQueueNew(int n_tile, int n_worker);
+void TileQueueFree(CTileQueue * I);
+int TileQueueNext(CTileQueue * I, int worker, int *tile);
+int TileQueueGetStolen(CTileQueue * I, int worker);
+
+#endif
@@ -84,6 +84,7 @@ struct _COrtho {
   int DirtyFlag;
   double BusyLast, BusyLastUpdate;
   int BusyStatus[4];
+  int BusyHold;                 /* OrthoBusyFast is a no-op while held */
   char BusyMessage[255];
   char *WizardPromptVLA;
   int SplashFlag;
@@ -515,11 +516,27 @@ void OrthoBusySlow(PyMOLGlobals * G, int progress, int total)
 }
 
 
+/*========================================================================*/
+void OrthoBusyHold(PyMOLGlobals * G, int hold)
+{
+  /* held while native worker threads (which mustn't call into Python)
+     may be reporting fine-grained progress */
+  register COrtho *I = G->Ortho;
+  if(hold)
+    I->BusyHold++;
+  else if(I->BusyHold > 0)
+    I->BusyHold--;
+}
+
+
 /*========================================================================*/
 void OrthoBusyFast(PyMOLGlobals * G, int progress, int total)
 {
   register COrtho *I = G->Ortho;
-  double time_yet = (-I->BusyLastUpdate) + UtilGetSeconds(G);
+  double time_yet;
+  if(I->BusyHold)
+    return;
+  time_yet = (-I->BusyLastUpdate) + UtilGetSeconds(G);
   PRINTFD(G, FB_Ortho)
     " OrthoBusyFast-DEBUG: progress %d total %d\n", progress, total ENDFD;
   I->BusyStatus[2] = progress;
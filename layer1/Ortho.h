@@ -79,6 +79,7 @@ void OrthoFakeDrag(PyMOLGlobals * G);
 void OrthoBusyMessage(PyMOLGlobals * G, char *message);
 void OrthoBusySlow(PyMOLGlobals * G, int progress, int total);
 void OrthoBusyFast(PyMOLGlobals * G, int progress, int total);
+void OrthoBusyHold(PyMOLGlobals * G, int hold);
 void OrthoBusyPrime(PyMOLGlobals * G);
 void OrthoCommandIn(PyMOLGlobals * G, char *buffer);
 int OrthoCommandSize(PyMOLGlobals * G);
@@ -48,6 +48,7 @@ the initialization functions for these libraries on startup.
 #define putenv _putenv
 #endif
 #include"os_python.h"
+#include"opcode.h"
 #endif
 
 #include"os_std.h"
@@ -679,8 +680,10 @@ ov_status PCacheSet(PyMOLGlobals * G, PyObject * entry, PyObject * output)
     PyList_SetItem(entry, 0, PyInt_FromLong(tot_size)); /* update total size */
     PyList_SetItem(entry, 3, PXIncRef(output));
     PXDecRef(PyObject_CallMethod(G->P_inst->cmd, "_cache_set",
-                                 "OiO", entry, SettingGetGlobal_i(G, cSetting_cache_max),
-                                 G->P_inst->cmd));
+                                 "OiOis", entry, SettingGetGlobal_i(G, cSetting_cache_max),
+                                 G->P_inst->cmd,
+                                 SettingGetGlobal_i(G, cSetting_cache_policy),
+                                 SettingGetGlobal_s(G, cSetting_cache_dir)));
     /* compute the hash codes */
   }
   if(PyErr_Occurred())
@@ -698,11 +701,18 @@ ov_status PCacheGet(PyMOLGlobals * G,
 
     if(OV_OK(CacheCreateEntry(&entry, input))) {
       output = PyObject_CallMethod(G->P_inst->cmd, "_cache_get",
-                                   "OOO", entry, Py_None, G->P_inst->cmd);
+                                   "OOOiis", entry, Py_None, G->P_inst->cmd,
+                                   SettingGetGlobal_i(G, cSetting_cache_max),
+                                   SettingGetGlobal_i(G, cSetting_cache_policy),
+                                   SettingGetGlobal_s(G, cSetting_cache_dir));
       if(output == Py_None) {
         Py_DECREF(output);
         output = NULL;
-      } else {
+      } else if(output && PyInt_Check(output)) {
+        Py_DECREF(output);
+        output = NULL;
+        status = cPCacheDeferred;
+      } else if(output) {
         status = OV_STATUS_YES;
       }
     }
@@ -922,57 +932,120 @@ int PAlterAtomState(PyMOLGlobals * G, float *v, PyCodeObject *expr_co, int read_
   return result;
 }
 
+static char *PAlterFieldName[] = {
+  "model", "index", "type", "name", "resn", "flags", "resi", "resv",
+  "chain", "alt", "segi", "elem", "ss", "numeric_type", "q", "b", "vdw",
+  "elec_radius", "partial_charge", "formal_charge", "stereo", "cartoon",
+  "text_type", "custom", "label", "color", "ID", "state", "rank", NULL
+};
+
+int PAlterFieldFromName(char *name)
+{
+  /* returns the cPAlter_* code for an atom field name, or 0 */
+  int a;
+  for(a = 0; PAlterFieldName[a]; a++) {
+    if(!strcmp(name, PAlterFieldName[a]))
+      return (1 << a);
+  }
+  return 0;
+}
+
+int PAlterAtomFields(PyCodeObject * expr_co)
+{
+  /* Returns the set of atom fields an alter/iterate expression can see.
+   * Every name an expression loads or stores directly shows up in
+   * co_names; anything which reaches the namespace indirectly gets all
+   * of the fields. */
+  int result = 0;
+  int a, b, n;
+  char *name;
+  if(!expr_co)
+    return cPAlterAllFields;
+  n = PyTuple_Size(expr_co->co_names);
+  for(a = 0; a < n; a++) {
+    name = PyString_AsString(PyTuple_GetItem(expr_co->co_names, a));
+    if(!name)
+      return cPAlterAllFields;
+    if(!(strcmp(name, "locals") && strcmp(name, "vars") && strcmp(name, "eval") &&
+         strcmp(name, "execfile") && strcmp(name, "dir")))
+      return cPAlterAllFields;
+    for(b = 0; PAlterFieldName[b]; b++) {
+      if(!strcmp(name, PAlterFieldName[b])) {
+        result |= (1 << b);
+        break;
+      }
+    }
+  }
+  {
+    /* exec statements and star imports see the whole namespace */
+    unsigned char *code = (unsigned char *) PyString_AsString(expr_co->co_code);
+    int len = PyString_Size(expr_co->co_code);
+    a = 0;
+    while(code && (a < len)) {
+      if((code[a] == EXEC_STMT) || (code[a] == IMPORT_STAR))
+        return cPAlterAllFields;
+      a += (code[a] >= HAVE_ARGUMENT) ? 3 : 1;
+    }
+  }
+  if(PyErr_Occurred()) {
+    PyErr_Clear();
+    return cPAlterAllFields;
+  }
+  return result;
+}
+
 int PAlterAtom(PyMOLGlobals * G,
                AtomInfoType * at, PyCodeObject *expr_co, int read_only,
-               char *model, int index, PyObject * space)
+               char *model, int index, PyObject * space, int fields)
 {
-  /* assumes Blocked python interpreter */
+  /* assumes Blocked python interpreter; only the atom fields in
+     "fields" (see PAlterAtomFields) are bound and read back */
   WordType buf;
   AtomName name;
-  PyObject *name_id1, *name_id2 = NULL;
+  PyObject *name_id1 = NULL, *name_id2 = NULL;
   ElemName elem;
-  PyObject *elem_id1, *elem_id2 = NULL;
+  PyObject *elem_id1 = NULL, *elem_id2 = NULL;
   ResName resn;
-  PyObject *resn_id1, *resn_id2 = NULL;
+  PyObject *resn_id1 = NULL, *resn_id2 = NULL;
   ResIdent resi;
-  PyObject *resi_id1, *resi_id2 = NULL;
+  PyObject *resi_id1 = NULL, *resi_id2 = NULL;
   int resv;
-  PyObject *resv_id1, *resv_id2 = NULL;
+  PyObject *resv_id1 = NULL, *resv_id2 = NULL;
   Chain chain;
-  PyObject *chain_id1, *chain_id2 = NULL;
+  PyObject *chain_id1 = NULL, *chain_id2 = NULL;
   Chain alt;
-  PyObject *alt_id1, *alt_id2 = NULL;
+  PyObject *alt_id1 = NULL, *alt_id2 = NULL;
   SegIdent segi;
-  PyObject *flags_id1, *flags_id2 = NULL;
+  PyObject *flags_id1 = NULL, *flags_id2 = NULL;
   int flags;
-  PyObject *segi_id1, *segi_id2 = NULL;
-  PyObject *text_type_id1, *text_type_id2 = NULL;
-  PyObject *custom_id1, *custom_id2 = NULL;
+  PyObject *segi_id1 = NULL, *segi_id2 = NULL;
+  PyObject *text_type_id1 = NULL, *text_type_id2 = NULL;
+  PyObject *custom_id1 = NULL, *custom_id2 = NULL;
   SSType ssType;
-  PyObject *ss_id1, *ss_id2 = NULL;
+  PyObject *ss_id1 = NULL, *ss_id2 = NULL;
   char atype[7], mmstereotype[2];
-  PyObject *type_id1, *type_id2 = NULL;
+  PyObject *type_id1 = NULL, *type_id2 = NULL;
   float b, q, partialCharge, vdw, elec_radius;
-  PyObject *b_id1, *b_id2 = NULL;
-  PyObject *q_id1, *q_id2 = NULL;
-  PyObject *partial_charge_id1, *partial_charge_id2 = NULL;
-  PyObject *vdw_id1, *vdw_id2 = NULL;
-  PyObject *elec_radius_id1, *elec_radius_id2 = NULL;
+  PyObject *b_id1 = NULL, *b_id2 = NULL;
+  PyObject *q_id1 = NULL, *q_id2 = NULL;
+  PyObject *partial_charge_id1 = NULL, *partial_charge_id2 = NULL;
+  PyObject *vdw_id1 = NULL, *vdw_id2 = NULL;
+  PyObject *elec_radius_id1 = NULL, *elec_radius_id2 = NULL;
   int formalCharge, numericType;
-  PyObject *formal_charge_id1, *formal_charge_id2 = NULL;
-  PyObject *numeric_type_id1, *numeric_type_id2 = NULL;
+  PyObject *formal_charge_id1 = NULL, *formal_charge_id2 = NULL;
+  PyObject *numeric_type_id1 = NULL, *numeric_type_id2 = NULL;
   char stereo[2];
-  PyObject *stereo_id1, *stereo_id2 = NULL;
+  PyObject *stereo_id1 = NULL, *stereo_id2 = NULL;
   int cartoon;
-  PyObject *cartoon_id1, *cartoon_id2 = NULL;
+  PyObject *cartoon_id1 = NULL, *cartoon_id2 = NULL;
   int color;
-  PyObject *color_id1, *color_id2 = NULL;
-  PyObject *label_id1, *label_id2 = NULL;
+  PyObject *color_id1 = NULL, *color_id2 = NULL;
+  PyObject *label_id1 = NULL, *label_id2 = NULL;
   int id;
-  PyObject *ID_id1, *ID_id2 = NULL;
+  PyObject *ID_id1 = NULL, *ID_id2 = NULL;
   int rank;
-  PyObject *rank_id1, *rank_id2 = NULL;
-  PyObject *state_id1, *state_id2 = NULL;
+  PyObject *rank_id1 = NULL, *rank_id2 = NULL;
+  PyObject *state_id1 = NULL, *state_id2 = NULL;
   int state;
   PyObject *dict;
   int result = true;
@@ -989,32 +1062,54 @@ int PAlterAtom(PyMOLGlobals * G,
   dict = PyDict_New();
 
   /* immutables */
-  PConvStringToPyDictItem(dict, "model", model);
-  PConvIntToPyDictItem(dict, "index", index + 1);
+  if(fields & cPAlter_model)
+    PConvStringToPyDictItem(dict, "model", model);
+  if(fields & cPAlter_index)
+    PConvIntToPyDictItem(dict, "index", index + 1);
 
   /* mutables */
-  type_id1 = PConvStringToPyDictItem(dict, "type", atype);
-  name_id1 = PConvStringToPyDictItem(dict, "name", at->name);
-  resn_id1 = PConvStringToPyDictItem(dict, "resn", at->resn);
-  flags_id1 = PConvIntToPyDictItem(dict, "flags", at->flags);
-  resi_id1 = PConvStringToPyDictItem(dict, "resi", at->resi);
-  resv_id1 = PConvIntToPyDictItem(dict, "resv", at->resv);      /* subordinate to resi */
-  chain_id1 = PConvStringToPyDictItem(dict, "chain", at->chain);
-  alt_id1 = PConvStringToPyDictItem(dict, "alt", at->alt);
-  segi_id1 = PConvStringToPyDictItem(dict, "segi", at->segi);
-  elem_id1 = PConvStringToPyDictItem(dict, "elem", at->elem);
-  ss_id1 = PConvStringToPyDictItem(dict, "ss", at->ssType);
-  numeric_type_id1 = PConvIntToPyDictItem(dict, "numeric_type", at->customType);
-  q_id1 = PConvFloatToPyDictItem(dict, "q", at->q);
-  b_id1 = PConvFloatToPyDictItem(dict, "b", at->b);
-  vdw_id1 = PConvFloatToPyDictItem(dict, "vdw", at->vdw);
-  elec_radius_id1 = PConvFloatToPyDictItem(dict, "elec_radius", at->elec_radius);
-  partial_charge_id1 = PConvFloatToPyDictItem(dict, "partial_charge", at->partialCharge);
-  formal_charge_id1 = PConvIntToPyDictItem(dict, "formal_charge", at->formalCharge);
+  if(fields & cPAlter_type)
+    type_id1 = PConvStringToPyDictItem(dict, "type", atype);
+  if(fields & cPAlter_name)
+    name_id1 = PConvStringToPyDictItem(dict, "name", at->name);
+  if(fields & cPAlter_resn)
+    resn_id1 = PConvStringToPyDictItem(dict, "resn", at->resn);
+  if(fields & cPAlter_flags)
+    flags_id1 = PConvIntToPyDictItem(dict, "flags", at->flags);
+  if(fields & cPAlter_resi)
+    resi_id1 = PConvStringToPyDictItem(dict, "resi", at->resi);
+  if(fields & cPAlter_resv)
+    resv_id1 = PConvIntToPyDictItem(dict, "resv", at->resv);
+  if(fields & cPAlter_chain)
+    chain_id1 = PConvStringToPyDictItem(dict, "chain", at->chain);
+  if(fields & cPAlter_alt)
+    alt_id1 = PConvStringToPyDictItem(dict, "alt", at->alt);
+  if(fields & cPAlter_segi)
+    segi_id1 = PConvStringToPyDictItem(dict, "segi", at->segi);
+  if(fields & cPAlter_elem)
+    elem_id1 = PConvStringToPyDictItem(dict, "elem", at->elem);
+  if(fields & cPAlter_ss)
+    ss_id1 = PConvStringToPyDictItem(dict, "ss", at->ssType);
+  if(fields & cPAlter_numeric_type)
+    numeric_type_id1 = PConvIntToPyDictItem(dict, "numeric_type", at->customType);
+  if(fields & cPAlter_q)
+    q_id1 = PConvFloatToPyDictItem(dict, "q", at->q);
+  if(fields & cPAlter_b)
+    b_id1 = PConvFloatToPyDictItem(dict, "b", at->b);
+  if(fields & cPAlter_vdw)
+    vdw_id1 = PConvFloatToPyDictItem(dict, "vdw", at->vdw);
+  if(fields & cPAlter_elec_radius)
+    elec_radius_id1 = PConvFloatToPyDictItem(dict, "elec_radius", at->elec_radius);
+  if(fields & cPAlter_partial_charge)
+    partial_charge_id1 = PConvFloatToPyDictItem(dict, "partial_charge", at->partialCharge);
+  if(fields & cPAlter_formal_charge)
+    formal_charge_id1 = PConvIntToPyDictItem(dict, "formal_charge", at->formalCharge);
   mmstereotype[0] = convertStereoToChar(at->mmstereo);
   mmstereotype[1] = 0;
-  stereo_id1 = PConvStringToPyDictItem(dict, "stereo", mmstereotype);
-  cartoon_id1 = PConvIntToPyDictItem(dict, "cartoon", at->cartoon);
+  if(fields & cPAlter_stereo)
+    stereo_id1 = PConvStringToPyDictItem(dict, "stereo", mmstereotype);
+  if(fields & cPAlter_cartoon)
+    cartoon_id1 = PConvIntToPyDictItem(dict, "cartoon", at->cartoon);
 
   {
     char null_st[1] = "";
@@ -1022,24 +1117,31 @@ int PAlterAtom(PyMOLGlobals * G,
 
     if(at->textType)
       st = OVLexicon_FetchCString(G->Lexicon, at->textType);
-    text_type_id1 = PConvStringToPyDictItem(dict, "text_type", st);
+    if(fields & cPAlter_text_type)
+      text_type_id1 = PConvStringToPyDictItem(dict, "text_type", st);
 
     st = null_st;
 
     if(at->custom)
       st = OVLexicon_FetchCString(G->Lexicon, at->custom);
-    custom_id1 = PConvStringToPyDictItem(dict, "custom", st);
+    if(fields & cPAlter_custom)
+      custom_id1 = PConvStringToPyDictItem(dict, "custom", st);
 
     st = null_st;
     if(at->label)
       st = OVLexicon_FetchCString(G->Lexicon, at->label);
-    label_id1 = PConvStringToPyDictItem(dict, "label", st);
+    if(fields & cPAlter_label)
+      label_id1 = PConvStringToPyDictItem(dict, "label", st);
   }
 
-  color_id1 = PConvIntToPyDictItem(dict, "color", at->color);
-  ID_id1 = PConvIntToPyDictItem(dict, "ID", at->id);
-  state_id1 = PConvIntToPyDictItem(dict, "state", at->discrete_state);
-  rank_id1 = PConvIntToPyDictItem(dict, "rank", at->rank);
+  if(fields & cPAlter_color)
+    color_id1 = PConvIntToPyDictItem(dict, "color", at->color);
+  if(fields & cPAlter_ID)
+    ID_id1 = PConvIntToPyDictItem(dict, "ID", at->id);
+  if(fields & cPAlter_state)
+    state_id1 = PConvIntToPyDictItem(dict, "state", at->discrete_state);
+  if(fields & cPAlter_rank)
+    rank_id1 = PConvIntToPyDictItem(dict, "rank", at->rank);
 
   PXDecRef(PyEval_EvalCode(expr_co, space, dict));
   if(PyErr_Occurred()) {
@@ -1057,59 +1159,59 @@ int PAlterAtom(PyMOLGlobals * G,
     if(result) {
       /* get new object IDs */
 
-      if(!(type_id2 = PyDict_GetItemString(dict, "type")))
+      if((fields & cPAlter_type) && !(type_id2 = PyDict_GetItemString(dict, "type")))
         result = false;
-      else if(!(name_id2 = PyDict_GetItemString(dict, "name")))
+      if((fields & cPAlter_name) && !(name_id2 = PyDict_GetItemString(dict, "name")))
         result = false;
-      else if(!(elem_id2 = PyDict_GetItemString(dict, "elem")))
+      if((fields & cPAlter_resn) && !(resn_id2 = PyDict_GetItemString(dict, "resn")))
         result = false;
-      else if(!(resn_id2 = PyDict_GetItemString(dict, "resn")))
+      if((fields & cPAlter_flags) && !(flags_id2 = PyDict_GetItemString(dict, "flags")))
         result = false;
-      else if(!(flags_id2 = PyDict_GetItemString(dict, "flags")))
+      if((fields & cPAlter_resi) && !(resi_id2 = PyDict_GetItemString(dict, "resi")))
         result = false;
-      else if(!(resi_id2 = PyDict_GetItemString(dict, "resi")))
+      if((fields & cPAlter_resv) && !(resv_id2 = PyDict_GetItemString(dict, "resv")))
         result = false;
-      else if(!(resv_id2 = PyDict_GetItemString(dict, "resv")))
+      if((fields & cPAlter_chain) && !(chain_id2 = PyDict_GetItemString(dict, "chain")))
         result = false;
-      else if(!(segi_id2 = PyDict_GetItemString(dict, "segi")))
+      if((fields & cPAlter_alt) && !(alt_id2 = PyDict_GetItemString(dict, "alt")))
         result = false;
-      else if(!(alt_id2 = PyDict_GetItemString(dict, "alt")))
+      if((fields & cPAlter_segi) && !(segi_id2 = PyDict_GetItemString(dict, "segi")))
         result = false;
-      else if(!(chain_id2 = PyDict_GetItemString(dict, "chain")))
+      if((fields & cPAlter_elem) && !(elem_id2 = PyDict_GetItemString(dict, "elem")))
         result = false;
-      else if(!(text_type_id2 = PyDict_GetItemString(dict, "text_type")))
+      if((fields & cPAlter_ss) && !(ss_id2 = PyDict_GetItemString(dict, "ss")))
         result = false;
-      else if(!(custom_id2 = PyDict_GetItemString(dict, "custom")))
+      if((fields & cPAlter_numeric_type) && !(numeric_type_id2 = PyDict_GetItemString(dict, "numeric_type")))
         result = false;
-      else if(!(ss_id2 = PyDict_GetItemString(dict, "ss")))
+      if((fields & cPAlter_q) && !(q_id2 = PyDict_GetItemString(dict, "q")))
         result = false;
-      else if(!(b_id2 = PyDict_GetItemString(dict, "b")))
+      if((fields & cPAlter_b) && !(b_id2 = PyDict_GetItemString(dict, "b")))
         result = false;
-      else if(!(q_id2 = PyDict_GetItemString(dict, "q")))
+      if((fields & cPAlter_vdw) && !(vdw_id2 = PyDict_GetItemString(dict, "vdw")))
         result = false;
-      else if(!(vdw_id2 = PyDict_GetItemString(dict, "vdw")))
+      if((fields & cPAlter_elec_radius) && !(elec_radius_id2 = PyDict_GetItemString(dict, "elec_radius")))
         result = false;
-      else if(!(elec_radius_id2 = PyDict_GetItemString(dict, "elec_radius")))
+      if((fields & cPAlter_partial_charge) && !(partial_charge_id2 = PyDict_GetItemString(dict, "partial_charge")))
         result = false;
-      else if(!(partial_charge_id2 = PyDict_GetItemString(dict, "partial_charge")))
+      if((fields & cPAlter_formal_charge) && !(formal_charge_id2 = PyDict_GetItemString(dict, "formal_charge")))
         result = false;
-      else if(!(formal_charge_id2 = PyDict_GetItemString(dict, "formal_charge")))
+      if((fields & cPAlter_stereo) && !(stereo_id2 = PyDict_GetItemString(dict, "stereo")))
         result = false;
-      else if(!(stereo_id2 = PyDict_GetItemString(dict, "stereo")))
+      if((fields & cPAlter_cartoon) && !(cartoon_id2 = PyDict_GetItemString(dict, "cartoon")))
         result = false;
-      else if(!(cartoon_id2 = PyDict_GetItemString(dict, "cartoon")))
+      if((fields & cPAlter_text_type) && !(text_type_id2 = PyDict_GetItemString(dict, "text_type")))
         result = false;
-      else if(!(color_id2 = PyDict_GetItemString(dict, "color")))
+      if((fields & cPAlter_custom) && !(custom_id2 = PyDict_GetItemString(dict, "custom")))
         result = false;
-      else if(!(label_id2 = PyDict_GetItemString(dict, "label")))
+      if((fields & cPAlter_label) && !(label_id2 = PyDict_GetItemString(dict, "label")))
         result = false;
-      if(!(numeric_type_id2 = PyDict_GetItemString(dict, "numeric_type")))
+      if((fields & cPAlter_color) && !(color_id2 = PyDict_GetItemString(dict, "color")))
         result = false;
-      if(!(ID_id2 = PyDict_GetItemString(dict, "ID")))
+      if((fields & cPAlter_ID) && !(ID_id2 = PyDict_GetItemString(dict, "ID")))
         result = false;
-      if(!(state_id2 = PyDict_GetItemString(dict, "state")))
+      if((fields & cPAlter_state) && !(state_id2 = PyDict_GetItemString(dict, "state")))
         result = false;
-      if(!(rank_id2 = PyDict_GetItemString(dict, "rank")))
+      if((fields & cPAlter_rank) && !(rank_id2 = PyDict_GetItemString(dict, "rank")))
         result = false;
 
       if(PyErr_Occurred()) {
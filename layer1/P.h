@@ -37,6 +37,38 @@ int PLabelExprUsesVariable(PyMOLGlobals * G, char *expr, char *var);
 int PLabelAtomAlt(PyMOLGlobals * G, AtomInfoType * at, char *model, char *expr,
                   int index);
 
+/* atom fields visible to alter/iterate expressions */
+#define cPAlter_model             0x00000001
+#define cPAlter_index             0x00000002
+#define cPAlter_type              0x00000004
+#define cPAlter_name              0x00000008
+#define cPAlter_resn              0x00000010
+#define cPAlter_flags             0x00000020
+#define cPAlter_resi              0x00000040
+#define cPAlter_resv              0x00000080
+#define cPAlter_chain             0x00000100
+#define cPAlter_alt               0x00000200
+#define cPAlter_segi              0x00000400
+#define cPAlter_elem              0x00000800
+#define cPAlter_ss                0x00001000
+#define cPAlter_numeric_type      0x00002000
+#define cPAlter_q                 0x00004000
+#define cPAlter_b                 0x00008000
+#define cPAlter_vdw               0x00010000
+#define cPAlter_elec_radius       0x00020000
+#define cPAlter_partial_charge    0x00040000
+#define cPAlter_formal_charge     0x00080000
+#define cPAlter_stereo            0x00100000
+#define cPAlter_cartoon           0x00200000
+#define cPAlter_text_type         0x00400000
+#define cPAlter_custom            0x00800000
+#define cPAlter_label             0x01000000
+#define cPAlter_color             0x02000000
+#define cPAlter_ID                0x04000000
+#define cPAlter_state             0x08000000
+#define cPAlter_rank              0x10000000
+#define cPAlterAllFields          0x1FFFFFFF
+
 #ifdef _PYMOL_NOPY
 
 #define PRunStringInstance(G,x)
@@ -92,13 +124,19 @@ int PLabelAtomAlt(PyMOLGlobals * G, AtomInfoType * at, char *model, char *expr,
 #define PConvertOptions(a,b)
 #define PGetOptions(a)
 
-#define PAlterAtom(G,a,b,c,d,e,f) 0
+#define PAlterAtom(G,a,b,c,d,e,f,g) 0
+#define PAlterAtomFields(a) 0
+#define PAlterFieldFromName(a) 0
 #define PLabelAtom(G,a,b,c,d) 0
 
 #define PAlterAtomState(G,a,b,c,d,e,f,g) 0
 
 #else
 
+/* PCacheGet status: missing, but will be computed elsewhere
+   (cmd._cache_get returned 0) */
+#define cPCacheDeferred 2
+
 ov_status PCacheSet(PyMOLGlobals * G, PyObject * entry, PyObject * output);
 ov_status PCacheGet(PyMOLGlobals * G,
                     PyObject ** result_output, PyObject ** result_entry,
@@ -117,8 +155,10 @@ void PExit(PyMOLGlobals * G, int code);
 void PParse(PyMOLGlobals * G, char *str);       /* only accepts one command */
 void PDo(PyMOLGlobals * G, char *str);  /* accepts multple commands seperated by newlines */
 
+int PAlterAtomFields(PyCodeObject * expr_co);
+int PAlterFieldFromName(char *name);
 int PAlterAtom(PyMOLGlobals * G, AtomInfoType * at, PyCodeObject *expr_co,
-               int read_only, char *model, int index, PyObject * space);
+               int read_only, char *model, int index, PyObject * space, int fields);
 int PLabelAtom(PyMOLGlobals * G, AtomInfoType * at, char *model, char *expr, int index);
 int PAlterAtomState(PyMOLGlobals * G, float *v, PyCodeObject *expr_co, int read_only,
                     AtomInfoType * at, char *model, int index, PyObject * space);
@@ -38,6 +38,7 @@ Z* -------------------------------------------------------------------
 #include"PyMOL.h"
 #include"Scene.h"
 #include"PConv.h"
+#include"Thread.h"
 
 #ifdef _PYMOL_INLINE
 #undef _PYMOL_INLINE
@@ -65,6 +66,23 @@ Z* -------------------------------------------------------------------
 typedef float float3[3];
 typedef float float4[4];
 
+/* rows handed out to the native render threads in bands of "rows",
+   which are scheduled through a work-stealing tile queue */
+
+typedef struct {
+  CTileQueue *queue;
+  int rows;
+  int row_start, row_stop;
+  int n_tile;
+  double *time;                 /* seconds spent on each tile */
+  int *worker;                  /* thread which rendered each tile */
+} CRayTiles;
+
+typedef struct {
+  int tile, stop;
+  double start;
+} CRayBand;
+
 struct _CRayThreadInfo {
   CRay *ray;
   int width, height;
@@ -84,6 +102,7 @@ struct _CRayThreadInfo {
   int perspective;
   float fov, pos[3];
   float *depth;
+  CRayTiles *tiles;             /* NULL: interleaved scanlines by phase */
 };
 
 struct _CRayHashThreadInfo {
@@ -113,6 +132,7 @@ struct _CRayAntiThreadInfo {
   int mag;
   int phase, n_thread;
   CRay *ray;
+  CRayTiles *tiles;             /* NULL: interleaved scanlines by phase */
 };
 
 void RayRelease(CRay * I);
@@ -159,6 +179,8 @@ void RaySetContext(CRay * I, int context)
     I->Context = context;
   else
     I->Context = 0;
+  if(I->Context)
+    I->ViewDependent = true;
 }
 
 void RayApplyContextToNormal(CRay * I, float *v);
@@ -2849,29 +2871,155 @@ static void RayHashSpawn(CRayHashThreadInfo * Thread, int n_thread, int n_total)
 }
 #endif
 
-#ifndef _PYMOL_NOPY
+static CRayTiles *RayTilesNew(PyMOLGlobals * G, int row_start, int row_stop,
+                              int n_thread)
+{
+  CRayTiles *R = NULL;
+  int n_row = row_stop - row_start;
+  int rows = SettingGetGlobal_i(G, cSetting_ray_tile_size);
+
+  if(n_row < 1)
+    return NULL;
+  if(rows < 1) {
+    /* aim for enough tiles per thread to even out the expensive regions */
+    rows = n_row / (n_thread * 8);
+    if(rows > 32)
+      rows = 32;
+  }
+  if(rows < 1)
+    rows = 1;
+  R = Calloc(CRayTiles, 1);
+  if(R) {
+    R->rows = rows;
+    R->row_start = row_start;
+    R->row_stop = row_stop;
+    R->n_tile = (n_row + rows - 1) / rows;
+    R->time = Calloc(double, R->n_tile);
+    R->worker = Calloc(int, R->n_tile);
+    R->queue = TileQueueNew(R->n_tile, n_thread);
+    if(!(R->time && R->worker && R->queue)) {
+      TileQueueFree(R->queue);
+      FreeP(R->time);
+      FreeP(R->worker);
+      FreeP(R);
+    }
+  }
+  return R;
+}
+
+static void RayTilesFree(CRayTiles * R)
+{
+  if(R) {
+    TileQueueFree(R->queue);
+    FreeP(R->time);
+    FreeP(R->worker);
+    FreeP(R);
+  }
+}
+
+static int RayTilesFetch(PyMOLGlobals * G, CRayTiles * R, int worker, CRayBand * band)
+{
+  int tile;
+  if(TileQueueNext(R->queue, worker, &tile)) {
+    int start = R->row_start + tile * R->rows;
+    band->tile = tile;
+    band->stop = start + R->rows;
+    if(band->stop > R->row_stop)
+      band->stop = R->row_stop;
+    band->start = UtilGetSeconds(G);
+    return start;
+  }
+  band->tile = -1;
+  return R->row_stop;
+}
+
+static int RayTilesNextRow(PyMOLGlobals * G, CRayTiles * R, int worker,
+                           CRayBand * band, int row)
+{
+  row++;
+  if(row < band->stop)
+    return row;
+  R->time[band->tile] = UtilGetSeconds(G) - band->start;
+  R->worker[band->tile] = worker;
+  return RayTilesFetch(G, R, worker, band);
+}
+
+static void RayTilesReport(PyMOLGlobals * G, CRayTiles * R, char *what,
+                           int n_thread, int n_started, double wall)
+{
+  if(Feedback(G, FB_Ray, FB_Blather)) {
+    int a, t;
+    int n_stolen = 0;
+    double t_min = 0.0, t_max = 0.0, t_sum = 0.0;
+    for(t = 0; t < R->n_tile; t++) {
+      double tt = R->time[t];
+      if((!t) || (tt < t_min))
+        t_min = tt;
+      if((!t) || (tt > t_max))
+        t_max = tt;
+      t_sum += tt;
+    }
+    for(a = 0; a < n_thread; a++)
+      n_stolen += TileQueueGetStolen(R->queue, a);
+    PRINTFB(G, FB_Ray, FB_Blather)
+      " Ray: %s: %d tiles of %d rows on %d of %d threads, %d stolen, %4.3f sec.\n",
+      what, R->n_tile, R->rows, n_started, n_thread, n_stolen, wall ENDFB(G);
+    PRINTFB(G, FB_Ray, FB_Blather)
+      " Ray: %s: tile time min %6.4f avg %6.4f max %6.4f sec.\n",
+      what, t_min, t_sum / R->n_tile, t_max ENDFB(G);
+    for(a = 0; a < n_thread; a++) {
+      int n_done = 0;
+      double busy = 0.0;
+      for(t = 0; t < R->n_tile; t++) {
+        if(R->worker[t] == a) {
+          n_done++;
+          busy += R->time[t];
+        }
+      }
+      PRINTFB(G, FB_Ray, FB_Blather)
+        " Ray: %s: thread %2d: %4d tiles (%d stolen), busy %4.3f sec (%3.0f%%).\n",
+        what, a + 1, n_done, TileQueueGetStolen(R->queue, a), busy,
+        (wall > 0.0) ? 100.0 * busy / wall : 100.0 ENDFB(G);
+    }
+    for(t = 0; t < R->n_tile; t++) {
+      int start = R->row_start + t * R->rows;
+      int stop = start + R->rows;
+      if(stop > R->row_stop)
+        stop = R->row_stop;
+      PRINTFB(G, FB_Ray, FB_Debugging)
+        " Ray: %s: tile %4d rows %5d-%5d thread %2d %7.5f sec.\n",
+        what, t, start, stop - 1, R->worker[t] + 1, R->time[t] ENDFB(G);
+    }
+  }
+}
+
+static void RayAntiThreadRun(void *arg)
+{
+  RayAntiThread((CRayAntiThreadInfo *) arg);
+}
+
 static void RayAntiSpawn(CRayAntiThreadInfo * Thread, int n_thread)
 {
-  int blocked;
-  PyObject *info_list;
-  int a;
+  int a, n_started;
+  double start;
   CRay *I = Thread->ray;
   PyMOLGlobals *G = I->G;
-
-  blocked = PAutoBlock(G);
+  CRayTiles *tiles = RayTilesNew(G, 0, (Thread->height / Thread->mag) - 2, n_thread);
 
   PRINTFB(I->G, FB_Ray, FB_Blather)
     " Ray: antialiasing with %d threads...\n", n_thread ENDFB(I->G);
-  info_list = PyList_New(n_thread);
-  for(a = 0; a < n_thread; a++) {
-    PyList_SetItem(info_list, a, PyCObject_FromVoidPtr(Thread + a, NULL));
+  for(a = 0; a < n_thread; a++)
+    Thread[a].tiles = tiles;
+  start = UtilGetSeconds(G);
+  n_started = ThreadRun(RayAntiThreadRun, Thread, sizeof(CRayAntiThreadInfo), n_thread);
+  if(tiles) {
+    RayTilesReport(G, tiles, "antialiasing", n_thread, n_started,
+                   UtilGetSeconds(G) - start);
+    for(a = 0; a < n_thread; a++)
+      Thread[a].tiles = NULL;
+    RayTilesFree(tiles);
   }
-  PXDecRef(PyObject_CallMethod
-           (G->P_inst->cmd, "_ray_anti_spawn", "OO", info_list, G->P_inst->cmd));
-  Py_DECREF(info_list);
-  PAutoUnblock(G, blocked);
 }
-#endif
 
 int RayHashThread(CRayHashThreadInfo * T)
 {
@@ -2890,30 +3038,33 @@ int RayHashThread(CRayHashThreadInfo * T)
   return 1;
 }
 
-#ifndef _PYMOL_NOPY
+static void RayTraceThreadRun(void *arg)
+{
+  RayTraceThread((CRayThreadInfo *) arg);
+}
+
 static void RayTraceSpawn(CRayThreadInfo * Thread, int n_thread)
 {
-  int blocked;
-  PyObject *info_list;
-  int a;
+  int a, n_started;
+  double start;
   CRay *I = Thread->ray;
   PyMOLGlobals *G = I->G;
-
-  blocked = PAutoBlock(G);
+  CRayTiles *tiles = RayTilesNew(G, Thread->y_start, Thread->y_stop, n_thread);
 
   PRINTFB(I->G, FB_Ray, FB_Blather)
     " Ray: rendering with %d threads...\n", n_thread ENDFB(I->G);
-  info_list = PyList_New(n_thread);
-  for(a = 0; a < n_thread; a++) {
-    PyList_SetItem(info_list, a, PyCObject_FromVoidPtr(Thread + a, NULL));
+  for(a = 0; a < n_thread; a++)
+    Thread[a].tiles = tiles;
+  start = UtilGetSeconds(G);
+  n_started = ThreadRun(RayTraceThreadRun, Thread, sizeof(CRayThreadInfo), n_thread);
+  if(tiles) {
+    RayTilesReport(G, tiles, "rendering", n_thread, n_started,
+                   UtilGetSeconds(G) - start);
+    for(a = 0; a < n_thread; a++)
+      Thread[a].tiles = NULL;
+    RayTilesFree(tiles);
   }
-  PXDecRef(PyObject_CallMethod
-           (G->P_inst->cmd, "_ray_spawn", "OO", info_list, G->P_inst->cmd));
-  Py_DECREF(info_list);
-  PAutoUnblock(G, blocked);
-
 }
-#endif
 
 static int find_edge(unsigned int *ptr, float *depth, unsigned int width,
                      int threshold, int back)
@@ -3156,6 +3307,7 @@ int RayTraceThread(CRayThreadInfo * T)
   CBasis *bp1, *bp2;
   int render_height;
   int offset = 0;
+  CRayBand band;
   BasisCallRec BasisCall[MAX_BASIS];
   float border_offset;
   int edge_sampling = false;
@@ -3471,13 +3623,21 @@ int RayTraceThread(CRayThreadInfo * T)
       back_mask = 0x00000000;
     }
   }
-  for(yy = T->y_start; (yy < T->y_stop); yy++) {
+  if(T->tiles)
+    yy = RayTilesFetch(I->G, T->tiles, T->phase, &band);
+  else
+    yy = T->y_start;
+  for(; (yy < T->y_stop);
+      yy = T->tiles ? RayTilesNextRow(I->G, T->tiles, T->phase, &band, yy) : yy + 1) {
     float perc, bkrd[3];
     unsigned int bkrd_value;
     if(PyMOL_GetInterrupt(I->G->PyMOL, false))
       break;
 
-    y = T->y_start + ((yy - T->y_start) + offset) % (render_height);    /* make sure threads write to different pages */
+    if(T->tiles)
+      y = yy;                   /* tiles are contiguous bands of rows */
+    else
+      y = T->y_start + ((yy - T->y_start) + offset) % (render_height);  /* make sure threads write to different pages */
 
     if (T->bkrd_is_gradient){
       /* for RayTraceThread, y is from bottom to top */
@@ -3515,7 +3675,7 @@ int RayTraceThread(CRayThreadInfo * T)
     }
     pixel = T->image + (T->width * y) + T->x_start;
 
-    if((y % T->n_thread) == T->phase) { /* this is my scan line */
+    if(T->tiles || ((y % T->n_thread) == T->phase)) {  /* this is my scan line */
       pixel_base[1] = ((y + 0.5F + border_offset) * invHgtRange) + vol2;
 
       for(x = T->x_start; (x < T->x_stop); x++) {
@@ -4484,6 +4644,7 @@ int RayAntiThread(CRayAntiThreadInfo * T)
   int x, y, yy;
   unsigned int *p;
   int offset = 0;
+  CRayBand band;
   CRay *I = T->ray;
 
   OrthoBusyFast(I->G, 9, 10);
@@ -4495,10 +4656,18 @@ int RayAntiThread(CRayAntiThreadInfo * T)
   offset = (T->phase * height) / T->n_thread;
   offset = offset - (offset % T->n_thread) + T->phase;
 
-  for(yy = 0; yy < height; yy++) {
-    y = (yy + offset) % height; /* make sure threads write to different pages */
+  if(T->tiles)
+    yy = RayTilesFetch(I->G, T->tiles, T->phase, &band);
+  else
+    yy = 0;
+  for(; yy < height;
+      yy = T->tiles ? RayTilesNextRow(I->G, T->tiles, T->phase, &band, yy) : yy + 1) {
+    if(T->tiles)
+      y = yy;
+    else
+      y = (yy + offset) % height;       /* make sure threads write to different pages */
 
-    if((y % T->n_thread) == T->phase) { /* this is my scan line */
+    if(T->tiles || ((y % T->n_thread) == T->phase)) {  /* this is my scan line */
       register unsigned long c1, c2, c3, c4, a;
       register unsigned char *c;
 
@@ -5379,6 +5548,33 @@ float *rayDepthPixels = NULL;
 int rayVolume = 0;
 
 /*========================================================================*/
+static void RayGetMapView(CRay * I, int perspective, float angle, float *view)
+{
+  UtilCopyMem(view, I->ModelView, sizeof(float) * 16);
+  UtilCopyMem(view + 16, I->Volume, sizeof(float) * 6);
+  copy3f(I->Pos, view + 22);
+  view[25] = I->Fov;
+  view[26] = I->PixelRadius;
+  view[27] = (float) I->Ortho;
+  view[28] = (float) perspective;
+  view[29] = angle;
+}
+
+static void RayReleaseMaps(CRay * I)
+{
+  /* drops the camera-space and light-space bases of an earlier render */
+  int bc;
+  if(I->Basis[1].Map) {
+    MapFree(I->Basis[1].Map);
+    I->Basis[1].Map = NULL;
+  }
+  for(bc = 2; bc < I->NBasis; bc++) {
+    BasisFinish(I->Basis + bc, bc);
+  }
+  I->NBasis = 2;
+  I->MapsValid = false;
+}
+
 void RayRender(CRay * I, unsigned int *image, double timing,
                float angle, int antialias, unsigned int *return_bg)
 {
@@ -5632,16 +5828,28 @@ void RayRender(CRay * I, unsigned int *image, double timing,
     }
   } else {
 
+    float prim_size = 0.0F;
+    float map_view[cRayMapViewSize];
+    int reuse_maps;
+
     if(I->PrimSizeCnt) {
       float factor = SettingGetGlobal_f(I->G, cSetting_ray_hint_camera);
-      I->PrimSize = I->PrimSize / (I->PrimSizeCnt * factor);
-      /*      printf("avg dist %8.7f\n",I->PrimSize); */
-    } else {
-      I->PrimSize = 0.0F;
+      prim_size = (float) (I->PrimSize / (I->PrimSizeCnt * factor));
+      /*      printf("avg dist %8.7f\n",prim_size); */
     }
 
-    RayExpandPrimitives(I);
-    RayTransformFirst(I, perspective, false);
+    /* geometry adopted from a retained ray (see RayAdoptGeometry) keeps
+       its transformed bases and voxel maps, which remain valid as long as
+       the camera hasn't moved */
+    RayGetMapView(I, perspective, angle, map_view);
+    reuse_maps = I->MapsValid &&
+      !memcmp(map_view, I->MapView, sizeof(float) * cRayMapViewSize);
+
+    if(!reuse_maps) {
+      RayReleaseMaps(I);
+      RayExpandPrimitives(I);
+      RayTransformFirst(I, perspective, false);
+    }
 
     OrthoBusyFast(I->G, 3, 20);
 
@@ -5651,160 +5859,172 @@ void RayRender(CRay * I, unsigned int *image, double timing,
       " Ray: processed %i graphics primitives in %4.2f sec.\n", I->NPrimitive, now
       ENDFB(I->G);
 
-    I->NBasis = n_light + 1;
-    if(I->NBasis > MAX_BASIS)
-      I->NBasis = MAX_BASIS;
-    if(I->NBasis < 2)
-      I->NBasis = 2;
-    {                           /* light sources */
-      int bc;
-      for(bc = 2; bc < I->NBasis; bc++) {
-        BasisInit(I->G, I->Basis + bc, bc);
-
-        {                       /* setup light & rotate if necessary  */
-          float light[3], *lightv;
-          switch (bc) {
-          default:
-          case 2:
-            lightv = SettingGetfv(I->G, cSetting_light);
-            break;
-          case 3:
-            lightv = SettingGetfv(I->G, cSetting_light2);
-            break;
-          case 4:
-            lightv = SettingGetfv(I->G, cSetting_light3);
-            break;
-          case 5:
-            lightv = SettingGetfv(I->G, cSetting_light4);
-            break;
-          case 6:
-            lightv = SettingGetfv(I->G, cSetting_light5);
-            break;
-          case 7:
-            lightv = SettingGetfv(I->G, cSetting_light6);
-            break;
-          case 8:
-            lightv = SettingGetfv(I->G, cSetting_light7);
-            break;
-          case 9:
-            lightv = SettingGetfv(I->G, cSetting_light8);
-            break;
-          case 10:
-            lightv = SettingGetfv(I->G, cSetting_light9);
-            break;
-          }
-          copy3f(lightv, light);
-          normalize3f(light);
-
-          if(angle) {
-            float temp[16];
-            identity44f(temp);
-            MatrixRotateC44f(temp, (float) -PI * angle / 180, 0.0F, 1.0F, 0.0F);
-            MatrixTransformC44fAs33f3f(temp, light, light);
-          }
+    if(reuse_maps) {
+      PRINTFB(I->G, FB_Ray, FB_Blather)
+        " Ray: reusing voxel maps from the previous frame.\n" ENDFB(I->G);
+      if (!bkrd_is_gradient) {
+	fill(image, background, width * (unsigned int) height);
+      } else {
+	fill_gradient(I, opaque_back, image, bkrd_top, bkrd_bottom, width, height, width * (unsigned int) height);
+      }
+    } else {
+      I->NBasis = n_light + 1;
+      if(I->NBasis > MAX_BASIS)
+        I->NBasis = MAX_BASIS;
+      if(I->NBasis < 2)
+        I->NBasis = 2;
+      {                           /* light sources */
+        int bc;
+        for(bc = 2; bc < I->NBasis; bc++) {
+          BasisInit(I->G, I->Basis + bc, bc);
+
+          {                       /* setup light & rotate if necessary  */
+            float light[3], *lightv;
+            switch (bc) {
+            default:
+            case 2:
+              lightv = SettingGetfv(I->G, cSetting_light);
+              break;
+            case 3:
+              lightv = SettingGetfv(I->G, cSetting_light2);
+              break;
+            case 4:
+              lightv = SettingGetfv(I->G, cSetting_light3);
+              break;
+            case 5:
+              lightv = SettingGetfv(I->G, cSetting_light4);
+              break;
+            case 6:
+              lightv = SettingGetfv(I->G, cSetting_light5);
+              break;
+            case 7:
+              lightv = SettingGetfv(I->G, cSetting_light6);
+              break;
+            case 8:
+              lightv = SettingGetfv(I->G, cSetting_light7);
+              break;
+            case 9:
+              lightv = SettingGetfv(I->G, cSetting_light8);
+              break;
+            case 10:
+              lightv = SettingGetfv(I->G, cSetting_light9);
+              break;
+            }
+            copy3f(lightv, light);
+            normalize3f(light);
+
+            if(angle) {
+              float temp[16];
+              identity44f(temp);
+              MatrixRotateC44f(temp, (float) -PI * angle / 180, 0.0F, 1.0F, 0.0F);
+              MatrixTransformC44fAs33f3f(temp, light, light);
+            }
 
-          I->Basis[bc].LightNormal[0] = light[0];
-          I->Basis[bc].LightNormal[1] = light[1];
-          I->Basis[bc].LightNormal[2] = light[2];
-          normalize3f(I->Basis[bc].LightNormal);
+            I->Basis[bc].LightNormal[0] = light[0];
+            I->Basis[bc].LightNormal[1] = light[1];
+            I->Basis[bc].LightNormal[2] = light[2];
+            normalize3f(I->Basis[bc].LightNormal);
 
-          {
-            float spec_vector[3];
-            copy3f(I->Basis[bc].LightNormal, spec_vector);
-            spec_vector[2]--;
-            normalize3f(spec_vector);
-            copy3f(spec_vector, I->Basis[bc].SpecNormal);
+            {
+              float spec_vector[3];
+              copy3f(I->Basis[bc].LightNormal, spec_vector);
+              spec_vector[2]--;
+              normalize3f(spec_vector);
+              copy3f(spec_vector, I->Basis[bc].SpecNormal);
+            }
           }
-        }
 
-        if(shadows) {           /* don't waste time on shadows unless needed */
-          BasisSetupMatrix(I->Basis + bc);
-          RayTransformBasis(I, I->Basis + bc, bc);
+          if(shadows) {           /* don't waste time on shadows unless needed */
+            BasisSetupMatrix(I->Basis + bc);
+            RayTransformBasis(I, I->Basis + bc, bc);
+          }
         }
       }
-    }
 
-    OrthoBusyFast(I->G, 4, 20);
+      OrthoBusyFast(I->G, 4, 20);
 #ifndef _PYMOL_NOPY
-    if(shadows && (n_thread > 1)) {     /* parallel execution */
-
-      CRayHashThreadInfo *thread_info = Calloc(CRayHashThreadInfo, I->NBasis);
-
-      /* rendering map */
-
-      thread_info[0].basis = I->Basis + 1;
-      thread_info[0].vert2prim = I->Vert2Prim;
-      thread_info[0].prim = I->Primitive;
-      thread_info[0].n_prim = I->NPrimitive;
-      thread_info[0].clipBox = I->Volume;
-      thread_info[0].phase = 0;
-      thread_info[0].perspective = perspective;
-      thread_info[0].front = front;
-
-      thread_info[0].image = image;
-      thread_info[0].bkrd_is_gradient = bkrd_is_gradient;
-      if (bkrd_is_gradient){
-	thread_info[0].bkrd_top = bkrd_top;
-	thread_info[0].bkrd_bottom = bkrd_bottom;
-	thread_info[0].width = width;
-	thread_info[0].height = height;
-	thread_info[0].opaque_back = opaque_back;
-      } else {
-	thread_info[0].background = background;
-      }
-      thread_info[0].bytes = width * (unsigned int) height;
-      thread_info[0].ray = I;   /* for compute box */
-      thread_info[0].size_hint = I->PrimSize;
-      /* shadow map */
+      if(shadows && (n_thread > 1)) {     /* parallel execution */
+
+        CRayHashThreadInfo *thread_info = Calloc(CRayHashThreadInfo, I->NBasis);
+
+        /* rendering map */
+
+        thread_info[0].basis = I->Basis + 1;
+        thread_info[0].vert2prim = I->Vert2Prim;
+        thread_info[0].prim = I->Primitive;
+        thread_info[0].n_prim = I->NPrimitive;
+        thread_info[0].clipBox = I->Volume;
+        thread_info[0].phase = 0;
+        thread_info[0].perspective = perspective;
+        thread_info[0].front = front;
+
+        thread_info[0].image = image;
+        thread_info[0].bkrd_is_gradient = bkrd_is_gradient;
+        if (bkrd_is_gradient){
+          thread_info[0].bkrd_top = bkrd_top;
+          thread_info[0].bkrd_bottom = bkrd_bottom;
+          thread_info[0].width = width;
+          thread_info[0].height = height;
+          thread_info[0].opaque_back = opaque_back;
+        } else {
+          thread_info[0].background = background;
+        }
+        thread_info[0].bytes = width * (unsigned int) height;
+        thread_info[0].ray = I;   /* for compute box */
+        thread_info[0].size_hint = prim_size;
+        /* shadow map */
 
-      {
-        int bc;
-        float factor = SettingGetGlobal_f(I->G, cSetting_ray_hint_shadow);
-        for(bc = 2; bc < I->NBasis; bc++) {
-          thread_info[bc - 1].basis = I->Basis + bc;
-          thread_info[bc - 1].vert2prim = I->Vert2Prim;
-          thread_info[bc - 1].prim = I->Primitive;
-          thread_info[bc - 1].n_prim = I->NPrimitive;
-          thread_info[bc - 1].clipBox = NULL;
-          thread_info[bc - 1].phase = bc - 1;
-          thread_info[bc - 1].perspective = false;
-          thread_info[bc - 1].front = _0;
-          /* allowing these maps to be more fine helps performance */
-          thread_info[bc - 1].size_hint = I->PrimSize * factor;
+        {
+          int bc;
+          float factor = SettingGetGlobal_f(I->G, cSetting_ray_hint_shadow);
+          for(bc = 2; bc < I->NBasis; bc++) {
+            thread_info[bc - 1].basis = I->Basis + bc;
+            thread_info[bc - 1].vert2prim = I->Vert2Prim;
+            thread_info[bc - 1].prim = I->Primitive;
+            thread_info[bc - 1].n_prim = I->NPrimitive;
+            thread_info[bc - 1].clipBox = NULL;
+            thread_info[bc - 1].phase = bc - 1;
+            thread_info[bc - 1].perspective = false;
+            thread_info[bc - 1].front = _0;
+            /* allowing these maps to be more fine helps performance */
+            thread_info[bc - 1].size_hint = prim_size * factor;
+          }
         }
-      }
 
-      /* NOTE that we're not limiting the number of threads in this phase
-         under the assumption that it will usually just be a few threads */
-      RayHashSpawn(thread_info, n_thread, I->NBasis - 1);
+        /* NOTE that we're not limiting the number of threads in this phase
+           under the assumption that it will usually just be a few threads */
+        RayHashSpawn(thread_info, n_thread, I->NBasis - 1);
 
-      FreeP(thread_info);
-    } else
+        FreeP(thread_info);
+      } else
 #endif
-    { 
+      { 
 #ifdef _PYMOL_NOPY
-      n_thread = 1;          /* serial execution */
+        n_thread = 1;          /* serial execution */
 #endif
-      BasisMakeMap(I->Basis + 1, I->Vert2Prim, I->Primitive, I->NPrimitive,
-                   I->Volume, 0, cCache_ray_map, perspective, front, I->PrimSize);
-      if(shadows) {
-        int bc;
-        float factor = SettingGetGlobal_f(I->G, cSetting_ray_hint_shadow);
-        for(bc = 2; bc < I->NBasis; bc++) {
-          BasisMakeMap(I->Basis + bc, I->Vert2Prim, I->Primitive, I->NPrimitive,
-                       NULL, bc - 1, cCache_ray_map, false, _0, I->PrimSize * factor);
+        BasisMakeMap(I->Basis + 1, I->Vert2Prim, I->Primitive, I->NPrimitive,
+                     I->Volume, 0, cCache_ray_map, perspective, front, prim_size);
+        if(shadows) {
+          int bc;
+          float factor = SettingGetGlobal_f(I->G, cSetting_ray_hint_shadow);
+          for(bc = 2; bc < I->NBasis; bc++) {
+            BasisMakeMap(I->Basis + bc, I->Vert2Prim, I->Primitive, I->NPrimitive,
+                         NULL, bc - 1, cCache_ray_map, false, _0, prim_size * factor);
+          }
         }
-      }
 
-      /* serial tasks which RayHashThread does in parallel mode using the first thread */
+        /* serial tasks which RayHashThread does in parallel mode using the first thread */
 
-      if (!bkrd_is_gradient) {
-	fill(image, background, width * (unsigned int) height);
-      } else {
-	fill_gradient(I, opaque_back, image, bkrd_top, bkrd_bottom, width, height, width * (unsigned int) height);
-      }
-      RayComputeBox(I);
+        if (!bkrd_is_gradient) {
+          fill(image, background, width * (unsigned int) height);
+        } else {
+          fill_gradient(I, opaque_back, image, bkrd_top, bkrd_bottom, width, height, width * (unsigned int) height);
+        }
+        RayComputeBox(I);
 
+      }
+      UtilCopyMem(I->MapView, map_view, sizeof(float) * cRayMapViewSize);
+      I->MapsValid = true;
     }
 
     OrthoBusyFast(I->G, 5, 20);
@@ -5968,11 +6188,9 @@ void RayRender(CRay * I, unsigned int *image, double timing,
         rt[a].depth = depth;
       }
 
-#ifndef _PYMOL_NOPY
       if(n_thread > 1)
         RayTraceSpawn(rt, n_thread);
       else
-#endif
         RayTraceThread(rt);
 
       if(oversample_cutoff) {   /* perform edge oversampling, if requested */
@@ -5986,11 +6204,9 @@ void RayRender(CRay * I, unsigned int *image, double timing,
           rt[a].edging = edging;
         }
 
-#ifndef _PYMOL_NOPY
         if(n_thread > 1)
           RayTraceSpawn(rt, n_thread);
         else
-#endif
           RayTraceThread(rt);
 
         CacheFreeP(I->G, edging, 0, cCache_ray_edging_buffer, false);
@@ -6379,11 +6595,9 @@ void RayRender(CRay * I, unsigned int *image, double timing,
       rt[a].ray = I;
     }
 
-#ifndef _PYMOL_NOPY
     if(n_thread > 1)
       RayAntiSpawn(rt, n_thread);
     else
-#endif
       RayAntiThread(rt);
     FreeP(rt);
     CacheFreeP(I->G, image, 0, cCache_ray_antialias_buffer, false);
@@ -6584,6 +6798,7 @@ void RayCharacter(CRay * I, int char_id)
   float width, height;
   float v_scale;
 
+  I->ViewDependent = true;      /* characters always face the camera */
   v = TextGetPos(I->G);
   VLACacheCheck(I->G, I->Primitive, CPrimitive, I->NPrimitive + 1, 0,
                 cCache_ray_primitive);
@@ -7313,6 +7528,10 @@ CRay *RayNew(PyMOLGlobals * G, int antialias)
   I->TTTStackVLA = NULL;
   I->TTTStackDepth = 0;
   I->CheckInterior = false;
+  I->PrimSizeCnt = 0;
+  I->PrimSize = 0.0;
+  I->ViewDependent = false;
+  I->MapsValid = false;
   if(antialias < 0)
     antialias = SettingGetGlobal_i(I->G, cSetting_antialias);
   I->Sampling = antialias;
@@ -7393,8 +7612,6 @@ void RayPrepare(CRay * I, float v0, float v1, float v2,
   I->PixelRatio = pixel_ratio;
   I->Magnified = magnified;
   I->FrontBackRatio = front_back_ratio;
-  I->PrimSizeCnt = 0;
-  I->PrimSize = 0.0;
   I->Fov = fov;
   copy3f(pos, I->Pos);
 
@@ -7446,8 +7663,16 @@ void RayRelease(CRay * I)
 /*========================================================================*/
 void RayFree(CRay * I)
 {
-  RayRelease(I);
   CharacterSetRetention(I->G, false);
+  RayDiscard(I);
+}
+
+
+/*========================================================================*/
+void RayDiscard(CRay * I)
+{
+  /* frees a ray without ending the current frame (see RayRetain) */
+  RayRelease(I);
   CacheFreeP(I->G, I->Basis, 0, cCache_ray_basis, false);
   VLACacheFreeP(I->G, I->Vert2Prim, 0, cCache_ray_vert2prim, false);
   VLAFreeP(I->TTTStackVLA);
@@ -7455,6 +7680,57 @@ void RayFree(CRay * I)
 }
 
 
+/*========================================================================*/
+void RayRetain(CRay * I)
+{
+  /* ends the frame like RayFree, but the caller keeps the ray and
+     its geometry for RayAdoptGeometry */
+  CharacterSetRetention(I->G, false);
+}
+
+
+/*========================================================================*/
+int RayIsViewDependent(CRay * I)
+{
+  return I->ViewDependent;
+}
+
+
+/*========================================================================*/
+void RayAdoptGeometry(CRay * I, CRay * src)
+{
+  /* takes over the primitives, bases and voxel maps of a retained ray
+     (which is freed) in place of emitting the same geometry again.  I
+     must be freshly prepared for the new camera. */
+
+  CPrimitive *prim = I->Primitive;
+  CBasis *basis = I->Basis;
+  int *vert2prim = I->Vert2Prim;
+  int n_basis = I->NBasis;
+
+  I->Primitive = src->Primitive;
+  I->NPrimitive = src->NPrimitive;
+  I->Basis = src->Basis;
+  I->NBasis = src->NBasis;
+  I->Vert2Prim = src->Vert2Prim;
+  I->PrimSize = src->PrimSize;
+  I->PrimSizeCnt = src->PrimSizeCnt;
+  I->CheckInterior = src->CheckInterior;
+  I->ViewDependent = src->ViewDependent;
+  I->MapsValid = src->MapsValid;
+  UtilCopyMem(I->MapView, src->MapView, sizeof(float) * cRayMapViewSize);
+  copy3f(src->min_box, I->min_box);
+  copy3f(src->max_box, I->max_box);
+
+  src->Primitive = prim;
+  src->NPrimitive = 0;
+  src->Basis = basis;
+  src->NBasis = n_basis;
+  src->Vert2Prim = vert2prim;
+  RayDiscard(src);
+}
+
+
 /*========================================================================*/
 void RayPushTTT(CRay * I)
 {
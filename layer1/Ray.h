@@ -23,12 +23,19 @@ Z* -------------------------------------------------------------------
 
 #define cRayMaxBasis 10
 
+/* camera parameters which the voxel maps of a rendered ray depend on */
+#define cRayMapViewSize 30
+
 typedef struct _CRayAntiThreadInfo CRayAntiThreadInfo;
 typedef struct _CRayHashThreadInfo CRayHashThreadInfo;
 typedef struct _CRayThreadInfo CRayThreadInfo;
 
 CRay *RayNew(PyMOLGlobals * G, int antialias);
 void RayFree(CRay * I);
+void RayDiscard(CRay * I);
+void RayRetain(CRay * I);
+void RayAdoptGeometry(CRay * I, CRay * src);
+int RayIsViewDependent(CRay * I);
 void RayPrepare(CRay * I, float v0, float v1, float v2,
                 float v3, float v4, float v5,
                 float fov, float *pos,
@@ -139,6 +146,9 @@ struct _CRay {
   double PrimSize;
   int PrimSizeCnt;
   float Fov, Pos[3];
+  int ViewDependent;            /* primitives were placed relative to the camera */
+  int MapsValid;                /* Basis[1..NBasis-1] were built for MapView */
+  float MapView[cRayMapViewSize];
 };
 
 #endif
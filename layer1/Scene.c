@@ -56,6 +56,7 @@ Z* -------------------------------------------------------------------
 #include"PConv.h"
 #include"ScrollBar.h"
 #include "ShaderMgr.h"
+#include"RepSurface.h"
 
 #ifdef _PYMOL_IP_EXTRAS
 #include "IncentiveCopyToClipboard.h"
@@ -230,8 +231,25 @@ struct _CScene {
   GLuint offscreen_fb, offscreen_depth_rb, offscreen_color_rb;
   int offscreen_width, offscreen_height;
   short offscreen_error;
+
+  /* ray geometry retained between frames, see SceneRay */
+  CRay *RayRetained;
+  int RayGeneration, RayRetainedGeneration;
+  struct _SceneRayObjKey *RayObjKeyVLA;
+  int RayNObjKey;
+  float RayParam[6];
+  int RayMovieFrame;
 };
 
+/* what an object contributes to a ray: when all of these (and
+   CScene.RayGeneration) are unchanged, so are its primitives */
+
+typedef struct _SceneRayObjKey {
+  CObject *obj;
+  int state, color, ttt_flag;
+  float ttt[16];
+} SceneRayObjKey;
+
 /* EXPERIMENTAL VOLUME RAYTRACING DATA */
 extern float *rayDepthPixels;
 extern int rayVolume;
@@ -2357,10 +2375,18 @@ void SceneRovingDirty(PyMOLGlobals * G)
 
 
 /*========================================================================*/
+void SceneInvalidateRayGeometry(PyMOLGlobals * G)
+{
+  register CScene *I = G->Scene;
+  if(I)
+    I->RayGeneration++;
+}
+
 void SceneChanged(PyMOLGlobals * G)
 {
   register CScene *I = G->Scene;
   I->ChangedFlag = true;
+  I->RayGeneration++;
   SceneInvalidateCopy(G, false);
   SceneDirty(G);
   SeqChanged(G);
@@ -2403,8 +2429,10 @@ int SceneMakeMovieImage(PyMOLGlobals * G, int show_timing, int validate, int mod
   I->DirtyFlag = false;
   switch (mode) {
   case cSceneImage_Ray:
+    I->RayMovieFrame = true;
     SceneRay(G, 0, 0, (int) SettingGet(G, cSetting_ray_default_renderer),
              NULL, NULL, 0.0F, 0.0F, false, NULL, show_timing, -1);
+    I->RayMovieFrame = false;
     break;
   case cSceneImage_Draw:
     SceneMakeSizedImage(G, 0, 0, SettingGetGlobal_i(G, cSetting_antialias));
@@ -2733,6 +2761,7 @@ int SceneObjectDel(PyMOLGlobals * G, CObject * obj, int allow_purge)
     }
   }
   SceneCountFrames(G);
+  SceneInvalidateRayGeometry(G);
   SceneInvalidate(G);
   return 0;
 }
@@ -6288,6 +6317,9 @@ void SceneFree(PyMOLGlobals * G)
   VLAFreeP(I->SceneVLA);
   VLAFreeP(I->SceneNameVLA);
   VLAFreeP(I->SlotVLA);
+  if(I->RayRetained)
+    RayDiscard(I->RayRetained);
+  VLAFreeP(I->RayObjKeyVLA);
   OrthoFreeBlock(G, I->Block);
   ListFree(I->Obj, next, ObjRec);
 
@@ -6804,6 +6836,52 @@ static int SceneGetDrawFlag(GridInfo * grid, int *slot_vla, int slot)
   return draw_flag;
 }
 
+static int SceneGetRayObjKey(PyMOLGlobals * G, SceneRayObjKey ** key_vla, int *n_key)
+{
+  /* fingerprints the objects which are about to be traced; returns false
+     if the ray geometry of any of them can't be kept across frames */
+  register CScene *I = G->Scene;
+  ObjRec *rec = NULL;
+  SceneRayObjKey *vla = *key_vla;
+  int n = 0;
+
+  if(!vla)
+    vla = VLAlloc(SceneRayObjKey, 10);
+  *n_key = 0;
+  while(ListIterate(I->Obj, rec, next)) {
+    CObject *obj = rec->obj;
+    if(obj->fRender) {
+      SceneRayObjKey *key;
+      switch (obj->type) {
+      case cObjectCallback:
+      case cObjectGadget:
+      case cObjectSlice:       /* may track the camera */
+      case cObjectVolume:
+        *key_vla = vla;
+        return false;
+      }
+      if(obj->Context || obj->ViewElem) {
+        /* screen-space objects, or motions which update TTT during rendering */
+        *key_vla = vla;
+        return false;
+      }
+      VLACheck(vla, SceneRayObjKey, n);
+      key = vla + n;
+      UtilZeroMem(key, sizeof(SceneRayObjKey));
+      key->obj = obj;
+      key->state = ObjectGetCurrentState(obj, false);
+      key->color = obj->Color;
+      key->ttt_flag = obj->TTTFlag;
+      if(obj->TTTFlag)
+        copy44f(obj->TTT, key->ttt);
+      n++;
+    }
+  }
+  *key_vla = vla;
+  *n_key = n;
+  return true;
+}
+
 void SceneRay(PyMOLGlobals * G,
               int ray_width, int ray_height, int mode,
               char **headerVLA_ptr,
@@ -6828,6 +6906,12 @@ void SceneRay(PyMOLGlobals * G,
   ImageType *stereo_image = NULL;
   OrthoLineType prefix = "";
   int ortho = SettingGetGlobal_i(G, cSetting_ray_orthoscopic);
+  int retain = SettingGetGlobal_i(G, cSetting_ray_retain_geometry);
+  int generation = 0;
+  SceneRayObjKey *obj_key = NULL;
+  int n_obj_key = 0;
+  int reused = false;
+  float ray_param[6];
 
   if(SettingGetGlobal_b(G, cSetting_defer_builds_mode) == 5)
     SceneUpdate(G, true);
@@ -6872,6 +6956,7 @@ void SceneRay(PyMOLGlobals * G,
 
   timing = UtilGetSeconds(G);   /* start timing the process */
 
+  ExecutiveMapRefine(G, true);  /* no coarse map contours in ray-traced images */
   SceneUpdate(G, false);
 
   switch (I->StereoMode) {
@@ -6905,6 +6990,21 @@ void SceneRay(PyMOLGlobals * G,
       aspRat *= grid.asp_adjust;
   }
 
+  /* ray_retain_geometry: 1 = keep the primitives (and voxel maps) of
+     movie frames, 2 = of every image, for reuse when only the camera moves */
+  if(retain == 1)
+    retain = I->RayMovieFrame;
+  if(mode || grid.active || stereo_hand)
+    retain = false;
+  if(retain) {
+    generation = I->RayGeneration;
+    retain = SceneGetRayObjKey(G, &obj_key, &n_obj_key);
+  }
+  if((!retain) && I->RayRetained) {
+    RayDiscard(I->RayRetained);
+    I->RayRetained = NULL;
+  }
+
   while(1) {
     int slot;
     int tot_width = ray_width;
@@ -7063,7 +7163,31 @@ void SceneRay(PyMOLGlobals * G,
           info.dynamic_width_max = SettingGetGlobal_f(G, cSetting_dynamic_width_max);
         }
 
-        while(ListIterate(I->Obj, rec, next)) {
+        ray_param[0] = (float) ray_width;
+        ray_param[1] = (float) ray_height;
+        ray_param[2] = (float) antialias;
+        ray_param[3] = (float) ortho;
+        ray_param[4] = info.vertex_scale;
+        ray_param[5] = ray->PixelRadius;
+
+        if(retain && I->RayRetained) {
+          if((I->RayRetainedGeneration == generation) &&
+             (I->RayNObjKey == n_obj_key) &&
+             !memcmp(ray_param, I->RayParam, sizeof(ray_param)) &&
+             !memcmp(obj_key, I->RayObjKeyVLA, sizeof(SceneRayObjKey) * n_obj_key)) {
+            /* nothing but the camera has changed */
+            RayAdoptGeometry(ray, I->RayRetained);
+            reused = true;
+            PRINTFB(G, FB_Scene, FB_Blather)
+              " SceneRay: reusing %d retained primitives.\n", RayGetNPrimitives(ray)
+              ENDFB(G);
+          } else {
+            RayDiscard(I->RayRetained);
+          }
+          I->RayRetained = NULL;
+        }
+
+        while((!reused) && ListIterate(I->Obj, rec, next)) {
           if(rec->obj->fRender) {
             if(SceneGetDrawFlag(&grid, slot_vla, rec->obj->grid_slot)) {
               int obj_color = rec->obj->Color;
@@ -7267,7 +7391,19 @@ void SceneRay(PyMOLGlobals * G,
         break;
 
       }
-      RayFree(ray);
+      if(retain && (!G->Interrupt) && !RayIsViewDependent(ray)) {
+        /* keep the primitives for the next frame */
+        SceneRayObjKey *tmp = I->RayObjKeyVLA;
+        RayRetain(ray);
+        I->RayRetained = ray;
+        I->RayRetainedGeneration = generation;
+        UtilCopyMem(I->RayParam, ray_param, sizeof(ray_param));
+        I->RayObjKeyVLA = obj_key;
+        I->RayNObjKey = n_obj_key;
+        obj_key = tmp;
+      } else {
+        RayFree(ray);
+      }
     }
     if(grid.active)
       GridSetRayViewport(&grid, -1, &ray_x, &ray_y, &ray_width, &ray_height);
@@ -7516,6 +7652,8 @@ void SceneRay(PyMOLGlobals * G,
     OrthoDirty(G);
   }
 
+  VLAFreeP(obj_key);
+
   /* EXPERIMENTAL VOLUME CODE */
   if (rayVolume) {
     SceneUpdate(G, true);
@@ -7764,11 +7902,17 @@ void SceneUpdate(PyMOLGlobals * G, int force)
         } else
 #endif
         {
-          /* single-threaded update */
+          /* single-threaded update, optionally with surfaces computed
+             in one native batch at the end (not while async builds
+             may run representations on Python threads) */
+          int batch = SettingGetGlobal_b(G, cSetting_surface_batch) &&
+            !SettingGetGlobal_b(G, cSetting_async_builds) && RepSurfaceBatchBegin(G);
           rec = NULL;
           while(ListIterate(I->Obj, rec, next))
             if(rec->obj->fUpdate)
               rec->obj->fUpdate(rec->obj);
+          if(batch)
+            RepSurfaceBatchFinish(G);
         }
       }
       PyMOL_SetBusy(G->PyMOL, false);   /*  race condition -- may need to be fixed */
@@ -75,6 +75,7 @@ int SceneGetButtonMargin(PyMOLGlobals * G);
 void SceneDirty(PyMOLGlobals * G);      /* scene dirty, but leave the overlay if one exists */
 void SceneInvalidate(PyMOLGlobals * G); /* scene dirty and remove the overlay */
 void SceneChanged(PyMOLGlobals * G);    /* update 3D objects */
+void SceneInvalidateRayGeometry(PyMOLGlobals * G);
 
 void SceneCountFrames(PyMOLGlobals * G);
 int SceneGetNFrame(PyMOLGlobals * G, int *has_movie);
@@ -2071,10 +2071,83 @@ void SettingGenerateSideEffects(PyMOLGlobals * G, int index, char *sele, int sta
   } else {
     inv_sele = sele;
   }
+  switch (index) {               /* settings which cannot change ray primitives */
+  case cSetting_state:          /* object states are checked by SceneRay itself */
+  case cSetting_frame:
+  case cSetting_sel_counter:
+  case cSetting_scene_current_name:
+  case cSetting_ray_retain_geometry:
+  case cSetting_max_threads:
+  case cSetting_async_builds:
+  case cSetting_cache_frames:
+  case cSetting_logging:
+  case cSetting_auto_zoom:
+  case cSetting_suspend_updates:
+  case cSetting_movie_auto_interpolate:
+  case cSetting_movie_auto_store:
+  case cSetting_movie_fps:
+  case cSetting_movie_loop:
+  case cSetting_ignore_case:
+  case cSetting_wildcard:
+  case cSetting_atom_name_wildcard:
+  case cSetting_seq_view:
+  case cSetting_seq_view_label_spacing:
+  case cSetting_seq_view_label_mode:
+  case cSetting_seq_view_label_start:
+  case cSetting_seq_view_format:
+  case cSetting_seq_view_color:
+  case cSetting_seq_view_unaligned_mode:
+  case cSetting_seq_view_fill_color:
+  case cSetting_seq_view_fill_char:
+  case cSetting_seq_view_label_color:
+  case cSetting_seq_view_location:
+  case cSetting_seq_view_overlay:
+  case cSetting_show_frame_rate:
+  case cSetting_group_full_member_names:
+  case cSetting_group_arrow_prefix:
+  case cSetting_hide_underscore_names:
+  case cSetting_mouse_selection_mode:
+  case cSetting_button_mode:
+  case cSetting_sculpting:
+  case cSetting_auto_overlay:
+  case cSetting_overlay:
+  case cSetting_overlay_lines:
+  case cSetting_text:
+  case cSetting_internal_gui_control_size:
+  case cSetting_internal_gui_mode:
+  case cSetting_internal_gui_width:
+  case cSetting_internal_gui:
+  case cSetting_internal_feedback:
+  case cSetting_mouse_grid:
+  case cSetting_movie_panel_row_height:
+  case cSetting_movie_panel:
+  case cSetting_scene_buttons:
+  case cSetting_scene_buttons_mode:
+  case cSetting_security:
+  case cSetting_rock:
+  case cSetting_sweep_mode:
+  case cSetting_sweep_phase:
+  case cSetting_sweep_angle:
+  case cSetting_sweep_speed:
+  case cSetting_motion_power:
+  case cSetting_motion_bias:
+  case cSetting_motion_simple:
+  case cSetting_motion_linear:
+  case cSetting_motion_hand:
+    break;
+  default:
+    SceneInvalidateRayGeometry(G);
+    break;
+  }
   switch (index) {
   case cSetting_stereo:
     SceneUpdateStereo(G);
     break;
+  case cSetting_ignore_case:
+  case cSetting_wildcard:
+  case cSetting_atom_name_wildcard:
+    SelectorInvalidateCache(G);
+    break;
   case cSetting_pickable:
     ExecutiveInvalidateRep(G, inv_sele, cRepAll, cRepInvAll);
     SceneChanged(G);
@@ -2112,6 +2185,7 @@ void SettingGenerateSideEffects(PyMOLGlobals * G, int index, char *sele, int sta
     OrthoDirty(G);
     break;
   case cSetting_static_singletons:
+    SelectorInvalidateCache(G);
     SeqChanged(G);
     break;
   case cSetting_seq_view_location:
@@ -4458,5 +4532,22 @@ void SettingInitGlobal(PyMOLGlobals * G, int alloc, int reset_gui, int use_defau
     set_i(I, cSetting_edit_light, 1); /* 0=ambient, default to 1 */
 
     set_b(I, cSetting_pick_surface, 1);
+    set_i(I, cSetting_traj_lazy_cache, 0); /* 0 = load all frames, N > 0 = decode on demand, keep N */
+    set_i(I, cSetting_ray_tile_size, 0); /* rows per render tile, 0 = automatic */
+    set_i(I, cSetting_ray_retain_geometry, 0); /* 0 = off, 1 = movie frames, 2 = every ray */
+    set_i(I, cSetting_cache_policy, 0); /* eviction: 0 = least recently used, 1 = least frequently used */
+    set_s(I, cSetting_cache_dir, "");   /* on-disk cache tier, "" = memory only */
+    set_b(I, cSetting_session_chunked, 0);      /* save .pse files in the chunked format */
+    set_b(I, cSetting_surface_batch, 0);        /* compute surfaces of all objects/states on max_threads native threads;
+                                                   only states SceneUpdate rebuilds are batched, i.e. every state with
+                                                   defer_builds_mode 0 (or all_states), else just the current one */
+    set_i(I, cSetting_surface_pool, 0);         /* worker processes for cached surfaces (rebuild, cache optimize) */
+    set_s(I, cSetting_fetch_mirror, "");        /* content-addressed mirror directory for fetch, "" = none */
+    set_b(I, cSetting_fetch_offline, 0);        /* fetch only from the mirror and fetch_local_path */
+    set_s(I, cSetting_fetch_local_path, "");    /* local copy of the wwPDB archive tree */
+    set_i(I, cSetting_fetch_threads, 4);        /* concurrent downloads when fetching several codes */
+    set_b(I, cSetting_lazy_ccp4_maps, 0);       /* memory-map CCP4 files, read map bricks when contoured */
+    set_i(I, cSetting_map_lod_points, 0);       /* contour coarser map levels above this many points while interacting, 0 = off */
+    set_f(I, cSetting_map_lod_delay, 0.5F);     /* seconds between updates which count as interacting, and before refining */
   }
 }
@@ -944,6 +944,21 @@ CSetting *SettingNewFromPyList(PyMOLGlobals * G, PyObject * list);
 #define cSetting_suspend_undo                            708
 #define cSetting_suspend_undo_atom_count                 709
 #define cSetting_pick_surface                            710
+#define cSetting_traj_lazy_cache                         711
+#define cSetting_ray_tile_size                           712
+#define cSetting_ray_retain_geometry                     713
+#define cSetting_cache_policy                            714
+#define cSetting_cache_dir                               715
+#define cSetting_session_chunked                         716
+#define cSetting_surface_batch                           717
+#define cSetting_surface_pool                            718
+#define cSetting_fetch_mirror                            719
+#define cSetting_fetch_offline                           720
+#define cSetting_fetch_local_path                        721
+#define cSetting_fetch_threads                           722
+#define cSetting_lazy_ccp4_maps                          723
+#define cSetting_map_lod_points                          724
+#define cSetting_map_lod_delay                           725
 
 /* when you add a new setting also remember:
    layer1/Setting.c
@@ -954,6 +969,6 @@ CSetting *SettingNewFromPyList(PyMOLGlobals * G, PyObject * list);
 
 /* cSetting_ss_INIT must always be last setting_index +1 */
 
-#define cSetting_INIT                       711
+#define cSetting_INIT                       726
 
 #endif
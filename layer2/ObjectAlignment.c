@@ -1264,6 +1264,7 @@ static void ObjectAlignmentRender(ObjectAlignment * I, RenderInfo * info)
 
 static void ObjectAlignmentInvalidate(ObjectAlignment * I, int rep, int level, int state)
 {
+  SceneInvalidateRayGeometry(I->Obj.G);
   if((rep == cRepAll) || (rep == cRepCGO)) {
     if(state >= 0) {
       if(state < I->NState)
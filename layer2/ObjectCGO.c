@@ -229,6 +229,7 @@ void ObjectCGORecomputeExtent(ObjectCGO * I)
 static void ObjectCGOInvalidate(ObjectCGO * I, int rep, int level, int state)
 {
   ObjectCGOState *sobj = NULL;
+  SceneInvalidateRayGeometry(I->Obj.G);
   if(state < 0) {
     int a;
     for(a = 0; a < I->NState; a++) {
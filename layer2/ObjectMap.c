@@ -36,6 +36,8 @@ Z* -------------------------------------------------------------------
 #include"Vector.h"
 #include"PyMOLGlobals.h"
 #include"Matrix.h"
+#include"MemoryMap.h"
+#include"Util.h"
 
 #ifndef _PYMOL_NOPY
 #ifdef _PYMOL_NUMPY
@@ -189,6 +191,364 @@ int ObjectMapSetMatrix(ObjectMap * I, int state, double *matrix)
  * RETURNS
  *  number of exluded pts?
  */
+/* Lazily read CCP4 maps
+ *
+ * With lazy_ccp4_maps, a CCP4 file is memory-mapped rather than read,
+ * and the state's Field is allocated but left unfilled, so that neither
+ * the file nor the Field is resident.  The Field is then filled one
+ * brick of cMapBrickSize^3 grid points at a time, as contouring needs
+ * them (ObjectMapStateLoadRange).  Bricks stay loaded, so contouring
+ * again around a nearby center only reads the bricks newly covered.
+ * Anything else which reads the Field loads it completely first
+ * (ObjectMapStateLoadAll), after which the file is released.
+ */
+
+#define cMapBrickSize 32
+
+struct _CMapBricks {
+  CMemoryMap *file;
+  float *voxel;                 /* first density value in the file */
+  int swap;                     /* file is reverse endian */
+  int normalize;
+  float mean, stdev;
+  int order[3];                 /* map axes of the file's columns, rows, sections */
+  int n_brick[3];
+  int n_loaded, n_total;
+  char *loaded;
+};
+
+static void ObjectMapBricksFree(CMapBricks * I)
+{
+  if(I) {
+    MemoryMapFree(I->file);
+    FreeP(I->loaded);
+    FreeP(I);
+  }
+}
+
+static float ObjectMapBricksValue(CMapBricks * I, float *f)
+{
+  float value;
+  if(I->swap) {
+    unsigned char *src = (unsigned char *) f, *dst = (unsigned char *) &value;
+    dst[0] = src[3];
+    dst[1] = src[2];
+    dst[2] = src[1];
+    dst[3] = src[0];
+  } else {
+    value = *f;
+  }
+  if(I->normalize)
+    value = (value - I->mean) / I->stdev;
+  return value;
+}
+
+static void ObjectMapStateLoadBrick(ObjectMapState * ms, int *brick)
+{
+  CMapBricks *I = ms->Bricks;
+  CCrystal *cryst = ms->Symmetry->Crystal;
+  int mapc = I->order[0], mapr = I->order[1], maps = I->order[2];
+  int lo[3], hi[3], cc[3];
+  float v[3], vr[3], *f;
+  int e;
+
+  for(e = 0; e < 3; e++) {
+    lo[e] = brick[e] * cMapBrickSize;
+    hi[e] = lo[e] + cMapBrickSize;
+    if(hi[e] > ms->FDim[e])
+      hi[e] = ms->FDim[e];
+  }
+  for(cc[maps] = lo[maps]; cc[maps] < hi[maps]; cc[maps]++) {
+    v[maps] = (cc[maps] + ms->Min[maps]) / ((float) ms->Div[maps]);
+    for(cc[mapr] = lo[mapr]; cc[mapr] < hi[mapr]; cc[mapr]++) {
+      v[mapr] = (cc[mapr] + ms->Min[mapr]) / ((float) ms->Div[mapr]);
+      /* one contiguous run of the file per brick row */
+      f = I->voxel + ((size_t) cc[maps] * ms->FDim[mapr] + cc[mapr]) * ms->FDim[mapc]
+        + lo[mapc];
+      for(cc[mapc] = lo[mapc]; cc[mapc] < hi[mapc]; cc[mapc]++) {
+        v[mapc] = (cc[mapc] + ms->Min[mapc]) / ((float) ms->Div[mapc]);
+        F3(ms->Field->data, cc[0], cc[1], cc[2]) = ObjectMapBricksValue(I, f++);
+        transform33f3f(cryst->FracToReal, v, vr);
+        for(e = 0; e < 3; e++)
+          F4(ms->Field->points, cc[0], cc[1], cc[2], e) = vr[e];
+      }
+    }
+  }
+}
+
+int ObjectMapStateLoadRange(ObjectMapState * ms, int *range)
+{
+  CMapBricks *I = ms->Bricks;
+  int lo[3], hi[3], b[3];
+  int a, n_new = 0;
+
+  if(!I)
+    return true;
+  for(a = 0; a < 3; a++) {
+    /* one point of margin for gradients and edge cases */
+    int mn = range ? range[a] - 1 : 0;
+    int mx = range ? range[a + 3] + 1 : ms->FDim[a];
+    if(mn < 0)
+      mn = 0;
+    if(mx > ms->FDim[a])
+      mx = ms->FDim[a];
+    if(mx <= mn)
+      return true;
+    lo[a] = mn / cMapBrickSize;
+    hi[a] = (mx + cMapBrickSize - 1) / cMapBrickSize;
+  }
+  for(b[2] = lo[2]; b[2] < hi[2]; b[2]++)
+    for(b[1] = lo[1]; b[1] < hi[1]; b[1]++)
+      for(b[0] = lo[0]; b[0] < hi[0]; b[0]++) {
+        char *loaded = I->loaded + (b[2] * I->n_brick[1] + b[1]) * I->n_brick[0] + b[0];
+        if(!*loaded) {
+          ObjectMapStateLoadBrick(ms, b);
+          *loaded = true;
+          n_new++;
+        }
+      }
+  I->n_loaded += n_new;
+  PRINTFB(ms->State.G, FB_ObjectMap, FB_Blather)
+    " ObjectMap: read %d bricks, %d of %d now loaded.\n",
+    n_new, I->n_loaded, I->n_total ENDFB(ms->State.G);
+  if(I->n_loaded >= I->n_total) {
+    /* complete: the file is no longer needed */
+    ObjectMapBricksFree(I);
+    ms->Bricks = NULL;
+  }
+  return true;
+}
+
+int ObjectMapStateLoadAll(ObjectMapState * ms)
+{
+  return ObjectMapStateLoadRange(ms, NULL);
+}
+
+/* loads the corner bricks, which IsosurfGetRange and TetsurfGetRange
+   read to place the map */
+static void ObjectMapStateLoadCorners(ObjectMapState * ms)
+{
+  int range[6];
+  int a;
+  for(a = 0; a < 3; a++) {
+    range[a] = 0;
+    range[a + 3] = 1;
+  }
+  ObjectMapStateLoadRange(ms, range);
+  for(a = 0; a < 3; a++) {
+    range[a] = ms->FDim[a] - 1;
+    range[a + 3] = ms->FDim[a];
+  }
+  ObjectMapStateLoadRange(ms, range);
+}
+
+/*
+ * Level-of-detail pyramid
+ *
+ * Level k of the pyramid samples the Field at every 2^k-th grid point
+ * along each axis, with the values smoothed by a [1 2 1] filter over
+ * the level below, applied one axis at a time.  The levels hold only
+ * their values: their grid point coordinates are a strided view of the
+ * Field's own.  While map_lod_points is on, the levels are built as
+ * soon as the map is loaded (ObjectMapUpdateExtents); otherwise they
+ * are built when contouring first asks for them (ObjectMapStateGetLOD).
+ * They are thrown away whenever the Field changes.
+ */
+
+#define cMapPyramidMax 4
+
+struct _CMapPyramid {
+  Isofield *base;               /* Field the levels were built from */
+  Isofield *level[cMapPyramidMax + 1];  /* level[0] is unused */
+};
+
+static void ObjectMapPyramidFree(PyMOLGlobals * G, CMapPyramid * I)
+{
+  if(I) {
+    int a;
+    for(a = 1; a <= cMapPyramidMax; a++)
+      if(I->level[a]) {
+        I->level[a]->points->data = NULL;       /* borrowed from the Field */
+        IsosurfFieldFree(G, I->level[a]);
+      }
+    FreeP(I);
+  }
+}
+
+void ObjectMapStateInvalidatePyramid(ObjectMapState * ms)
+{
+  ObjectMapPyramidFree(ms->State.G, ms->Pyramid);
+  ms->Pyramid = NULL;
+}
+
+/* every other grid point of "src", without copying it */
+
+static CField *ObjectMapPyramidPoints(PyMOLGlobals * G, CField * src, int *fdim)
+{
+  int a;
+  OOAlloc(G, CField);
+  I->type = src->type;
+  I->base_size = src->base_size;
+  I->n_dim = 4;
+  I->stride = (unsigned int *) Alloc(int, 4);
+  I->dim = (unsigned int *) Alloc(int, 4);
+  for(a = 0; a < 3; a++) {
+    I->stride[a] = 2 * src->stride[a];
+    I->dim[a] = fdim[a];
+  }
+  I->stride[3] = src->stride[3];
+  I->dim[3] = src->dim[3];
+  I->data = src->data;
+  I->size = 0;                  /* owns no data */
+  return (I);
+}
+
+/* [1 2 1] at an even point "s" of a row of "n", clamped at the ends */
+
+#define PyramidTap(v,s,n,st) (0.25F * (v)[((s) > 0 ? (s) - 1 : 0) * (st)] + \
+                              0.5F * (v)[(s) * (st)] + \
+                              0.25F * (v)[((s) + 1 < (n) ? (s) + 1 : (n) - 1) * (st)])
+
+static Isofield *ObjectMapPyramidHalve(PyMOLGlobals * G, Isofield * src)
+{
+  Isofield *field;
+  int *sdim = src->dimensions;
+  int fdim[3];
+  float *pass1, *pass2, *row;
+  int a, b, c;
+
+  for(a = 0; a < 3; a++)
+    fdim[a] = (sdim[a] + 1) / 2;
+  if((fdim[0] == sdim[0]) && (fdim[1] == sdim[1]) && (fdim[2] == sdim[2]))
+    return NULL;                /* no smaller than its source */
+
+  pass1 = Alloc(float, fdim[0] * sdim[1] * sdim[2]);
+  pass2 = Alloc(float, fdim[0] * fdim[1] * sdim[2]);
+  row = Alloc(float, sdim[0]);
+  if(!(pass1 && pass2 && row)) {
+    FreeP(pass1);
+    FreeP(pass2);
+    FreeP(row);
+    return NULL;
+  }
+
+  /* first axis */
+  for(b = 0; b < sdim[1]; b++)
+    for(c = 0; c < sdim[2]; c++) {
+      for(a = 0; a < sdim[0]; a++)
+        row[a] = F3(src->data, a, b, c);
+      for(a = 0; a < fdim[0]; a++)
+        pass1[(a * sdim[1] + b) * sdim[2] + c] = PyramidTap(row, 2 * a, sdim[0], 1);
+    }
+  /* second axis */
+  for(a = 0; a < fdim[0]; a++)
+    for(b = 0; b < fdim[1]; b++)
+      for(c = 0; c < sdim[2]; c++)
+        pass2[(a * fdim[1] + b) * sdim[2] + c] =
+          PyramidTap(pass1 + a * sdim[1] * sdim[2] + c, 2 * b, sdim[1], sdim[2]);
+
+  field = (Isofield *) mmalloc(sizeof(Isofield));
+  ErrChkPtr(G, field);
+  field->data = FieldNew(G, fdim, 3, sizeof(float), cFieldFloat);
+  ErrChkPtr(G, field->data);
+  field->points = ObjectMapPyramidPoints(G, src->points, fdim);
+  for(a = 0; a < 3; a++)
+    field->dimensions[a] = fdim[a];
+  field->save_points = false;
+  field->gradients = NULL;
+
+  /* third axis */
+  for(a = 0; a < fdim[0]; a++)
+    for(b = 0; b < fdim[1]; b++)
+      for(c = 0; c < fdim[2]; c++)
+        F3(field->data, a, b, c) =
+          PyramidTap(pass2 + (a * fdim[1] + b) * sdim[2], 2 * c, sdim[2], 1);
+
+  FreeP(pass1);
+  FreeP(pass2);
+  FreeP(row);
+  return field;
+}
+
+/* builds the missing levels up to "level"; returns the last one built
+   or already there, and sets *used to its number */
+
+static Isofield *ObjectMapStateBuildPyramid(ObjectMapState * ms, int level, int *used)
+{
+  PyMOLGlobals *G = ms->State.G;
+  CMapPyramid *I;
+  Isofield *field = NULL;
+  int a;
+
+  *used = 0;
+  if(ms->Bricks || !ms->Field)
+    return NULL;
+  if(ms->Pyramid && (ms->Pyramid->base != ms->Field))
+    ObjectMapStateInvalidatePyramid(ms);
+  if(!ms->Pyramid) {
+    ms->Pyramid = Calloc(CMapPyramid, 1);
+    if(!ms->Pyramid)
+      return NULL;
+    ms->Pyramid->base = ms->Field;
+  }
+  I = ms->Pyramid;
+
+  for(a = 1; a <= level; a++) {
+    if(!I->level[a]) {
+      double start = UtilGetSeconds(G);
+      I->level[a] = ObjectMapPyramidHalve(G, a > 1 ? I->level[a - 1] : ms->Field);
+      if(!I->level[a])
+        break;
+      PRINTFB(G, FB_ObjectMap, FB_Blather)
+        " ObjectMap: built level %d (%d x %d x %d) in %1.3f sec.\n", a,
+        I->level[a]->dimensions[0], I->level[a]->dimensions[1],
+        I->level[a]->dimensions[2], UtilGetSeconds(G) - start ENDFB(G);
+    }
+    field = I->level[a];
+    *used = a;
+  }
+  return field;
+}
+
+/* returns a coarser level of the Field for contouring the given range
+   with at most about max_points grid points, along with the matching
+   range in that level.  Returns NULL if the range is small enough to be
+   contoured as is, or if no coarser level is available (maps still
+   being read from their file are not reduced). */
+
+Isofield *ObjectMapStateGetLOD(ObjectMapState * ms, int *range, int max_points,
+                               int *lod_range)
+{
+  Isofield *field = NULL;
+  double n_point = 1.0;
+  int a, level = 0, used = 0;
+
+  if((max_points <= 0) || ms->Bricks || !ms->Field)
+    return NULL;
+  for(a = 0; a < 3; a++)
+    n_point *= (range[a + 3] - range[a]);
+  while((n_point > max_points) && (level < cMapPyramidMax)) {
+    n_point /= 8.0;
+    level++;
+  }
+  if(!level)
+    return NULL;
+
+  field = ObjectMapStateBuildPyramid(ms, level, &used);
+  if(field) {
+    int step = 1 << used;
+    for(a = 0; a < 3; a++) {
+      int first = range[a] > 0 ? range[a] : 0;
+      int last = range[a + 3] - 1;
+      lod_range[a] = first / step;
+      lod_range[a + 3] = (last + step - 1) / step + 1;
+      if(lod_range[a + 3] > field->dimensions[a])
+        lod_range[a + 3] = field->dimensions[a];
+    }
+  }
+  return field;
+}
+
 int ObjectMapStateGetExcludedStats(PyMOLGlobals * G, ObjectMapState * ms, float *vert_vla,
                                    float beyond, float within, float *level)
 {
@@ -199,6 +559,8 @@ int ObjectMapStateGetExcludedStats(PyMOLGlobals * G, ObjectMapState * ms, float
   float cutoff = beyond;
   MapType *voxelmap = NULL;
 
+  ObjectMapStateLoadAll(ms);
+
   /* size of the VLA */
   if(vert_vla) {
     list_size = VLAGetSize(vert_vla) / 3;
@@ -292,9 +654,13 @@ int ObjectMapStateGetDataRange(PyMOLGlobals * G, ObjectMapState * ms, float *min
                                float *max)
 {
   float max_val = 0.0F, min_val = 0.0F;
-  CField *data = ms->Field->data;
-  int cnt = data->dim[0] * data->dim[1] * data->dim[2];
-  float *raw_data = (float *) data->data;
+  CField *data;
+  int cnt;
+  float *raw_data;
+  ObjectMapStateLoadAll(ms);
+  data = ms->Field->data;
+  cnt = data->dim[0] * data->dim[1] * data->dim[2];
+  raw_data = (float *) data->data;
   if(cnt) {
     int a;
     min_val = (max_val = *(raw_data++));
@@ -332,9 +698,13 @@ int ObjectMapStateGetHistogram(PyMOLGlobals * G, ObjectMapState * ms,
   float sum = 0.0f, sumsq = 0.0f;
   float min_his, max_his, irange, mean, stdev;
   int pos;
-  CField *data = ms->Field->data;
-  int cnt = data->dim[0] * data->dim[1] * data->dim[2];
-  float *raw_data = (float *) data->data;
+  CField *data;
+  int cnt;
+  float *raw_data;
+  ObjectMapStateLoadAll(ms);
+  data = ms->Field->data;
+  cnt = data->dim[0] * data->dim[1] * data->dim[2];
+  raw_data = (float *) data->data;
   if(cnt) {
     int a;
     sum = min_val = (max_val = *(raw_data++));
@@ -443,6 +813,8 @@ static int ObjectMapStateTrim(PyMOLGlobals * G, ObjectMapState * ms,
   float orig_size = 1.0F;
   float new_size = 1.0F;
 
+  ObjectMapStateLoadAll(ms);
+  ObjectMapStateInvalidatePyramid(ms);
   if(ObjectMapStateValidXtal(ms)) {
     float tst[3], frac_tst[3];
     float frac_mn[3];
@@ -685,6 +1057,8 @@ static int ObjectMapStateDouble(PyMOLGlobals * G, ObjectMapState * ms)
 
   Isofield *field;
 
+  ObjectMapStateLoadAll(ms);
+  ObjectMapStateInvalidatePyramid(ms);
   if(ObjectMapStateValidXtal(ms)) {
     for(a = 0; a < 3; a++) {
       div[a] = ms->Div[a] * 2;
@@ -786,6 +1160,8 @@ static int ObjectMapStateHalve(PyMOLGlobals * G, ObjectMapState * ms, int smooth
 
   Isofield *field;
 
+  ObjectMapStateLoadAll(ms);
+  ObjectMapStateInvalidatePyramid(ms);
   if(ObjectMapStateValidXtal(ms)) {
     int *old_div, *old_min, *old_max;
     int a_2, b_2, c_2;
@@ -1067,6 +1443,7 @@ int ObjectMapStateInterpolate(ObjectMapState * ms, float *array, float *result,
   inp = array;
   out = result;
 
+  ObjectMapStateLoadAll(ms);
   if(ObjectMapStateValidXtal(ms)) {
     float frac[3];
 
@@ -1243,6 +1620,14 @@ void ObjectMapStateRegeneratePoints(ObjectMapState * ms)
   int a, b, c, e;
   float v[3], vr[3];
 
+  ObjectMapStateInvalidatePyramid(ms);
+  if(ms->Bricks) {
+    /* the file is unchanged: reread the bricks in use with new points */
+    UtilZeroMem(ms->Bricks->loaded, ms->Bricks->n_total);
+    ms->Bricks->n_loaded = 0;
+    ObjectMapStateLoadCorners(ms);
+    return;
+  }
   if(ObjectMapStateValidXtal(ms)) {
     for(c = 0; c < ms->FDim[2]; c++) {
       v[2] = (c + ms->Min[2]) / ((float) ms->Div[2]);
@@ -1314,6 +1699,7 @@ static PyObject *ObjectMapStateAsPyList(ObjectMapState * I)
   PyList_SetItem(result, 12, PConvIntArrayToPyList(I->Max, 3));
   PyList_SetItem(result, 13, PConvIntArrayToPyList(I->FDim, 4));
 
+  ObjectMapStateLoadAll(I);
   PyList_SetItem(result, 14, IsosurfAsPyList(I->Field));
   PyList_SetItem(result, 15, ObjectStateAsPyList(&I->State));
 #if 0
@@ -1352,6 +1738,7 @@ static PyObject *ObjectMapAllStatesAsPyList(ObjectMap * I)
 static int ObjectMapStateCopy(PyMOLGlobals * G, ObjectMapState * src, ObjectMapState * I)
 {
   int ok = true;
+  ObjectMapStateLoadAll(src);
   if(ok) {
     I->Active = src->Active;
     if(I->Active) {
@@ -1714,6 +2101,14 @@ void ObjectMapUpdateExtents(ObjectMap * I)
     }
   }
 
+  /* have the coarse levels ready before the first interactive update */
+  if(SettingGetGlobal_i(I->Obj.G, cSetting_map_lod_points) > 0) {
+    int used;
+    for(a = 0; a < I->NState; a++)
+      if(I->State[a].Active)
+        ObjectMapStateBuildPyramid(I->State + a, cMapPyramidMax, &used);
+  }
+
   PRINTFD(I->Obj.G, FB_ObjectMap)
     " ObjectMapUpdateExtents-DEBUG: ExtentFlag %d\n", I->Obj.ExtentFlag ENDFD;
 }
@@ -1723,6 +2118,9 @@ void ObjectMapStateClamp(ObjectMapState * I, float clamp_floor, float clamp_ceil
   int a, b, c;
   float *fp;
 
+  ObjectMapStateLoadAll(I);
+  ObjectMapStateInvalidatePyramid(I);
+
   for(a = 0; a < I->FDim[0]; a++)
     for(b = 0; b < I->FDim[1]; b++)
       for(c = 0; c < I->FDim[2]; c++) {
@@ -1739,6 +2137,8 @@ int ObjectMapStateSetBorder(ObjectMapState * I, float level)
   int result = true;
   int a, b, c;
 
+  ObjectMapStateLoadAll(I);
+  ObjectMapStateInvalidatePyramid(I);
   c = I->FDim[2] - 1;
   for(a = 0; a < I->FDim[0]; a++)
     for(b = 0; b < I->FDim[1]; b++) {
@@ -1769,6 +2169,10 @@ void ObjectMapStatePurge(PyMOLGlobals * G, ObjectMapState * I)
     IsosurfFieldFree(G, I->Field);
     I->Field = NULL;
   }
+  ObjectMapBricksFree(I->Bricks);
+  I->Bricks = NULL;
+  ObjectMapPyramidFree(G, I->Pyramid);
+  I->Pyramid = NULL;
   FreeP(I->Origin);
   FreeP(I->Dim);
   FreeP(I->Range);
@@ -1806,6 +2210,7 @@ static void ObjectMapUpdate(ObjectMap * I)
 
 static void ObjectMapInvalidate(ObjectMap * I, int rep, int level, int state)
 {
+  SceneInvalidateRayGeometry(I->Obj.G);
   if(level >= cRepInvExtents) {
     I->Obj.ExtentFlag = false;
   }
@@ -1978,6 +2383,7 @@ static void ObjectMapRender(ObjectMap * I, RenderInfo * info)
       if(I->Obj.RepVis[cRepDot]) {
         /* note, the following rep doesn't work with state matrices yet */
 
+        ObjectMapStateLoadAll(ms);
         if(!ms->have_range) {
           double sum = 0.0, sumsq = 0.0;
           CField *data = ms->Field->data;
@@ -2195,6 +2601,8 @@ void ObjectMapStateInit(PyMOLGlobals * G, ObjectMapState * I)
   I->Grid = NULL;
   I->MapSource = cMapSourceUndefined;
   I->have_range = false;
+  I->Bricks = NULL;
+  I->Pyramid = NULL;
 }
 
 int ObjectMapGetNStates(ObjectMap * I)
@@ -2396,7 +2804,7 @@ ObjectMapState *ObjectMapNewStateFromDesc(PyMOLGlobals * G, ObjectMap * I,
 
 /*========================================================================*/
 static int ObjectMapCCP4StrToMap(ObjectMap * I, char *CCP4Str, int bytes, int state,
-                                 int quiet)
+                                 int quiet, CMemoryMap ** file)
 {
   char *p;
   int *i;
@@ -2423,6 +2831,7 @@ static int ObjectMapCCP4StrToMap(ObjectMap * I, char *CCP4Str, int bytes, int st
   int normalize;
   ObjectMapState *ms;
   int expectation;
+  CMapBricks *bricks = NULL;
 
   /* state check */
   if(state < 0)
@@ -2436,6 +2845,10 @@ static int ObjectMapCCP4StrToMap(ObjectMap * I, char *CCP4Str, int bytes, int st
   ObjectMapStateInit(I->Obj.G, ms);
 
   normalize = (int) SettingGet(I->Obj.G, cSetting_normalize_ccp4_maps);
+  if(file && *file && SettingGetGlobal_b(I->Obj.G, cSetting_lazy_ccp4_maps)) {
+    /* read the map brick by brick from the mapped file (see above) */
+    bricks = Calloc(CMapBricks, 1);
+  }
   maxd = -FLT_MAX;
   mind = FLT_MAX;
   p = CCP4Str;
@@ -2445,6 +2858,7 @@ static int ObjectMapCCP4StrToMap(ObjectMap * I, char *CCP4Str, int bytes, int st
   if(bytes < 256 * sizeof(int)) {
     PRINTFB(I->Obj.G, FB_ObjectMap, FB_Errors)
       " ObjectMapCCP4: Map appears to be truncated -- aborting." ENDFB(I->Obj.G);
+    ObjectMapBricksFree(bricks);
     return (0);
   }
   if(little_endian != map_endian) {
@@ -2453,6 +2867,10 @@ static int ObjectMapCCP4StrToMap(ObjectMap * I, char *CCP4Str, int bytes, int st
         " ObjectMapCCP4: Map appears to be reverse endian, swapping...\n" ENDFB(I->Obj.G);
     }
     c = bytes;
+    if(bricks) {                /* densities are swapped as bricks are read */
+      bricks->swap = true;
+      c = 256 * sizeof(int);
+    }
     u = (unsigned int *) p;
     uc = (unsigned char *) u;
     while(c > 3) {
@@ -2483,6 +2901,7 @@ static int ObjectMapCCP4StrToMap(ObjectMap * I, char *CCP4Str, int bytes, int st
     PRINTFB(I->Obj.G, FB_ObjectMap, FB_Errors)
       "ObjectMapCCP4-ERR: Only map mode 2 currently supported (this map is mode %d)",
       map_mode ENDFB(I->Obj.G);
+    ObjectMapBricksFree(bricks);
     return (0);
   }
 
@@ -2547,6 +2966,7 @@ static int ObjectMapCCP4StrToMap(ObjectMap * I, char *CCP4Str, int bytes, int st
       PRINTFB(I->Obj.G, FB_ObjectMap, FB_Errors)
         "ObjectMapCCP4-ERR: PyMOL doesn't know how to handle skewed maps. Sorry!\n"
         ENDFB(I->Obj.G);
+      ObjectMapBricksFree(bricks);
       return (0);
     }
   }
@@ -2588,21 +3008,30 @@ static int ObjectMapCCP4StrToMap(ObjectMap * I, char *CCP4Str, int bytes, int st
     } else {
       PRINTFB(I->Obj.G, FB_ObjectMap, FB_Errors)
         " ObjectMapCCP4: Map appears to be truncated -- aborting.\n" ENDFB(I->Obj.G);
+      ObjectMapBricksFree(bricks);
       return (0);
     }
   }
 
   if(n_pts > 1) {
-    f = (float *) (p + (sizeof(int) * 256) + sym_skip);
-    c = n_pts;
-    sum = 0.0;
-    sumsq = 0.0;
-    while(c--) {
-      sumsq += (*f) * (*f);
-      sum += *f++;
+    float *header = (float *) p;
+    if(bricks && (header[54] > 0.0F)) {
+      /* AMEAN and RMS from the header, so the file isn't read through */
+      mean = header[21];
+      stdev = header[54];
+    } else {
+      f = (float *) (p + (sizeof(int) * 256) + sym_skip);
+      c = n_pts;
+      sum = 0.0;
+      sumsq = 0.0;
+      while(c--) {
+        float value = bricks ? ObjectMapBricksValue(bricks, f++) : *(f++);
+        sumsq += value * value;
+        sum += value;
+      }
+      mean = (float) (sum / n_pts);
+      stdev = (float) sqrt1d((sumsq - (sum * sum / n_pts)) / (n_pts - 1));
     }
-    mean = (float) (sum / n_pts);
-    stdev = (float) sqrt1d((sumsq - (sum * sum / n_pts)) / (n_pts - 1));
     if(stdev < 0.000001)
       stdev = 1.0;
 
@@ -2674,28 +3103,61 @@ static int ObjectMapCCP4StrToMap(ObjectMap * I, char *CCP4Str, int bytes, int st
     ms->MapSource = cMapSourceCCP4;
     ms->Field->save_points = false;
 
-    for(cc[maps] = 0; cc[maps] < ms->FDim[maps]; cc[maps]++) {
-      v[maps] = (cc[maps] + ms->Min[maps]) / ((float) ms->Div[maps]);
+    if(bricks) {
+      float *header = (float *) p;
+      bricks->voxel = f;
+      bricks->normalize = normalize;
+      bricks->mean = mean;
+      bricks->stdev = stdev;
+      bricks->order[0] = mapc;
+      bricks->order[1] = mapr;
+      bricks->order[2] = maps;
+      bricks->n_total = 1;
+      for(e = 0; e < 3; e++) {
+        bricks->n_brick[e] = (ms->FDim[e] + cMapBrickSize - 1) / cMapBrickSize;
+        bricks->n_total *= bricks->n_brick[e];
+      }
+      bricks->loaded = Calloc(char, bricks->n_total);
+      if(!bricks->loaded) {
+        ok = false;
+      } else {
+        /* the state now owns the mapping */
+        bricks->file = *file;
+        *file = NULL;
+        ms->Bricks = bricks;
+        bricks = NULL;
+        mind = header[19];      /* AMIN and AMAX */
+        maxd = header[20];
+        if(normalize) {
+          mind = (mind - mean) / stdev;
+          maxd = (maxd - mean) / stdev;
+        }
+        ObjectMapStateLoadCorners(ms);
+      }
+    } else {
+      for(cc[maps] = 0; cc[maps] < ms->FDim[maps]; cc[maps]++) {
+        v[maps] = (cc[maps] + ms->Min[maps]) / ((float) ms->Div[maps]);
 
-      for(cc[mapr] = 0; cc[mapr] < ms->FDim[mapr]; cc[mapr]++) {
-        v[mapr] = (cc[mapr] + ms->Min[mapr]) / ((float) ms->Div[mapr]);
+        for(cc[mapr] = 0; cc[mapr] < ms->FDim[mapr]; cc[mapr]++) {
+          v[mapr] = (cc[mapr] + ms->Min[mapr]) / ((float) ms->Div[mapr]);
 
-        for(cc[mapc] = 0; cc[mapc] < ms->FDim[mapc]; cc[mapc]++) {
-          v[mapc] = (cc[mapc] + ms->Min[mapc]) / ((float) ms->Div[mapc]);
+          for(cc[mapc] = 0; cc[mapc] < ms->FDim[mapc]; cc[mapc]++) {
+            v[mapc] = (cc[mapc] + ms->Min[mapc]) / ((float) ms->Div[mapc]);
 
-          if(normalize)
-            dens = (*f - mean) / stdev;
-          else
-            dens = *f;
-          F3(ms->Field->data, cc[0], cc[1], cc[2]) = dens;
-          if(maxd < *f)
-            maxd = dens;
-          if(mind > *f)
-            mind = dens;
-          f++;
-          transform33f3f(ms->Symmetry->Crystal->FracToReal, v, vr);
-          for(e = 0; e < 3; e++)
-            F4(ms->Field->points, cc[0], cc[1], cc[2], e) = vr[e];
+            if(normalize)
+              dens = (*f - mean) / stdev;
+            else
+              dens = *f;
+            F3(ms->Field->data, cc[0], cc[1], cc[2]) = dens;
+            if(maxd < *f)
+              maxd = dens;
+            if(mind > *f)
+              mind = dens;
+            f++;
+            transform33f3f(ms->Symmetry->Crystal->FracToReal, v, vr);
+            for(e = 0; e < 3; e++)
+              F4(ms->Field->points, cc[0], cc[1], cc[2], e) = vr[e];
+          }
         }
       }
     }
@@ -2759,6 +3221,7 @@ static int ObjectMapCCP4StrToMap(ObjectMap * I, char *CCP4Str, int bytes, int st
   printf("Okay? %d\n", ok);
   fflush(stdout);
 #endif
+  ObjectMapBricksFree(bricks);
   if(!ok) {
     ErrMessage(I->Obj.G, "ObjectMap", "Error reading map");
   } else {
@@ -4489,7 +4952,8 @@ static ObjectMap *ObjectMapReadXPLORStr(PyMOLGlobals * G, ObjectMap * I, char *X
 
 /*========================================================================*/
 static ObjectMap *ObjectMapReadCCP4Str(PyMOLGlobals * G, ObjectMap * I, char *XPLORStr,
-                                       int bytes, int state, int quiet)
+                                       int bytes, int state, int quiet,
+                                       CMemoryMap ** file)
 {
   int ok = true;
   int isNew = true;
@@ -4505,7 +4969,7 @@ static ObjectMap *ObjectMapReadCCP4Str(PyMOLGlobals * G, ObjectMap * I, char *XP
     } else {
       isNew = false;
     }
-    ObjectMapCCP4StrToMap(I, XPLORStr, bytes, state, quiet);
+    ObjectMapCCP4StrToMap(I, XPLORStr, bytes, state, quiet, file);
     SceneChanged(G);
     SceneCountFrames(G);
   }
@@ -4520,18 +4984,24 @@ ObjectMap *ObjectMapLoadCCP4(PyMOLGlobals * G, ObjectMap * obj, char *fname, int
   ObjectMap *I = NULL;
   int ok = true;
   FILE *f = NULL;
+  CMemoryMap *file = NULL;
+  int mapped;
   char *buffer, *p;
   long size;
   size_t res;
 
   if(!is_string) {
-
-    f = fopen(fname, "rb");
-    if(!f)
-      ok = ErrMessage(G, "ObjectMapLoadCCP4File", "Unable to open file!");
+    /* mapped files are only paged in as they're read, and don't need a
+       second copy of the map in memory */
+    file = MemoryMapOpen(fname);
+    if(!file) {
+      f = fopen(fname, "rb");
+      if(!f)
+        ok = ErrMessage(G, "ObjectMapLoadCCP4File", "Unable to open file!");
+    }
   }
 
-  if(f || is_string) {
+  if(f || file || is_string) {
 
     if(!quiet) {
       if((!is_string) && Feedback(G, FB_ObjectMap, FB_Actions)) {
@@ -4539,7 +5009,11 @@ ObjectMap *ObjectMapLoadCCP4(PyMOLGlobals * G, ObjectMap * obj, char *fname, int
       }
     }
 
-    if(!is_string) {
+    mapped = (file != NULL);
+    if(mapped) {
+      buffer = MemoryMapGetData(file);
+      size = (long) MemoryMapGetSize(file);
+    } else if(!is_string) {
       fseek(f, 0, SEEK_END);
       size = ftell(f);
       fseek(f, 0, SEEK_SET);
@@ -4558,9 +5032,11 @@ ObjectMap *ObjectMapLoadCCP4(PyMOLGlobals * G, ObjectMap * obj, char *fname, int
       size = (long) bytes;
     }
 
-    I = ObjectMapReadCCP4Str(G, obj, buffer, size, state, quiet);
+    I = ObjectMapReadCCP4Str(G, obj, buffer, size, state, quiet, &file);
 
-    if(!is_string)
+    if(mapped)
+      MemoryMapFree(file);      /* NULL if a lazily read state kept it */
+    else if(!is_string)
       mfree(buffer);
 
     if(!quiet) {
@@ -42,6 +42,9 @@ Z* -------------------------------------------------------------------
 #define cMapSourceVMDPlugin 9
 #define cMapSourceObsolete   10
 
+typedef struct _CMapBricks CMapBricks;
+typedef struct _CMapPyramid CMapPyramid;
+
 typedef struct ObjectMapState {
   CObjectState State;
   int Active;
@@ -62,6 +65,8 @@ typedef struct ObjectMapState {
 
   int have_range;
   float high_cutoff, low_cutoff;
+  CMapBricks *Bricks;           /* file the Field is still being read from, or NULL */
+  CMapPyramid *Pyramid;         /* coarser copies of the Field, built on demand */
 } ObjectMapState;
 
 typedef struct ObjectMap {
@@ -157,5 +162,14 @@ int ObjectMapStateGetDataRange(PyMOLGlobals * G, ObjectMapState * ms, float *min
 int ObjectMapStateGetHistogram(PyMOLGlobals * G, ObjectMapState * ms,
                                int n_points, float limit, float *histogram);
 
+/* lazily read maps (lazy_ccp4_maps): make sure the Field holds data and
+   points for the given index range, or for the whole map.  No-ops for
+   maps which are already complete. */
+int ObjectMapStateLoadRange(ObjectMapState * ms, int *range);
+int ObjectMapStateLoadAll(ObjectMapState * ms);
+void ObjectMapStateInvalidatePyramid(ObjectMapState * ms);
+Isofield *ObjectMapStateGetLOD(ObjectMapState * ms, int *range, int max_points,
+                               int *lod_range);
+
 
 #endif
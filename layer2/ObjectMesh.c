@@ -429,6 +429,7 @@ static void ObjectMeshInvalidate(ObjectMesh * I, int rep, int level, int state)
 {
   int a;
   int once_flag = true;
+  SceneInvalidateRayGeometry(I->Obj.G);
   if(level >= cRepInvExtents) {
     I->Obj.ExtentFlag = false;
   }
@@ -521,6 +522,23 @@ int ObjectMeshSetLevel(ObjectMesh * I, float level, int state, int quiet)
   return (ok);
 }
 
+int ObjectMeshRefine(ObjectMesh * I)
+{
+  int a;
+  int result = false;
+  ObjectMeshState *ms;
+  for(a = 0; a < I->NState; a++) {
+    ms = I->State + a;
+    if(ms->Active && ms->CoarseFlag) {
+      ms->ResurfaceFlag = true;
+      ms->RefineFlag = true;
+      ms->quiet = true;
+      result = true;
+    }
+  }
+  return (result);
+}
+
 static void ObjectMeshStateUpdateColors(ObjectMesh * I, ObjectMeshState * ms)
 {
   int one_color_flag = true;
@@ -662,6 +680,8 @@ static void ObjectMeshUpdate(ObjectMesh * I)
       if(map && oms && ms->N && ms->V && I->Obj.RepVis[cRepMesh]) {
         if(ms->ResurfaceFlag) {
           Isofield *field = NULL;
+          int *range = ms->Range;
+          int lod_range[6];
           ms->RecolorFlag = true;
           ms->ResurfaceFlag = false;
           if(!ms->quiet) {
@@ -690,7 +710,27 @@ static void ObjectMeshUpdate(ObjectMesh * I)
 
               IsosurfGetRange(I->Obj.G, field, oms->Symmetry->Crystal,
                               min_ext, max_ext, ms->Range, true);
+              if(field == oms->Field) {
+                /* gradients (mode 3) are computed over the whole field */
+                ObjectMapStateLoadRange(oms, (ms->MeshMode == 3) ? NULL : ms->Range);
+              }
+            }
+            /* while interacting, contour a coarser level of large maps
+               and come back for full resolution once things settle */
+            ms->CoarseFlag = false;
+            if((field == oms->Field) && G->HaveGUI && !ms->RefineFlag) {
+              Isofield *lod = ObjectMapStateGetLOD(oms, ms->Range,
+                                                   SettingGet_i(G, I->Obj.Setting, NULL,
+                                                                cSetting_map_lod_points),
+                                                   lod_range);
+              if(lod) {
+                field = lod;
+                range = lod_range;
+                ms->CoarseFlag = true;
+                ExecutiveMapRefineLater(G);
+              }
             }
+            ms->RefineFlag = false;
             /*                      printf("Mesh-DEBUG: %d %d %d %d %d %d\n",
                ms->Range[0],
                ms->Range[1],
@@ -702,7 +742,7 @@ static void ObjectMeshUpdate(ObjectMesh * I)
                           field,
                           ms->Level,
                           &ms->N, &ms->V,
-                          ms->Range, ms->MeshMode, mesh_skip, ms->AltLevel);
+                          range, ms->MeshMode, mesh_skip, ms->AltLevel);
 
             if(!SettingGet_b
                (I->Obj.G, I->Obj.Setting, NULL, cSetting_mesh_negative_visible)) {
@@ -716,7 +756,7 @@ static void ObjectMeshUpdate(ObjectMesh * I)
               IsosurfVolume(I->Obj.G, I->Obj.Setting, NULL,
                             field,
                             -ms->Level,
-                            &N2, &V2, ms->Range, ms->MeshMode, mesh_skip, ms->AltLevel);
+                            &N2, &V2, range, ms->MeshMode, mesh_skip, ms->AltLevel);
 
               if(N2 && V2) {
 
@@ -1412,6 +1452,8 @@ void ObjectMeshStateInit(PyMOLGlobals * G, ObjectMeshState * ms)
   ms->displayListInvalid = true;
   ms->caption[0] = 0;
   ms->Field = NULL;
+  ms->CoarseFlag = false;
+  ms->RefineFlag = false;
   ms->shaderCGO = NULL;
   ms->shaderUnitCellCGO = NULL;
 }
@@ -1502,6 +1544,7 @@ ObjectMesh *ObjectMeshFromXtalSym(PyMOLGlobals * G, ObjectMesh * obj, ObjectMap
           fdim[2] = eff_range[5] - eff_range[2];
           ms->Field = IsosurfFieldAlloc(I->Obj.G, fdim);
 
+          ObjectMapStateLoadAll(oms);
           expand_result =
             IsosurfExpand(oms->Field, ms->Field, oms->Symmetry->Crystal, sym, eff_range);
 
@@ -49,6 +49,8 @@ typedef struct {
   float AltLevel;
   /* not stored */
   Isofield *Field;
+  int CoarseFlag;               /* contoured from a coarser level of the map */
+  int RefineFlag;               /* recontour at full resolution */
   CGO *shaderCGO;
   CGO *shaderUnitCellCGO;
 } ObjectMeshState;
@@ -79,5 +81,6 @@ int ObjectMeshSetLevel(ObjectMesh * I, float level, int state, int quiet);
 int ObjectMeshGetLevel(ObjectMesh * I, int state, float *result);
 int ObjectMeshInvalidateMapName(ObjectMesh * I, char *name);
 int ObjectMeshAllMapsInStatesExist(ObjectMesh * I);
+int ObjectMeshRefine(ObjectMesh * I);
 
 #endif
@@ -38,6 +38,7 @@ Z* -------------------------------------------------------------------
 #include"P.h"
 #include"PConv.h"
 #include"Executive.h"
+#include"PlugIOManager.h"
 #include"Setting.h"
 #include"Sphere.h"
 #include"main.h"
@@ -10037,9 +10038,11 @@ void ObjectMoleculeAppendAtoms(ObjectMolecule * I, AtomInfoType * atInfo, CoordS
 /*========================================================================*/
 CoordSet *ObjectMoleculeGetCoordSet(ObjectMolecule * I, int setIndex)
 {
-  if((setIndex >= 0) && (setIndex < I->NCSet))
+  if((setIndex >= 0) && (setIndex < I->NCSet)) {
+    if(I->Traj && !I->CSet[setIndex])
+      PlugIOManagerTrajLoadRange(I, setIndex, setIndex + 1);
     return (I->CSet[setIndex]);
-  else
+  } else
     return (NULL);
 }
 
@@ -10064,6 +10067,302 @@ void ObjectMoleculeTransformTTTf(ObjectMolecule * I, float *ttt, int frame)
 
 
 /*========================================================================*/
+int ObjectMoleculeAtomColumnKind(int field)
+{
+  /* atom fields which can be set column-wise (cPAlter_* codes):
+     1 = numeric, 2 = text, 0 = not settable */
+  switch (field) {
+  case cPAlter_b:
+  case cPAlter_q:
+  case cPAlter_vdw:
+  case cPAlter_elec_radius:
+  case cPAlter_partial_charge:
+  case cPAlter_formal_charge:
+  case cPAlter_resv:
+  case cPAlter_numeric_type:
+  case cPAlter_color:
+  case cPAlter_cartoon:
+  case cPAlter_ID:
+  case cPAlter_rank:
+  case cPAlter_flags:
+  case cPAlter_state:
+    return 1;
+  case cPAlter_type:
+  case cPAlter_name:
+  case cPAlter_resn:
+  case cPAlter_resi:
+  case cPAlter_chain:
+  case cPAlter_alt:
+  case cPAlter_segi:
+  case cPAlter_elem:
+  case cPAlter_ss:
+  case cPAlter_text_type:
+  case cPAlter_custom:
+  case cPAlter_label:
+    return 2;
+  }
+  return 0;
+}
+
+int ObjectMoleculeGetAtomColumn(PyMOLGlobals * G, AtomInfoType * ai, int field,
+                                double *value, char **text)
+{
+  static char null_st[1] = "";
+  int word = 0;
+  switch (field) {
+  case cPAlter_b:
+    *value = ai->b;
+    break;
+  case cPAlter_q:
+    *value = ai->q;
+    break;
+  case cPAlter_vdw:
+    *value = ai->vdw;
+    break;
+  case cPAlter_elec_radius:
+    *value = ai->elec_radius;
+    break;
+  case cPAlter_partial_charge:
+    *value = ai->partialCharge;
+    break;
+  case cPAlter_formal_charge:
+    *value = ai->formalCharge;
+    break;
+  case cPAlter_resv:
+    *value = ai->resv;
+    break;
+  case cPAlter_numeric_type:
+    *value = ai->customType;
+    break;
+  case cPAlter_color:
+    *value = ai->color;
+    break;
+  case cPAlter_cartoon:
+    *value = ai->cartoon;
+    break;
+  case cPAlter_ID:
+    *value = ai->id;
+    break;
+  case cPAlter_rank:
+    *value = ai->rank;
+    break;
+  case cPAlter_flags:
+    *value = ai->flags;
+    break;
+  case cPAlter_state:
+    *value = ai->discrete_state;
+    break;
+  case cPAlter_type:
+    *text = ai->hetatm ? "HETATM" : "ATOM";
+    break;
+  case cPAlter_name:
+    *text = ai->name;
+    break;
+  case cPAlter_resn:
+    *text = ai->resn;
+    break;
+  case cPAlter_resi:
+    *text = ai->resi;
+    break;
+  case cPAlter_chain:
+    *text = ai->chain;
+    break;
+  case cPAlter_alt:
+    *text = ai->alt;
+    break;
+  case cPAlter_segi:
+    *text = ai->segi;
+    break;
+  case cPAlter_elem:
+    *text = ai->elem;
+    break;
+  case cPAlter_ss:
+    *text = ai->ssType;
+    break;
+  case cPAlter_text_type:
+    word = ai->textType;
+    break;
+  case cPAlter_custom:
+    word = ai->custom;
+    break;
+  case cPAlter_label:
+    word = ai->label;
+    break;
+  default:
+    return false;
+  }
+  switch (field) {
+  case cPAlter_text_type:
+  case cPAlter_custom:
+  case cPAlter_label:
+    *text = word ? OVLexicon_FetchCString(G->Lexicon, word) : null_st;
+    break;
+  }
+  return true;
+}
+
+static void ObjectMoleculeSetLexiconWord(PyMOLGlobals * G, int *word, char *text)
+{
+  if(*word)
+    OVLexicon_DecRef(G->Lexicon, *word);
+  *word = 0;
+  if(text[0]) {
+    OVreturn_word result = OVLexicon_GetFromCString(G->Lexicon, text);
+    if(OVreturn_IS_OK(result))
+      *word = result.word;
+  }
+}
+
+int ObjectMoleculeSetAtomColumn(PyMOLGlobals * G, AtomInfoType * ai, int field,
+                                double value, char *text)
+{
+  /* same side effects as assigning the field in "alter" */
+  switch (field) {
+  case cPAlter_b:
+    ai->b = (float) value;
+    break;
+  case cPAlter_q:
+    ai->q = (float) value;
+    break;
+  case cPAlter_vdw:
+    ai->vdw = (float) value;
+    break;
+  case cPAlter_elec_radius:
+    ai->elec_radius = (float) value;
+    break;
+  case cPAlter_partial_charge:
+    ai->partialCharge = (float) value;
+    break;
+  case cPAlter_formal_charge:
+    ai->formalCharge = (int) value;
+    ai->chemFlag = false;       /* invalidate chemistry info for this atom */
+    break;
+  case cPAlter_resv:
+    ai->resv = (int) value;
+    sprintf(ai->resi, "%d", ai->resv);
+    break;
+  case cPAlter_numeric_type:
+    ai->customType = (int) value;
+    break;
+  case cPAlter_color:
+    ai->color = (int) value;
+    break;
+  case cPAlter_cartoon:
+    ai->cartoon = (int) value;
+    break;
+  case cPAlter_ID:
+    ai->id = (int) value;
+    break;
+  case cPAlter_rank:
+    ai->rank = (int) value;
+    break;
+  case cPAlter_flags:
+    ai->flags = (unsigned int) value;
+    break;
+  case cPAlter_state:
+    ai->discrete_state = (int) value;
+    break;
+  case cPAlter_type:
+    ai->hetatm = ((text[0] == 'h') || (text[0] == 'H'));
+    break;
+  case cPAlter_name:
+    UtilNCopy(ai->name, text, sizeof(AtomName));
+    break;
+  case cPAlter_resn:
+    UtilNCopy(ai->resn, text, sizeof(ResName));
+    break;
+  case cPAlter_resi:
+    if(strcmp(ai->resi, text)) {
+      UtilNCopy(ai->resi, text, sizeof(ResIdent));
+      ai->resv = AtomResvFromResi(ai->resi);
+    }
+    break;
+  case cPAlter_chain:
+    UtilNCopy(ai->chain, text, sizeof(Chain));
+    break;
+  case cPAlter_alt:
+    UtilNCopy(ai->alt, text, sizeof(Chain));
+    break;
+  case cPAlter_segi:
+    UtilNCopy(ai->segi, text, sizeof(SegIdent));
+    break;
+  case cPAlter_elem:
+    UtilNCopy(ai->elem, text, sizeof(ElemName));
+    AtomInfoAssignParameters(G, ai);
+    break;
+  case cPAlter_ss:
+    UtilNCopy(ai->ssType, text, sizeof(SSType));
+    ai->ssType[0] = toupper(ai->ssType[0]);
+    break;
+  case cPAlter_text_type:
+    ObjectMoleculeSetLexiconWord(G, &ai->textType, text);
+    break;
+  case cPAlter_custom:
+    ObjectMoleculeSetLexiconWord(G, &ai->custom, text);
+    break;
+  case cPAlter_label:
+    ObjectMoleculeSetLexiconWord(G, &ai->label, text);
+    break;
+  default:
+    return false;
+  }
+  return true;
+}
+
+
+/*========================================================================*/
+static void ObjectMoleculeSeleOpTrajLoad(ObjectMolecule * I, ObjectMoleculeOpRec * op)
+{
+  /* decode the trajectory states an operation is about to read, since
+     everything below walks I->CSet directly */
+  int a;
+  switch (op->code) {
+  case OMOP_AlterState:
+    PlugIOManagerTrajLoadRange(I, op->i2, op->i2 + 1);
+    if(!op->i3)                 /* edits must survive eviction */
+      PlugIOManagerTrajKeep(I, op->i2);
+    break;
+  case OMOP_SetSingleStateVertices:
+    PlugIOManagerTrajLoadRange(I, op->cs1, op->cs1 + 1);
+    if(op->i2)
+      PlugIOManagerTrajKeep(I, op->cs1);
+    break;
+  case OMOP_StateVRT:
+    PlugIOManagerTrajLoadRange(I, op->i1, op->i1 + 1);
+    break;
+  case OMOP_SingleStateVertices:
+  case OMOP_CSetMinMax:
+  case OMOP_CSetCameraMinMax:
+  case OMOP_CSetMaxDistToPt:
+  case OMOP_CSetSumSqDistToPt:
+  case OMOP_CSetSumVertices:
+  case OMOP_CSetMoment:
+    PlugIOManagerTrajLoadRange(I, op->cs1, op->cs1 + 1);
+    break;
+  case OMOP_CSetIdxGetAndFlag:
+    PlugIOManagerTrajLoadRange(I, op->cs1, op->cs2 + 1);
+    break;
+  case OMOP_CSetIdxSetFlagged:
+    PlugIOManagerTrajLoadRange(I, op->cs1, op->cs2 + 1);
+    for(a = op->cs1; a <= op->cs2; a++)
+      PlugIOManagerTrajKeep(I, a);
+    break;
+  case OMOP_AVRT:
+  case OMOP_SFIT:
+  case OMOP_SUMC:
+  case OMOP_VERT:
+  case OMOP_SVRT:
+  case OMOP_MOME:
+  case OMOP_MDST:
+  case OMOP_MNMX:
+  case OMOP_MaxDistToPt:
+  case OMOP_CameraMinMax:
+    /* all-state operations; the surplus is retired on the next update */
+    PlugIOManagerTrajLoadRange(I, 0, I->NCSet);
+    break;
+  }
+}
+
 void ObjectMoleculeSeleOp(ObjectMolecule * I, int sele, ObjectMoleculeOpRec * op)
 {
   register float *coord;
@@ -10084,9 +10383,12 @@ void ObjectMoleculeSeleOp(ObjectMolecule * I, int sele, ObjectMoleculeOpRec * op
   AtomInfoType *ai, *ai0, *ai_option;
   PyMOLGlobals *G = I->Obj.G;
   PyCodeObject *expr_co = NULL;
+  int expr_fields = cPAlterAllFields;
 
   PRINTFD(G, FB_ObjectMolecule)
     " ObjectMoleculeSeleOp-DEBUG: sele %d op->code %d\n", sele, op->code ENDFD;
+  if((sele >= 0) && I->Traj)
+    ObjectMoleculeSeleOpTrajLoad(I, op);
   if(sele >= 0) {
     /* always run on entry */
     switch (op->code) {
@@ -10098,6 +10400,8 @@ void ObjectMoleculeSeleOp(ObjectMolecule * I, int sele, ObjectMoleculeOpRec * op
         if(PyErr_Occurred())
           PyErr_Print();
         ok = ErrMessage(G, "Alter", "failed to compile expression");
+      } else if(op->code == OMOP_ALTR) {
+        expr_fields = PAlterAtomFields(expr_co);
       }
       /* PBlockAndUnlockAPI() is not safe.
        * what if "v" is invalidated by another thread? */
@@ -10717,6 +11021,35 @@ void ObjectMoleculeSeleOp(ObjectMolecule * I, int sele, ObjectMoleculeOpRec * op
         ai++;
       }
       break;
+    case OMOP_AlterColumn:     /* set one field: per-atom values, one value, or
+                                   another field (i4) of the same kind */
+      {
+        int kind = ObjectMoleculeAtomColumnKind(op->i1);
+        double value = 0.0;
+        char *text = NULL;
+        int n;
+        ai = I->AtomInfo;
+        for(a = 0; a < I->NAtom; a++) {
+          s = ai->selEntry;
+          if(SelectorIsMember(G, s, sele)) {
+            n = (op->i2 > 1) ? op->i3 : 0;
+            if(op->i4) {
+              ObjectMoleculeGetAtomColumn(G, ai, op->i4, &value, &text);
+            } else if(n < op->i2) {
+              if(kind == 1)
+                value = op->dd1[n];
+              else
+                text = op->charVLA + op->ii1[n];
+            } else
+              break;
+            if(ObjectMoleculeSetAtomColumn(G, ai, op->i1, value, text))
+              op->i5++;
+            op->i3++;
+          }
+          ai++;
+        }
+      }
+      break;
     case OMOP_Remove:          /* flag atoms for deletion */
       ai = I->AtomInfo;
       for(a = 0; a < I->NAtom; a++) {
@@ -10823,6 +11156,42 @@ void ObjectMoleculeSeleOp(ObjectMolecule * I, int sele, ObjectMoleculeOpRec * op
         }
       }
       break;
+    case OMOP_SetSingleStateVertices:  /* inverse of OMOP_SingleStateVertices */
+      /* i2 = 0: count only, i2 = 1: copy vv1 into the coordinate set */
+      ai = I->AtomInfo;
+      if(op->cs1 < I->NCSet) {
+        if(I->CSet[op->cs1]) {
+          CoordSet *cs = I->CSet[op->cs1];
+          int hit_flag = false;
+          b = op->cs1;
+          for(a = 0; a < I->NAtom; a++) {
+            s = ai->selEntry;
+            if(SelectorIsMember(G, s, sele)) {
+              if(I->DiscreteFlag) {
+                if(cs == I->DiscreteCSet[a])
+                  a1 = I->DiscreteAtmToIdx[a];
+                else
+                  a1 = -1;
+              } else
+                a1 = cs->AtmToIdx[a];
+              if(a1 >= 0) {
+                if(op->i2 && (op->nvv1 < op->nvv2)) {
+                  copy3f(op->vv1 + (op->nvv1 * 3), cs->Coord + (3 * a1));
+                  hit_flag = true;
+                }
+                op->nvv1++;
+              }
+            }
+            ai++;
+          }
+          if(hit_flag) {
+            if(cs->fInvalidateRep)
+              cs->fInvalidateRep(cs, cRepAll, cRepInvCoord);
+            op->i1++;
+          }
+        }
+      }
+      break;
     case OMOP_CSetIdxGetAndFlag:
       ai = I->AtomInfo;
       for(a = 0; a < I->NAtom; a++) {
@@ -11165,7 +11534,7 @@ void ObjectMoleculeSeleOp(ObjectMolecule * I, int sele, ObjectMoleculeOpRec * op
                 if(ok) {
                   if(PAlterAtom
                      (I->Obj.G, &I->AtomInfo[a], expr_co, op->i2, I->Obj.Name, a,
-                      op->py_ob1))
+                      op->py_ob1, expr_fields))
                     op->i1++;
                   else
                     ok = false;
@@ -11901,6 +12270,13 @@ void ObjectMoleculeUpdate(ObjectMolecule * I)
     if(stop > I->NCSet)
       stop = I->NCSet;
 
+    /* retire trajectory states decoded since the last update, then
+       decode the ones we are about to display */
+    if(I->Traj) {
+      PlugIOManagerTrajTrim(I, start, stop);
+      PlugIOManagerTrajLoadRange(I, start, stop);
+    }
+
     /* single and multithreaded coord set updates */
     {
 #ifndef _PYMOL_NOPY
@@ -12009,6 +12385,9 @@ void ObjectMoleculeInvalidate(ObjectMolecule * I, int rep, int level, int state)
     I->RepVisCacheValid = false;
   }
 
+  if(level >= cRepInvProp)
+    SelectorInvalidateCache(I->Obj.G);
+
   if(level >= cRepInvBonds) {
     VLAFreeP(I->Neighbor);      /* set I->Neighbor to NULL */
     if(I->Sculpt) {
@@ -12597,6 +12976,7 @@ ObjectMolecule *ObjectMoleculeNew(PyMOLGlobals * G, int discreteFlag)
   I->UnitCellCGO = NULL;
   I->Sculpt = NULL;
   I->CSTmpl = NULL;
+  I->Traj = NULL;
   if(I->DiscreteFlag) {         /* discrete objects don't share atoms between states */
     I->DiscreteAtmToIdx = VLACalloc(int, 0);
     I->DiscreteCSet = VLACalloc(CoordSet*, 0);
@@ -12647,6 +13027,7 @@ ObjectMolecule *ObjectMoleculeCopy(ObjectMolecule * obj)
   I->UnitCellCGO = NULL;
   I->Neighbor = NULL;
   I->Sculpt = NULL;
+  I->Traj = PlugIOManagerTrajCopy(obj->Traj);  /* null-safe */
   I->Obj.Setting = NULL;        /* TODO - make a copy */
   /* ListInit(I->UndoData); */
   for(a = 0; a <= cUndoMask; a++)
@@ -12756,6 +13137,8 @@ void ObjectMoleculeFree(ObjectMolecule * I)
   if(I->CSTmpl)
     if(I->CSTmpl->fFree)
       I->CSTmpl->fFree(I->CSTmpl);
+  if(I->Traj)
+    PlugIOManagerTrajFree(I->Traj);
   ObjectPurge(&I->Obj);
   OOFreeP(I);
 }
@@ -80,6 +80,7 @@ typedef struct ObjectMolecule {
   struct CSculpt *Sculpt;
   int RepVisCacheValid;
   signed char RepVisCache[cRepCnt];     /* for transient storage during updates */
+  CPlugIOTraj *Traj;            /* trajectory states decoded on demand, or NULL */
   /* UndoDataList *UndoData; */
 } ObjectMolecule;
 
@@ -90,7 +91,7 @@ typedef struct ObjectMoleculeOpRec {
   int cs1, cs2;
   int i1, i2, i3, i4, i5, i6, *vc1, *i1VLA, *ii1, *vp1;
   float f1, f2, *f1VLA, *f2VLA, *ff1;
-  double d[3][3], d1;
+  double d[3][3], d1, *dd1;
   float *vv1, *vv2;
   char *charVLA;
   char *s1;
@@ -195,6 +196,8 @@ typedef struct {
 #define OMOP_ReferenceValidate 64
 #define OMOP_ReferenceSwap 65
 #define OMOP_RenameAtoms 66
+#define OMOP_SetSingleStateVertices 67
+#define OMOP_AlterColumn 68
 
 #include"CoordSet.h"
 
@@ -345,6 +348,11 @@ void ObjectMoleculeInvalidateAtomType(ObjectMolecule *I, int state);
 void ObjectMoleculeRenderSele(ObjectMolecule * I, int curState, int sele, int vis_only);
 
 void ObjectMoleculeSeleOp(ObjectMolecule * I, int sele, ObjectMoleculeOpRec * op);
+int ObjectMoleculeAtomColumnKind(int field);
+int ObjectMoleculeGetAtomColumn(PyMOLGlobals * G, AtomInfoType * ai, int field,
+                                double *value, char **text);
+int ObjectMoleculeSetAtomColumn(PyMOLGlobals * G, AtomInfoType * ai, int field,
+                                double value, char *text);
 
 struct CoordSet *ObjectMoleculeGetCoordSet(ObjectMolecule * I, int setIndex);
 void ObjectMoleculeBlindSymMovie(ObjectMolecule * I);
@@ -32,6 +32,7 @@
 #include"AtomInfo.h"
 #include"Selector.h"
 #include"ObjectDist.h"
+#include"PlugIOManager.h"
 #include"Executive.h"
 #include"P.h"
 #include"ObjectCGO.h"
@@ -3456,7 +3457,13 @@ static PyObject *ObjectMoleculeCSetAsPyList(ObjectMolecule * I)
   int a;
   result = PyList_New(I->NCSet);
   for(a = 0; a < I->NCSet; a++) {
-    if(I->CSet[a]) {
+    CoordSet *cs = NULL;
+    if(!I->CSet[a] && I->Traj)
+      cs = PlugIOManagerTrajRead(I, a);   /* store undecoded states too */
+    if(cs) {
+      PyList_SetItem(result, a, CoordSetAsPyList(cs));
+      cs->fFree(cs);
+    } else if(I->CSet[a]) {
       PyList_SetItem(result, a, CoordSetAsPyList(I->CSet[a]));
     } else {
       PyList_SetItem(result, a, PConvAutoNone(Py_None));
@@ -3483,8 +3490,17 @@ static int ObjectMoleculeCSetFromPyList(ObjectMolecule * I, PyObject * list)
   if(ok) {
     VLACheck(I->CSet, CoordSet *, I->NCSet);
     for(a = 0; a < I->NCSet; a++) {
+      PyObject *item = PyList_GetItem(list, a);
+      PyObject *lazy = NULL;
+      if(ok && item && PyCallable_Check(item)) {
+        /* chunked sessions: states are read on demand, one at a time */
+        lazy = PyObject_CallObject(item, NULL);
+        ok = (lazy != NULL);
+        item = lazy;
+      }
       if(ok)
-        ok = CoordSetFromPyList(I->Obj.G, PyList_GetItem(list, a), &I->CSet[a]);
+        ok = CoordSetFromPyList(I->Obj.G, item, &I->CSet[a]);
+      Py_XDECREF(lazy);
       PRINTFB(I->Obj.G, FB_ObjectMolecule, FB_Debugging)
         " ObjectMoleculeCSetFromPyList: ok %d after CoordSet %d\n", ok, a ENDFB(I->Obj.G);
 
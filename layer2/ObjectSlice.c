@@ -744,6 +744,7 @@ static void ObjectSliceUpdate(ObjectSlice * I)
           PRINTFB(I->Obj.G, FB_ObjectSlice, FB_Blather)
             " ObjectSlice: updating \"%s\".\n", I->Obj.Name ENDFB(I->Obj.G);
           if(oms->Field) {
+            ObjectMapStateLoadAll(oms);
             ObjectSliceStateUpdate(I, oss, oms);
             ogr = ColorGetRamp(I->Obj.G, I->Obj.Color);
             if(ogr)
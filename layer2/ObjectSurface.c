@@ -336,6 +336,7 @@ static void ObjectSurfaceInvalidate(ObjectSurface * I, int rep, int level, int s
 {
   int a;
   int once_flag = true;
+  SceneInvalidateRayGeometry(I->Obj.G);
   if(level >= cRepInvExtents) {
     I->Obj.ExtentFlag = false;
   }
@@ -553,13 +554,16 @@ static void ObjectSurfaceUpdate(ObjectSurface * I)
       }
       if(map && ms && oms && ms->N && ms->V && I->Obj.RepVis[cRepSurface]) {
         if(ms->ResurfaceFlag) {
+          Isofield *field = oms->Field;
+          int *range = ms->Range;
+          int lod_range[6];
           ms->ResurfaceFlag = false;
           ms->RecolorFlag = true;
           if(!ms->quiet) {
             PRINTFB(I->Obj.G, FB_ObjectSurface, FB_Details)
               " ObjectSurface: updating \"%s\".\n", I->Obj.Name ENDFB(I->Obj.G);
           }
-          if(oms->Field) {
+          if(field) {
 
             {
               float *min_ext, *max_ext;
@@ -576,8 +580,28 @@ static void ObjectSurfaceUpdate(ObjectSurface * I)
 
               TetsurfGetRange(I->Obj.G, oms->Field, oms->Symmetry->Crystal,
                               min_ext, max_ext, ms->Range);
+              /* gradients (mode 3) are computed over the whole field */
+              ObjectMapStateLoadRange(oms, (ms->Mode == 3) ? NULL : ms->Range);
             }
 
+            /* while interacting, contour a coarser level of large maps
+               and come back for full resolution once things settle */
+            ms->CoarseFlag = false;
+            if(I->Obj.G->HaveGUI && !ms->RefineFlag) {
+              Isofield *lod = ObjectMapStateGetLOD(oms, ms->Range,
+                                                   SettingGet_i(I->Obj.G, I->Obj.Setting,
+                                                                NULL,
+                                                                cSetting_map_lod_points),
+                                                   lod_range);
+              if(lod) {
+                field = lod;
+                range = lod_range;
+                ms->CoarseFlag = true;
+                ExecutiveMapRefineLater(I->Obj.G);
+              }
+            }
+            ms->RefineFlag = false;
+
             if(ms->CarveFlag && ms->AtomVertex) {
               carve_buffer = ms->CarveBuffer;
               if(carve_buffer < 0.0F) {
@@ -590,10 +614,10 @@ static void ObjectSurfaceUpdate(ObjectSurface * I)
                 MapSetupExpress(voxelmap);
             }
 
-            ms->nT = TetsurfVolume(I->Obj.G, oms->Field,
+            ms->nT = TetsurfVolume(I->Obj.G, field,
                                    ms->Level,
                                    &ms->N, &ms->V,
-                                   ms->Range,
+                                   range,
                                    ms->Mode,
                                    voxelmap, ms->AtomVertex, ms->CarveBuffer, ms->Side);
 
@@ -607,10 +631,10 @@ static void ObjectSurfaceUpdate(ObjectSurface * I)
               int *N2 = VLAlloc(int, 10000);
               float *V2 = VLAlloc(float, 10000);
 
-              nT2 = TetsurfVolume(I->Obj.G, oms->Field,
+              nT2 = TetsurfVolume(I->Obj.G, field,
                                   -ms->Level,
                                   &N2, &V2,
-                                  ms->Range,
+                                  range,
                                   ms->Mode,
                                   voxelmap, ms->AtomVertex, ms->CarveBuffer, ms->Side);
               if(N2 && V2) {
@@ -1659,6 +1683,8 @@ void ObjectSurfaceStateInit(PyMOLGlobals * G, ObjectSurfaceState * ms)
   ms->displayList = 0;
   ms->displayListInvalid = true;
   ms->shaderCGO = 0;
+  ms->CoarseFlag = false;
+  ms->RefineFlag = false;
 }
 
 
@@ -1802,6 +1828,23 @@ int ObjectSurfaceSetLevel(ObjectSurface * I, float level, int state, int quiet)
   return (ok);
 }
 
+int ObjectSurfaceRefine(ObjectSurface * I)
+{
+  int a;
+  int result = false;
+  ObjectSurfaceState *ms;
+  for(a = 0; a < I->NState; a++) {
+    ms = I->State + a;
+    if(ms->Active && ms->CoarseFlag) {
+      ms->ResurfaceFlag = true;
+      ms->RefineFlag = true;
+      ms->quiet = true;
+      result = true;
+    }
+  }
+  return (result);
+}
+
 
 /*========================================================================*/
 
@@ -49,6 +49,8 @@ typedef struct {
   int displayList;
   int displayListInvalid;
   CGO *shaderCGO;
+  int CoarseFlag;               /* contoured from a coarser level of the map */
+  int RefineFlag;               /* recontour at full resolution */
 } ObjectSurfaceState;
 
 typedef struct ObjectSurface {
@@ -69,5 +71,6 @@ PyObject *ObjectSurfaceAsPyList(ObjectSurface * I);
 int ObjectSurfaceSetLevel(ObjectSurface * I, float level, int state, int quiet);
 int ObjectSurfaceGetLevel(ObjectSurface * I, int state, float *result);
 int ObjectSurfaceInvalidateMapName(ObjectSurface * I, char *name);
+int ObjectSurfaceRefine(ObjectSurface * I);
 
 #endif
@@ -659,6 +659,7 @@ static void ObjectVolumeUpdate(ObjectVolume * I)
             field = vs->Field;
           } else if(oms->Field) {
             field = oms->Field;
+            ObjectMapStateLoadAll(oms); /* the whole field is copied below */
           }
 
           if(field) {
@@ -1689,6 +1690,7 @@ ObjectVolume *ObjectVolumeFromXtalSym(PyMOLGlobals * G, ObjectVolume * obj, Obje
           fdim[2] = eff_range[5] - eff_range[2];
           vs->Field = IsosurfFieldAlloc(I->Obj.G, fdim);
 
+          ObjectMapStateLoadAll(oms);
           expand_result =
             IsosurfExpand(oms->Field, vs->Field, oms->Symmetry->Crystal, sym, eff_range);
 
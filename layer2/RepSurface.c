@@ -39,6 +39,8 @@ Z* -------------------------------------------------------------------
 #include"PConv.h"
 #include"Selector.h"
 #include"ShaderMgr.h"
+#include"Ortho.h"
+#include"Thread.h"
 
 #ifdef NT
 #undef NT
@@ -4320,6 +4322,49 @@ OV_INLINE ov_status SurfaceJobResultFromTuple(PyMOLGlobals * G,
   }
   return status;
 }
+
+OV_INLINE ov_status SurfaceJobInputFromTuple(PyMOLGlobals * G,
+                                             SurfaceJob * I, PyObject * tuple)
+{
+  /* inverse of SurfaceJobInputAsTuple (version 1) */
+  ov_status status = OV_STATUS_FAILURE;
+  if(tuple && PyTuple_Check(tuple) && (PyTuple_Size(tuple) >= 24) &&
+     (PyInt_AsLong(PyTuple_GetItem(tuple, 1)) == 1)) {
+    status = PConvPyTupleToFloatVLA(&I->coord, PyTuple_GetItem(tuple, 2));
+    if(OV_OK(status)) {
+      I->atomInfo = SurfaceJobAtomInfoVLAFromPyTuple(PyTuple_GetItem(tuple, 3));
+      if(!I->atomInfo)
+        status = OV_STATUS_FAILURE;
+    }
+    I->maxVdw = (float) PyFloat_AsDouble(PyTuple_GetItem(tuple, 4));
+    I->allVisibleFlag = PyInt_AsLong(PyTuple_GetItem(tuple, 5));
+    I->nPresent = PyInt_AsLong(PyTuple_GetItem(tuple, 6));
+    if(OV_OK(status))
+      PConvPyTupleToIntVLA(&I->presentVla, PyTuple_GetItem(tuple, 7));  /* may be None */
+    I->solventSphereIndex = PyInt_AsLong(PyTuple_GetItem(tuple, 8));
+    I->sphereIndex = PyInt_AsLong(PyTuple_GetItem(tuple, 9));
+    I->surfaceType = PyInt_AsLong(PyTuple_GetItem(tuple, 10));
+    I->circumscribe = PyInt_AsLong(PyTuple_GetItem(tuple, 11));
+    I->probeRadius = (float) PyFloat_AsDouble(PyTuple_GetItem(tuple, 12));
+    I->carveCutoff = (float) PyFloat_AsDouble(PyTuple_GetItem(tuple, 13));
+    if(OV_OK(status))
+      PConvPyTupleToFloatVLA(&I->carveVla, PyTuple_GetItem(tuple, 14));   /* may be None */
+    I->surfaceMode = PyInt_AsLong(PyTuple_GetItem(tuple, 15));
+    I->surfaceSolvent = PyInt_AsLong(PyTuple_GetItem(tuple, 16));
+    I->cavityCull = PyInt_AsLong(PyTuple_GetItem(tuple, 17));
+    I->pointSep = (float) PyFloat_AsDouble(PyTuple_GetItem(tuple, 18));
+    I->trimCutoff = (float) PyFloat_AsDouble(PyTuple_GetItem(tuple, 19));
+    I->trimFactor = (float) PyFloat_AsDouble(PyTuple_GetItem(tuple, 20));
+    I->cavityMode = PyInt_AsLong(PyTuple_GetItem(tuple, 21));
+    I->cavityRadius = (float) PyFloat_AsDouble(PyTuple_GetItem(tuple, 22));
+    I->cavityCutoff = (float) PyFloat_AsDouble(PyTuple_GetItem(tuple, 23));
+    if(PyErr_Occurred()) {
+      PyErr_Clear();
+      status = OV_STATUS_FAILURE;
+    }
+  }
+  return status;
+}
 #endif
 
 static SurfaceJob *SurfaceJobNew(PyMOLGlobals * G)
@@ -5063,9 +5108,247 @@ static int SurfaceJobRun(PyMOLGlobals * G, SurfaceJob * I)
   return ok;
 }
 
+#ifndef _PYMOL_NOPY
+PyObject *RepSurfaceJobRunTuple(PyMOLGlobals * G, PyObject * input)
+{
+  /* runs a job given in the SurfaceJobInputAsTuple format and returns
+     its result in the SurfaceJobResultAsTuple format (for worker
+     processes).  Called with the interpreter blocked; unblocks while
+     computing. */
+  PyObject *result = NULL;
+  SurfaceJob *job = SurfaceJobNew(G);
+  if(job && OV_OK(SurfaceJobInputFromTuple(G, job, input))) {
+    int ok;
+    PUnblock(G);
+    ok = SurfaceJobRun(G, job);
+    PBlock(G);
+    if(ok && !G->Interrupt)
+      result = SurfaceJobResultAsTuple(G, job);
+  }
+  if(job)
+    SurfaceJobFree(G, job);
+  return result;
+}
+#endif
+
+static void RepSurfaceTakeJobResult(RepSurface * I, SurfaceJob * surf_job)
+{
+  I->N = surf_job->N;
+  surf_job->N = 0;
+  I->V = surf_job->V;
+  surf_job->V = NULL;
+  I->VN = surf_job->VN;
+  surf_job->VN = NULL;
+  I->NT = surf_job->NT;
+  surf_job->NT = 0;
+  I->T = surf_job->T;
+  surf_job->T = NULL;
+  I->S = surf_job->S;
+  surf_job->S = NULL;
+}
+
+/* surface batches: while a batch is open (G->SurfaceBatch), RepSurfaceNew
+   queues its SurfaceJob instead of running it and returns an empty
+   representation.  RepSurfaceBatchFinish then runs all queued jobs on
+   native worker threads and completes the representations in the
+   calling thread, which is the only one that touches Python (for the
+   surface cache) or the coordinate sets.  A batch only sees the states
+   SceneUpdate rebuilds (ObjectAdjustStateRebuildRange): every state with
+   defer_builds_mode 0 or all_states, otherwise just the current one. */
+
+typedef struct {
+  RepSurface *rep;
+  CoordSet *cs;
+  SurfaceJob *job;
+  int cache_mode;
+#ifndef _PYMOL_NOPY
+  PyObject *entry, *input;
+#endif
+  int done, ok;
+} SurfaceBatchItem;
+
+struct _CSurfaceBatch {
+  SurfaceBatchItem *item;       /* VLA */
+  int n_item;
+  CTileQueue *queue;
+};
+
+typedef struct {
+  PyMOLGlobals *G;
+  CSurfaceBatch *batch;
+  int worker;
+  double busy;
+} SurfaceBatchWorker;
+
+int RepSurfaceBatchBegin(PyMOLGlobals * G)
+{
+  CSurfaceBatch *I;
+  if(G->SurfaceBatch)
+    return false;               /* already open: the outer caller finishes it */
+  I = Calloc(CSurfaceBatch, 1);
+  if(I) {
+    I->item = VLACalloc(SurfaceBatchItem, 10);
+    if(!I->item) {
+      FreeP(I);
+    }
+  }
+  G->SurfaceBatch = I;
+  return (I != NULL);
+}
+
+#ifndef _PYMOL_NOPY
+static int RepSurfaceBatchAdd(CSurfaceBatch * I, RepSurface * rep, CoordSet * cs,
+                              SurfaceJob * job, int cache_mode,
+                              PyObject * entry, PyObject * input)
+#else
+static int RepSurfaceBatchAdd(CSurfaceBatch * I, RepSurface * rep, CoordSet * cs,
+                              SurfaceJob * job, int cache_mode)
+#endif
+{
+  SurfaceBatchItem *item;
+  if(!job)
+    return false;
+  VLACheck(I->item, SurfaceBatchItem, I->n_item);
+  if(!I->item)
+    return false;
+  item = I->item + I->n_item++;
+  UtilZeroMem(item, sizeof(SurfaceBatchItem));
+  item->rep = rep;
+  item->cs = cs;
+  item->job = job;
+  item->cache_mode = cache_mode;
+#ifndef _PYMOL_NOPY
+  item->entry = entry;
+  item->input = input;
+#endif
+  return true;
+}
+
+static void RepSurfaceBatchThread(void *arg)
+{
+  SurfaceBatchWorker *W = (SurfaceBatchWorker *) arg;
+  PyMOLGlobals *G = W->G;
+  CSurfaceBatch *I = W->batch;
+  int n;
+
+  while((!G->Interrupt) && TileQueueNext(I->queue, W->worker, &n)) {
+    double start = UtilGetSeconds(G);
+    SurfaceBatchItem *item = I->item + n;
+    item->ok = SurfaceJobRun(G, item->job);
+    item->done = true;
+    W->busy += UtilGetSeconds(G) - start;
+    if(!W->worker) {
+      /* only the calling thread reports progress (cmd.get_progress) */
+      int a, n_done = 0;
+      for(a = 0; a < I->n_item; a++)
+        if(I->item[a].done)
+          n_done++;
+      OrthoBusySlow(G, n_done, I->n_item);
+    }
+  }
+}
+
+void RepSurfaceBatchFinish(PyMOLGlobals * G)
+{
+  CSurfaceBatch *I = G->SurfaceBatch;
+  int a;
+
+  G->SurfaceBatch = NULL;       /* from now on, jobs run inline again */
+  if(!I)
+    return;
+
+  if(I->n_item) {
+    int n_thread = SettingGetGlobal_i(G, cSetting_max_threads);
+    double timing = UtilGetSeconds(G);
+    SurfaceBatchWorker *worker;
+
+    if(n_thread > I->n_item)
+      n_thread = I->n_item;
+    if(n_thread < 1)
+      n_thread = 1;
+    I->queue = TileQueueNew(I->n_item, n_thread);
+    worker = Calloc(SurfaceBatchWorker, n_thread);
+
+    if(I->queue && worker) {
+      for(a = 0; a < n_thread; a++) {
+        worker[a].G = G;
+        worker[a].batch = I;
+        worker[a].worker = a;
+      }
+      /* per-job progress from the workers would go through Python */
+      OrthoBusyHold(G, true);
+      n_thread = ThreadRun(RepSurfaceBatchThread, worker, sizeof(SurfaceBatchWorker),
+                           n_thread);
+      OrthoBusyHold(G, false);
+    } else {
+      for(a = 0; a < I->n_item; a++) {  /* out of memory: run serially */
+        if(!G->Interrupt) {
+          I->item[a].ok = SurfaceJobRun(G, I->item[a].job);
+          I->item[a].done = true;
+        }
+      }
+      n_thread = 1;
+    }
+
+    PRINTFB(G, FB_RepSurface, FB_Blather)
+      " RepSurface: computed %d surfaces on %d threads in %4.2f sec.\n",
+      I->n_item, n_thread, UtilGetSeconds(G) - timing ENDFB(G);
+    if(worker && Feedback(G, FB_RepSurface, FB_Debugging)) {
+      for(a = 0; a < n_thread; a++) {
+        PRINTF " RepSurface: thread %d busy %4.2f sec., stole %d jobs.\n",
+          a, worker[a].busy, TileQueueGetStolen(I->queue, a) ENDF(G);
+      }
+    }
+    FreeP(worker);
+    TileQueueFree(I->queue);
+    I->queue = NULL;
+  }
+
+  for(a = 0; a < I->n_item; a++) {
+    SurfaceBatchItem *item = I->item + a;
+    RepSurface *rep = item->rep;
+    CoordSet *cs = item->cs;
+    int ok = item->done && item->ok && (!G->Interrupt);
+
+#ifndef _PYMOL_NOPY
+    if(item->entry || item->input) {
+      int blocked = PAutoBlock(G);
+      if(ok && (item->cache_mode > 1)) {
+        PyObject *output = SurfaceJobResultAsTuple(G, item->job);
+        PCacheSet(G, item->entry, output);
+        PXDecRef(output);
+      }
+      PXDecRef(item->entry);
+      PXDecRef(item->input);
+      if(PyErr_Occurred())
+        PyErr_Print();
+      PAutoUnblock(G, blocked);
+    }
+#endif
+    if(ok) {
+      RepSurfaceTakeJobResult(rep, item->job);
+      RepSurfaceColor(rep, cs);
+    } else {
+      /* cancelled (or failed): drop the incomplete representation */
+      if(cs->Rep[cRepSurface] == (Rep *) rep) {
+        cs->Rep[cRepSurface] = NULL;
+        cs->Active[cRepSurface] = false;
+      }
+      RepSurfaceFree(rep);
+    }
+    SurfaceJobFree(G, item->job);
+  }
+  if(I->n_item)
+    SceneInvalidate(G);
+  VLAFreeP(I->item);
+  FreeP(I);
+}
+
 Rep *RepSurfaceNew(CoordSet * cs, int state)
 {
   int ok = true;
+  int queued = false;
+  int deferred = false;
   PyMOLGlobals *G = cs->State.G;
   ObjectMolecule *obj = cs->Obj;
   OOCalloc(G, RepSurface);
@@ -5491,7 +5774,8 @@ Rep *RepSurfaceNew(CoordSet * cs, int state)
               int blocked = PAutoBlock(G);
               input = SurfaceJobInputAsTuple(G, surf_job);
 
-              if(PCacheGet(G, &output, &entry, input) == OV_STATUS_YES) {
+              switch (PCacheGet(G, &output, &entry, input)) {
+              case OV_STATUS_YES:
                 if(OV_OK(SurfaceJobResultFromTuple(G, surf_job, output))) {
                   found = true;
                   PXDecRef(input);
@@ -5501,13 +5785,34 @@ Rep *RepSurfaceNew(CoordSet * cs, int state)
                 }
                 PXDecRef(output);
                 output = NULL;
+                break;
+              case cPCacheDeferred:
+                /* a worker process computes it: leave the surface empty
+                   until the result is in the cache and we're rebuilt */
+                deferred = true;
+                break;
               }
               if(PyErr_Occurred())
                 PyErr_Print();
               PAutoUnblock(G, blocked);
             }
 #endif
-            if(!found) {
+            if(!(found || deferred) && G->SurfaceBatch) {
+              /* computed later, concurrently with the other queued jobs */
+#ifndef _PYMOL_NOPY
+              queued = RepSurfaceBatchAdd(G->SurfaceBatch, I, cs, surf_job,
+                                          cache_mode, entry, input);
+              if(queued) {
+                entry = NULL;
+                input = NULL;
+              }
+#else
+              queued = RepSurfaceBatchAdd(G->SurfaceBatch, I, cs, surf_job, 0);
+#endif
+              if(queued)
+                surf_job = NULL;
+            }
+            if(!(found || queued || deferred)) {
 
               SurfaceJobRun(G, surf_job);
 
@@ -5536,23 +5841,11 @@ Rep *RepSurfaceNew(CoordSet * cs, int state)
             }
 #endif
           }
-          /* surf_job must be valid at this point */
-
-          I->N = surf_job->N;
-          surf_job->N = 0;
-          I->V = surf_job->V;
-          surf_job->V = NULL;
-          I->VN = surf_job->VN;
-          surf_job->VN = NULL;
-          I->NT = surf_job->NT;
-          surf_job->NT = 0;
-          I->T = surf_job->T;
-          surf_job->T = NULL;
-          I->S = surf_job->S;
-          surf_job->S = NULL;
-
-          SurfaceJobPurgeResult(G, surf_job);
-          SurfaceJobFree(G, surf_job);
+          if(!queued) {
+            /* surf_job must be valid at this point */
+            RepSurfaceTakeJobResult(I, surf_job);
+            SurfaceJobFree(G, surf_job);
+          }
 
         }
         VLAFreeP(atom_info);
@@ -5560,7 +5853,7 @@ Rep *RepSurfaceNew(CoordSet * cs, int state)
         if(G->Interrupt)
           ok = false;
 
-        if(ok)
+        if(ok && !queued)
           RepSurfaceColor(I, cs);
       }
       if(carve_map)
@@ -5570,7 +5863,7 @@ Rep *RepSurfaceNew(CoordSet * cs, int state)
       if(I->debug)
         CGOStop(I->debug);
       OrthoBusyFast(G, 4, 4);
-      if(!ok) {
+      if((!ok) && !queued) {    /* queued reps are dropped by RepSurfaceBatchFinish */
         RepSurfaceFree(I);
         I = NULL;
       }
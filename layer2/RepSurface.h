@@ -22,6 +22,16 @@ Z* -------------------------------------------------------------------
 
 Rep *RepSurfaceNew(CoordSet * cset, int state);
 
+/* compute the surfaces of all representations built between these calls
+   concurrently (setting surface_batch); Begin returns false if a batch
+   is already open */
+int RepSurfaceBatchBegin(PyMOLGlobals * G);
+void RepSurfaceBatchFinish(PyMOLGlobals * G);
+
+/* runs a surface job tuple (as stored in the cache) and returns the
+   result tuple, or NULL on failure */
+PyObject *RepSurfaceJobRunTuple(PyMOLGlobals * G, PyObject * input);
+
 #define cRepSurface_by_flags       0
 #define cRepSurface_all            1
 #define cRepSurface_heavy_atoms    2
@@ -46,6 +46,7 @@
 #include"Match.h"
 #include"ObjectCGO.h"
 #include"Util.h"
+#include"Thread.h"
 #include"Wizard.h"
 #include"ScrollBar.h"
 #include"Movie.h"
@@ -80,6 +81,8 @@ extern double** calcS(double** d1, double** d2, int lenA, int lenB, int wSize);
 extern pcePoint getCoords(PyObject *L, int length);
 extern pathCache findPath(double** S, double** dA, double** dB, int lenA, int lenB, float D0, float D1, int winSize, int gapMax, int * bufferSize);
 extern PyObject* findBest( pcePoint coordsA, pcePoint coordsB, pathCache paths, int bufferSize, int smaller, int winSize);
+extern int findBestResult( pcePoint coordsA, pcePoint coordsB, pathCache paths, int bufferSize, int smaller, int winSize, ceResult* result);
+extern void freePaths( pathCache paths );
 #endif
 
 /* HACK */
@@ -161,6 +164,7 @@ struct _CExecutive {
   int ValidPanel;
   int CaptureFlag;
   int LastMotionCount;
+  double MapRefineTime;         /* when coarse contours are due for refinement, or 0 */
 };
 
 #ifdef _PYMOL_INCENTIVE
@@ -3654,6 +3658,11 @@ int ExecutiveLoad(PyMOLGlobals * G, CObject * origObj,
       if(is_string) {
         buffer = content;
         size = (long) content_length;
+      } else if(content_format == cLoadTypeCCP4Map) {
+        /* read by filename, so the map can be memory-mapped and its
+           bricks decoded lazily */
+        buffer = content;
+        size = 0;
       } else {
         f = fopen(content, "rb");
 
@@ -3734,7 +3743,7 @@ int ExecutiveLoad(PyMOLGlobals * G, CObject * origObj,
         case cLoadTypeCCP4Str:
           obj =
             (CObject *) ObjectMapLoadCCP4(G, (ObjectMap *) origObj, start_at, eff_state,
-                                          true, size, quiet);
+                                          is_string, size, quiet);
           break;
         case cLoadTypeCUBEMap:
           if(plugin) {
@@ -3839,7 +3848,7 @@ int ExecutiveLoad(PyMOLGlobals * G, CObject * origObj,
         }
 
       }
-      if((!is_string) && buffer) {
+      if((!is_string) && buffer && (buffer != content)) {
         mfree(buffer);
       }
     }
@@ -5038,6 +5047,7 @@ static int ExecutiveSetNamedEntries(PyMOLGlobals * G, PyObject * names, int vers
   SpecRec *rec = NULL;
   int extra_int;
   int incomplete = false;
+  PyObject *lazy;
 
   if(ok)
     ok = (names != NULL);
@@ -5048,6 +5058,19 @@ static int ExecutiveSetNamedEntries(PyMOLGlobals * G, PyObject * names, int vers
 
   while(ok && (a < l)) {
     cur = PyList_GetItem(names, a);
+    lazy = NULL;
+    if((cur != Py_None) && PyCallable_Check(cur)) {
+      /* chunked sessions: the entry is read from disk only now, and
+         released as soon as the object has been built */
+      lazy = PyObject_CallObject(cur, NULL);
+      if(!lazy) {
+        PRINTFB(G, FB_Executive, FB_Errors)
+          "ExectiveSetNamedEntries-Error: unable to read entry %d.\n", a ENDFB(G);
+        PyErr_Print();
+        incomplete = true;
+      }
+      cur = lazy ? lazy : Py_None;
+    }
     if(cur != Py_None) {        /* skip over None w/o aborting */
       skip = false;
       rec = NULL;
@@ -5188,6 +5211,7 @@ static int ExecutiveSetNamedEntries(PyMOLGlobals * G, PyObject * names, int vers
         ListElemFree(rec);
       }
     }
+    Py_XDECREF(lazy);
     a++;
     if(!ok) {
       incomplete = true;
@@ -5216,7 +5240,7 @@ static int ExecutiveSetSelections(PyMOLGlobals * G, PyObject * names)
     l = PyList_Size(names);
   while(ok && (a < l)) {
     cur = PyList_GetItem(names, a);
-    if(cur != Py_None) {        /* skip over None w/o aborting */
+    if((cur != Py_None) && !PyCallable_Check(cur)) {    /* skip None & lazy objects */
       rec = NULL;
       ListElemCalloc(G, rec, SpecRec);
       rec->next = NULL;
@@ -6703,6 +6727,8 @@ int ExecutiveMapSet(PyMOLGlobals * G, char *name, int operator, char *operands,
       VLACheck(target->State, ObjectMapState, trg_state);
 
       ms = target->State + target_state;
+      ObjectMapStateLoadAll(ms);
+      ObjectMapStateInvalidatePyramid(ms);
       if(ms->Active) {
         int iter_id = TrackerNewIter(I_Tracker, 0, list_id);
         int n_pnt = (ms->Field->points->size / ms->Field->points->base_size) / 3;
@@ -7378,6 +7404,48 @@ int ExecutiveMapNew(PyMOLGlobals * G, char *name, int type, float *grid,
 
 
 /*========================================================================*/
+/* meshes and surfaces of large maps are contoured from a coarser level
+   of the map while they are being changed (map_lod_points), and then
+   again at full resolution once map_lod_delay has passed without
+   further changes */
+
+void ExecutiveMapRefineLater(PyMOLGlobals * G)
+{
+  register CExecutive *I = G->Executive;
+  I->MapRefineTime = UtilGetSeconds(G) + fabs(SettingGetGlobal_f(G, cSetting_map_lod_delay));
+}
+
+int ExecutiveMapRefine(PyMOLGlobals * G, int force)
+{
+  register CExecutive *I = G->Executive;
+  SpecRec *rec = NULL;
+  int refined = false;
+
+  if((I->MapRefineTime > 0.0) && (force || (UtilGetSeconds(G) >= I->MapRefineTime))) {
+    I->MapRefineTime = 0.0;
+    while(ListIterate(I->Spec, rec, next)) {
+      if(rec->type == cExecObject) {
+        switch (rec->obj->type) {
+        case cObjectMesh:
+          if(ObjectMeshRefine((ObjectMesh *) rec->obj))
+            refined = true;
+          break;
+        case cObjectSurface:
+          if(ObjectSurfaceRefine((ObjectSurface *) rec->obj))
+            refined = true;
+          break;
+        }
+      }
+    }
+    if(refined) {
+      PRINTFB(G, FB_Executive, FB_Blather)
+        " Executive: refining coarse map contours.\n" ENDFB(G);
+      SceneChanged(G);
+    }
+  }
+  return (refined);
+}
+
 int ExecutiveSculptIterateAll(PyMOLGlobals * G)
 {
   int active = false;
@@ -8479,6 +8547,51 @@ float *ExecutiveGetVertexVLA(PyMOLGlobals * G, char *s1, int state)
 }
 
 
+/*========================================================================*/
+int ExecutiveSetVertices(PyMOLGlobals * G, char *s1, int state, float *coord, int n_coord, int quiet)
+{
+  /* writes n_coord packed xyz triples into the selected atoms of a single
+     state, in the same atom order as ExecutiveGetVertexVLA returns them */
+
+  ObjectMoleculeOpRec op1;
+  int sele1;
+  int ok = true;
+  sele1 = SelectorIndexByName(G, s1);
+  if(sele1 < 0) {
+    ok = false;
+  } else if(state < 0) {
+    ok = false;
+  } else {
+    ObjectMoleculeOpRecInit(&op1);
+    op1.code = OMOP_SetSingleStateVertices;
+    op1.cs1 = state;
+    op1.i2 = false;             /* first pass: count */
+    op1.nvv1 = 0;
+    ExecutiveObjMolSeleOp(G, sele1, &op1);
+    if(op1.nvv1 != n_coord) {
+      PRINTFB(G, FB_Executive, FB_Errors)
+        " Executive-Error: selection has %d atoms with coordinates in state %d, but %d coordinates were given.\n",
+        op1.nvv1, state + 1, n_coord ENDFB(G);
+      ok = false;
+    } else if(n_coord) {
+      op1.i1 = 0;
+      op1.i2 = true;
+      op1.nvv1 = 0;
+      op1.nvv2 = n_coord;
+      op1.vv1 = coord;
+      ExecutiveObjMolSeleOp(G, sele1, &op1);
+      if(!quiet) {
+        PRINTFB(G, FB_Executive, FB_Actions)
+          " Executive: %d coordinates loaded into %d object%s.\n",
+          op1.nvv1, op1.i1, op1.i1 == 1 ? "" : "s" ENDFB(G);
+      }
+      SceneInvalidate(G);
+    }
+  }
+  return ok;
+}
+
+
 /*========================================================================*/
 PyObject *ExecutiveGetSettingOfType(PyMOLGlobals * G, int index,
                                     char *object, int state, int type)
@@ -10365,6 +10478,26 @@ char *ExecutiveNameToSeqAlignStrVLA(PyMOLGlobals * G, char *name, int state, int
 
 
 /*========================================================================*/
+static void ExecutiveSeleTrajLoad(PyMOLGlobals * G, int sele, int state)
+{
+  /* decodes lazily loaded trajectory states (state -1: all of them)
+     before exporters walk the coordinate sets directly */
+  ObjectMolecule **vla = SelectorGetObjectMoleculeVLA(G, sele);
+  if(vla) {
+    int a, n = VLAGetSize(vla);
+    for(a = 0; a < n; a++) {
+      ObjectMolecule *obj = vla[a];
+      if(obj->Traj) {
+        if(state < 0)
+          PlugIOManagerTrajLoadRange(obj, 0, obj->NCSet);
+        else
+          PlugIOManagerTrajLoadRange(obj, state, state + 1);
+      }
+    }
+    VLAFreeP(vla);
+  }
+}
+
 char *ExecutiveSeleToPDBStr(PyMOLGlobals * G, char *s1, int state, int conectFlag,
                             int mode, char *ref_object, int ref_state,
                             ObjectMolecule * single_object, int quiet)
@@ -10457,6 +10590,8 @@ char *ExecutiveSeleToPDBStr(PyMOLGlobals * G, char *s1, int state, int conectFla
       break;
     }
 
+    if(sele1 >= 0)
+      ExecutiveSeleTrajLoad(G, sele1, actual_state);
     if(conectFlag) {
       op1.i2 = SelectorGetPDB(G, &op1.charVLA, op1.i2, sele1,
                               actual_state, conectFlag, &pdb_info, counter, ref_mat,
@@ -10537,6 +10672,7 @@ PyObject *ExecutiveSeleToChemPyModel(PyMOLGlobals * G, char *s1, int state,
   {
     int unblock = PAutoBlock(G);        /*   PBlock(G);    PBlockAndUnlockAPI(); */
     if(sele1 >= 0) {
+      ExecutiveSeleTrajLoad(G, sele1, state);
       result = SelectorGetChemPyModel(G, sele1, state, ref_mat);
     }
     if(PyErr_Occurred())
@@ -10819,6 +10955,81 @@ int ExecutiveIterate(PyMOLGlobals * G, char *s1, char *expr, int read_only, int
 }
 
 
+/*========================================================================*/
+int ExecutiveAlterColumn(PyMOLGlobals * G, char *s1, char *field, char *source,
+                         double *value, char *text, int n_value, int quiet)
+{
+  /* Sets one atom field over a selection without evaluating Python per
+   * atom.  Numeric fields take "value", text fields take "text" as
+   * n_value consecutive NUL-terminated strings.  There must be either
+   * one value per atom (in "iterate" order) or a single value for all
+   * atoms.  If "source" names another field of the same kind, its
+   * values are copied instead.  Returns the number of atoms altered,
+   * or -1 on error. */
+  int sele1;
+  int field_code = PAlterFieldFromName(field);
+  int source_code = 0;
+  int kind = ObjectMoleculeAtomColumnKind(field_code);
+  int n_atom;
+  int ok = true;
+  ObjectMoleculeOpRec op1;
+
+  if(!kind) {
+    PRINTFB(G, FB_Executive, FB_Errors)
+      " AlterColumn-Error: can't set \"%s\".\n", field ENDFB(G);
+    return -1;
+  }
+  if(source && source[0]) {
+    source_code = PAlterFieldFromName(source);
+    if(ObjectMoleculeAtomColumnKind(source_code) != kind) {
+      PRINTFB(G, FB_Executive, FB_Errors)
+        " AlterColumn-Error: can't copy \"%s\" into \"%s\".\n", source, field ENDFB(G);
+      return -1;
+    }
+  }
+  if((!source_code) && ((kind == 1) ? (!value) : (!text)))
+    return -1;
+  sele1 = SelectorIndexByName(G, s1);
+  if(sele1 < 0)
+    return 0;
+  n_atom = SelectorCountAtoms(G, sele1, cSelectorUpdateTableAllStates);
+  if((!source_code) && (n_value != 1) && (n_value != n_atom)) {
+    PRINTFB(G, FB_Executive, FB_Errors)
+      " AlterColumn-Error: %d values given for %d atoms.\n", n_value, n_atom ENDFB(G);
+    return -1;
+  }
+  ObjectMoleculeOpRecInit(&op1);
+  op1.code = OMOP_AlterColumn;
+  op1.i1 = field_code;
+  op1.i2 = n_value;
+  op1.i4 = source_code;
+  if(!source_code) {
+    if(kind == 1) {
+      op1.dd1 = value;
+    } else {
+      /* offsets of the individual strings */
+      int a;
+      char *p = text;
+      op1.charVLA = text;
+      op1.ii1 = Alloc(int, n_value);
+      ok = (op1.ii1 != NULL);
+      for(a = 0; ok && (a < n_value); a++) {
+        op1.ii1[a] = p - text;
+        p += strlen(p) + 1;
+      }
+    }
+  }
+  if(ok)
+    ExecutiveObjMolSeleOp(G, sele1, &op1);
+  FreeP(op1.ii1);
+  if(!quiet) {
+    PRINTFB(G, FB_Executive, FB_Actions)
+      " AlterColumn: modified %i atoms.\n", op1.i5 ENDFB(G);
+  }
+  return (ok ? op1.i5 : -1);
+}
+
+
 /*========================================================================*/
 int ExecutiveSelectList(PyMOLGlobals * G, char *sele_name, char *s1,
                         int *list, int list_len, int state, int mode, int quiet)
@@ -11008,13 +11219,15 @@ int ExecutiveIterateList(PyMOLGlobals * G, char *name,
           ok =
             (expr_co != NULL) &&
             PAlterAtom(G, obj->AtomInfo + index - 1, expr_co, read_only, name, index - 1,
-                       space);
+                       space, PAlterAtomFields(expr_co));
           Py_XDECREF(expr_co);
         }
         if(ok)
           n_eval++;
       }
     }
+    if(!read_only)
+      SelectorInvalidateCache(G);
   } else {
     PRINTFB(G, FB_Executive, FB_Errors)
       " AlterList-Error: selection cannot span more than one object.\n" ENDFB(G);
@@ -14054,6 +14267,34 @@ void ExecutiveObjMolSeleOp(PyMOLGlobals * G, int sele, ObjectMoleculeOpRec * op)
         }
       }
     }
+    /* operations which may change what selection expressions match */
+    switch (op->code) {
+    case OMOP_ALTR:
+      if(!op->i2)               /* not read_only */
+        SelectorInvalidateCache(G);
+      break;
+    case OMOP_AlterState:
+      if(!op->i3)
+        SelectorInvalidateCache(G);
+      break;
+    case OMOP_Flag:
+    case OMOP_FlagSet:
+    case OMOP_FlagClear:
+    case OMOP_Remove:
+    case OMOP_Protect:
+    case OMOP_Mask:
+    case OMOP_AddHydrogens:
+    case OMOP_SetB:
+    case OMOP_PrepareFromTemplate:
+    case OMOP_FixHydrogens:
+    case OMOP_Sort:
+    case OMOP_RenameAtoms:
+    case OMOP_RevalenceFromSource:
+    case OMOP_RevalenceByGuessing:
+    case OMOP_AlterColumn:
+      SelectorInvalidateCache(G);
+      break;
+    }
   }
 }
 
@@ -15704,19 +15945,114 @@ void ExecutiveSetControlsOff(PyMOLGlobals * G, char *name)
 
 
 /*========================================================================*/
+
+/* symmetry operator "sym" (fractional space) for a coordinate set with
+   fractional center "avg", shifted into the unit cell around "tc" and
+   then by the lattice step "step" */
+
+static void SymExpOperator(float *sym, float *avg, float *tc, int *step, float *m)
+{
+  float ts[3];
+  int c, tt;
+  copy44f(sym, m);
+  transform44f3f(sym, avg, ts);
+  for(c = 0; c < 3; c++) {      /* manual rounding - rint broken */
+    ts[c] = tc[c] - ts[c];
+    if(ts[c] < 0)
+      ts[c] -= 0.5;
+    else
+      ts[c] += 0.5;
+    tt = (int) ts[c];
+    m[4 * c + 3] += (float) (tt + step[c]);
+  }
+}
+
+/* does the box (mn, mx) transformed by "mat" reach the box (sel_mn, sel_mx)? */
+
+static int SymExpBoxTest(float *mat, float *mn, float *mx, float *sel_mn, float *sel_mx)
+{
+  float corner[3], t[3], t_mn[3], t_mx[3];
+  int a, c;
+  for(a = 0; a < 8; a++) {
+    corner[0] = (a & 1) ? mx[0] : mn[0];
+    corner[1] = (a & 2) ? mx[1] : mn[1];
+    corner[2] = (a & 4) ? mx[2] : mn[2];
+    transform44f3f(mat, corner, t);
+    for(c = 0; c < 3; c++) {
+      if((!a) || (t[c] < t_mn[c]))
+        t_mn[c] = t[c];
+      if((!a) || (t[c] > t_mx[c]))
+        t_mx[c] = t[c];
+    }
+  }
+  for(c = 0; c < 3; c++) {
+    if((t_mx[c] < sel_mn[c]) || (t_mn[c] > sel_mx[c]))
+      return false;
+  }
+  return true;
+}
+
+/* is any of the n coordinates v, transformed by "mat", within cutoff of
+   the selection vertices in the map? */
+
+static int SymExpContact(MapType * map, float *sel_v, float *sel_mn, float *sel_mx,
+                         float *v, int n, float *mat, float cutoff)
+{
+  float t[3];
+  int h, k, l, i, j;
+  while(n--) {
+    transform44f3f(mat, v, t);
+    v += 3;
+    if((t[0] < sel_mn[0]) || (t[0] > sel_mx[0]) ||
+       (t[1] < sel_mn[1]) || (t[1] > sel_mx[1]) ||
+       (t[2] < sel_mn[2]) || (t[2] > sel_mx[2]))
+      continue;
+    MapLocus(map, t, &h, &k, &l);
+    i = *(MapEStart(map, h, k, l));
+    if(i) {
+      j = map->EList[i++];
+      while(j >= 0) {
+        if(within3f(sel_v + 3 * j, t, cutoff))
+          return true;
+        j = map->EList[i++];
+      }
+    }
+  }
+  return false;
+}
+
+/* does "mat" leave the n coordinates v where they are? */
+
+static int SymExpIsIdentity(float *v, int n, float *mat)
+{
+  float t[3];
+  while(n--) {
+    transform44f3f(mat, v, t);
+    if(diffsq3f(v, t) > R_SMALL8)
+      return false;
+    v += 3;
+  }
+  return true;
+}
+
 void ExecutiveSymExp(PyMOLGlobals * G, char *name,
-                     char *oname, char *s1, float cutoff, int segi, int quiet)
+                     char *oname, char *s1, float cutoff, int segi, int as_states,
+                     int quiet)
 {                               /* TODO state */
   CObject *ob;
   ObjectMolecule *obj = NULL;
   ObjectMolecule *new_obj = NULL;
+  ObjectMolecule *states_obj = NULL;
   ObjectMoleculeOpRec op;
   MapType *map;
-  int x, y, z, b, c, i, j, h, k, l, n;
+  int x, y, z, b, c;
   ov_size a;
-  CoordSet *cs, *os;
-  int keepFlag, sele, tt[3];
-  float *v1, *v2, m[16], tc[3], ts[3];
+  CoordSet *cs;
+  int keepFlag, sele, step[3];
+  float m[16], r2f[16], f2r[16], tmp[16], tc[3];
+  float sel_mn[3], sel_mx[3];
+  float *mat = NULL, *box = NULL;
+  int n_state, n_out = 0, n_tested = 0, n_kept = 0;
   OrthoLineType new_name;
   float auto_save;
 
@@ -15745,6 +16081,12 @@ void ExecutiveSymExp(PyMOLGlobals * G, char *name,
       PRINTFB(G, FB_Executive, FB_Actions)
         " ExecutiveSymExp: Generating symmetry mates...\n" ENDFB(G);
     }
+    if(as_states && obj->DiscreteFlag) {
+      PRINTFB(G, FB_Executive, FB_Warnings)
+        " ExecutiveSymExp-Warning: discrete object, creating separate objects.\n"
+        ENDFB(G);
+      as_states = false;
+    }
 
 		/* 1.  Get the center of mass for this object/selection */
 		/* the object and selection are valid, so initialize the NEW object */
@@ -15781,150 +16123,188 @@ void ExecutiveSymExp(PyMOLGlobals * G, char *name,
       ErrMessage(G, "ExecutiveSymExp", "No atoms indicated!");
     } else {
       map = MapNew(G, -cutoff, op.vv1, op.nvv1, NULL);
-      if(map) {
+      n_state = obj->NCSet;
+      mat = Alloc(float, 16 * n_state);
+      box = Alloc(float, 9 * n_state);
+      if(map && mat && box) {
         MapSetupExpress(map);
+
+        /* selection bounds, widened by the cutoff */
+        for(c = 0; c < 3; c++) {
+          sel_mn[c] = sel_mx[c] = op.vv1[c];
+        }
+        for(b = 1; b < op.nvv1; b++) {
+          float *v = op.vv1 + 3 * b;
+          for(c = 0; c < 3; c++) {
+            if(v[c] < sel_mn[c])
+              sel_mn[c] = v[c];
+            if(v[c] > sel_mx[c])
+              sel_mx[c] = v[c];
+          }
+        }
+        for(c = 0; c < 3; c++) {
+          sel_mn[c] -= cutoff;
+          sel_mx[c] += cutoff;
+        }
+
+        /* per state: fractional center and bounds of the template */
+        for(b = 0; b < n_state; b++) {
+          cs = obj->CSet[b];
+          if(cs && cs->NIndex) {
+            float *avg = box + 9 * b, *mn = avg + 3, *mx = avg + 6;
+            float *v = cs->Coord;
+            CoordSetGetAverage(cs, avg);
+            transform33f3f(obj->Symmetry->Crystal->RealToFrac, avg, avg);
+            copy3f(v, mn);
+            copy3f(v, mx);
+            for(a = 1; a < (ov_size) cs->NIndex; a++) {
+              v += 3;
+              for(c = 0; c < 3; c++) {
+                if(v[c] < mn[c])
+                  mn[c] = v[c];
+                if(v[c] > mx[c])
+                  mx[c] = v[c];
+              }
+            }
+          }
+        }
+
+        /* symmetry operators work in fractional space */
+        copy33f44f(obj->Symmetry->Crystal->RealToFrac, r2f);
+        copy33f44f(obj->Symmetry->Crystal->FracToReal, f2r);
+
         /* go out no more than one lattice step in each direction: -1, 0, +1 */
         for(x = -1; x < 2; x++)
           for(y = -1; y < 2; y++)
             for(z = -1; z < 2; z++)
               for(a = 0; a < obj->Symmetry->NSymMat; a++) {
-								/* make a copy of the original */
-                new_obj = ObjectMoleculeCopy(obj);
-
+                /* work out each state's operator (in real space) and test
+                   the transformed template before anything is copied:
+                   first its bounds, then its atoms, against the selection */
+                step[0] = x;
+                step[1] = y;
+                step[2] = z;
                 keepFlag = false;
-                for(b = 0; b < new_obj->NCSet; b++)
-                  if(new_obj->CSet[b]) {
-										/* get the new and original coordinate sets for this state */
-                    cs = new_obj->CSet[b];
-                    os = obj->CSet[b];
-										/* convert coordinates into fractional, based on unit cell */
-                    CoordSetRealToFrac(cs, obj->Symmetry->Crystal);
-                    CoordSetTransform44f(cs, obj->Symmetry->SymMatVLA + (a * 16));
-                    CoordSetGetAverage(cs, ts);
-                    identity44f(m);
-                    /* compute the effective translation resulting
-                       from application of the symmetry operator so
-                       that we can shift it into the cell of the
-                       target selection */
-                    for(c = 0; c < 3; c++) {    /* manual rounding - rint broken */
-											/* here, we subtract the center of mass of the selection from tc */
-                      ts[c] = tc[c] - ts[c];
-                      if(ts[c] < 0)
-                        ts[c] -= 0.5;
-                      else
-                        ts[c] += 0.5;
-                      tt[c] = (int) ts[c];
-                    }
-										/* translate the coordinate set by adding Tx, Ty, Tz from the symmetry matrix */
-										/* Now we're at the center of mass and can make an non-affine rotation */
-                    m[3] = (float) tt[0] + x;
-                    m[7] = (float) tt[1] + y;
-                    m[11] = (float) tt[2] + z;
-										/* cs = m x cs, for rotation matrix, m and coordinate set cs */
-                    CoordSetTransform44f(cs, m);
-										
-										/* this steps through the coordinate list until it finds a vertex close enough */
-                    CoordSetFracToReal(cs, obj->Symmetry->Crystal);
-                    if(!keepFlag) {
-											/* for each coordinate in this coordinate set */
-                      v2 = cs->Coord;
-                      n = cs->NIndex;
-                      while(n--) {
-                        MapLocus(map, v2, &h, &k, &l);
-                        i = *(MapEStart(map, h, k, l));
-                        if(i) {
-                          j = map->EList[i++];
-                          while(j >= 0) {
-														/* if op.vv1+3*j (a vertex) is within cutoff angstroms of v2, keep it and break */
-                            if(within3f(op.vv1 + 3 * j, v2, cutoff)) {
-                              keepFlag = true;
-                              break;
-                            }
-                            j = map->EList[i++];
-                          }
-                        }
-                        v2 += 3;
-                        if(keepFlag)
-                          break;
-                      }
-                    }
-                    if(keepFlag) {
-                      /* make sure that we aren't simply duplicating the template coordinates */
-                      keepFlag = false;
-                      v1 = os->Coord;
-                      v2 = cs->Coord;
-                      n = cs->NIndex;
-                      while(n--) {
-                        if(diffsq3f(v1, v2) > R_SMALL8) {
-                          keepFlag = true;
-                          break;
-                        }
-                        v1++;
-                        v2++;
-                      }
-                    }
+                n_tested++;
+                for(b = 0; b < n_state; b++) {
+                  cs = obj->CSet[b];
+                  if(cs && cs->NIndex) {
+                    float *mb = mat + 16 * b, *avg = box + 9 * b;
+                    SymExpOperator(obj->Symmetry->SymMatVLA + (a * 16), avg, tc, step, m);
+                    multiply44f44f44f(m, r2f, tmp);
+                    multiply44f44f44f(f2r, tmp, mb);
+                    if(!keepFlag &&
+                       SymExpBoxTest(mb, avg + 3, avg + 6, sel_mn, sel_mx) &&
+                       SymExpContact(map, op.vv1, sel_mn, sel_mx,
+                                     cs->Coord, cs->NIndex, mb, cutoff) &&
+                       /* make sure that we aren't simply duplicating the template coordinates */
+                       !SymExpIsIdentity(cs->Coord, cs->NIndex, mb))
+                      keepFlag = true;
                   }
-                if(keepFlag) {  /* we need to create new object */
-
-                  /* TODO: should also transform the U tensor at this point... */
-
-		  /* make and manage the new object; update the scene for the new object */
-		  printf("new_name before: %s\n", new_name);
-		  sprintf(new_name, "%s%02d%02d%02d%02d", name, (int)a, (int)x, (int)y, (int)z);
-		  printf("Making new object: %s from name=%s, a=%d, x=%d, y=%d, z=%d\n", new_name, name, (int)a, (int)x, (int)y, (int)z); /* remove me -- JV */
-                  ObjectSetName((CObject *) new_obj, new_name);
-                  ExecutiveDelete(G, new_name);
-                  ExecutiveManageObject(G, (CObject *) new_obj, -1, quiet);
-                  SceneChanged(G);
-									
-                  if(segi == 1) {
-                    SegIdent seg;
-										/* a == index of this symmetryMatrix */
-                    if(a > 35) {
-                      seg[0] = 'a' + (a - 36);
-                    } else if(a > 25) {
-                      seg[0] = '0' + (a - 26);
-                    } else {
-                      seg[0] = 'A' + a;
-                    }
-                    if(x > 0) {
-                      seg[1] = 'A' + x - 1;
-                    } else if(x < 0) {
-                      seg[1] = 'Z' + x + 1;
-                    } else {
-                      seg[1] = '0';
-                    }
-                    if(y > 0) {
-                      seg[2] = 'A' + y - 1;
-                    } else if(y < 0) {
-                      seg[2] = 'Z' + y + 1;
-                    } else {
-                      seg[2] = '0';
+                }
+                if(!keepFlag)
+                  continue;
+                n_kept++;
+
+                /* TODO: should also transform the U tensor at this point... */
+
+                if(as_states) {
+                  /* every state of this mate becomes a state of one object */
+                  if(!states_obj) {
+                    states_obj = ObjectMoleculeCopy(obj);
+                    for(b = 0; b < states_obj->NCSet; b++) {
+                      if(states_obj->CSet[b] && states_obj->CSet[b]->fFree)
+                        states_obj->CSet[b]->fFree(states_obj->CSet[b]);
+                      states_obj->CSet[b] = NULL;
                     }
-                    if(z > 0) {
-                      seg[3] = 'A' + z - 1;
-                    } else if(z < 0) {
-                      seg[3] = 'Z' + z + 1;
-                    } else {
-                      seg[3] = '0';
+                  }
+                  for(b = 0; b < n_state; b++) {
+                    if(obj->CSet[b] && obj->CSet[b]->NIndex) {
+                      cs = CoordSetCopy(obj->CSet[b]);
+                      CoordSetTransform44f(cs, mat + 16 * b);
+                      cs->Obj = states_obj;
+                      VLACheck(states_obj->CSet, CoordSet *, n_out);
+                      states_obj->CSet[n_out++] = cs;
                     }
-                    seg[4] = 0;
-                    {
-                      int a;
-                      AtomInfoType *ai = new_obj->AtomInfo;
-                      for(a = 0; a < new_obj->NAtom; a++) {
-                        strcpy(ai->segi, seg);
-                        ai++;
-                      }
+                  }
+                  continue;
+                }
 
+                /* we need to create new object */
+                new_obj = ObjectMoleculeCopy(obj);
+                for(b = 0; b < new_obj->NCSet; b++)
+                  if(new_obj->CSet[b] && new_obj->CSet[b]->NIndex)
+                    CoordSetTransform44f(new_obj->CSet[b], mat + 16 * b);
+
+                /* make and manage the new object; update the scene for the new object */
+                sprintf(new_name, "%s%02d%02d%02d%02d", name, (int)a, (int)x, (int)y, (int)z);
+                ObjectSetName((CObject *) new_obj, new_name);
+                ExecutiveDelete(G, new_name);
+                ExecutiveManageObject(G, (CObject *) new_obj, -1, quiet);
+                SceneChanged(G);
+
+                if(segi == 1) {
+                  SegIdent seg;
+                  /* a == index of this symmetryMatrix */
+                  if(a > 35) {
+                    seg[0] = 'a' + (a - 36);
+                  } else if(a > 25) {
+                    seg[0] = '0' + (a - 26);
+                  } else {
+                    seg[0] = 'A' + a;
+                  }
+                  if(x > 0) {
+                    seg[1] = 'A' + x - 1;
+                  } else if(x < 0) {
+                    seg[1] = 'Z' + x + 1;
+                  } else {
+                    seg[1] = '0';
+                  }
+                  if(y > 0) {
+                    seg[2] = 'A' + y - 1;
+                  } else if(y < 0) {
+                    seg[2] = 'Z' + y + 1;
+                  } else {
+                    seg[2] = '0';
+                  }
+                  if(z > 0) {
+                    seg[3] = 'A' + z - 1;
+                  } else if(z < 0) {
+                    seg[3] = 'Z' + z + 1;
+                  } else {
+                    seg[3] = '0';
+                  }
+                  seg[4] = 0;
+                  {
+                    int a;
+                    AtomInfoType *ai = new_obj->AtomInfo;
+                    for(a = 0; a < new_obj->NAtom; a++) {
+                      strcpy(ai->segi, seg);
+                      ai++;
                     }
                   }
-                } else {
-                  ((CObject *) new_obj)->fFree((CObject *) new_obj);
                 }
               }
-        MapFree(map);
+        if(states_obj) {
+          states_obj->NCSet = n_out;
+          ObjectSetName((CObject *) states_obj, name);
+          /* if the source object is being replaced, let
+             ExecutiveManageObject swap it out in place, which keeps
+             its name record rather than deleting it outright */
+          if(strcmp(name, obj->Obj.Name))
+            ExecutiveDelete(G, name);
+          ExecutiveManageObject(G, (CObject *) states_obj, -1, quiet);
+          SceneChanged(G);
+        }
+        if(!quiet) {
+          PRINTFB(G, FB_Executive, FB_Actions)
+            " ExecutiveSymExp: %d of %d operators make contacts.\n", n_kept, n_tested
+            ENDFB(G);
+        }
       }
+      FreeP(mat);
+      FreeP(box);
+      MapFree(map);
     }
     VLAFreeP(op.vv1);
   }
@@ -18075,6 +18455,7 @@ int ExecutiveInit(PyMOLGlobals * G)
     I->LastChanged = NULL;
     I->ValidGroups = false;
     I->ValidSceneMembers = false;
+    I->MapRefineTime = 0.0;
 
     ListInit(I->Panel);
     I->ValidPanel = false;
@@ -18263,6 +18644,190 @@ PyObject * ExecutiveCEAlign(PyMOLGlobals * G, PyObject * listA, PyObject * listB
 #endif
 }
 
+#ifndef _PYMOL_NOPY
+
+typedef struct {
+  pcePoint coords;
+  int len;
+  int ok;
+  ceResult result;
+} CEAlignManyItem;
+
+typedef struct {
+  PyMOLGlobals *G;
+  CTileQueue *queue;
+  int worker;
+  pcePoint coordsA;
+  double **dmA;
+  int lenA;
+  CEAlignManyItem *item;
+  float d0, d1;
+  int windowSize, gapMax;
+} CEAlignManyWorker;
+
+static void CEAlignManyFreeMatrix(double **m, int len)
+{
+  int i;
+  if(m) {
+    for(i = 0; i < len; i++)
+      free(m[i]);
+    free(m);
+  }
+}
+
+/* converts packed float32 XYZ triples (as from cmd.get_coords) */
+static pcePoint CEAlignManyCoords(PyObject * str, int *len)
+{
+  char *data = NULL;
+  Py_ssize_t size = 0;
+  pcePoint coords = NULL;
+  int i;
+  *len = 0;
+  if(PyString_AsStringAndSize(str, &data, &size) || (size % (3 * sizeof(float)))) {
+    PyErr_Clear();
+    return NULL;
+  }
+  *len = size / (3 * sizeof(float));
+  coords = (pcePoint) malloc(sizeof(cePoint) * (*len ? *len : 1));
+  if(coords) {
+    for(i = 0; i < *len; i++) {
+      float v[3];
+      memcpy(v, data + i * sizeof(v), sizeof(v));
+      coords[i].x = v[0];
+      coords[i].y = v[1];
+      coords[i].z = v[2];
+    }
+  }
+  return coords;
+}
+
+static void CEAlignManyThread(void *arg)
+{
+  CEAlignManyWorker *W = (CEAlignManyWorker *) arg;
+  int n;
+
+  while((!W->G->Interrupt) && TileQueueNext(W->queue, W->worker, &n)) {
+    CEAlignManyItem *item = W->item + n;
+    int lenB = item->len;
+    int smaller = W->lenA < lenB ? W->lenA : lenB;
+    int bufferSize = 0;
+    double **dmB, **S;
+    pathCache paths;
+
+    if(!item->coords)
+      continue;
+    dmB = calcDM(item->coords, lenB);
+    S = calcS(W->dmA, dmB, W->lenA, lenB, W->windowSize);
+    paths = findPath(S, W->dmA, dmB, W->lenA, lenB, W->d0, W->d1,
+                     W->windowSize, W->gapMax, &bufferSize);
+    item->ok = (findBestResult(W->coordsA, item->coords, paths, bufferSize,
+                               smaller, W->windowSize, &item->result) >= 0);
+    freePaths(paths);
+    CEAlignManyFreeMatrix(S, W->lenA);
+    CEAlignManyFreeMatrix(dmB, lenB);
+  }
+}
+
+#endif
+
+/* aligns each of the mobiles onto the target with CE.  The target's
+   distance matrix is computed once, and the mobiles are then aligned
+   on native threads without the GIL.  Coordinates are packed float32
+   XYZ strings; returns a list with [length, RMSD, TTT] for each mobile,
+   or None where no alignment was found.  Only reads its arguments, so
+   it is called without the API lock (and so prints nothing): the
+   caller checks the lengths and reports the results. */
+
+PyObject *ExecutiveCEAlignMany(PyMOLGlobals * G, PyObject * target, PyObject * mobiles,
+                               float d0, float d1, int windowSize, int gapMax,
+                               int quiet)
+{
+#ifdef _PYMOL_NOPY
+  return NULL;
+#else
+  int a, b;
+  int n_item = PyList_Size(mobiles);
+  int n_thread = SettingGetGlobal_i(G, cSetting_max_threads);
+  int lenA = 0;
+  int minLen = 2 * windowSize;
+  pcePoint coordsA;
+  double **dmA = NULL;
+  CEAlignManyItem *item = NULL;
+  CEAlignManyWorker *worker = NULL;
+  CTileQueue *queue = NULL;
+  PyObject *result = NULL;
+  PyThreadState *tstate;
+
+  coordsA = CEAlignManyCoords(target, &lenA);
+  if((!coordsA) || (lenA < minLen)) {
+    free(coordsA);
+    return NULL;
+  }
+
+  item = Calloc(CEAlignManyItem, n_item ? n_item : 1);
+  if(n_thread > n_item)
+    n_thread = n_item;
+  if(n_thread < 1)
+    n_thread = 1;
+  queue = TileQueueNew(n_item, n_thread);
+  worker = Calloc(CEAlignManyWorker, n_thread);
+
+  if(item && queue && worker) {
+    for(a = 0; a < n_item; a++) {
+      item[a].coords = CEAlignManyCoords(PyList_GetItem(mobiles, a), &item[a].len);
+      if(item[a].coords && (item[a].len < minLen)) {
+        free(item[a].coords);
+        item[a].coords = NULL;
+      }
+    }
+
+    /* the target's half of the CE work is shared by all mobiles */
+    dmA = calcDM(coordsA, lenA);
+
+    for(a = 0; a < n_thread; a++) {
+      worker[a].G = G;
+      worker[a].queue = queue;
+      worker[a].worker = a;
+      worker[a].coordsA = coordsA;
+      worker[a].dmA = dmA;
+      worker[a].lenA = lenA;
+      worker[a].item = item;
+      worker[a].d0 = d0;
+      worker[a].d1 = d1;
+      worker[a].windowSize = windowSize;
+      worker[a].gapMax = gapMax;
+    }
+
+    tstate = PyEval_SaveThread();
+    ThreadRun(CEAlignManyThread, worker, sizeof(CEAlignManyWorker), n_thread);
+    PyEval_RestoreThread(tstate);
+
+    result = PyList_New(n_item);
+    for(a = 0; a < n_item; a++) {
+      PyObject *entry;
+      if(item[a].ok) {
+        PyObject *ttt = PyList_New(16);
+        for(b = 0; b < 16; b++)
+          PyList_SetItem(ttt, b, PyFloat_FromDouble(item[a].result.TTT[b]));
+        entry = Py_BuildValue("[idN]", item[a].result.alignLen,
+                              item[a].result.RMSD, ttt);
+      } else {
+        entry = PConvAutoNone(Py_None);
+      }
+      PyList_SetItem(result, a, entry);
+      free(item[a].coords);
+    }
+  }
+
+  CEAlignManyFreeMatrix(dmA, lenA);
+  free(coordsA);
+  TileQueueFree(queue);
+  FreeP(worker);
+  FreeP(item);
+  return result;
+#endif
+}
+
 char *ExecutiveGetObjectNames(PyMOLGlobals * G, int mode, char *name, int enabled_only, int *numstrs){
   char *res;
   int size=0, stlen;
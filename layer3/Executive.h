@@ -194,6 +194,8 @@ int ExecutiveRevalence(PyMOLGlobals * G, char *s1, char *s2, char *src,
                        int target_state, int source_state, int reset, int quiet);
 int ExecutiveVdwFit(PyMOLGlobals * G, char *s1, int state1, char *s2, int state2,
                     float buffer, int quiet);
+int ExecutiveAlterColumn(PyMOLGlobals * G, char *s1, char *field, char *source,
+                         double *value, char *text, int n_value, int quiet);
 int ExecutiveIterate(PyMOLGlobals * G, char *s1, char *expr, int read_only, int quiet,
                      PyObject * space);
 int ExecutiveIterateList(PyMOLGlobals * G, char *s1, PyObject * list, int read_only,
@@ -307,7 +309,7 @@ float ExecutiveOverlap(PyMOLGlobals * G, char *s1, int state1, char *s2, int sta
                        float adjust);
 int ExecutiveCountStates(PyMOLGlobals * G, char *s1);
 void ExecutiveSymExp(PyMOLGlobals * G, char *name, char *obj, char *sele, float cutoff,
-                     int segi, int quiet);
+                     int segi, int as_states, int quiet);
 int ExecutiveGetExtent(PyMOLGlobals * G, char *name, float *mn, float *mx,
                        int transformed, int state, int weighted);
 int ExecutiveGetCameraExtent(PyMOLGlobals * G, char *name, float *mn, float *mx,
@@ -353,6 +355,7 @@ void ExecutiveRebuildAllObjectDist(PyMOLGlobals * G);
 int ExecutivePhiPsi(PyMOLGlobals * G, char *s1, ObjectMolecule *** objVLA, int **iVLA,
                     float **phiVLA, float **psiVLA, int state);
 float *ExecutiveGetVertexVLA(PyMOLGlobals * G, char *s1, int state);
+int ExecutiveSetVertices(PyMOLGlobals * G, char *s1, int state, float *coord, int n_coord, int quiet);
 int ExecutiveValidName(PyMOLGlobals * G, char *name);
 int ExecutiveValidNamePattern(PyMOLGlobals * G, char *name);
 int ExecutiveProcessObjectName(PyMOLGlobals * G, char *proposed, char *actual);
@@ -388,6 +391,8 @@ int ExecutiveSetObjectMatrix(PyMOLGlobals * G, char *name, int state, double *ma
 
 int ExecutiveSetGeometry(PyMOLGlobals * G, char *s1, int geom, int valence);
 int ExecutiveSculptIterateAll(PyMOLGlobals * G);
+void ExecutiveMapRefineLater(PyMOLGlobals * G);
+int ExecutiveMapRefine(PyMOLGlobals * G, int force);
 int ExecutiveSmooth(PyMOLGlobals * G, char *name, int cycles, int window,
                     int first, int last, int ends, int quiet);
 int ExecutiveSculptDeactivate(PyMOLGlobals * G, char *name);
@@ -532,6 +537,9 @@ PyObject *ExecutiveAssignAtomTypes(PyMOLGlobals * G, char *s1, int format, int s
 
 PyObject * ExecutiveCEAlign(PyMOLGlobals * G, PyObject * listA, PyObject * listB, int lenA, int lenB,
 			    float d0, float d1, int windowSize, int gapMax);
+PyObject *ExecutiveCEAlignMany(PyMOLGlobals * G, PyObject * target, PyObject * mobiles,
+                               float d0, float d1, int windowSize, int gapMax,
+                               int quiet);
 
 #ifdef _PYMOL_LIB
 int *ExecutiveGetRepsInSceneForObject(PyMOLGlobals *G, const char *name);
@@ -63,6 +63,33 @@ ObjectMap *PlugIOManagerLoadVol(PyMOLGlobals * G, ObjectMap * obj,
   return NULL;
 }
 
+int PlugIOManagerTrajLoadRange(ObjectMolecule * obj, int start, int stop)
+{
+  return 0;
+}
+
+void PlugIOManagerTrajFree(CPlugIOTraj * traj)
+{
+}
+
+CPlugIOTraj *PlugIOManagerTrajCopy(CPlugIOTraj * traj)
+{
+  return NULL;
+}
+
+CoordSet *PlugIOManagerTrajRead(ObjectMolecule * obj, int state)
+{
+  return NULL;
+}
+
+void PlugIOManagerTrajKeep(ObjectMolecule * obj, int state)
+{
+}
+
+void PlugIOManagerTrajTrim(ObjectMolecule * obj, int keep_start, int keep_stop)
+{
+}
+
 #else
 
 #include "molfile_plugin.h"
@@ -113,6 +140,334 @@ int PlugIOManagerRegister(PyMOLGlobals * G, vmdplugin_t * header)
     return VMDPLUGIN_ERROR;
 }
 
+/* Lazily decoded trajectory (traj_lazy_cache > 0): instead of copying
+ * every timestep into its own CoordSet, the object keeps the trajectory
+ * files plus a state -> (file, frame) index, and decodes states on demand
+ * into a bounded LRU of CoordSets.  States which are not resident are
+ * simply NULL in obj->CSet, just like gaps in any multi-state object.
+ * Each lazy load_traj adds another source file, so several trajectories
+ * can be appended to the same object.
+ *
+ * Decoding never frees anything: resident states beyond the cache size
+ * are only evicted by PlugIOManagerTrajTrim at the start of the next
+ * ObjectMoleculeUpdate, so CoordSet pointers handed out by
+ * ObjectMoleculeGetCoordSet stay valid until the update cycle ends.
+ */
+
+typedef struct {
+  molfile_plugin_t *plugin;
+  void *file_handle;            /* opened on first decode */
+  char *fname, *plugin_type;
+  int natoms;
+  int next_frame;               /* file frame the handle will return next */
+} CPlugIOTrajSource;
+
+struct _CPlugIOTraj {
+  PyMOLGlobals *G;
+  CoordSet *tmpl;               /* private template for decoded states */
+  CPlugIOTrajSource *source;    /* VLA */
+  int n_source;
+  int *origin;                  /* VLA: state -> source, or -1 if not lazy */
+  int *frame;                   /* VLA: state -> file frame */
+  int n_state;                  /* extent of origin and frame */
+  int *cached;                  /* VLA: resident states, least recent first */
+  int n_cached, max_cached;
+};
+
+static char *PlugIOManagerStrDup(char *st)
+{
+  char *result = Alloc(char, strlen(st) + 1);
+  if(result)
+    strcpy(result, st);
+  return result;
+}
+
+void PlugIOManagerTrajFree(CPlugIOTraj * I)
+{
+  if(I) {
+    int a;
+    for(a = 0; a < I->n_source; a++) {
+      CPlugIOTrajSource *src = I->source + a;
+      if(src->file_handle)
+        src->plugin->close_file_read(src->file_handle);
+      FreeP(src->fname);
+      FreeP(src->plugin_type);
+    }
+    if(I->tmpl && I->tmpl->fFree)
+      I->tmpl->fFree(I->tmpl);
+    VLAFreeP(I->source);
+    VLAFreeP(I->origin);
+    VLAFreeP(I->frame);
+    VLAFreeP(I->cached);
+    FreeP(I);
+  }
+}
+
+CPlugIOTraj *PlugIOManagerTrajCopy(CPlugIOTraj * src)
+{
+  /* the copy shares nothing: it reopens the files on its own and treats
+     the states ObjectMoleculeCopy duplicated as its resident ones */
+  CPlugIOTraj *I = NULL;
+  int a;
+  if(src && (I = Calloc(CPlugIOTraj, 1))) {
+    *I = *src;
+    I->tmpl = CoordSetCopy(src->tmpl);
+    I->source = VLACopy(src->source, CPlugIOTrajSource);
+    I->origin = VLACopy(src->origin, int);
+    I->frame = VLACopy(src->frame, int);
+    I->cached = VLACopy(src->cached, int);
+    for(a = 0; a < I->n_source; a++) {
+      CPlugIOTrajSource *s = I->source + a;
+      s->file_handle = NULL;
+      s->next_frame = 0;
+      s->fname = PlugIOManagerStrDup(s->fname);
+      s->plugin_type = PlugIOManagerStrDup(s->plugin_type);
+    }
+  }
+  return I;
+}
+
+static int PlugIOManagerTrajIsLazy(CPlugIOTraj * I, int state)
+{
+  return (state >= 0) && (state < I->n_state) && (I->origin[state] >= 0);
+}
+
+static void PlugIOManagerTrajUncache(CPlugIOTraj * I, int state)
+{
+  int a, b = 0;
+  for(a = 0; a < I->n_cached; a++) {
+    if(I->cached[a] != state)
+      I->cached[b++] = I->cached[a];
+  }
+  I->n_cached = b;
+}
+
+static void PlugIOManagerTrajTouch(CPlugIOTraj * I, int state)
+{
+  /* move state to the most-recently-used end of the cache list */
+  PlugIOManagerTrajUncache(I, state);
+  VLACheck(I->cached, int, I->n_cached);
+  I->cached[I->n_cached++] = state;
+}
+
+void PlugIOManagerTrajKeep(ObjectMolecule * obj, int state)
+{
+  /* state is now owned by the object (edited or replaced), so it is
+     neither evicted nor decoded again */
+  CPlugIOTraj *I = obj->Traj;
+  if(I && PlugIOManagerTrajIsLazy(I, state)) {
+    I->origin[state] = -1;
+    PlugIOManagerTrajUncache(I, state);
+  }
+}
+
+CoordSet *PlugIOManagerTrajRead(ObjectMolecule * obj, int state)
+{
+  /* decodes a state into a new CoordSet which the caller owns */
+  CPlugIOTraj *I = obj->Traj;
+  PyMOLGlobals *G;
+  CPlugIOTrajSource *src;
+  molfile_timestep_t timestep;
+  CoordSet *cs;
+  int want;
+
+  if(!I || !PlugIOManagerTrajIsLazy(I, state))
+    return NULL;
+  G = I->G;
+  src = I->source + I->origin[state];
+  want = I->frame[state];
+  if(want < src->next_frame || !src->file_handle) {
+    /* molfile readers are forward-only: rewind by reopening */
+    int natoms = 0;
+    if(src->file_handle)
+      src->plugin->close_file_read(src->file_handle);
+    src->file_handle = src->plugin->open_file_read(src->fname, src->plugin_type, &natoms);
+    src->next_frame = 0;
+    if(src->file_handle && natoms != src->natoms) {
+      src->plugin->close_file_read(src->file_handle);
+      src->file_handle = NULL;
+    }
+    if(!src->file_handle) {
+      PRINTFB(G, FB_ObjectMolecule, FB_Errors)
+        " ObjectMolecule: unable to reopen trajectory '%s'.\n", src->fname ENDFB(G);
+      return NULL;
+    }
+  }
+  /* skipping with a NULL timestep lets readers seek instead of decoding */
+  while(src->next_frame < want) {
+    if(src->plugin->read_next_timestep(src->file_handle, src->natoms, NULL))
+      return NULL;
+    src->next_frame++;
+  }
+  cs = CoordSetCopy(I->tmpl);
+  if(!cs)
+    return NULL;
+  timestep.coords = cs->Coord;
+  timestep.velocities = NULL;
+  if(src->plugin->read_next_timestep(src->file_handle, src->natoms, &timestep)) {
+    cs->fFree(cs);
+    return NULL;
+  }
+  src->next_frame++;
+  PRINTFB(G, FB_ObjectMolecule, FB_Blather)
+    " ObjectMolecule: decoded set %d into state %d...\n", want + 1, state + 1 ENDFB(G);
+  return cs;
+}
+
+int PlugIOManagerTrajLoadRange(ObjectMolecule * obj, int start, int stop)
+{
+  /* makes states start..stop-1 resident; the cache size is only
+     enforced by PlugIOManagerTrajTrim */
+  CPlugIOTraj *I = obj->Traj;
+  int state, ok = true;
+  if(!I)
+    return false;
+  if(start < 0)
+    start = 0;
+  if(stop > I->n_state)
+    stop = I->n_state;
+  if(stop > obj->NCSet)
+    stop = obj->NCSet;
+  for(state = start; ok && (state < stop); state++) {
+    if(PlugIOManagerTrajIsLazy(I, state)) {
+      if(!obj->CSet[state]) {
+        CoordSet *cs = PlugIOManagerTrajRead(obj, state);
+        if(cs)
+          obj->CSet[state] = cs;
+        else
+          ok = false;
+      }
+      if(ok)
+        PlugIOManagerTrajTouch(I, state);
+    }
+  }
+  return ok;
+}
+
+void PlugIOManagerTrajTrim(ObjectMolecule * obj, int keep_start, int keep_stop)
+{
+  /* evicts least recently used states beyond the cache size, except
+     those in keep_start..keep_stop-1; only call this where no CoordSet
+     pointers obtained earlier can still be in use */
+  CPlugIOTraj *I = obj->Traj;
+  int a = 0;
+  if(!I)
+    return;
+  while((I->n_cached > I->max_cached) && (a < I->n_cached)) {
+    int victim = I->cached[a];
+    if((victim >= keep_start) && (victim < keep_stop)) {
+      a++;
+    } else {
+      CoordSet *cs = obj->CSet[victim];
+      if(cs && cs->fFree)
+        cs->fFree(cs);
+      obj->CSet[victim] = NULL;
+      I->n_cached--;
+      memmove(I->cached + a, I->cached + a + 1, sizeof(int) * (I->n_cached - a));
+    }
+  }
+}
+
+static int PlugIOManagerLoadTrajLazy(PyMOLGlobals * G, ObjectMolecule * obj,
+                                     molfile_plugin_t * plugin, void *file_handle,
+                                     int natoms, CoordSet * cs_tmpl,
+                                     char *fname, char *plugin_type, int frame,
+                                     int interval, int start, int stop, int max,
+                                     int max_cached, int quiet)
+{
+  /* builds the frame index by skipping through the file once, honoring
+     the same start/stop/interval/max semantics as the eager reader */
+  CPlugIOTraj *I = obj->Traj;
+  CPlugIOTrajSource *src;
+  int *index = VLAlloc(int, 100);
+  int cnt = 0, icnt = interval, n_state = 0;
+  int a, state;
+
+  if(!index) {
+    plugin->close_file_read(file_handle);
+    return false;
+  }
+  while(!plugin->read_next_timestep(file_handle, natoms, NULL)) {
+    cnt++;
+    if(cnt >= start) {
+      icnt--;
+      if(icnt <= 0) {
+        icnt = interval;
+        VLACheck(index, int, n_state);
+        index[n_state++] = cnt - 1;
+        if((stop > 0) && (cnt >= stop))
+          break;
+        if((max > 0) && (n_state >= max))
+          break;
+      }
+    }
+  }
+  plugin->close_file_read(file_handle);
+
+  if(!n_state) {
+    VLAFreeP(index);
+    return false;
+  }
+
+  if(!I) {
+    I = Calloc(CPlugIOTraj, 1);
+    if(!I) {
+      VLAFreeP(index);
+      return false;
+    }
+    I->G = G;
+    I->tmpl = CoordSetCopy(cs_tmpl);
+    if(I->tmpl->fInvalidateRep)
+      I->tmpl->fInvalidateRep(I->tmpl, cRepAll, cRepInvRep);
+    I->source = VLAlloc(CPlugIOTrajSource, 1);
+    I->origin = VLAlloc(int, 100);
+    I->frame = VLAlloc(int, 100);
+    I->cached = VLAlloc(int, max_cached + 1);
+    obj->Traj = I;
+  }
+  I->max_cached = max_cached;
+
+  VLACheck(I->source, CPlugIOTrajSource, I->n_source);
+  src = I->source + I->n_source;
+  src->plugin = plugin;
+  src->file_handle = NULL;      /* reopened on first decode */
+  src->fname = PlugIOManagerStrDup(fname);
+  src->plugin_type = PlugIOManagerStrDup(plugin_type);
+  src->natoms = natoms;
+  src->next_frame = 0;
+
+  if(frame < 0)
+    frame = obj->NCSet;
+  VLACheck(I->origin, int, frame + n_state - 1);
+  VLACheck(I->frame, int, frame + n_state - 1);
+  for(a = I->n_state; a < frame; a++)
+    I->origin[a] = -1;
+  if(I->n_state < frame + n_state)
+    I->n_state = frame + n_state;
+
+  VLACheck(obj->CSet, CoordSet *, frame + n_state - 1);
+  for(a = 0; a < n_state; a++) {
+    state = frame + a;
+    PlugIOManagerTrajUncache(I, state);
+    if(state < obj->NCSet && obj->CSet[state]) {
+      if(obj->CSet[state]->fFree)
+        obj->CSet[state]->fFree(obj->CSet[state]);
+    }
+    obj->CSet[state] = NULL;
+    I->origin[state] = I->n_source;
+    I->frame[state] = index[a];
+  }
+  I->n_source++;
+  if(obj->NCSet < frame + n_state)
+    obj->NCSet = frame + n_state;
+  VLAFreeP(index);
+
+  PRINTFB(G, FB_ObjectMolecule, FB_Details)
+    " ObjectMolecule: indexed %d sets into states %d-%d (decoded on demand).\n",
+    n_state, frame + 1, frame + n_state ENDFB(G);
+  return true;
+}
+
 int PlugIOManagerLoadTraj(PyMOLGlobals * G, ObjectMolecule * obj,
                           char *fname, int frame,
                           int interval, int average, int start,
@@ -145,6 +500,9 @@ int PlugIOManagerLoadTraj(PyMOLGlobals * G, ObjectMolecule * obj,
       int zoom_flag = false;
       CoordSet *cs_tmpl = obj->CSet[0];
 
+      if(!cs_tmpl && obj->Traj)
+        cs_tmpl = obj->Traj->tmpl;      /* state 1 may not be decoded */
+
       timestep.coords = NULL;
       timestep.velocities = NULL;
 
@@ -156,6 +514,21 @@ int PlugIOManagerLoadTraj(PyMOLGlobals * G, ObjectMolecule * obj,
       } else if (natoms!=obj->NAtom) {
 	PRINTFB(G, FB_ObjectMolecule, FB_Errors)
           " ObjectMolecule: plugin '%s' cannot open file because the number of atoms in the object (%d) did not equal the number of atoms in the '%s' (%d) file.\n", plugin_type, obj->NAtom, plugin_type, natoms ENDFB(G);
+      } else if(cs_tmpl && (average < 2) &&
+                (SettingGetGlobal_i(G, cSetting_traj_lazy_cache) > 0)) {
+        int max_cached = SettingGetGlobal_i(G, cSetting_traj_lazy_cache);
+        if(!obj->NCSet)
+          zoom_flag = true;
+        if(PlugIOManagerLoadTrajLazy(G, obj, plugin, file_handle, natoms, cs_tmpl,
+                                     fname, plugin_type, frame, interval,
+                                     start, stop, max, max_cached, quiet)) {
+          SceneChanged(G);
+          SceneCountFrames(G);
+          if(zoom_flag)
+            if(SettingGet(G, cSetting_auto_zoom)) {
+              ExecutiveWindowZoom(G, obj->Obj.Name, 0.0, -1, 0, 0, quiet);
+            }
+        }
       } else if(cs_tmpl) {
 	/* by this point, we have opened the DCD file, and we have a valid topology file (obj->CSet[0] exists) */
         CoordSet *cs = CoordSetCopy(cs_tmpl);
@@ -209,6 +582,7 @@ int PlugIOManagerLoadTraj(PyMOLGlobals * G, ObjectMolecule * obj,
 		  /* bump the object's state count */
                   if(obj->NCSet <= frame) obj->NCSet = frame + 1;
 		  /* if there's data in this state's coordset, emtpy it */
+                  PlugIOManagerTrajKeep(obj, frame);
                   if(obj->CSet[frame]) obj->CSet[frame]->fFree(obj->CSet[frame]);
 		  /* set this state's coordset to cs */
                   obj->CSet[frame] = cs;
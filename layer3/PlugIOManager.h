@@ -31,5 +31,11 @@ int PlugIOManagerLoadTraj(PyMOLGlobals * G, ObjectMolecule * obj,
                           float *shift, int quiet, char *plugin_type);
 ObjectMap *PlugIOManagerLoadVol(PyMOLGlobals * G, ObjectMap * obj,
                                 char *fname, int state, int quiet, char *plugin_type);
+int PlugIOManagerTrajLoadRange(ObjectMolecule * obj, int start, int stop);
+void PlugIOManagerTrajFree(CPlugIOTraj * traj);
+CPlugIOTraj *PlugIOManagerTrajCopy(CPlugIOTraj * traj);
+CoordSet *PlugIOManagerTrajRead(ObjectMolecule * obj, int state);
+void PlugIOManagerTrajKeep(ObjectMolecule * obj, int state);
+void PlugIOManagerTrajTrim(ObjectMolecule * obj, int keep_start, int keep_stop);
 
 #endif
@@ -94,6 +94,18 @@ typedef struct {
   float f1;
 } TableRec;
 
+#define cSelectorCacheSize 16
+
+typedef struct {
+  char *text;                   /* expression, as given to SelectorSelect */
+  unsigned int hash;
+  SelectorWordType *parsed;     /* VLA of tokens from SelectorParse */
+  int *mask;                    /* result over the all-states table */
+  ov_size mask_size;
+  int generation;               /* Selector generation the mask belongs to */
+  int last_used;
+} SelectorCacheRec;
+
 typedef struct {
   int ID;
   int justOneObjectFlag;
@@ -122,7 +134,17 @@ struct _CSelector {
   OVLexicon *Lex;
   OVOneToAny *Key;
   OVOneToOne *NameOffset;
-
+  /* an all-states, whole-domain table is kept between operations and
+     patched in place when objects come and go */
+  int TableCached;
+  int *TableNAtom;              /* atom count of each model when tabulated */
+  int NTableFull, NTableIncremental, NTableReused;
+  /* compiled selections, keyed by expression text */
+  SelectorCacheRec Cache[cSelectorCacheSize];
+  int CacheClock;
+  int Generation;               /* bumped whenever a cached mask may go stale */
+  int EvalVolatile;             /* expression depends on state we don't track */
+  int NParseHit, NMaskHit, NCacheMiss;
 };
 
 typedef struct {
@@ -156,6 +178,7 @@ static int *SelectorGetIndexVLA(PyMOLGlobals * G, int sele);
 static int *SelectorGetIndexVLAImpl(PyMOLGlobals * G, CSelector *I, int sele);
 static void SelectorClean(PyMOLGlobals * G);
 static void SelectorCleanImpl(PyMOLGlobals * G, CSelector *I);
+static void SelectorReleaseTable(PyMOLGlobals * G);
 static int *SelectorApplyMultipick(PyMOLGlobals * G, Multipick * mp);
 static int SelectorCheckNeighbors(PyMOLGlobals * G, int maxDepth, ObjectMolecule * obj,
                                   int at1, int at2, int *zero, int *scratch);
@@ -1126,6 +1149,8 @@ static int SelectorAddName(PyMOLGlobals * G, int index)
       ok = true;
     }
   }
+  if(strncmp(I->Name[index], cSelectorTmpPrefix, strlen(cSelectorTmpPrefix)))
+    I->Generation++;            /* expressions may refer to this name */
   return ok;
 }
 
@@ -1140,6 +1165,8 @@ static int SelectorDelName(PyMOLGlobals * G, int index)
       ok = true;
     }
   }
+  if(strncmp(I->Name[index], cSelectorTmpPrefix, strlen(cSelectorTmpPrefix)))
+    I->Generation++;
   return ok;
 }
 
@@ -1679,7 +1706,7 @@ void SelectorSelectByID(PyMOLGlobals * G, char *name, ObjectMolecule * obj, int
   SelectorEmbedSelection(G, atom, name, NULL, true, -1);
   FreeP(atom);
   FreeP(lookup);
-  SelectorClean(G);
+  SelectorReleaseTable(G);
 }
 
 void SelectorDefragment(PyMOLGlobals * G)
@@ -5132,7 +5159,7 @@ int SelectorSubdivide(PyMOLGlobals * G, char *pref, int sele1, int sele2,
     FreeP(comp);
     FreeP(pkset);
     VLAFreeP(stk);
-    SelectorClean(G);
+    SelectorReleaseTable(G);
   }
   PRINTFD(G, FB_Selector)
     " SelectorSubdivideObject: leaving...nFrag %d\n", nFrag ENDFD;
@@ -7908,7 +7935,7 @@ static int _SelectorCreate(PyMOLGlobals * G, char *sname, char *sele,
   if(ok)
     c = SelectorEmbedSelection(G, atom, name, embed_obj, false, executive_manage);
   FreeP(atom);
-  SelectorClean(G);
+  SelectorReleaseTable(G);
   /* ignore reporting on quiet */
   if(!quiet) {
     /* ignore reporting on internal/private names */
@@ -8029,6 +8056,8 @@ static void SelectorCleanImpl(PyMOLGlobals * G, CSelector *I)
   I->Table = NULL;
   FreeP(I->Obj);
   I->Obj = NULL;
+  FreeP(I->TableNAtom);
+  I->TableCached = false;
   FreeP(I->Vertex);
   I->Vertex = NULL;
   FreeP(I->Flag1);
@@ -8183,6 +8212,174 @@ static int *SelectorUpdateTableSingleObject(PyMOLGlobals * G, ObjectMolecule * o
 }
 
 
+/*========================================================================*/
+static void SelectorReleaseTable(PyMOLGlobals * G)
+{
+  /* called when an operation is done with the table: keep it around if
+     it can be patched up for the next request, free it otherwise */
+  if(!G->Selector->TableCached)
+    SelectorClean(G);
+}
+
+
+/*========================================================================*/
+static int SelectorRefreshCachedTable(PyMOLGlobals * G, CSelector * I)
+{
+  /* Brings the cached all-states table in line with the current object
+   * list.  Objects are compared by address and atom count; the models
+   * that match at the head and at the tail of the old table keep their
+   * records, so only the slice for objects which were added, removed or
+   * resized gets tabulated.  Returns false if a full rebuild is needed.
+   */
+  void *iterator = NULL;
+  ObjectMolecule *obj = NULL;
+  ObjectMolecule **cur_obj;
+  int *cur_natom;
+  int n_cur = 0, n_old = I->NModel - cNDummyModels;
+  int pre = 0, suf = 0;
+  int a, m;
+  ov_size c = cNDummyAtoms;
+  ov_size old_mid_start, old_mid_stop, new_mid_stop, new_natom;
+  int model_shift;
+
+  cur_obj = VLAlloc(ObjectMolecule *, 100);
+  cur_natom = VLAlloc(int, 100);
+  while(ExecutiveIterateObjectMolecule(G, &obj, &iterator)) {
+    if(obj->NAtom) {            /* empty objects never make it into the table */
+      VLACheck(cur_obj, ObjectMolecule *, n_cur);
+      VLACheck(cur_natom, int, n_cur);
+      cur_obj[n_cur] = obj;
+      cur_natom[n_cur] = obj->NAtom;
+      c += obj->NAtom;
+      n_cur++;
+    }
+  }
+  new_natom = c;
+
+  /* matching head and tail (by address and size) */
+  while((pre < n_cur) && (pre < n_old) &&
+        (cur_obj[pre] == I->Obj[cNDummyModels + pre]) &&
+        (cur_natom[pre] == I->TableNAtom[cNDummyModels + pre]))
+    pre++;
+  while((suf < (n_cur - pre)) && (suf < (n_old - pre)) &&
+        (cur_obj[n_cur - 1 - suf] == I->Obj[I->NModel - 1 - suf]) &&
+        (cur_natom[n_cur - 1 - suf] == I->TableNAtom[I->NModel - 1 - suf]))
+    suf++;
+
+  if((pre == n_cur) && (pre == n_old)) {
+    I->NTableReused++;
+  } else if(!(pre + suf)) {
+    VLAFreeP(cur_obj);
+    VLAFreeP(cur_natom);
+    return false;
+  } else {
+    /* old and new table positions of the changed slice */
+    old_mid_start = cNDummyAtoms;
+    for(m = 0; m < pre; m++)
+      old_mid_start += cur_natom[m];
+    old_mid_stop = I->NAtom;
+    new_mid_stop = new_natom;
+    for(m = 0; m < suf; m++) {
+      old_mid_stop -= cur_natom[n_cur - 1 - m];
+      new_mid_stop -= cur_natom[n_cur - 1 - m];
+    }
+    model_shift = (n_cur - n_old);
+
+    if(new_natom > I->NAtom)
+      I->Table = Realloc(I->Table, TableRec, new_natom);
+    if(suf && (new_mid_stop != old_mid_stop))
+      memmove(I->Table + new_mid_stop, I->Table + old_mid_stop,
+              sizeof(TableRec) * (I->NAtom - old_mid_stop));
+    if(new_natom < I->NAtom)
+      I->Table = Realloc(I->Table, TableRec, new_natom);
+    ErrChkPtr(G, I->Table);
+
+    /* tabulate the changed models */
+    {
+      register TableRec *rec = I->Table + old_mid_start;
+      for(m = pre; m < (n_cur - suf); m++) {
+        register int n_atom = cur_natom[m];
+        register int model = cNDummyModels + m;
+        for(a = 0; a < n_atom; a++) {
+          rec->model = model;
+          rec->atom = a;
+          rec++;
+        }
+      }
+    }
+
+    /* renumber the models which moved */
+    if(model_shift) {
+      register TableRec *rec = I->Table + new_mid_stop;
+      register TableRec *stop = I->Table + new_natom;
+      while(rec < stop) {
+        rec->model += model_shift;
+        rec++;
+      }
+    }
+
+    I->NModel = cNDummyModels + n_cur;
+    I->Obj = Realloc(I->Obj, ObjectMolecule *, I->NModel);
+    I->TableNAtom = Realloc(I->TableNAtom, int, I->NModel);
+    ErrChkPtr(G, I->Obj);
+    ErrChkPtr(G, I->TableNAtom);
+    for(m = 0; m < n_cur; m++) {
+      I->Obj[cNDummyModels + m] = cur_obj[m];
+      I->TableNAtom[cNDummyModels + m] = cur_natom[m];
+    }
+
+    if(new_natom != I->NAtom) {
+      FreeP(I->Flag1);
+      FreeP(I->Flag2);
+      FreeP(I->Vertex);
+      I->Flag1 = Alloc(int, new_natom);
+      ErrChkPtr(G, I->Flag1);
+      I->Flag2 = Alloc(int, new_natom);
+      ErrChkPtr(G, I->Flag2);
+      I->Vertex = Alloc(float, new_natom * 3);
+      ErrChkPtr(G, I->Vertex);
+      I->NAtom = new_natom;
+    }
+    I->NTableIncremental++;
+    if(I == G->Selector)
+      I->Generation++;
+    PRINTFD(G, FB_Selector)
+      " SelectorRefreshCachedTable-Debug: kept %d+%d models, retabulated %d.\n",
+      pre, suf, n_cur - pre - suf ENDFD;
+  }
+
+  /* other table flavors may have moved these in the meantime */
+  c = cNDummyAtoms;
+  for(m = 0; m < n_cur; m++) {
+    cur_obj[m]->SeleBase = c;
+    c += cur_natom[m];
+  }
+  I->SeleBaseOffsetsValid = true;
+  VLAFreeP(cur_obj);
+  VLAFreeP(cur_natom);
+  return true;
+}
+
+void SelectorGetStats(PyMOLGlobals * G, int *stats)
+{
+  /* fills cSelectorNStats values: table full/incremental/reused, parse
+     hits, mask hits, cache misses, generation */
+  register CSelector *I = G->Selector;
+  stats[0] = I->NTableFull;
+  stats[1] = I->NTableIncremental;
+  stats[2] = I->NTableReused;
+  stats[3] = I->NParseHit;
+  stats[4] = I->NMaskHit;
+  stats[5] = I->NCacheMiss;
+  stats[6] = I->Generation;
+}
+
+void SelectorInvalidateCache(PyMOLGlobals * G)
+{
+  G->Selector->Generation++;
+}
+
+
 /*========================================================================*/
 int SelectorUpdateTable(PyMOLGlobals * G, int req_state, int domain)
 {
@@ -8205,7 +8402,19 @@ int SelectorUpdateTableImpl(PyMOLGlobals * G, CSelector *I, int req_state, int d
   if(!I->Center)
     I->Center = ObjectMoleculeDummyNew(G, cObjectMoleculeDummyCenter);
 
-  SelectorClean(G);
+  if(I->TableCached && (req_state == cSelectorUpdateTableAllStates) && (domain < 0)) {
+    I->NCSet = 0;
+    while(ExecutiveIterateObjectMolecule(G, &obj, &iterator)) {
+      if(I->NCSet < obj->NCSet)
+        I->NCSet = obj->NCSet;
+    }
+    if(SelectorRefreshCachedTable(G, I))
+      return (true);
+    iterator = NULL;
+    obj = NULL;
+  }
+
+  SelectorCleanImpl(G, I);
   I->NCSet = 0;
 
   /* take a summary of PyMOL's current state; foreach molecular object
@@ -8394,20 +8603,113 @@ int SelectorUpdateTableImpl(PyMOLGlobals * G, CSelector *I, int req_state, int d
   ErrChkPtr(G, I->Flag2);
   I->Vertex = Alloc(float, c * 3);
   ErrChkPtr(G, I->Vertex);
+  I->NTableFull++;
+  if(I == G->Selector)
+    I->Generation++;
+  if((req_state == cSelectorUpdateTableAllStates) && (domain < 0)) {
+    /* remember what we tabulated so that the table can be patched later */
+    I->TableNAtom = Alloc(int, modelCnt);
+    ErrChkPtr(G, I->TableNAtom);
+    for(a = 0; a < modelCnt; a++)
+      I->TableNAtom[a] = I->Obj[a]->NAtom;
+    I->TableCached = true;
+  }
   /* printf("selector update table state=%d, natom=%d\n",req_state,c); */
   return (true);
 }
 
 
 /*========================================================================*/
+static void SelectorCachePurge(CSelector * I)
+{
+  int a;
+  SelectorCacheRec *rec = I->Cache;
+  for(a = 0; a < cSelectorCacheSize; a++) {
+    FreeP(rec->text);
+    VLAFreeP(rec->parsed);
+    FreeP(rec->mask);
+    rec->last_used = 0;
+    rec++;
+  }
+}
+
+static SelectorCacheRec *SelectorCacheGet(PyMOLGlobals * G, char *text)
+{
+  /* returns the entry for this expression, recycling the least recently
+     used one on a miss (in which case rec->parsed is NULL) */
+  register CSelector *I = G->Selector;
+  SelectorCacheRec *rec = I->Cache, *oldest = I->Cache;
+  unsigned int hash = 5381;
+  char *p = text;
+  int a;
+
+  while(*p)
+    hash = ((hash << 5) + hash) + (unsigned char) *(p++);
+
+  for(a = 0; a < cSelectorCacheSize; a++) {
+    if(rec->text && (rec->hash == hash) && !strcmp(rec->text, text)) {
+      rec->last_used = ++I->CacheClock;
+      return rec;
+    }
+    if(rec->last_used < oldest->last_used)
+      oldest = rec;
+    rec++;
+  }
+  rec = oldest;
+  FreeP(rec->text);
+  VLAFreeP(rec->parsed);
+  FreeP(rec->mask);
+  rec->text = Alloc(char, strlen(text) + 1);
+  if(!rec->text)
+    return NULL;
+  strcpy(rec->text, text);
+  rec->hash = hash;
+  rec->last_used = ++I->CacheClock;
+  return rec;
+}
+
 static int *SelectorSelect(PyMOLGlobals * G, char *sele, int state, int domain, int quiet)
 {
+  /* Tokens are cached by expression text.  The resulting mask is cached
+   * too if it was computed over the all-states table from atom
+   * properties and selection names only (see EvalVolatile); it stays
+   * valid until I->Generation changes.
+   */
+  register CSelector *I = G->Selector;
   SelectorWordType *parsed;
+  SelectorCacheRec *rec;
   int *result = NULL;
+  int mask_ok, generation;
   PRINTFD(G, FB_Selector)
     "SelectorSelect-DEBUG: sele = \"%s\"\n", sele ENDFD;
   SelectorUpdateTable(G, state, domain);
-  parsed = SelectorParse(G, sele);
+  mask_ok = I->TableCached && (state == cSelectorUpdateTableAllStates) && (domain < 0);
+  generation = I->Generation;
+  rec = SelectorCacheGet(G, sele);
+  if(rec && rec->mask && mask_ok &&
+     (rec->generation == generation) && (rec->mask_size == I->NAtom)) {
+    result = Alloc(int, I->NAtom);
+    if(result) {
+      memcpy(result, rec->mask, sizeof(int) * I->NAtom);
+      I->NMaskHit++;
+      return (result);
+    }
+  }
+  if(rec && rec->parsed) {
+    I->NParseHit++;
+  } else {
+    I->NCacheMiss++;
+    if(rec)
+      rec->parsed = SelectorParse(G, sele);
+  }
+  /* SelectorEvaluate may modify the tokens, so it gets a copy */
+  if(!rec) {
+    parsed = SelectorParse(G, sele);
+  } else if(rec->parsed) {
+    parsed = VLACopy(rec->parsed, SelectorWordType);
+  } else {
+    parsed = NULL;
+  }
   if(parsed) {
     if(Feedback(G, FB_Selector, FB_Debugging)) {
       SelectorWordType *a;
@@ -8421,8 +8723,18 @@ static int *SelectorSelect(PyMOLGlobals * G, char *sele, int state, int domain,
       }
       fprintf(stderr, "SelectorSelect-DEBUG: end of tokens.\n");
     }
+    I->EvalVolatile = false;
     result = SelectorEvaluate(G, parsed, state, quiet);
     VLAFreeP(parsed);
+    if(rec && result && mask_ok && !I->EvalVolatile && (generation == I->Generation)) {
+      FreeP(rec->mask);
+      rec->mask = Alloc(int, I->NAtom);
+      if(rec->mask) {
+        memcpy(rec->mask, result, sizeof(int) * I->NAtom);
+        rec->mask_size = I->NAtom;
+        rec->generation = generation;
+      }
+    }
   }
   return (result);
 }
@@ -9591,6 +9903,11 @@ static int SelectorSelect1(PyMOLGlobals * G, EvalElem * base, int quiet)
           word++;
         }
       }
+      /* patterns may pick up temporary selections, which come and go
+         without notice, and enabled-only matching follows the display */
+      if(enabled_only || (wildcard[0] && strchr(word, wildcard[0])) ||
+         !strncmp(word, cSelectorTmpPrefix, strlen(cSelectorTmpPrefix)))
+        I->EvalVolatile = true;
       WordMatchOptionsConfigAlpha(&options, wildcard[0], ignore_case);
 
       if((matcher = WordMatcherNew(G, word, &options, false))) {
@@ -9632,6 +9949,7 @@ static int SelectorSelect1(PyMOLGlobals * G, EvalElem * base, int quiet)
           int group_list_id;
           if((group_list_id = ExecutiveGetExpandedGroupListFromPattern(G, word))) {
             int last_was_member = false;
+            I->EvalVolatile = true;     /* group membership isn't tracked */
             last_obj = NULL;
             for(a = cNDummyAtoms; a < I_NAtom; a++) {
               if(last_obj != i_obj[i_table[a].model]) {
@@ -11000,6 +11318,26 @@ int *SelectorEvaluate(PyMOLGlobals * G, SelectorWordType * word, int state, int
           e->imp_op_level = (imp_op_level << 4) + 1;
           imp_op_level = level;
           e->type = (e->code & 0xF);
+          switch (e->code) {    /* results depending on coordinates, states,
+                                   visibility or colors aren't cached */
+          case SELE_VISz:
+          case SELE_ENAz:
+          case SELE_REPs:
+          case SELE_COLs:
+          case SELE_CCLs:
+          case SELE_RCLs:
+          case SELE_STAs:
+          case SELE_PREz:
+          case SELE_GAP_:
+          case SELE_ARD_:
+          case SELE_EXP_:
+          case SELE_WIT_:
+          case SELE_BEY_:
+          case SELE_NTO_:
+          case SELE_BYX1:
+            G->Selector->EvalVolatile = true;
+            break;
+          }
           switch (e->type) {
           case STYP_SEL0:
             valueFlag = 0;
@@ -11442,6 +11780,7 @@ void SelectorFree(PyMOLGlobals * G)
 void SelectorFreeImpl(PyMOLGlobals * G, CSelector *I, short init2)
 {
   SelectorCleanImpl(G, I);
+  SelectorCachePurge(I);
   if(I->Origin)
     if(I->Origin->Obj.fFree)
       I->Origin->Obj.fFree((CObject *) I->Origin);
@@ -11523,6 +11862,8 @@ void SelectorReinit(PyMOLGlobals * G)
 {
   register CSelector *I = G->Selector;
   SelectorClean(G);
+  SelectorCachePurge(I);
+  I->Generation++;
 
   OVLexicon_DEL_AUTO_NULL(I->Lex);
   OVOneToAny_DEL_AUTO_NULL(I->Key);
@@ -55,6 +55,9 @@ void SelectorToggle(PyMOLGlobals * G, int rep, char *name);
 void SelectorCylinder(PyMOLGlobals * G, char *sele, char *onoff);
 
 int SelectorUpdateTable(PyMOLGlobals * G, int req_state, int domain);
+#define cSelectorNStats 7
+void SelectorGetStats(PyMOLGlobals * G, int *stats);
+void SelectorInvalidateCache(PyMOLGlobals * G);
 int SelectorUpdateTableImpl(PyMOLGlobals * G, CSelector *I, int req_state, int domain);
 
 #define cSelectorUpdateTableAllStates -1
@@ -58,6 +58,7 @@ Z* -------------------------------------------------------------------
 #include"ObjectMolecule.h"
 #include"ObjectMesh.h"
 #include"ObjectMap.h"
+#include"RepSurface.h"
 #include"ObjectCallback.h"
 #include"ObjectCGO.h"
 #include"ObjectSurface.h"
@@ -3808,12 +3809,14 @@ static PyObject *CmdSymExp(PyObject * self, PyObject * args)
   float cutoff;
   CObject *mObj;
   int segi;
+  int as_states;
   int quiet;
   /* oper 0 = all, 1 = sele + buffer, 2 = vector */
 
   int ok = false;
   ok =
-    PyArg_ParseTuple(args, "Osssfii", &self, &str1, &str2, &str3, &cutoff, &segi, &quiet);
+    PyArg_ParseTuple(args, "Osssfiii", &self, &str1, &str2, &str3, &cutoff, &segi,
+                     &as_states, &quiet);
   if(ok) {
     API_SETUP_PYMOL_GLOBALS;
     ok = (G != NULL);
@@ -3831,7 +3834,7 @@ static PyObject *CmdSymExp(PyObject * self, PyObject * args)
     if(mObj) {
       ok = (SelectorGetTmp(G, str3, s1) >= 0);
       if(ok)
-        ExecutiveSymExp(G, str1, str2, s1, cutoff, segi, quiet);        /* TODO STATUS */
+        ExecutiveSymExp(G, str1, str2, s1, cutoff, segi, as_states, quiet);      /* TODO STATUS */
       SelectorFreeTmp(G, s1);
     }
     APIExit(G);
@@ -4224,6 +4227,56 @@ static PyObject *CmdAlter(PyObject * self, PyObject * args)
   return Py_BuildValue("i", result);
 }
 
+static PyObject *CmdAlterColumn(PyObject * self, PyObject * args)
+{
+  PyMOLGlobals *G = NULL;
+  char *str1, *field, *source, *buffer;
+  int buffer_len, n_value, text, quiet;
+  OrthoLineType s1;
+  int result = -1;
+  int ok = false;
+  ok = PyArg_ParseTuple(args, "Osssz#iii", &self, &str1, &field, &source,
+                        &buffer, &buffer_len, &n_value, &text, &quiet);
+  if(ok) {
+    API_SETUP_PYMOL_GLOBALS;
+    ok = (G != NULL);
+  } else {
+    API_HANDLE_ERROR;
+  }
+  if(ok && buffer) {
+    /* values must fill the buffer exactly */
+    if(text) {
+      int a, n_term = 0;
+      for(a = 0; a < buffer_len; a++)
+        if(!buffer[a])
+          n_term++;
+      ok = (n_term == n_value) && (buffer_len > 0) && (!buffer[buffer_len - 1]);
+    } else {
+      ok = (buffer_len == (int) (sizeof(double) * n_value));
+    }
+    if(!ok) {
+      PRINTFB(G, FB_Executive, FB_Errors)
+        " AlterColumn-Error: malformed value buffer.\n" ENDFB(G);
+    }
+  }
+  if(ok && (ok = APIEnterNotModal(G))) {
+    double *value = NULL;
+    if(buffer && !text) {
+      /* the buffer from Python needn't be aligned */
+      value = Alloc(double, n_value ? n_value : 1);
+      if(value)
+        memcpy(value, buffer, sizeof(double) * n_value);
+    }
+    if((ok = (SelectorGetTmp(G, str1, s1) >= 0)))
+      result = ExecutiveAlterColumn(G, s1, field, source, value,
+                                    text ? buffer : NULL, n_value, quiet);
+    SelectorFreeTmp(G, s1);
+    FreeP(value);
+    APIExit(G);
+  }
+  return Py_BuildValue("i", result);
+}
+
 static PyObject *CmdAlterList(PyObject * self, PyObject * args)
 {
   PyMOLGlobals *G = NULL;
@@ -4858,6 +4911,29 @@ static PyObject *CmdGetMovieLength(PyObject * self, PyObject * args)
   return (APIResultCode(result));
 }
 
+static PyObject *CmdGetSelectorStats(PyObject * self, PyObject * args)
+{
+  PyMOLGlobals *G = NULL;
+  int stats[cSelectorNStats];
+  int ok = false;
+  ok = PyArg_ParseTuple(args, "O", &self);
+  if(ok) {
+    API_SETUP_PYMOL_GLOBALS;
+    ok = (G != NULL);
+  } else {
+    API_HANDLE_ERROR;
+  }
+  if(ok && (ok = APIEnterNotModal(G))) {
+    SelectorGetStats(G, stats);
+    APIExit(G);
+  }
+  if(ok) {
+    return PConvIntArrayToPyList(stats, cSelectorNStats);
+  } else {
+    return APIFailure();
+  }
+}
+
 static PyObject *CmdIdentify(PyObject * self, PyObject * args)
 {
   PyMOLGlobals *G = NULL;
@@ -5364,6 +5440,84 @@ static PyObject *CmdGetAtomCoords(PyObject * self, PyObject * args)
   return APIAutoNone(result);
 }
 
+static PyObject *CmdGetCoordsStr(PyObject * self, PyObject * args)
+{
+  /* returns packed native float32 xyz triples for a single state as a
+     string, suitable for numpy.frombuffer */
+  PyMOLGlobals *G = NULL;
+  char *str1;
+  int state;
+  OrthoLineType s1;
+  float *vla = NULL;
+  PyObject *result = Py_None;
+  int ok = false;
+  ok = PyArg_ParseTuple(args, "Osi", &self, &str1, &state);
+  if(ok) {
+    API_SETUP_PYMOL_GLOBALS;
+    ok = (G != NULL);
+  } else {
+    API_HANDLE_ERROR;
+  }
+  if(ok && (ok = APIEnterNotModal(G))) {
+    if(state < 0)
+      state = SceneGetState(G);
+    ok = (SelectorGetTmp(G, str1, s1) >= 0);
+    if(ok)
+      vla = ExecutiveGetVertexVLA(G, s1, state);
+    SelectorFreeTmp(G, s1);
+    APIExit(G);
+    if(vla) {
+      result = PyString_FromStringAndSize((char *) vla,
+                                          sizeof(float) * VLAGetSize(vla));
+      VLAFreeP(vla);
+    }
+  }
+  return APIAutoNone(result);
+}
+
+static PyObject *CmdLoadCoordsStr(PyObject * self, PyObject * args)
+{
+  /* inverse of CmdGetCoordsStr: accepts any object exporting a buffer
+     of packed native float32 xyz triples (string, numpy array, array) */
+  PyMOLGlobals *G = NULL;
+  char *str1;
+  int state, quiet;
+  OrthoLineType s1;
+  PyObject *buffer;
+  const void *data = NULL;
+  Py_ssize_t len = 0;
+  int ok = false;
+  ok = PyArg_ParseTuple(args, "OsOii", &self, &str1, &buffer, &state, &quiet);
+  if(ok) {
+    API_SETUP_PYMOL_GLOBALS;
+    ok = (G != NULL);
+  } else {
+    API_HANDLE_ERROR;
+  }
+  if(ok) {
+    ok = (PyObject_AsReadBuffer(buffer, &data, &len) == 0);
+    if(!ok)
+      PyErr_Clear();
+    else if(len % (3 * sizeof(float))) {
+      PRINTFB(G, FB_Executive, FB_Errors)
+        " Executive-Error: coordinate buffer size is not a multiple of 3 floats.\n"
+        ENDFB(G);
+      ok = false;
+    }
+  }
+  if(ok && (ok = APIEnterNotModal(G))) {
+    if(state < 0)
+      state = SceneGetState(G);
+    ok = (SelectorGetTmp(G, str1, s1) >= 0);
+    if(ok)
+      ok = ExecutiveSetVertices(G, s1, state, (float *) data,
+                                (int) (len / (3 * sizeof(float))), quiet);
+    SelectorFreeTmp(G, s1);
+    APIExit(G);
+  }
+  return APIResultOk(ok);
+}
+
 static PyObject *CmdFit(PyObject * self, PyObject * args)
 {
   PyMOLGlobals *G = NULL;
@@ -8151,6 +8305,27 @@ static PyObject *CmdSpheroid(PyObject * self, PyObject * args)
   return APIResultOk(ok);
 }
 
+static PyObject *CmdSurfaceJobRun(PyObject * self, PyObject * args)
+{
+  /* computes one cached surface job (used by worker processes) */
+  PyMOLGlobals *G = NULL;
+  PyObject *input;
+  PyObject *result = NULL;
+  int ok = false;
+  ok = PyArg_ParseTuple(args, "OO", &self, &input);
+  if(ok) {
+    API_SETUP_PYMOL_GLOBALS;
+    ok = (G != NULL);
+  } else {
+    API_HANDLE_ERROR;
+  }
+  if(ok && (ok = APIEnterBlockedNotModal(G))) {
+    result = RepSurfaceJobRunTuple(G, input);
+    APIExitBlocked(G);
+  }
+  return APIAutoNone(result);
+}
+
 static PyObject *CmdTest(PyObject * self, PyObject * args)
 {
   PyMOLGlobals *G = NULL;
@@ -8839,6 +9014,29 @@ static PyObject *CmdCEAlign(PyObject *self, PyObject *args)
   return result;
 }
 
+static PyObject *CmdCEAlignMany(PyObject *self, PyObject *args)
+{
+  PyMOLGlobals * G = NULL;
+  int ok = false;
+  int windowSize = 8, gap_max = 30, quiet = 1;
+  float d0 = 3.0, d1 = 4.0;
+  PyObject *target, *mobiles, *result = NULL;
+
+  ok = PyArg_ParseTuple(args, "OOO|ffiii", &self, &target, &mobiles, &d0, &d1,
+                        &windowSize, &gap_max, &quiet);
+  if(ok) {
+    API_SETUP_PYMOL_GLOBALS;
+    ok = (G != NULL) && PyList_Check(mobiles);
+  } else {
+    API_HANDLE_ERROR;
+  }
+  if(ok) {
+    /* no API lock: the coordinates have already been copied out */
+    result = ExecutiveCEAlignMany(G, target, mobiles, d0, d1, windowSize, gap_max, quiet);
+  }
+  return APIAutoNone(result);
+}
+
 static PyObject *CmdVolumeColor(PyObject * self, PyObject * args)
 {
   PyMOLGlobals * G = NULL;
@@ -8960,6 +9158,7 @@ static PyMethodDef Cmd_methods[] = {
   {"accept", CmdAccept, METH_VARARGS},
   {"align", CmdAlign, METH_VARARGS},
   {"alter", CmdAlter, METH_VARARGS},
+  {"alter_column", CmdAlterColumn, METH_VARARGS},
   {"alter_list", CmdAlterList, METH_VARARGS},
   {"alter_state", CmdAlterState, METH_VARARGS},
   {"angle", CmdAngle, METH_VARARGS},
@@ -8972,6 +9171,7 @@ static PyMethodDef Cmd_methods[] = {
   /*  {"cache",                 CmdCache,                METH_VARARGS }, */
   {"cartoon", CmdCartoon, METH_VARARGS},
   {"cealign", CmdCEAlign, METH_VARARGS},
+  {"cealign_many", CmdCEAlignMany, METH_VARARGS},
   {"center", CmdCenter, METH_VARARGS},
   {"clip", CmdClip, METH_VARARGS},
   {"cls", CmdCls, METH_VARARGS},
@@ -9021,6 +9221,7 @@ static PyMethodDef Cmd_methods[] = {
   {"get_angle", CmdGetAngle, METH_VARARGS},
   {"get_area", CmdGetArea, METH_VARARGS},
   {"get_atom_coords", CmdGetAtomCoords, METH_VARARGS},
+  {"get_coords_str", CmdGetCoordsStr, METH_VARARGS},
   {"get_bond_print", CmdGetBondPrint, METH_VARARGS},
   {"get_busy", CmdGetBusy, METH_VARARGS},
   {"get_chains", CmdGetChains, METH_VARARGS},
@@ -9053,6 +9254,7 @@ static PyMethodDef Cmd_methods[] = {
   {"get_pdb", CmdGetPDB, METH_VARARGS},
   {"get_phipsi", CmdGetPhiPsi, METH_VARARGS},
   {"get_renderer", CmdGetRenderer, METH_VARARGS},
+  {"get_selector_stats", CmdGetSelectorStats, METH_VARARGS},
   {"get_raw_alignment", CmdGetRawAlignment, METH_VARARGS},
   {"get_seq_align_str", CmdGetSeqAlignStr, METH_VARARGS},
   {"get_session", CmdGetSession, METH_VARARGS},
@@ -9098,6 +9300,7 @@ static PyMethodDef Cmd_methods[] = {
   {"load", CmdLoad, METH_VARARGS},
   {"load_color_table", CmdLoadColorTable, METH_VARARGS},
   {"load_coords", CmdLoadCoords, METH_VARARGS},
+  {"load_coords_str", CmdLoadCoordsStr, METH_VARARGS},
   {"load_png", CmdLoadPNG, METH_VARARGS},
   {"load_object", CmdLoadObject, METH_VARARGS},
   {"load_traj", CmdLoadTraj, METH_VARARGS},
@@ -9198,6 +9401,7 @@ static PyMethodDef Cmd_methods[] = {
   {"spheroid", CmdSpheroid, METH_VARARGS},
   {"splash", CmdSplash, METH_VARARGS},
   {"stereo", CmdStereo, METH_VARARGS},
+  {"surface_job_run", CmdSurfaceJobRun, METH_VARARGS},
   {"system", CmdSystem, METH_VARARGS},
   {"symexp", CmdSymExp, METH_VARARGS},
   {"symmetry_copy", CmdSymmetryCopy, METH_VARARGS},
@@ -897,6 +897,21 @@ typedef struct _CPyMOL {
   ov_word lex_suspend_undo;
   ov_word lex_suspend_undo_atom_count;
   ov_word lex_pick_surface;
+  ov_word lex_traj_lazy_cache;
+  ov_word lex_ray_tile_size;
+  ov_word lex_ray_retain_geometry;
+  ov_word lex_cache_policy;
+  ov_word lex_cache_dir;
+  ov_word lex_session_chunked;
+  ov_word lex_surface_batch;
+  ov_word lex_surface_pool;
+  ov_word lex_fetch_mirror;
+  ov_word lex_fetch_offline;
+  ov_word lex_fetch_local_path;
+  ov_word lex_fetch_threads;
+  ov_word lex_lazy_ccp4_maps;
+  ov_word lex_map_lod_points;
+  ov_word lex_map_lod_delay;
 
 #ifdef _PYMOL_LIB
   OVOneToOne *MouseButtonCodeLexicon;
@@ -1805,6 +1820,21 @@ static OVstatus PyMOL_InitAPI(CPyMOL * I)
   LEX_SETTING(suspend_undo, 708);
   LEX_SETTING(suspend_undo_atom_count, 709);
   LEX_SETTING(pick_surface, 710);
+  LEX_SETTING(traj_lazy_cache, 711);
+  LEX_SETTING(ray_tile_size, 712);
+  LEX_SETTING(ray_retain_geometry, 713);
+  LEX_SETTING(cache_policy, 714);
+  LEX_SETTING(cache_dir, 715);
+  LEX_SETTING(session_chunked, 716);
+  LEX_SETTING(surface_batch, 717);
+  LEX_SETTING(surface_pool, 718);
+  LEX_SETTING(fetch_mirror, 719);
+  LEX_SETTING(fetch_offline, 720);
+  LEX_SETTING(fetch_local_path, 721);
+  LEX_SETTING(fetch_threads, 722);
+  LEX_SETTING(lazy_ccp4_maps, 723);
+  LEX_SETTING(map_lod_points, 724);
+  LEX_SETTING(map_lod_delay, 725);
 
 #ifdef _PYMOL_LIB
 
@@ -4021,6 +4051,9 @@ int PyMOL_Idle(CPyMOL * I)
     SceneRovingUpdate(G);
     did_work = true;
   }
+
+  if(ExecutiveMapRefine(G, false))
+    did_work = true;
 #ifndef _PYMOL_NOPY
   if(PFlush(G)) {
     did_work = true;
@@ -31,6 +31,9 @@
 //////////////////////////////////////////////////////////////////////////////
 #include "ccealignmodule.H"
 
+// CE-specific cutoff: number of best paths kept by findPath
+static const int MAX_KEPT = 20;
+
 /////////////////////////////////////////////////////////////////////////////
 // CE Specific
 /////////////////////////////////////////////////////////////////////////////
@@ -139,9 +142,6 @@ pcePoint getCoords(PyObject* L, int length)
 
 pathCache findPath( double** S, double** dA, double** dB, int lenA, int lenB, float D0, float D1, int winSize, int gapMax, int * bufferSize )
 {
-  // CE-specific cutoffs
-  const int MAX_KEPT = 20;
-
   // the best Path's score
   double bestPathScore = 1e6;
   int bestPathLength = 0;
@@ -411,13 +411,31 @@ pathCache findPath( double** S, double** dA, double** dB, int lenA, int lenB, fl
     } // ROF -- end for iB
   } // ROF -- end for iA
 
+  free(bestPath);
+  free(winCache);
+  for ( i = 0; i < smaller; i++ )
+    free(allScoreBuffer[i]);
+  free(allScoreBuffer);
+  free(tIndex);
+
   return pathBuffer;
 }
 
 
+void freePaths( pathCache paths )
+{
+  if ( paths ) {
+    for ( int i = 0; i < MAX_KEPT; i++ )
+      if ( paths[i] )
+	free(paths[i]);
+    free(paths);
+  }
+}
+
+
 
 
-PyObject* findBest( pcePoint coordsA, pcePoint coordsB, pathCache paths, int bufferSize, int smaller, int winSize )
+int findBestResult( pcePoint coordsA, pcePoint coordsB, pathCache paths, int bufferSize, int smaller, int winSize, ceResult* result )
 {
   // keep the best values
   double bestRMSD = 1e6;
@@ -591,7 +609,32 @@ PyObject* findBest( pcePoint coordsA, pcePoint coordsB, pathCache paths, int buf
     }
   }
 
-  if ( bestRMSD == 1e6 ) {
+  if ( bestRMSD == 1e6 )
+    return -1;
+
+  result->alignLen = bestLen;
+  result->RMSD = bestRMSD;
+
+  // TTT matrix: rotation about the mobile's center, then translation
+  // onto the target's center
+  for ( int i = 0; i < 3; i++ ) {
+    for ( int j = 0; j < 3; j++ )
+      result->TTT[4*i+j] = bestU[j][i];
+    result->TTT[4*i+3] = bestCOM1[i];
+    result->TTT[12+i] = -bestCOM2[i];
+  }
+  result->TTT[15] = 1.0;
+
+  return bestO;
+}
+
+
+PyObject* findBest( pcePoint coordsA, pcePoint coordsB, pathCache paths, int bufferSize, int smaller, int winSize )
+{
+  ceResult best;
+  int bestO = findBestResult(coordsA, coordsB, paths, bufferSize, smaller, winSize, &best);
+
+  if ( bestO < 0 ) {
     std::cout << "ERROR: Best RMSD found was 1e6.  Broken.\n";
     return NULL;
   }
@@ -599,15 +642,13 @@ PyObject* findBest( pcePoint coordsA, pcePoint coordsB, pathCache paths, int buf
   // list of list of pairs	
   PyObject* rVal = PyList_New(0);
 
-  PyObject* pyRMSD = Py_BuildValue( "f", bestRMSD );
+  PyObject* pyRMSD = Py_BuildValue( "f", best.RMSD );
 
-  PyObject* pyAliLen = Py_BuildValue( "i", bestLen );
+  PyObject* pyAliLen = Py_BuildValue( "i", best.alignLen );
 
-  PyObject* pyU = Py_BuildValue( "[f,f,f,f, f,f,f,f, f,f,f,f, f,f,f,f]",
-				 bestU[0][0], bestU[1][0], bestU[2][0], bestCOM1[0],
-				 bestU[0][1], bestU[1][1], bestU[2][1], bestCOM1[1],
-				 bestU[0][2], bestU[1][2], bestU[2][2], bestCOM1[2],
-				 -bestCOM2[0], -bestCOM2[1], -bestCOM2[2], 1.);
+  PyObject* pyU = PyList_New(16);
+  for ( int i = 0; i < 16; i++ )
+    PyList_SetItem(pyU, i, PyFloat_FromDouble(best.TTT[i]));
 	
   PyObject* pyPathA = PyList_New(0);
   PyObject* pyPathB = PyList_New(0);
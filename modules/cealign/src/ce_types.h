@@ -14,3 +14,13 @@ typedef struct {
 	int first;
 	int second;
 } afp, *path, **pathCache;
+
+/*
+// The best superposition found for a pair: alignment length, RMSD and
+// the TTT matrix, as returned to Python by findBest
+*/
+typedef struct {
+	int alignLen;
+	double RMSD;
+	double TTT[16];
+} ceResult;
@@ -21,160 +21,135 @@ from chempy.models import Indexed
 
 # OMG what a horrid file format.
 
-single_quote_re = re.compile(r"'[^']*[']*'") # doesn't yet handle ESC
-double_quote_re = re.compile(r'"[^"]*["]*"') # ditto
-bracket_quote_re = re.compile(r'\[[^\]]*\]') # ditto
+# Tokens are whitespace-separated words, 'single' or "double" quoted
+# strings (closed by a quote which is followed by whitespace) and text
+# fields (between lines starting with ";").  Loop rows, which make up
+# nearly all of a large file, rarely hold anything but plain words, so
+# lines without quotes or comments are split by str.split and only the
+# others go through the regular expression.
+
+token_re = re.compile(r"""'(.*?)'(?=\s|$)|"(.*?)"(?=\s|$)|(#)|(\S+)""")
+
+reserved_words = ('loop_','data_','save_','stop_')
 
 clean_float_re = re.compile(r'[^0-9+\-.eE].*')
 clean_int_re = re.compile(r'[^0-9+\-].*')
 
-class CIFRec:
-
-    def get_quoted_value(self):
-        if self.line[0:1] == "'":
-            mo = single_quote_re.match(self.line)
-        elif self.line[0:1] == '"':
-            mo = double_quote_re.match(self.line)
-        elif self.line[0:1] == '[':
-            mo = bracket_quote_re.match(self.line)
-        else:
-            mo = None
-        if mo != None:
-            result = self.line[:mo.end()]
-            self.line = self.line[mo.end():]
-            if len(string.strip(self.line[0:1])): # followed by non-whitespace...
-                self.line = result[-1:] + self.line
-                result = result[:-1] + self.get_quoted_value()
-            self.check_line()
+def is_marker(word): # data name or reserved word?
+    return ((word[0:1] == '_') or
+            (string.lower(word[0:5]) in reserved_words) or
+            (string.lower(word[0:7]) == 'global_'))
+
+def tokenize(lines):
+    '''
+    Splits the lines of a data block into tokens.  Returns the token
+    values (without quotes) and the indices of the (unquoted) tokens
+    which are data names or reserved words.
+    '''
+    tokens = []
+    markers = []
+    text = None
+    for line in lines:
+        if text != None: # inside a text field
+            if line[0:1] != ';':
+                text.append(line)
+                continue
+            value = string.join(text,'')
+            if value[-1:] == '\n':
+                value = value[:-1]
+            tokens.append(value)
+            text = None
+            line = line[1:]
+        elif line[0:1] == ';':
+            text = [ line[1:] ]
+            continue
+        if ("'" in line) or ('"' in line) or ('#' in line):
+            for mo in token_re.finditer(line):
+                (single, double, hash, word) = mo.groups()
+                if word != None:
+                    if is_marker(word):
+                        markers.append(len(tokens))
+                    tokens.append(word)
+                elif hash != None: # comment
+                    break
+                elif single != None:
+                    tokens.append(single)
+                else:
+                    tokens.append(double)
         else:
-            result = None # shouldn't happen
-        return result
-    
-    def get_delimited_value(self):
-        result = ''
-        while 1:
-            if self.line[0:1] == ';':
-                self.line = self.line[1:]
-                self.check_line()
-                break
-            result = result + self.line
-            self.next_line()
+            words = string.split(line)
+            if '_' in line: # every marker contains an underscore
+                base = len(tokens)
+                for index in xrange(len(words)):
+                    if is_marker(words[index]):
+                        markers.append(base + index)
+            tokens.extend(words)
+    if text != None: # unterminated text field
+        tokens.append(string.join(text,''))
+    return (tokens, markers)
+
+def data_name(word): # "_atom_site.Cartn_x" -> "_atom_site_cartn_x"
+    return string.lower(string.replace(word,'.','_'))
+
+def float_column(column):
+    try:
+        return map(float, column)
+    except ValueError: # standard uncertainties, "?" or "."
+        result = []
+        for value in column:
+            try:
+                result.append(float(clean_float_re.sub("",value)))
+            except ValueError:
+                result.append(0.0)
         return result
 
-    def get_next_word(self):
-        result = None
-        mo = re.search("\s+", self.line)
-        if mo == None:
-            result = self.line
-            self.next_line()
-        else:
-            result = self.line[:mo.start()]
-            self.line = self.line[mo.end():]
-            self.check_line()
+def int_column(column):
+    try:
+        return map(int, column)
+    except ValueError:
+        result = []
+        for value in column:
+            try:
+                result.append(int(clean_int_re.sub("",value)))
+            except ValueError:
+                result.append(0)
         return result
-    
-    def trim_leading_whitespace(self):
-        while self.line != None:
-            mo = re.match("\s",self.line)
-            if mo != None:
-                self.line = self.line[mo.end():]
-                self.check_line()
-            else:
-                break
-
-    def get_next_value(self):
-        self.trim_leading_whitespace()
-        if self.line != None:
-            if self.line[0:1] == '_':
-                return None
-            elif self.line[0:1] == ';':
-                self.line = self.line[1:]
-                self.check_line()
-                return self.get_delimited_value()
-            elif string.lower(self.line[0:5]) in ['loop_','data_','save_']:
-                return None
-            elif string.lower(self.line[0:6]) == 'GLOBAL':
-                return None
-            elif self.line[0:1] in [ "'", '"']: #  '[' ]: bracket quote fubar with PDB's mmCIF data???
-                return self.get_quoted_value()
-            else:
-                return self.get_next_word()
-        return None
-        
-    def check_line(self):
-        if self.line != None:
-            while not len(string.strip(self.line)):
-                self.next_line()
-                if self.line == None:
-                    break
 
-    def next_line(self):
-        self.line = None
-        while len(self.list):
-            self.line = self.list.pop()
-            # nuke hash comments 
-            hash = string.find(self.line,'#')
-            if hash>=0:
-                self.line = self.line[0:hash]
-            # and only return non-blank lines
-            if len(string.strip(self.line)):
-                break
-#        print "next_line:", self.line,
-        
-    def parse_loop_body(self,fields):
-        len_fields = len(fields)
-        records = []
-        record = []
-        cnt = len_fields
-        while self.line != None: 
-            value = self.get_next_value()
-            if value == None:
-                break
-            else:
-                record.append(value)
-                cnt = cnt - 1
-                if not cnt:
-                    cnt = len_fields
-                    if len(record) == len_fields:
-                        records.append(record)
-                    record = []
-#                print "loop_read [%s]=[%s]"%(fields[0],value)
-        if len(record) == len_fields:
-            records.append(record)
-        self.loops.append( (fields,records) )
-        
-    def parse_loop(self):
-#        print "parsing loop..."
-        fields = []
-        while self.line != None: 
-            if string.lower(self.line[0:5])=='loop_':
-                break
-            elif self.line[0:1]=='_':
-                fields.append(string.lower(string.strip(self.line)))
-            else:
-                self.parse_loop_body(fields)
-                break
-            self.next_line()
-                
-    def parse_name_value(self):
-        data_name = self.get_next_word()
-        data_value = self.get_next_value()
-        self.key_value[data_name] = data_value
-#        print "data_read [%s]=[%s]"%(data_name,data_value)
-        
-    def parse_normal(self):
-        while self.line != None:
-            if self.line[0:1] == '_': # data name
-                self.parse_name_value()
-            elif string.lower(self.line[0:5])=='loop_':
-                print "entering loop",self.line
-                self.line = self.line[5:]
-                self.check_line()
-                self.parse_loop()
-                print "exiting loop",self.line                
-            else: # shouldn't happen
-                print "unhandled: [%s]"%self.line
-                self.next_line()
+class CIFRec:
+
+    def parse(self, tokens, markers):
+        # values lie between the markers: a data name takes the token
+        # after it, and a loop takes its data names, then the values up
+        # to the next marker, which are split into columns by slicing
+        markers.append(len(tokens))
+        n_marker = len(markers) - 1
+        k = 0
+        while k < n_marker:
+            index = markers[k]
+            word = tokens[index]
+            k = k + 1
+            if word[0:1] == '_':
+                if index + 1 < markers[k]:
+                    self.key_value[data_name(word)] = tokens[index + 1]
+            elif string.lower(word[0:5]) == 'loop_':
+                fields = []
+                index = index + 1
+                while (k < n_marker) and (markers[k] == index) and \
+                      (tokens[index][0:1] == '_'):
+                    fields.append(data_name(tokens[index]))
+                    index = index + 1
+                    k = k + 1
+                n_field = len(fields)
+                if n_field:
+                    values = tokens[index:markers[k]]
+                    end = (len(values) / n_field) * n_field
+                    columns = map(lambda a,v=values,e=end,s=n_field:v[a:e:s],
+                                  range(n_field))
+                    field_dict = {}
+                    for a in range(n_field):
+                        field_dict[fields[a]] = a
+                    self.loops.append( (fields, field_dict, columns) )
+            # save_, stop_ and global_ are skipped
 
     def to_float(self, key):
         value = self.key_value[key]
@@ -226,17 +201,34 @@ class CIFRec:
 
     def index_to_str(self, index, value):
         return value[index]
+
+    def build_atoms(self, columns, coord, str_fields, float_fields, int_fields):
+        # atoms are built straight from the loop columns, one field at a time
+        (x, y, z) = map(lambda a,c=columns:float_column(c[a]), coord)
+        atoms = []
+        for xyz in zip(x, y, z):
+            atom = Atom()
+            atom.coord = list(xyz)
+            atoms.append(atom)
+        n_atom = len(atoms)
+        for field in str_fields:
+            map(setattr, atoms, [field[0]] * n_atom, columns[field[1]])
+        for field in float_fields:
+            map(setattr, atoms, [field[0]] * n_atom, float_column(columns[field[1]]))
+        for field in int_fields:
+            map(setattr, atoms, [field[0]] * n_atom, int_column(columns[field[1]]))
+        self.model.atom.extend(atoms)
+        return atoms
                 
-    def read_chem_comp_atom_model_cartn(self,fields,field_dict,values):
+    def read_chem_comp_atom_model_cartn(self,fields,field_dict,columns):
         cartn_x = field_dict['_chem_comp_atom_model_cartn_x']
         cartn_y = field_dict['_chem_comp_atom_model_cartn_y']
         cartn_z = field_dict['_chem_comp_atom_model_cartn_z']
-        print cartn_x,cartn_y,cartn_z
         name = field_dict.get('_chem_comp_atom_atom_id',None)
         symbol = field_dict.get('_chem_comp_atom_type_symbol',None)
-        resn = field_dict.get('_chem_comp_atom.comp_id',None)
+        resn = field_dict.get('_chem_comp_atom_comp_id',None)
         partial_charge = field_dict.get('_chem_comp_atom_partial_charge',None)
-        formal_charge = field_dict.get('chem_comp_atom_charge',None)
+        formal_charge = field_dict.get('_chem_comp_atom_charge',None)
         str_fields = []
         if symbol != None: str_fields.append( ('symbol',symbol) )
         if name != None: str_fields.append( ('name',name) )
@@ -245,30 +237,19 @@ class CIFRec:
         if partial_charge != None: float_fields.append( ('partial_charge',partial_charge) )
         int_fields = []
         if formal_charge != None: int_fields.append( ('formal_charge',formal_charge) ) 
-        for value in values:
-            atom = Atom()
-            atom.coord = [
-                self.index_to_float(cartn_x,value),
-                self.index_to_float(cartn_y,value),
-                self.index_to_float(cartn_z,value)]
-            self.model.atom.append(atom)
-            for field in str_fields:
-                setattr(atom,field[0],value[field[1]])
-            for field in float_fields:
-                setattr(atom,field[0],self.index_to_float(field[1],value))
-            for field in int_fields:
-                setattr(atom,field[0],self.index_to_int(field[1],value))
+        self.build_atoms(columns, (cartn_x, cartn_y, cartn_z),
+                         str_fields, float_fields, int_fields)
 
     def read_chem_comp_atom(self):
         self.atom_site_label_index = {}
         for loop in self.loops:
-            (fields, field_dict, values) = loop
+            (fields, field_dict, columns) = loop
             if (field_dict.has_key("_chem_comp_atom_model_cartn_x") and
                 field_dict.has_key("_chem_comp_atom_model_cartn_y") and
                 field_dict.has_key("_chem_comp_atom_model_cartn_z")): 
-                self.read_chem_comp_atom_model_cartn(fields,field_dict,values)
+                self.read_chem_comp_atom_model_cartn(fields,field_dict,columns)
 
-    def read_atom_site_fract(self,fields,field_dict,values):
+    def read_atom_site_fract(self,fields,field_dict,columns):
         self.model.fractional = 1
 
         fract_x = field_dict['_atom_site_fract_x']
@@ -283,21 +264,10 @@ class CIFRec:
         float_fields = []
         if u != None: float_fields.append( ('u', u))
         int_fields = []
-        for value in values:
-            atom = Atom()
-            atom.coord = [
-                self.index_to_float(fract_x,value),
-                self.index_to_float(fract_y,value),
-                self.index_to_float(fract_z,value)]
-            self.model.atom.append(atom)
-            for field in str_fields:
-                setattr(atom,field[0],value[field[1]])
-            for field in float_fields:
-                setattr(atom,field[0],self.index_to_float(field[1],value))
-            for field in int_fields:
-                setattr(atom,field[0],self.index_to_int(field[1],value))
-
-    def read_atom_site_cartn(self,fields,field_dict,values):
+        self.build_atoms(columns, (fract_x, fract_y, fract_z),
+                         str_fields, float_fields, int_fields)
+
+    def read_atom_site_cartn(self,fields,field_dict,columns):
         cartn_x = field_dict['_atom_site_cartn_x']
         cartn_y = field_dict['_atom_site_cartn_y']
         cartn_z = field_dict['_atom_site_cartn_z']
@@ -333,29 +303,16 @@ class CIFRec:
         int_fields = []
         if ID != None: int_fields.append( ('id',ID) )                                
 
-        for value in values:
-            atom = Atom()
-            atom.coord = [
-                self.index_to_float(cartn_x,value),
-                self.index_to_float(cartn_y,value),
-                self.index_to_float(cartn_z,value)]
-            self.model.atom.append(atom)
-            if group_pdb != None:
-                if value[group_pdb] == 'ATOM':
-                    atom.hetatm = 0
-                else:
-                    atom.hetatm = 1
-            for field in str_fields:
-                setattr(atom,field[0],value[field[1]])
-            for field in float_fields:
-                setattr(atom,field[0],self.index_to_float(field[1],value))
-            for field in int_fields:
-                setattr(atom,field[0],self.index_to_int(field[1],value))
+        atoms = self.build_atoms(columns, (cartn_x, cartn_y, cartn_z),
+                                 str_fields, float_fields, int_fields)
+        if group_pdb != None:
+            map(setattr, atoms, ['hetatm'] * len(atoms),
+                map(lambda x:int(x != 'ATOM'), columns[group_pdb]))
                 
 #        for a in self.model.atom:
 #            print a.coord
         
-    def read_atom_site_aniso(self,fields,field_dict,values):
+    def read_atom_site_aniso(self,fields,field_dict,columns):
         cnt = 0
         name_dict = {}
         for atom in self.model.atom:
@@ -369,7 +326,7 @@ class CIFRec:
         u12 = field_dict['_atom_site_aniso_u_12']
         u13 = field_dict['_atom_site_aniso_u_13']
         u23 = field_dict['_atom_site_aniso_u_23']
-        for value in values:
+        for value in zip(*columns):
             atom = name_dict[self.index_to_str(label,value)]
             self.model.atom[atom].u_aniso = [
                 self.index_to_float(u11,value),
@@ -383,15 +340,15 @@ class CIFRec:
     def read_atom_site(self):
         self.atom_site_label_index = {}
         for loop in self.loops:
-            (fields, field_dict, values) = loop
+            (fields, field_dict, columns) = loop
             if (field_dict.has_key("_atom_site_fract_x") and
                 field_dict.has_key("_atom_site_fract_y") and
                 field_dict.has_key("_atom_site_fract_z")): # fractional coords
-                self.read_atom_site_fract(fields,field_dict,values)
+                self.read_atom_site_fract(fields,field_dict,columns)
             elif (field_dict.has_key("_atom_site_cartn_x") and
                   field_dict.has_key("_atom_site_cartn_y") and
                   field_dict.has_key("_atom_site_cartn_z")): # cartesian coords
-                self.read_atom_site_cartn(fields,field_dict,values)
+                self.read_atom_site_cartn(fields,field_dict,columns)
             elif (field_dict.has_key("_atom_site_aniso_label") and
                   field_dict.has_key("_atom_site_aniso_u_11") and
                   field_dict.has_key("_atom_site_aniso_u_22") and
@@ -399,9 +356,9 @@ class CIFRec:
                   field_dict.has_key("_atom_site_aniso_u_12") and
                   field_dict.has_key("_atom_site_aniso_u_13") and
                   field_dict.has_key("_atom_site_aniso_u_23")): # anisotropics
-                self.read_atom_site_aniso(fields,field_dict,values)
+                self.read_atom_site_aniso(fields,field_dict,columns)
 
-    def read_geom_bond_atom_site_labels(self,fields,field_dict,values):
+    def read_geom_bond_atom_site_labels(self,fields,field_dict,columns):
         # create index of atom name
         cnt = 0
         name_dict = {}
@@ -411,7 +368,7 @@ class CIFRec:
             cnt = cnt + 1
         label_1 = field_dict['_geom_bond_atom_site_label_1']
         label_2 = field_dict['_geom_bond_atom_site_label_2']
-        for value in values:
+        for value in zip(*columns):
             bond = Bond()
             bond.index = [
                 name_dict[self.index_to_str(label_1,value)],
@@ -422,12 +379,12 @@ class CIFRec:
     def read_geom_bond(self):
         self.atom_site_label_index = {}
         for loop in self.loops:
-            (fields, field_dict, values) = loop
+            (fields, field_dict, columns) = loop
             if (field_dict.has_key("_geom_bond_atom_site_label_1") and
                 field_dict.has_key("_geom_bond_atom_site_label_2")):
-                self.read_geom_bond_atom_site_labels(fields,field_dict,values)
+                self.read_geom_bond_atom_site_labels(fields,field_dict,columns)
     
-    def read_chem_comp_bond_atom_ids(self,fields,field_dict,values):
+    def read_chem_comp_bond_atom_ids(self,fields,field_dict,columns):
         order_table = { 'sing' : 1, 'doub' : 2, 'trip' :3, 'delo': 4 }
         # create index of atom name
         cnt = 0
@@ -439,7 +396,7 @@ class CIFRec:
         label_1 = field_dict['_chem_comp_bond_atom_id_1']
         label_2 = field_dict['_chem_comp_bond_atom_id_2']
         order = field_dict.get('_chem_comp_bond_value_order',None)
-        for value in values:
+        for value in zip(*columns):
             bond = Bond()
             bond.index = [
                 name_dict[self.index_to_str(label_1,value)],
@@ -454,57 +411,22 @@ class CIFRec:
     def read_chem_comp_bond(self):
         self.atom_site_label_index = {}
         for loop in self.loops:
-            (fields, field_dict, values) = loop
+            (fields, field_dict, columns) = loop
             if (field_dict.has_key("_chem_comp_bond_atom_id_1") and
                 field_dict.has_key("_chem_comp_bond_atom_id_2")):
-                self.read_chem_comp_bond_atom_ids(fields,field_dict,values)
+                self.read_chem_comp_bond_atom_ids(fields,field_dict,columns)
 
-    def create_field_dicts(self):
-        new_loops = []
-        for loop in self.loops:
-            (fields, values) = loop
-            field_dict = {}
-            cnt = 0
-            for field in fields:
-                field_dict[field] = cnt
-                cnt = cnt + 1
-            new_loops.append( (fields,field_dict,values) )
-        self.loops = new_loops
-                
-    def convert_dot_to_underscore(self):
-        for key in self.key_value.keys():
-            if string.find(key,".")>=0:
-                new_key = string.replace(key,".","_")
-            else:
-                new_key = key
-            new_key = string.lower(new_key)
-            if new_key != key:
-                self.key_value[new_key] = self.key_value[key]
-                del self.key_value[key]
-        new_loops = []
-        for loop in self.loops:
-            (fields, values) = loop
-            fields = map(lambda x:string.replace(x,".","_"),fields)
-            fields = map(lambda x:string.lower(x),fields)            
-            new_loops.append( (fields,values) )
-        self.loops = new_loops
-        
     def __init__(self,cif_list):
-        cif_list.reverse()
-        self.list = cif_list
-        data_line = self.list.pop()
         self.loops = []
         self.key_value = {}
-        self.data_name = string.strip(data_line[5:])
-        self.next_line()
-        self.parse_normal()
+        self.data_name = string.strip(cif_list[0][5:])
+        (tokens, markers) = tokenize(cif_list[1:])
+        self.parse(tokens, markers)
+        tokens = None
         print ' CIF: For data block "%s"...'%self.data_name
         print " CIF: Read %d key/value pair(s)."%len(self.key_value)
         print " CIF: Read %d table(s)."%len(self.loops)
 
-        self.convert_dot_to_underscore()
-        self.create_field_dicts()
-
         # now build the molecule record
         self.model = Indexed()
 
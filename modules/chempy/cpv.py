@@ -19,12 +19,24 @@
 #
 # Raises ValueError when given bad input
 #
+# When numpy is available, most routines also accept numpy arrays of
+# shape (N,3) in place of single vectors and then return the N results
+# as an array (see "block routines" at the end).
+#
 # TODO: documentation!
 
 import math
 import random
 import copy
 
+try:
+    import numpy as _numpy
+    _ndarray = _numpy.ndarray
+except ImportError:
+    _numpy = None
+    class _ndarray: # matches nothing
+        pass
+
 RSMALL4 = 0.0001
 
 #------------------------------------------------------------------------------
@@ -37,6 +49,8 @@ def get_identity():
 
 #------------------------------------------------------------------------------
 def distance_sq(v1, v2):
+    if isinstance(v1,_ndarray) or isinstance(v2,_ndarray):
+        return distance_sq_array(v1,v2)
     d0 = v2[0] - v1[0]
     d1 = v2[1] - v1[1]
     d2 = v2[2] - v1[2]
@@ -44,6 +58,8 @@ def distance_sq(v1, v2):
 
 #------------------------------------------------------------------------------
 def distance(v1, v2):
+    if isinstance(v1,_ndarray) or isinstance(v2,_ndarray):
+        return distance_array(v1,v2)
     d0 = v2[0] - v1[0]
     d1 = v2[1] - v1[1]
     d2 = v2[2] - v1[2]
@@ -51,6 +67,8 @@ def distance(v1, v2):
 
 #------------------------------------------------------------------------------
 def length(v):
+    if isinstance(v,_ndarray):
+        return length_array(v)
     return math.sqrt(v[0]*v[0] + v[1]*v[1] + v[2]*v[2])
 
 #------------------------------------------------------------------------------
@@ -118,12 +136,16 @@ def cross_product(v1,v2):
 
 #------------------------------------------------------------------------------
 def transform(m,v):
+    if isinstance(v,_ndarray):
+        return transform_array(m,v)
     return [m[0][0]*v[0] + m[0][1]*v[1] + m[0][2]*v[2],
               m[1][0]*v[0] + m[1][1]*v[1] + m[1][2]*v[2],
               m[2][0]*v[0] + m[2][1]*v[1] + m[2][2]*v[2]]
 
 #------------------------------------------------------------------------------
 def inverse_transform(m,v):
+    if isinstance(v,_ndarray):
+        return _numpy.dot(v,_numpy.asarray(m))
     return [m[0][0]*v[0] + m[1][0]*v[1] + m[2][0]*v[2],
             m[0][1]*v[0] + m[1][1]*v[1] + m[2][1]*v[2],
             m[0][2]*v[0] + m[1][2]*v[1] + m[2][2]*v[2]]
@@ -192,6 +214,9 @@ def get_angle(v1,v2): # v1,v2 must be unit vectors
 #------------------------------------------------------------------------------
 def get_angle_formed_by(p1,p2,p3): # angle formed by three positions in space
 
+    if isinstance(p1,_ndarray) or isinstance(p2,_ndarray) or isinstance(p3,_ndarray):
+        return get_angle_formed_by_array(p1,p2,p3)
+
     # based on code submitted by Paul Sherwood
     r1 = distance(p1,p2)
     r2 = distance(p2,p3)
@@ -206,6 +231,19 @@ def get_angle_formed_by(p1,p2,p3): # angle formed by three positions in space
         theta = math.acos( (r1*r1 + r2*r2  - r3*r3) / (2.0 * r1*r2) )
     return theta;
 
+#------------------------------------------------------------------------------
+def get_dihedral(p1,p2,p3,p4): # dihedral angle (radians) about the p2-p3 bond
+
+    if (isinstance(p1,_ndarray) or isinstance(p2,_ndarray) or
+        isinstance(p3,_ndarray) or isinstance(p4,_ndarray)):
+        return get_dihedral_array(p1,p2,p3,p4)
+    b1 = sub(p2,p1)
+    b2 = sub(p3,p2)
+    b3 = sub(p4,p3)
+    n1 = cross_product(b1,b2)
+    n2 = cross_product(b2,b3)
+    return math.atan2(length(b2)*dot_product(b1,n2), dot_product(n1,n2))
+
 #------------------------------------------------------------------------------
 def project(v,n):
     dot = v[0]*n[0] + v[1]*n[1] + v[2]*n[2]
@@ -238,6 +276,9 @@ def normalize_failsafe(v):
 
 #------------------------------------------------------------------------------
 def rotation_matrix(angle,axis):
+
+    if isinstance(angle,_ndarray):
+        return rotation_matrix_array(angle,axis)
     
     x=axis[0]
     y=axis[1]
@@ -275,8 +316,16 @@ def transform_array(rot_mtx,vec_array):
 
     '''transform_array( matrix, vector_array ) -> vector_array
 
+    Given a numpy array of vectors, the matrix may also be a stack of
+    K matrices, giving a (K,N,3) array with every vector transformed
+    by each of them.
     '''
 
+    if isinstance(vec_array,_ndarray):
+        m = _numpy.asarray(rot_mtx,dtype=float)
+        if m.ndim == 3:
+            return _numpy.einsum('kij,nj->kni',m,vec_array)
+        return _numpy.dot(vec_array,m.T)
     return map( lambda x,m=rot_mtx:transform(m,x), vec_array )
 
 #------------------------------------------------------------------------------
@@ -288,6 +337,8 @@ def translate_array(trans_vec,vec_array):
     the translated vector.
     '''
 
+    if isinstance(vec_array,_ndarray):
+        return vec_array + _numpy.asarray(trans_vec,dtype=float)
     return map ( lambda x,m=trans_vec:add(m,x),vec_array )
 
 #------------------------------------------------------------------------------
@@ -297,6 +348,10 @@ def fit_apply(fit_result,vec_array):
     Applies a fit result to an array of vectors
     '''
 
+    if isinstance(vec_array,_ndarray):
+        m = _numpy.asarray(fit_result[2],dtype=float)
+        return (_numpy.dot(vec_array - _numpy.asarray(fit_result[1],dtype=float),m.T) +
+                _numpy.asarray(fit_result[0],dtype=float))
     return map( lambda x,t1=fit_result[0],mt2=negate(fit_result[1]),
         m=fit_result[2]: add(t1,transform(m,add(mt2,x))),vec_array)
 
@@ -312,6 +367,9 @@ def fit(target_array, source_array):
     t1,t2 are vectors from origin to centers of mass...
     '''
 
+    if isinstance(target_array,_ndarray) and isinstance(source_array,_ndarray):
+        return fit_array(target_array, source_array)
+
 # Check dimensions of input arrays
     if len(target_array) != len(source_array):
         print ("Error: arrays must be of same length for RMS fitting.")
@@ -406,3 +464,106 @@ def fit(target_array, source_array):
     print ("Error: Too many iterations in RMS fit.")
     raise ValueError
 
+#------------------------------------------------------------------------------
+# block routines (numpy)
+#
+# These take (N,3) arrays of vectors (or anything numpy.asarray turns
+# into one), compute all N results in one go, and return arrays.  The
+# routines above call them when handed numpy arrays.
+
+def _block(v):
+    if _numpy == None:
+        raise ImportError("numpy is required for block operations")
+    return _numpy.asarray(v,dtype=float)
+
+#------------------------------------------------------------------------------
+def distance_sq_array(v1, v2):
+    d = _block(v2) - _block(v1)
+    return (d*d).sum(axis=-1)
+
+#------------------------------------------------------------------------------
+def distance_array(v1, v2):
+    return _numpy.sqrt(distance_sq_array(v1,v2))
+
+#------------------------------------------------------------------------------
+def length_array(v):
+    v = _block(v)
+    return _numpy.sqrt((v*v).sum(axis=-1))
+
+#------------------------------------------------------------------------------
+def get_angle_formed_by_array(p1,p2,p3):
+    d1 = _block(p1) - _block(p2)
+    d3 = _block(p3) - _block(p2)
+    denom = length_array(d1) * length_array(d3)
+    cos = (d1*d3).sum(axis=-1) / _numpy.where(denom>1e-10, denom, 1.0)
+    cos = _numpy.where(denom>1e-10, cos, -1.0) # degenerate: 180 degrees
+    return _numpy.arccos(_numpy.clip(cos,-1.0,1.0))
+
+#------------------------------------------------------------------------------
+def get_dihedral_array(p1,p2,p3,p4):
+    p2 = _block(p2)
+    p3 = _block(p3)
+    b1 = p2 - _block(p1)
+    b2 = p3 - p2
+    b3 = _block(p4) - p3
+    n1 = _numpy.cross(b1,b2)
+    n2 = _numpy.cross(b2,b3)
+    return _numpy.arctan2(length_array(b2)*(b1*n2).sum(axis=-1),
+                          (n1*n2).sum(axis=-1))
+
+#------------------------------------------------------------------------------
+def rotation_matrix_array(angles,axis):
+    '''rotation_matrix_array(angles, axis) -> (K,3,3) array
+
+    One rotation matrix about the same axis per angle (e.g. for
+    scanning a torsion), for use with transform_array.
+    '''
+    angles = _block(angles).reshape(-1)
+    axis = _block(axis)
+    mag = math.sqrt(_numpy.dot(axis,axis))
+    result = _numpy.zeros((len(angles),3,3))
+    if mag<RSMALL4:
+        result[:] = _numpy.identity(3)
+        return result
+    (x,y,z) = axis / mag
+    s = _numpy.sin(angles)
+    c = _numpy.cos(angles)
+    one_c = 1.0 - c
+    result[:,0,0] = (one_c * x * x) + c
+    result[:,0,1] = (one_c * x * y) - z * s
+    result[:,0,2] = (one_c * z * x) + y * s
+    result[:,1,0] = (one_c * x * y) + z * s
+    result[:,1,1] = (one_c * y * y) + c
+    result[:,1,2] = (one_c * y * z) - x * s
+    result[:,2,0] = (one_c * z * x) - y * s
+    result[:,2,1] = (one_c * y * z) + x * s
+    result[:,2,2] = (one_c * z * z) + c
+    return result
+
+#------------------------------------------------------------------------------
+def fit_array(target_array, source_array):
+    '''fit_array(target_array, source_array) -> (t1, t2, rot_mtx, rmsd)
+
+    Same result as fit(), computed with a singular value decomposition
+    (t1, t2 and rot_mtx are numpy arrays).
+    '''
+    target = _block(target_array)
+    source = _block(source_array)
+    if target.shape != source.shape:
+        print ("Error: arrays must be of same length for RMS fitting.")
+        raise ValueError
+    if (target.ndim != 2) or (target.shape[1] != 3) or not len(target):
+        print ("Error: arrays must be dimension 3 for RMS fitting.")
+        raise ValueError
+    t1 = target.mean(axis=0)
+    t2 = source.mean(axis=0)
+    q = target - t1
+    p = source - t2
+    (u, s, vt) = _numpy.linalg.svd(_numpy.dot(p.T,q))
+    d = _numpy.identity(3)
+    if _numpy.linalg.det(_numpy.dot(vt.T,u.T)) < 0.0:
+        d[2,2] = -1.0 # avoid a reflection
+    rot_mtx = _numpy.dot(vt.T,_numpy.dot(d,u.T))
+    diff = _numpy.dot(p,rot_mtx.T) - q
+    rmsd = math.sqrt((diff*diff).sum() / len(target))
+    return (t1, t2, rot_mtx, rmsd)
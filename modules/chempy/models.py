@@ -16,6 +16,8 @@ import chempy
 import copy
 from cpv import *
 import operator
+import array
+import types
 
 class Base:
 
@@ -721,7 +723,370 @@ class Connected(Base):
         self.bond = new_bond
         del old_index
         del xref
-        
 
+#------------------------------------------------------------------------------
+#------------------------------------------------------------------------------
+#------------------------------------------------------------------------------
+
+# typecodes for the per-atom columns of the Columnar model, anything
+# else (text fields) is kept in a list of interned strings; floats are
+# doubles, so values read back exactly as they were set (as with Atom)
+
+_column_type = {
+    'id'             : 'i',
+    'index'          : 'i',
+    'resi_number'    : 'i',
+    'b'              : 'd',
+    'q'              : 'd',
+    'vdw'            : 'd',
+    'hetatm'         : 'b',
+    'formal_charge'  : 'd',
+    'partial_charge' : 'd',
+    'flags'          : 'l',
+    'numeric_type'   : 'i',
+    'stereo'         : 'b',
+    'color_code'     : 'i',
+    'elec_radius'    : 'd',
+    }
+
+_text_column = ('symbol','name','resn','resn_code','resi','alt',
+                'segi','chain','text_type','ss','custom')
+
+class AtomProxy(object):
+
+    '''
+    Lightweight stand-in for chempy.Atom handed out by Columnar models.
+    Attribute reads and writes go straight to the model's columns.
+    '''
+
+    __slots__ = ('model','_row')
+
+    def __init__(self,model,row):
+        object.__setattr__(self,'model',model)
+        object.__setattr__(self,'_row',row)
+
+    def __getattr__(self,attr):
+        # slots are unset while copy/pickle rebuild the object
+        if attr in AtomProxy.__slots__ or attr[:2] == '__':
+            raise AttributeError(attr)
+        return self.model._get(attr,self._row,self)
+
+    def __setattr__(self,attr,value):
+        self.model._set(attr,self._row,value)
+
+    def __delattr__(self,attr):
+        self.model._unset(attr,self._row)
+
+    def __reduce__(self):
+        return (AtomProxy,(self.model,self._row))
+
+    def __getstate__(self):
+        return None
+
+    def __deepcopy__(self,memo):
+        # a deep copy is detached from the model, like copying an Atom
+        return copy.deepcopy(self.to_atom(),memo)
+
+    def has(self,attr):
+        return self.model._has(attr,self._row)
+
+    def to_atom(self):
+        return self.model.get_atom(self._row)
+
+class AtomSequence(object):
+
+    '''
+    Sequence view of a Columnar model's atoms (model.atom).
+    '''
+
+    __slots__ = ('model',)
+
+    def __init__(self,model):
+        self.model = model
+
+    def __reduce__(self):
+        return (AtomSequence,(self.model,))
+
+    def __len__(self):
+        return self.model.nAtom
+
+    def __getitem__(self,index):
+        model = self.model
+        if isinstance(index,types.SliceType):
+            return map(self.__getitem__,range(*index.indices(model.nAtom)))
+        if index < 0:
+            index = index + model.nAtom
+        if index < 0 or index >= model.nAtom:
+            raise IndexError(index)
+        if model._proxy != None:
+            return model._proxy[index]
+        return AtomProxy(model,index)
+
+    def __iter__(self):
+        for a in xrange(self.model.nAtom):
+            yield self[a]
+
+    def append(self,atom):
+        self.model.add_atom(atom)
+
+class Columnar(Base):
+
+    '''
+    Array-backed alternative to Indexed: per-atom attributes are held in
+    typed columns instead of one chempy.Atom (and __dict__) per atom.
+    model.atom yields AtomProxy objects on demand, so code written
+    against Indexed keeps working.  Numeric columns carry a parallel
+    "given" flag array so that has() matches Atom.has(); attributes that
+    have no column (e.g. "ter" or "u_aniso") are kept sparsely in
+    self.extra.
+    '''
+
+    def __init__(self):
+        self.reset()
+
+#------------------------------------------------------------------------------
+    def reset(self):
+        self.index = None
+        self.molecule = chempy.Molecule()
+        self.bond = []
+        self.nAtom = 0
+        self.column = {}
+        for attr in _text_column:
+            self.column[attr] = []
+        self.given = {}
+        for (attr,code) in _column_type.items():
+            self.column[attr] = array.array(code)
+            self.given[attr] = array.array('b')
+        self.coord = array.array('d')
+        self.extra = {}
+        self._proxy = None
+        self.atom = AtomSequence(self)
+
+    def __getattr__(self,attr):
+        if attr == 'nBond':
+            return len(self.bond)
+        raise AttributeError(attr)
+
+#------------------------------------------------------------------------------
+    def _get(self,attr,index,proxy):
+        if attr == 'coord':
+            return list(self.coord[index*3:index*3+3])
+        col = self.column.get(attr)
+        if col != None:
+            given = self.given.get(attr)
+            if given == None:
+                value = col[index]
+                if value != None:
+                    return value
+            elif given[index]:
+                return col[index]
+        else:
+            ext = self.extra.get(attr)
+            if ext != None and ext.has_key(index):
+                return ext[index]
+        if chempy.Atom.defaults.has_key(attr):
+            return copy.deepcopy(chempy.Atom.defaults[attr])
+        meth = chempy.Atom.__dict__.get(attr)
+        if type(meth) == types.FunctionType:
+            return types.MethodType(meth,proxy)
+        raise AttributeError(attr)
+
+    def _set(self,attr,index,value):
+        if attr == 'coord':
+            self.coord[index*3:index*3+3] = array.array('d',value)
+        elif self.column.has_key(attr):
+            if type(value) == types.StringType:
+                value = intern(value)
+            self.column[attr][index] = value
+            if self.given.has_key(attr):
+                self.given[attr][index] = 1
+        else:
+            self.extra.setdefault(attr,{})[index] = value
+
+    def _unset(self,attr,index):
+        col = self.column.get(attr)
+        if col != None:
+            if not self._has(attr,index):
+                raise AttributeError(attr)
+            if isinstance(col,list):
+                col[index] = None
+            else:
+                col[index] = chempy.Atom.defaults.get(attr,0)
+                self.given[attr][index] = 0
+        else:
+            ext = self.extra.get(attr)
+            if ext == None or not ext.has_key(index):
+                raise AttributeError(attr)
+            del ext[index]
+
+    def _has(self,attr,index):
+        if attr == 'coord':
+            return 1
+        given = self.given.get(attr)
+        if given != None:
+            return given[index]
+        col = self.column.get(attr)
+        if col != None:
+            return col[index] != None
+        ext = self.extra.get(attr)
+        return ext != None and ext.has_key(index)
+
+#------------------------------------------------------------------------------
+    def get_atom(self,index):
+        '''Returns a real (detached) chempy.Atom for the given index.'''
+        at = chempy.Atom()
+        for (attr,col) in self.column.items():
+            if self._has(attr,index):
+                setattr(at,attr,col[index])
+        at.coord = list(self.coord[index*3:index*3+3])
+        for (attr,ext) in self.extra.items():
+            if ext.has_key(index):
+                setattr(at,attr,ext[index])
+        return at
+
+#------------------------------------------------------------------------------
+    def update_index(self):
+        if chempy.feedback['verbose']:
+            print " "+str(self.__class__)+": updating indexes..."
+        # identities are only stable once proxies are pinned
+        if self._proxy == None:
+            self._proxy = map(AtomProxy,[self]*self.nAtom,xrange(self.nAtom))
+        self.index = {}
+        idx = self.index
+        c = 0
+        for a in self._proxy:
+            idx[id(a)] = c
+            c = c + 1
+
+#------------------------------------------------------------------------------
+    def add_atom(self,atom):
+        if chempy.feedback['atoms']:
+            print " "+str(self.__class__)+': adding atom "%s".' % atom.name
+        index = self.nAtom
+        if isinstance(atom,AtomProxy):
+            atom = atom.to_atom()
+        dct = atom.__dict__
+        for attr in _text_column:
+            value = dct.get(attr)
+            if type(value) == types.StringType:
+                value = intern(value)
+            self.column[attr].append(value)
+        for attr in _column_type.keys():
+            if dct.has_key(attr):
+                self.column[attr].append(dct[attr])
+                self.given[attr].append(1)
+            else:
+                self.column[attr].append(chempy.Atom.defaults.get(attr,0))
+                self.given[attr].append(0)
+        self.coord.extend(atom.coord)
+        for (attr,value) in dct.items():
+            if attr != 'coord' and not self.column.has_key(attr):
+                self.extra.setdefault(attr,{})[index] = value
+        self.nAtom = index + 1
+        if self._proxy != None:
+            prx = AtomProxy(self,index)
+            self._proxy.append(prx)
+            if self.index:
+                self.index[id(prx)] = index
+        return index
+
+#------------------------------------------------------------------------------
+    def add_bond(self,bond):
+        if chempy.feedback['bonds']:
+            print " "+str(self.__class__)+": adding bond (%d,%d)." % \
+                    (bond.index[0],bond.index[1])
+        self.bond.append(bond)
 
+#------------------------------------------------------------------------------
+    def delete_list(self,list): # delete a list of indexed atoms
+
+        if chempy.feedback['atoms']:
+            print " "+str(self.__class__)+": deleting atoms %s." % str(list)
 
+        nAtom = self.nAtom
+        dead = {}
+        for i in list:
+            dead[i] = 1
+        if not dead:
+            return
+
+        # generate cross-reference table
+
+        o2n = [-1] * nAtom
+        keep = []
+        for i in xrange(nAtom):
+            if not dead.has_key(i):
+                o2n[i] = len(keep)
+                keep.append(i)
+
+        # compact columns
+
+        for (attr,col) in self.column.items():
+            if isinstance(col,array.array):
+                self.column[attr] = array.array(col.typecode,map(col.__getitem__,keep))
+            else:
+                self.column[attr] = map(col.__getitem__,keep)
+        for (attr,given) in self.given.items():
+            self.given[attr] = array.array('b',map(given.__getitem__,keep))
+        old = self.coord
+        crd = array.array('d')
+        for i in keep:
+            crd.extend(old[i*3:i*3+3])
+        self.coord = crd
+        for (attr,ext) in self.extra.items():
+            new_ext = {}
+            for (i,value) in ext.items():
+                if o2n[i] >= 0:
+                    new_ext[o2n[i]] = value
+            self.extra[attr] = new_ext
+        self.nAtom = len(keep)
+
+        # delete bonds
+
+        new_bond = []
+        for b in self.bond:
+            b0 = o2n[b.index[0]]
+            b1 = o2n[b.index[1]]
+            if (b0>=0) and (b1>=0):
+                b.index[0] = b0
+                b.index[1] = b1
+                new_bond.append(b)
+        self.bond = new_bond
+
+        # renumber pinned proxies and update index if it exists
+
+        if self._proxy != None:
+            proxy = map(self._proxy.__getitem__,keep)
+            for i in xrange(len(proxy)):
+                object.__setattr__(proxy[i],'_row',i)
+            self._proxy = proxy
+        if self.index:
+            self.update_index()
+
+#------------------------------------------------------------------------------
+    def get_coord_list(self):
+        crd = self.coord
+        return map(lambda a,c=crd:list(c[a:a+3]),xrange(0,len(crd),3))
+
+    def get_coord_array(self):
+        '''Returns a (writable) copy of the coordinates as a float64 numpy
+        array of shape (N,3).'''
+        import numpy
+        return numpy.frombuffer(self.coord,numpy.float64).reshape((-1,3)).copy()
+
+#------------------------------------------------------------------------------
+    def from_indexed(self,model):
+        self.reset()
+        self.molecule = model.molecule
+        for a in model.atom:
+            self.add_atom(a)
+        self.bond = copy.deepcopy(model.bond)
+        return self
+
+    def convert_to_indexed(self):
+        indexed = Indexed()
+        indexed.molecule = self.molecule
+        indexed.atom = map(self.get_atom,xrange(self.nAtom))
+        indexed.bond = self.bond
+        self.reset()
+        return indexed
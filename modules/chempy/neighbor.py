@@ -14,6 +14,11 @@
 
 import copy
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 class Neighbor:
 
     def __init__(self,vect_list,spacing):
@@ -34,7 +39,8 @@ class Neighbor:
         self.neighbor = {}
         voxel = self.voxel
         for k in voxel.keys():
-            lst = self.neighbor[k]
+            lst = []
+            self.neighbor[k] = lst
             for a in (k[0]-1,k[0],k[0]+1):
                 for b in (k[1]-1,k[1],k[1]+1):
                     for c in (k[2]-1,k[2],k[2]+1):
@@ -72,5 +78,187 @@ class Neighbor:
                         if voxel.has_key(k2):
                             lst.extend(voxel[k2])
             return lst
-            
-            
+
+class NeighborGrid:
+
+    '''
+    Array-based cell list over an (N,3) coordinate block (requires
+    numpy).  Unlike Neighbor, all queries are answered for a whole batch
+    of points at once and the distance test is applied, so results are
+    exact rather than voxel-based candidates.
+
+    The cell edge defaults to the largest cutoff you intend to use;
+    larger cutoffs still work, they just scan more cells.
+    '''
+
+    def __init__(self,coords,spacing):
+        if numpy is None:
+            raise ImportError("NeighborGrid requires numpy")
+        if spacing <= 0.0:
+            raise ValueError("spacing must be positive")
+        coords = numpy.asarray(coords,dtype=float).reshape((-1,3))
+        self.coords = coords
+        self.spacing = float(spacing)
+        self.n = coords.shape[0]
+        if self.n:
+            self.origin = coords.min(0)
+            cell = self._cell(coords)
+            self.dim = cell.max(0) + 1
+        else:
+            self.origin = numpy.zeros(3)
+            cell = numpy.zeros((0,3),int)
+            self.dim = numpy.ones(3,int)
+        key = self._key(cell)
+        # atoms sorted by cell, plus the start/count of every occupied cell
+        self.order = numpy.argsort(key,kind='mergesort')
+        skey = key[self.order]
+        self.cell_key, self.cell_start = numpy.unique(skey,return_index=True)
+        self.cell_count = numpy.diff(numpy.append(self.cell_start,self.n))
+
+    def _cell(self,coords):
+        return numpy.floor((coords - self.origin)/self.spacing).astype(int)
+
+    def _key(self,cell):
+        dim = self.dim
+        return (cell[:,0]*dim[1] + cell[:,1])*dim[2] + cell[:,2]
+
+    def query_pairs(self,points,cutoff):
+        '''
+        Returns three parallel arrays (point_index, atom_index, distance)
+        for every atom within cutoff of each query point.
+        '''
+        points = numpy.asarray(points,dtype=float).reshape((-1,3))
+        empty = (numpy.zeros(0,int),numpy.zeros(0,int),numpy.zeros(0))
+        if not (self.n and points.shape[0]):
+            return empty
+        cutoff = float(cutoff)
+        cutoff2 = cutoff*cutoff
+        reach = int(numpy.ceil(cutoff/self.spacing))
+        if (2*reach+1)**3 > max(len(self.cell_key),27):
+            # cutoff spans most of the grid: scanning cells buys nothing
+            return self._brute_pairs(points,cutoff2)
+        cell = self._cell(points)
+        dim = self.dim
+        n_cell = len(self.cell_key)
+        all_p = []
+        all_a = []
+        all_d = []
+        rng = range(-reach,reach+1)
+        for dx in rng:
+            for dy in rng:
+                for dz in rng:
+                    nc = cell + (dx,dy,dz)
+                    ok = numpy.all((nc >= 0) & (nc < dim),axis=1)
+                    if not numpy.any(ok):
+                        continue
+                    pidx = numpy.nonzero(ok)[0]
+                    key = self._key(nc[pidx])
+                    slot = numpy.searchsorted(self.cell_key,key)
+                    slot[slot >= n_cell] = 0
+                    hit = self.cell_key[slot] == key
+                    if not numpy.any(hit):
+                        continue
+                    pidx = pidx[hit]
+                    slot = slot[hit]
+                    cnt = self.cell_count[slot]
+                    # expand each (point, cell) into its candidate atoms
+                    total = int(cnt.sum())
+                    first = numpy.repeat(numpy.cumsum(cnt) - cnt,cnt)
+                    pos = numpy.repeat(self.cell_start[slot],cnt) + \
+                          numpy.arange(total) - first
+                    cand_p = numpy.repeat(pidx,cnt)
+                    cand_a = self.order[pos]
+                    diff = self.coords[cand_a] - points[cand_p]
+                    dist2 = (diff*diff).sum(1)
+                    within = dist2 <= cutoff2
+                    all_p.append(cand_p[within])
+                    all_a.append(cand_a[within])
+                    all_d.append(numpy.sqrt(dist2[within]))
+        if not all_p:
+            return empty
+        p = numpy.concatenate(all_p)
+        a = numpy.concatenate(all_a)
+        d = numpy.concatenate(all_d)
+        srt = numpy.lexsort((a,p))
+        return (p[srt],a[srt],d[srt])
+
+    def _brute_pairs(self,points,cutoff2):
+        chunk = max(1,1000000//self.n)
+        all_p = []
+        all_a = []
+        all_d = []
+        for start in range(0,points.shape[0],chunk):
+            blk = points[start:start+chunk]
+            diff = blk[:,None,:] - self.coords[None,:,:]
+            dist2 = (diff*diff).sum(2)
+            (p,a) = numpy.nonzero(dist2 <= cutoff2)
+            all_p.append(p + start)
+            all_a.append(a)
+            all_d.append(numpy.sqrt(dist2[p,a]))
+        return (numpy.concatenate(all_p),numpy.concatenate(all_a),
+                numpy.concatenate(all_d))
+
+    def query(self,points,cutoff):
+        '''
+        Returns one array of atom indices per query point.
+        '''
+        points = numpy.asarray(points,dtype=float).reshape((-1,3))
+        (p,a,d) = self.query_pairs(points,cutoff)
+        bounds = numpy.searchsorted(p,numpy.arange(1,points.shape[0]))
+        return numpy.split(a,bounds)
+
+    def pairs(self,cutoff):
+        '''
+        Returns (i, j, distance) for all atom pairs i < j within cutoff.
+        '''
+        (i,j,d) = self.query_pairs(self.coords,cutoff)
+        keep = i < j
+        return (i[keep],j[keep],d[keep])
+
+    def nearest(self,points,k=1):
+        '''
+        Returns (indices, distances), both of shape (M,k), for the k
+        nearest atoms to each query point, closest first.  Rows are
+        padded with -1 and inf when fewer than k atoms exist.
+        '''
+        points = numpy.asarray(points,dtype=float).reshape((-1,3))
+        m = points.shape[0]
+        k = int(k)
+        idx = numpy.empty((m,k),int)
+        idx.fill(-1)
+        dist = numpy.empty((m,k))
+        dist.fill(numpy.inf)
+        k_eff = min(k,self.n)
+        if not (m and k_eff):
+            return (idx,dist)
+        # any point can be reached from anywhere inside this radius
+        lo = numpy.minimum(points.min(0),self.origin)
+        hi = numpy.maximum(points.max(0),self.coords.max(0))
+        limit = numpy.sqrt(((hi - lo)**2).sum()) + self.spacing
+        todo = numpy.arange(m)
+        cutoff = self.spacing
+        while len(todo):
+            if cutoff >= limit:
+                cutoff = limit
+            (p,a,d) = self.query_pairs(points[todo],cutoff)
+            srt = numpy.lexsort((d,p))
+            p = p[srt]
+            a = a[srt]
+            d = d[srt]
+            start = numpy.searchsorted(p,numpy.arange(len(todo)))
+            cnt = numpy.diff(numpy.append(start,len(p)))
+            done = cnt >= k_eff
+            if cutoff >= limit:
+                done[:] = True
+            rows = numpy.nonzero(done)[0]
+            if len(rows):
+                take = numpy.minimum(cnt[rows],k_eff)
+                total = int(take.sum())
+                col = numpy.arange(total) - numpy.repeat(numpy.cumsum(take) - take,take)
+                src = numpy.repeat(start[rows],take) + col
+                dst = numpy.repeat(todo[rows],take)
+                idx[dst,col] = a[src]
+                dist[dst,col] = d[src]
+            todo = todo[~done]
+            cutoff = cutoff * 2.0
+        return (idx,dist)
@@ -15,6 +15,112 @@
 from chempy import Storage,Atom
 from chempy.models import Indexed
 import string
+import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_text_columns = ('name','alt','resn','chain','resi','segi','symbol')
+_numeric_columns = ('resi_number','hetatm','q','b')
+
+class PDBColumns:
+
+    '''
+    Column-oriented atom block for one MODEL of a PDB file.  Text fields
+    are plain lists, coordinates are a float64 block of shape (N,3) when
+    numpy is available (otherwise a flat array.array('d')).
+    '''
+
+    def __init__(self):
+        for col in _text_columns:
+            setattr(self,col,[])
+        self.resi_number = array.array('i')
+        self.hetatm = array.array('b')
+        self.q = array.array('d')
+        self.b = array.array('d')
+        self.coord = array.array('d')
+        self.ter = {}
+        self.model = None
+
+    def __len__(self):
+        return len(self.name)
+
+    def __getitem__(self,index):
+        if index < 0:
+            index = index + len(self.name)
+        if index < 0 or index >= len(self.name):
+            raise IndexError(index)
+        return PDBAtom(self,index)
+
+    def __iter__(self):
+        for a in xrange(len(self.name)):
+            yield PDBAtom(self,a)
+
+    def finish(self):
+        if numpy != None:
+            self.coord = numpy.frombuffer(self.coord,numpy.float64).reshape((-1,3))
+
+    def get_coord(self,index):
+        if numpy != None and not isinstance(self.coord,array.array):
+            return map(float,self.coord[index])
+        return list(self.coord[index*3:index*3+3])
+
+    def toModel(self):
+        model = Indexed()
+        for at in self:
+            model.add_atom(at.toAtom())
+        return model
+
+class PDBAtom(object):
+
+    '''
+    Lightweight read-only view on one row of a PDBColumns block.
+    '''
+
+    __slots__ = ('_columns','index')
+
+    _default = Atom() # answers for attributes which have no column
+
+    def __init__(self,columns,index):
+        self._columns = columns
+        self.index = index
+
+    def __getattr__(self,attr):
+        cols = self._columns
+        if attr == 'coord':
+            return cols.get_coord(self.index)
+        elif attr == 'ter':
+            return cols.ter.get(self.index,0)
+        elif attr in _text_columns or attr in _numeric_columns:
+            return getattr(cols,attr)[self.index]
+        return getattr(PDBAtom._default,attr)
+
+    def toAtom(self):
+        at = Atom()
+        cols = self._columns
+        idx = self.index
+        for col in _text_columns:
+            setattr(at,col,getattr(cols,col)[idx])
+        at.resi_number = cols.resi_number[idx]
+        at.hetatm = cols.hetatm[idx]
+        at.q = float(cols.q[idx])
+        at.b = float(cols.b[idx])
+        at.coord = cols.get_coord(idx)
+        at.index = idx
+        if cols.ter.has_key(idx):
+            at.ter = 1
+        return at
+
+def _readlines(fp):
+    # works for file objects, gzip streams, mmap and PseudoFile alike
+    readline = fp.readline
+    while 1:
+        rec = readline()
+        if not rec:
+            break
+        yield rec
 
 class PDB(Storage):
     
@@ -61,6 +167,91 @@ class PDB(Storage):
                     at.ter=1
         return(model)
 
+#---------------------------------------------------------------------------------
+    def iterColumns(self,fp):
+        '''
+        Streams ATOM/HETATM records from any object with a readline()
+        method (file, gzip stream, mmap) and yields one PDBColumns block
+        per MODEL, so that only a single model is held in memory.
+        '''
+        cols = PDBColumns()
+        name = cols.name
+        alt = cols.alt
+        resn = cols.resn
+        chain = cols.chain
+        resi = cols.resi
+        segi = cols.segi
+        symbol = cols.symbol
+        resi_number = cols.resi_number
+        hetatm = cols.hetatm
+        q = cols.q
+        b = cols.b
+        coord = cols.coord
+        for rec in _readlines(fp):
+            tag = rec[0:6]
+            if tag[0:4] == 'ATOM' or tag == 'HETATM':
+                nam = rec[12:16].strip()
+                name.append(nam)
+                alt.append(rec[16:17].strip())
+                resn.append(rec[17:20].strip())
+                chain.append(rec[21:22].strip())
+                resi.append(rec[22:27].strip())
+                resi_number.append(int(rec[22:26]))
+                hetatm.append(tag[0] != 'A')
+                coord.extend((float(rec[30:38]),float(rec[38:46]),float(rec[46:54])))
+                try:
+                    q.append(float(rec[54:60]))
+                except ValueError:
+                    q.append(1.0)
+                try:
+                    b.append(float(rec[60:66]))
+                except ValueError:
+                    b.append(0.0)
+                segi.append(rec[72:76].strip())
+                sym = rec[76:78].strip()
+                if not sym:
+                    sym = nam[0:1]
+                    if sym in '012345678':
+                        sym = nam[1:2]
+                symbol.append(sym)
+            elif tag[0:3] == 'TER':
+                if len(name):
+                    cols.ter[len(name)-1] = 1
+            elif tag[0:5] == 'MODEL' or tag == 'ENDMDL':
+                if len(name):
+                    cols.finish()
+                    yield cols
+                    # rebinding these locals is what keeps the loop cheap
+                    cols = PDBColumns()
+                    name = cols.name
+                    alt = cols.alt
+                    resn = cols.resn
+                    chain = cols.chain
+                    resi = cols.resi
+                    segi = cols.segi
+                    symbol = cols.symbol
+                    resi_number = cols.resi_number
+                    hetatm = cols.hetatm
+                    q = cols.q
+                    b = cols.b
+                    coord = cols.coord
+                if tag[0:5] == 'MODEL':
+                    try:
+                        cols.model = int(rec[6:].split()[0])
+                    except (ValueError,IndexError):
+                        pass
+        if len(name):
+            cols.finish()
+            yield cols
+
+#---------------------------------------------------------------------------------
+    def iterModels(self,fp):
+        '''
+        Generator over MODEL blocks, yielding one Indexed model each.
+        '''
+        for cols in self.iterColumns(fp):
+            yield cols.toModel()
+
 #---------------------------------------------------------------------------------
     def toList(self,model):
 
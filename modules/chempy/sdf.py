@@ -12,9 +12,11 @@
 #-*
 #Z* -------------------------------------------------------------------
 
+import os
 import string
 import re
 import copy
+import cPickle
 
 from chempy import io
 
@@ -168,3 +170,177 @@ class SDF:
         self.file.close()
         
     
+class SDFIndex:
+    '''
+    Byte-offset index of a multi-record SDF file, for random access to
+    its records.  The index (record offsets, plus the first line of every
+    data item) is built by a single pass over the file and cached beside
+    it as "<file>.idx", where it is reused for as long as the size and
+    modification time of the file stay the same.
+    '''
+
+    version = 3
+
+    def __init__(self,fname,cache=1):
+        self.fname = fname
+        self.offset = [] # record start offsets, plus the end of the last record
+        self.props = {}  # key -> list of values (None where missing)
+        self.kees = []   # property keys in order of appearance
+        stat = os.stat(fname)
+        # full (float) mtime: a rewrite within the same second still shows
+        self.stamp = (stat.st_size, stat.st_mtime)
+        if not (cache and self._read_cache()):
+            self._scan()
+            if cache:
+                self._write_cache()
+        self.file = None
+
+    def _cache_name(self):
+        return self.fname + '.idx'
+
+    def _read_cache(self):
+        try:
+            fp = open(self._cache_name(),'rb')
+            try:
+                idx = cPickle.load(fp)
+            finally:
+                fp.close()
+            if (idx.get('version') != self.version) or (idx.get('stamp') != self.stamp):
+                return 0
+            self.offset = idx['offset']
+            self.props = idx['props']
+            self.kees = idx['kees']
+            return 1
+        except:
+            return 0
+
+    def _write_cache(self):
+        # a read-only directory only means no index is kept
+        try:
+            fp = open(self._cache_name(),'wb')
+            try:
+                cPickle.dump({ 'version' : self.version,
+                               'stamp'   : self.stamp,
+                               'offset'  : self.offset,
+                               'props'   : self.props,
+                               'kees'    : self.kees }, fp, 2)
+            finally:
+                fp.close()
+        except (IOError, OSError):
+            pass
+
+    def _scan(self):
+        getkee = re.compile(r"^>.*<([^>]*)>")
+        offset = self.offset
+        props = self.props
+        kees = self.kees
+        n_rec = 0
+        pos = 0
+        start = 0
+        blank = 1    # nothing but whitespace since the last "$$$$"
+        kee = None   # data item awaiting its first value line
+        fp = open(self.fname,'rb')
+        try:
+            for s in fp:
+                if s[0:4]=='$$$$':
+                    offset.append(start)
+                    n_rec = n_rec + 1
+                    start = pos + len(s)
+                    blank = 1
+                    kee = None
+                else:
+                    if blank and len(string.strip(s)):
+                        blank = 0
+                    if kee != None:
+                        values = props.get(kee)
+                        if values == None:
+                            values = [None] * n_rec
+                            props[kee] = values
+                            kees.append(kee)
+                        elif len(values) < n_rec:
+                            values.extend([None] * (n_rec - len(values)))
+                        if len(values) == n_rec: # a repeated key keeps its first value
+                            values.append(string.strip(s))
+                        kee = None
+                    elif s[0:1]=='>':
+                        match = getkee.match(s)
+                        if match:
+                            kee = match.group(1)
+                pos = pos + len(s)
+        finally:
+            fp.close()
+        if not blank: # last record without a terminating "$$$$"
+            offset.append(start)
+            n_rec = n_rec + 1
+        offset.append(pos)
+        for values in props.values():
+            if len(values) < n_rec:
+                values.extend([None] * (n_rec - len(values)))
+
+    def __len__(self):
+        return len(self.offset) - 1
+
+    def read_text(self,index): # 0-based record index
+        if (index < 0) or (index >= len(self)):
+            raise IndexError("SDF record index out of range")
+        if self.file == None:
+            self.file = open(self.fname,'rb')
+        self.file.seek(self.offset[index])
+        return self.file.read(self.offset[index + 1] - self.offset[index])
+
+    def read(self,index): # returns SDFRec
+        lst = string.split(self.read_text(index),'\n')
+        lst = map(lambda x:x+'\n', lst[:-1]) + filter(None,lst[-1:])
+        while len(lst) and (lst[-1][0:4]=='$$$$'):
+            del lst[-1]
+        return SDFRec(lst)
+
+    def get_values(self,kee): # first line of data item "kee", per record
+        return self.props.get(kee,[None] * len(self))
+
+    def select(self,kee,test):
+        '''
+        Returns the indices of the records whose value for "kee" passes
+        test(value).  Values are compared as floats where possible.
+        '''
+        result = []
+        values = self.get_values(kee)
+        for index in xrange(len(values)):
+            value = values[index]
+            if value != None:
+                try:
+                    value = float(value)
+                except ValueError:
+                    pass
+                if test(value):
+                    result.append(index)
+        return result
+
+    def sort(self,kee,indices=None,reverse=0):
+        '''
+        Returns record indices ordered by their value for "kee" (numerically
+        where possible).  Records without a value come last, and records
+        with equal values keep their file order, also when reversed.
+        '''
+        values = self.get_values(kee)
+        if indices == None:
+            indices = xrange(len(values))
+        have = []
+        missing = []
+        for index in indices:
+            value = values[index]
+            if value == None:
+                missing.append(index)
+            else:
+                try:
+                    value = float(value)
+                except ValueError:
+                    pass
+                have.append((value, index))
+        have.sort(key=lambda x:x[0], reverse=reverse) # stable
+        return map(lambda x:x[1], have) + missing
+
+    def close(self):
+        if self.file != None:
+            self.file.close()
+            self.file = None
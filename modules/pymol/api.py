@@ -7,9 +7,12 @@ from importing import \
       load_brick,         \
       load_callback,      \
       load_cgo,           \
+      load_coords,        \
       load_embedded,      \
+      load_many,          \
       load_map,           \
       load_model,         \
+      load_sdf,           \
       load_object,        \
       load_traj,          \
       load_raw,           \
@@ -94,6 +97,7 @@ from querying import \
       get_object_list,    \
       get_color_tuple,    \
       get_atom_coords,    \
+      get_coords,         \
       get_dihedral,       \
       get_distance,       \
       get_drag_object_name, \
@@ -114,6 +118,7 @@ from querying import \
       get_povray,         \
       get_raw_alignment,  \
       get_renderer,       \
+      get_selector_stats, \
       get_symmetry,       \
       get_title,          \
       get_type,           \
@@ -155,6 +160,7 @@ from exporting import \
 import editing
 from editing import \
       alter,              \
+      alter_column,       \
       alter_list,         \
       alter_state,        \
       attach,             \
@@ -258,6 +264,7 @@ from fitting import \
       intra_rms,         \
       intra_rms_cur,     \
       cealign,          \
+      cealign_many,      \
       pair_fit          
 
 #--------------------------------------------------------------------
@@ -392,7 +399,6 @@ from experimenting import \
       get_bond_print,     \
       fast_minimize,      \
       import_coords,      \
-      load_coords,        \
       mem,                \
       minimize,           \
       spheroid,           \
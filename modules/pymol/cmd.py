@@ -212,6 +212,17 @@ if __name__=='pymol.cmd':
         _cache_clear = internal._cache_clear
         _cache_purge = internal._cache_purge
         _cache_mark = internal._cache_mark
+        _surface_pool = internal._surface_pool
+        _surface_pool_defer = internal._surface_pool_defer
+        _surface_pool_collect = internal._surface_pool_collect
+        _surface_pool_update = internal._surface_pool_update
+        _surface_pool_run = internal._surface_pool_run
+        _surface_pool_rebuild = internal._surface_pool_rebuild
+        _surface_pool_apply = internal._surface_pool_apply
+        _pool_new = internal._pool_new
+        _pool_free = internal._pool_free
+        _sdf_lazy_update = internal._sdf_lazy_update
+        _sdf_lazy_rename = internal._sdf_lazy_rename
         _sdof = internal._sdof
         
         # when adding, remember to also edit cmd2.py
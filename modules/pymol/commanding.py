@@ -267,6 +267,7 @@ USAGE
             r = _cmd.reinitialize(_self._COb,int(what),str(object))
         finally:
             _self.unlock(r,_self)
+        _self._sdf_lazy_rename(_self=_self)
         if _self._raising(r,_self): raise pymol.CmdException
         return r
 
@@ -440,6 +441,7 @@ SEE ALSO
             r = _cmd.delete(_self._COb,str(name))
         finally:
             _self.unlock(r,_self)
+        _self._sdf_lazy_rename(_self=_self)
         if _self._raising(r,_self): raise pymol.CmdException      
         return r
 
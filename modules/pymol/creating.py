@@ -953,7 +953,8 @@ SEE ALSO
         if _self._raising(r,_self): raise pymol.CmdException                  
         return r
 
-    def symexp(prefix, object, selection, cutoff, segi=0, quiet=1,_self=cmd):
+    def symexp(prefix, object, selection, cutoff, segi=0, quiet=1,
+               states=0, _self=cmd):
         '''
 DESCRIPTION
 
@@ -962,13 +963,27 @@ DESCRIPTION
 
 USAGE
 
-    symexp prefix, object, selection, cutoff
+    symexp prefix, object, selection, cutoff [, segi ]
+
+ARGUMENTS
+
+    segi = 0/1: give each symmetry mate its own segment identifier
+    {default: 0}
+
+    states = 0/1: put all symmetry mates into a single object named
+    prefix, one state per mate {default: 0}
 
 NOTES
 
     The newly objects are labeled using the prefix provided along with
     their crystallographic symmetry operation and translation.
 
+    Only symmetry mates with atoms within the cutoff are copied.
+
+EXAMPLES
+
+    symexp sym, 1abc, 1abc, 6, states=1
+
 SEE ALSO
 
     load
@@ -981,7 +996,7 @@ SEE ALSO
             _self.lock(_self)
             r = _cmd.symexp(_self._COb,str(prefix),str(object),
                             "("+str(selection)+")",float(cutoff),
-                            int(segi),int(quiet))
+                            int(segi),int(states),int(quiet))
         finally:
             _self.unlock(r,_self)
         if _self._raising(r,_self): raise pymol.CmdException                           
@@ -22,6 +22,59 @@ if __name__=='pymol.editing':
           boolean_sc,boolean_dict,safe_list_eval, is_sequence, \
           DEFAULT_ERROR, DEFAULT_SUCCESS, _raising, is_ok, is_error              
     from chempy import cpv
+    import re
+    
+    # atom fields which "alter_column" can set (and copy between)
+    _column_float = ('b', 'q', 'vdw', 'elec_radius', 'partial_charge')
+    _column_int = ('formal_charge', 'resv', 'numeric_type', 'color',
+                   'cartoon', 'ID', 'rank', 'flags', 'state')
+    _column_text = ('type', 'name', 'resn', 'resi', 'chain', 'alt', 'segi',
+                    'elem', 'ss', 'text_type', 'custom', 'label')
+
+    _simple_assignment_re = re.compile(
+        r'''^\s*([A-Za-z_]+)\s*=\s*(?:([-+]?\d+)|([-+]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?)|'([^'\\]*)'|"([^"\\]*)"|([A-Za-z_]+))\s*;?\s*$''')
+
+    def _simple_assignment(expression):
+        '''
+    returns (field, source, value, text) if expression just assigns a
+    constant or another atom field to a column-settable field, None
+    otherwise.
+        '''
+        mo = _simple_assignment_re.match(expression)
+        if not mo:
+            return None
+        field, int_st, float_st, sq_st, dq_st, source = mo.groups()
+        if source:
+            if source in _column_text:
+                ok = field in _column_text
+            else:
+                ok = ((source in _column_float or source in _column_int) and
+                      (field in _column_float or field in _column_int))
+            if ok:
+                return (field, source, None, 0)
+        elif int_st != None:
+            if field in _column_float or field in _column_int:
+                return (field, '', _column_buffer([float(int_st)]), 0)
+        elif float_st != None:
+            if field in _column_float:
+                return (field, '', _column_buffer([float(float_st)]), 0)
+        else:
+            if sq_st == None:
+                sq_st = dq_st
+            if field in _column_text:
+                return (field, '', sq_st + '\0', 1)
+        return None
+
+    def _column_buffer(values):
+        # one native double per value
+        try:
+            import numpy
+            return numpy.ascontiguousarray(values, numpy.float64).ravel().tostring()
+        except ImportError:
+            import array
+            if not is_sequence(values):
+                values = [ values ]
+            return array.array('d', map(float, values)).tostring()
     
     ref_action_dict = {
         'store'     : 1,
@@ -338,6 +391,7 @@ PYMOL API
                                     str(new_name))
         finally:
             _self.unlock(r,_self)
+        _self._sdf_lazy_rename(str(old_name),str(new_name),_self=_self)
         if _self._raising(r,_self): raise pymol.CmdException            
         return r
 
@@ -1279,8 +1333,10 @@ NOTES
     numeric_type, model*, state*, index*, ID, rank, color, ss,
     cartoon, flags
 
-    All strings must be explicitly quoted.  This operation typically
-    takes several seconds per thousand atoms altered.  
+    All strings must be explicitly quoted.  Only the symbols used by
+    the expression are made available.  Simple assignments of a
+    constant or of another symbol (e.g. b=0, chain='A', segi=chain)
+    don't evaluate Python for each atom at all.
 
     You may need to issue a "rebuild" in order to update associated
     representations.
@@ -1292,14 +1348,27 @@ NOTES
 
 SEE ALSO
 
-    alter_state, iterate, iterate_state, sort
+    alter_column, alter_state, iterate, iterate_state, sort
         '''
-        if space == None:
-            space = _self._pymol.__dict__
         r = DEFAULT_ERROR
         # preprocess selections
         selection = selector.process(selection)
-        #
+        # plain assignments of constants or other fields skip Python per atom
+        simple = _simple_assignment(str(expression))
+        if simple:
+            field, source, value, text = simple
+            try:
+                _self.lock(_self)
+                r = _cmd.alter_column(_self._COb,"("+str(selection)+")",field,source,
+                                      value,1,text,1)
+            finally:
+                _self.unlock(r,_self)
+            if _self._raising(r,_self): raise pymol.CmdException
+            if not int(quiet) and r >= 0:
+                print " Alter: modified %i atoms."%r
+            return r
+        if space == None:
+            space = _self._pymol.__dict__
         try:
             _self.lock(_self)
             r = _cmd.alter(_self._COb,"("+str(selection)+")",str(expression),0,int(quiet),dict(space))
@@ -1308,6 +1377,71 @@ SEE ALSO
         if _self._raising(r,_self): raise pymol.CmdException
         return r
 
+    def alter_column(selection, field, values, quiet=1, _self=cmd):
+        '''
+DESCRIPTION
+
+    "alter_column" sets one atomic property over a selection from a
+    sequence of values, one per atom in the order visited by
+    "iterate", or from a single value which is applied to every atom.
+
+USAGE
+
+    alter_column selection, field, values
+
+ARGUMENTS
+
+    field = b, q, vdw, elec_radius, partial_charge, formal_charge,
+    resv, numeric_type, color, cartoon, ID, rank, flags, state, type,
+    name, resn, resi, chain, alt, segi, elem, ss, text_type, custom
+    or label
+
+    values = sequence, NumPy array or single value
+
+EXAMPLES
+
+    cmd.alter_column("all", "b", numpy.zeros(cmd.count_atoms()))
+    cmd.alter_column("chain A", "segi", "PROA")
+
+NOTES
+
+    Side effects are the same as for assigning the field in "alter".
+    You may need to issue a "rebuild" in order to update associated
+    representations.
+
+PYMOL API
+
+    cmd.alter_column(string selection, string field, values)
+
+SEE ALSO
+
+    alter, iterate, get_coords, load_coords
+    '''
+        r = DEFAULT_ERROR
+        selection = selector.process(selection)
+        if field in _column_text:
+            if is_string(values):
+                values = [ values ]
+            values = map(str, values)
+            buffer = '\0'.join(values) + '\0'
+            n_value = len(values)
+            text = 1
+        elif field in _column_float or field in _column_int:
+            buffer = _column_buffer(values)
+            n_value = len(buffer) / 8
+            text = 0
+        else:
+            print " Error: can't set '%s' column-wise."%field
+            raise pymol.CmdException
+        try:
+            _self.lock(_self)
+            r = _cmd.alter_column(_self._COb,"("+str(selection)+")",str(field),'',
+                                  buffer,n_value,text,int(quiet))
+        finally:
+            _self.unlock(r,_self)
+        if _self._raising(r,_self): raise pymol.CmdException
+        return r
+
     def alter_list(object, expr_list, quiet=1, space=None, _self=cmd):
         '''
 DESCRIPTION
@@ -1451,6 +1585,10 @@ SEE ALSO
         # preprocess selection
         selection = selector.process(selection)
         state = int(state)
+        if state >= 0:
+            _self._sdf_lazy_update(_self,state)
+        else:
+            _self._sdf_lazy_update(_self)
         #
         try:
             _self.lock(_self)
@@ -218,27 +218,3 @@ DESCRIPTION
         if _self._raising(r,_self): raise pymol.CmdException                  
         return r
 
-    def load_coords(*arg): # UNSUPPORTED
-        _self = cmd
-        r = DEFAULT_ERROR
-        try:
-            _self.lock(_self)
-            ok = 1
-            ftype = loadable.model
-            state = 0
-            model = arg[0];
-            if len(arg)<2:
-                ok=0
-            if len(arg)>=2:
-                oname = string.strip(arg[1])
-            if len(arg)>=3:
-                state = int(arg[2])-1
-            if ok:
-                r = _cmd.load_coords(_self._COb,str(oname),model,
-                                            int(state)-1,int(ftype))
-            else:
-                print "Error: invalid arguments."
-        finally:
-            _self.unlock(r,_self)
-        if _self._raising(r,_self): raise pymol.CmdException                  
-        return r
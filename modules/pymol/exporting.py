@@ -16,6 +16,7 @@ if __name__=='pymol.exporting':
     import os
     import thread
     import selector
+    import sessionfile
     import string
     import re
     import copy
@@ -80,6 +81,17 @@ NOTES
     "cache optimize" will iterate through the list of scenes provided
     (or all defined scenes), compute any missing surfaces, and store
     them in the cache for later reuse.
+
+    The in-memory cache is limited by the "cache_max" setting; the
+    "cache_policy" setting picks which entries go first when it is
+    full (0: least recently used, 1: least frequently used).  If
+    "cache_dir" is set, results are also kept in that directory and
+    reused by later sessions and other PyMOL processes ("cache clear"
+    only empties the in-memory cache).
+
+    With "surface_pool" set to a number of worker processes, "cache
+    optimize" first collects the missing surfaces of all scenes and
+    computes them in parallel in those processes.
     
 PYMOL API
 
@@ -112,6 +124,21 @@ PYMOL API
             _self.set('cache_mode',2)
             if not len(scene_list):
                 scene_list = _self.get_scene_list()
+            if (_self._surface_pool(_self) != None) and _self._surface_pool_defer(_self):
+                # first pass: only collect the missing surfaces, then
+                # compute them all at once in the worker processes
+                try:
+                    for scene in scene_list or [None]:
+                        if scene != None:
+                            cmd.scene(string.strip(scene),animate=0)
+                        cmd.rebuild()
+                        _self._surface_pool_update(_self)
+                finally:
+                    entries = _self._surface_pool_collect(_self)
+                if len(entries):
+                    if not quiet:
+                        print " cache: computing %d surfaces in worker processes."%len(entries)
+                    _self._surface_pool_run(entries,_self=_self)
             for scene in scene_list:
                 scene = string.strip(scene)
                 if not quiet:
@@ -523,6 +550,12 @@ SEE ALSO
                 print " Save-Warning: Unrecognized file type -- defaulting to PDB format."
             format='pdb'
         filename = _self.exp_path(filename)
+        if (format in ('pse','psw')) or (int(state) == 0):
+            _self._sdf_lazy_update(_self,0)
+        elif int(state) > 0:
+            _self._sdf_lazy_update(_self,int(state))
+        else:
+            _self._sdf_lazy_update(_self)
         if format=='pdb': # standard PDB file 
             f=open(filename,"w")
             if f:
@@ -600,7 +633,11 @@ SEE ALSO
                 input_selection=''
             if not quiet:
                 print " Save: Please wait -- writing session file..."
-            io.pkl.toFile(_self.get_session(str(input_selection),int(partial),int(quiet)),filename)
+            if _self.get_setting_boolean('session_chunked'):
+                sessionfile.toFile(_self.get_session(str(input_selection),int(partial),
+                                                     int(quiet),compress=0),filename)
+            else:
+                io.pkl.toFile(_self.get_session(str(input_selection),int(partial),int(quiet)),filename)
             r = DEFAULT_SUCCESS
             if not quiet:
                 print " Save: wrote \""+filename+"\"."
@@ -0,0 +1,157 @@
+#A* -------------------------------------------------------------------
+#B* This file contains source code for the PyMOL computer program
+#C* Copyright (c) Schrodinger, LLC.
+#D* -------------------------------------------------------------------
+#E* It is unlawful to modify or remove this copyright notice.
+#F* -------------------------------------------------------------------
+#G* Please see the accompanying LICENSE file for further information.
+#H* -------------------------------------------------------------------
+#I* Additional authors of this source file include:
+#-*
+#-*
+#-*
+#Z* -------------------------------------------------------------------
+
+# Content-addressed mirror for fetched files
+#
+#   <mirror>/objects/ab/cdef...    file contents, named by their SHA-1
+#   <mirror>/index/<type>/<code>   SHA-1 of the contents for that entry
+#
+# Files are stored as downloaded (compressed where the server
+# compresses them), so identical downloads share one object.  Objects
+# and index entries are written under temporary names and then renamed,
+# which lets several sessions (or cluster nodes sharing the directory)
+# read and fill the same mirror at once.  Contents are checked against
+# their digest when read; a damaged object counts as a miss.  Only
+# four-character alphanumeric codes are accepted, so an entry name can
+# never reach outside the mirror tree.
+
+import os
+import re
+import hashlib
+import threading
+import thread
+
+_code_re = re.compile(r"^[A-Za-z0-9]{4}$")
+_type_re = re.compile(r"^[A-Za-z0-9_]+$")
+_digest_re = re.compile(r"^[0-9a-f]{40}$")
+
+class Mirror:
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.stats = { 'hits' : 0, 'misses' : 0, 'stored' : 0, 'damaged' : 0 }
+
+    def _count(self, key):
+        self.lock.acquire()
+        try:
+            self.stats[key] = self.stats[key] + 1
+        finally:
+            self.lock.release()
+
+    def _valid(self, type, code):
+        return (_code_re.match(str(code)) != None) and \
+               (_type_re.match(str(type)) != None)
+
+    def _index_name(self, type, code):
+        return os.path.join(self.path, 'index', type, code)
+
+    def _object_name(self, digest):
+        return os.path.join(self.path, 'objects', digest[0:2], digest[2:])
+
+    def _write(self, fname, data):
+        dir = os.path.dirname(fname)
+        if not os.path.isdir(dir):
+            try:
+                os.makedirs(dir)
+            except OSError:
+                if not os.path.isdir(dir): # lost a race otherwise
+                    raise
+        tmp = "%s.%d.%d.tmp"%(fname, os.getpid(), thread.get_ident())
+        fp = open(tmp,'wb')
+        try:
+            fp.write(data)
+        finally:
+            fp.close()
+        try:
+            os.rename(tmp, fname)
+        except OSError: # Windows won't rename over an existing file
+            try:
+                os.remove(fname)
+            except OSError:
+                pass
+            os.rename(tmp, fname)
+
+    def get(self, type, code):
+        '''
+        Returns the stored contents for the entry, or None.
+        '''
+        data = None
+        if not self._valid(type, code):
+            return None
+        try:
+            fp = open(self._index_name(type, code),'rb')
+            try:
+                digest = fp.read().strip()
+            finally:
+                fp.close()
+            if _digest_re.match(digest) == None:
+                raise IOError("bad index entry")
+            fp = open(self._object_name(digest),'rb')
+            try:
+                data = fp.read()
+            finally:
+                fp.close()
+            if hashlib.sha1(data).hexdigest() != digest:
+                self._count('damaged')
+                data = None
+        except (IOError, OSError):
+            data = None
+        if data == None:
+            self._count('misses')
+        else:
+            self._count('hits')
+        return data
+
+    def put(self, type, code, data):
+        '''
+        Stores the contents for the entry.  Returns true on success.
+        '''
+        if not self._valid(type, code):
+            return 0
+        digest = hashlib.sha1(data).hexdigest()
+        try:
+            if not os.path.exists(self._object_name(digest)):
+                self._write(self._object_name(digest), data)
+            self._write(self._index_name(type, code), digest + '\n')
+        except (IOError, OSError):
+            return 0
+        self._count('stored')
+        return 1
+
+    def get_stats(self):
+        self.lock.acquire()
+        try:
+            return self.stats.copy()
+        finally:
+            self.lock.release()
+
+_mirrors = {}
+_mirrors_lock = threading.Lock()
+
+def get_mirror(path):
+    '''
+    Returns the Mirror for the directory, keeping one instance per path
+    so that statistics accumulate over the session.
+    '''
+    path = os.path.abspath(os.path.expanduser(path))
+    _mirrors_lock.acquire()
+    try:
+        mirror = _mirrors.get(path)
+        if mirror == None:
+            mirror = Mirror(path)
+            _mirrors[path] = mirror
+        return mirror
+    finally:
+        _mirrors_lock.release()
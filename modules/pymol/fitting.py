@@ -21,7 +21,7 @@ if __name__=='pymol.fitting':
 	import pymol
 	import string
 
-        from cmd import _cmd,lock,unlock,Shortcut, \
+        from cmd import _cmd,lock,unlock,Shortcut,is_string, \
             DEFAULT_ERROR, DEFAULT_SUCCESS, _raising, is_ok, is_error
 
 
@@ -136,6 +136,163 @@ SEE ALSO
                 return ( {"alignment_length": aliLen, "RMSD" : RMSD, "rotation_matrix" : rotMat } )
 
 
+        def cealign_many(target, mobiles, target_state=1, mobile_state=1,
+                         quiet=1, guide=1, d0=3.0, d1=4.0, window=8, gap_max=30,
+                         transform=0, _self=cmd):
+                '''
+DESCRIPTION
+
+    "cealign_many" aligns each object in "mobiles" onto the target
+    using the CE algorithm, and returns a table of the results.
+
+USAGE
+
+    cealign_many target, mobiles [, target_state [, mobile_state [,
+        quiet [, guide [, d0 [, d1 [, window [, gap_max [, transform ]]]]]]]]]
+
+ARGUMENTS
+
+    target = string: selection for the target
+
+    mobiles = string: selection spanning the mobile objects (or, from
+    the API, a list of object names)
+
+    target_state, mobile_state = integer: 0 for the current state
+    {default: 1}
+
+    transform = 0/1: move the mobile objects onto the target {default: 0}
+
+NOTES
+
+    The target is extracted and prepared once, and the mobiles are then
+    aligned in parallel (see "max_threads"), without holding the API
+    lock.  As with "cealign", "guide" applies to the target and to each
+    mobile alike, and mobiles with fewer than 2 * window atoms are not
+    aligned.  The result is a list with
+    one dictionary per mobile object ("object", "alignment_length",
+    "RMSD" and "rotation_matrix", the TTT matrix which "transform_object"
+    takes), ordered by RMSD.  Objects for which no alignment was found
+    are reported with an alignment_length of 0.
+
+EXAMPLES
+
+    # rank models by their fit to a reference
+    cealign_many ref, model_*
+
+    # all against all, from the API
+    names = cmd.get_object_list()
+    table = dict([(a, cmd.cealign_many(a, names)) for a in names])
+
+PYMOL API
+
+    cmd.cealign_many(string target, string or list mobiles,
+        int target_state, int mobile_state, int quiet, int guide,
+        float d0, float d1, int window, int gap_max, int transform)
+
+SEE ALSO
+
+    cealign, alignto, transform_object
+                '''
+                quiet = int(quiet)
+                window = int(window)
+                target_state = int(target_state)
+                mobile_state = int(mobile_state)
+                guide = "" if int(guide)==0 else "and guide"
+
+                # handle PyMOL's macro /// notation, as cealign does
+                target = selector.process("(%s) %s" % (target,guide))
+                if is_string(mobiles):
+                        mobile = "(%s)" % selector.process(mobiles)
+                        mobiles = _self.get_object_list(mobile)
+                        mobile_sele = [ selector.process("(%s) and %s %s" % (name,mobile,guide))
+                                        for name in mobiles or [] ]
+                else:
+                        mobile_sele = [ selector.process("(%s) %s" % (name,guide))
+                                        for name in mobiles ]
+                if not mobiles:
+                        print "CEalign-Error: no mobile objects."
+                        raise pymol.CmdException
+                if (target_state < 0) or (mobile_state < 0):
+                        print "CEalign-Error: states must be 0 (current) or a state number."
+                        raise pymol.CmdException
+                if window < 3:
+                        print "CEalign-Error: window size must be an integer greater than 2."
+                        raise pymol.CmdException
+                if int(gap_max) < 0:
+                        print "CEalign-Error: gap_max must be a positive integer."
+                        raise pymol.CmdException
+
+                r = DEFAULT_ERROR
+                try:
+                        _self.lock(_self)
+                        # packed float32 coordinates: no models to build
+                        target_coords = _cmd.get_coords_str(_self._COb, target,
+                                                            target_state - 1)
+                        coords = []
+                        for sele in mobile_sele:
+                                coords.append(_cmd.get_coords_str(_self._COb, sele,
+                                                                  mobile_state - 1))
+                        r = DEFAULT_SUCCESS
+                finally:
+                        _self.unlock(r,_self)
+                if _self._raising(r,_self): raise pymol.CmdException
+
+                # 12 bytes per atom; empty or failed selections count as short
+                if not (is_string(target_coords) and
+                        (len(target_coords) >= 12 * 2 * window)):
+                        print "CEalign-Error: Your target selection is too short."
+                        raise pymol.CmdException
+                aligned = [ a for a in range(len(coords))
+                            if is_string(coords[a]) and
+                            (len(coords[a]) >= 12 * 2 * window) ]
+
+                # the alignments only read the copied coordinates
+                import time
+                timing = time.time()
+                r = _cmd.cealign_many(_self._COb, target_coords,
+                                      [ coords[a] for a in aligned ],
+                                      float(d0), float(d1), window,
+                                      int(gap_max), quiet)
+                if r == None:
+                        if _self._raising(r,_self): raise pymol.CmdException
+                        return r
+                entries = [ None ] * len(mobiles)
+                for a, entry in zip(aligned, r):
+                        entries[a] = entry
+                if not quiet:
+                        print " CEalign: aligned %d of %d mobiles in %4.2f sec." % (
+                                len(filter(None, entries)), len(mobiles), time.time() - timing)
+
+                results = []
+                for name, entry in zip(mobiles, entries):
+                        if entry == None:
+                                results.append({ "object" : name, "alignment_length" : 0,
+                                                 "RMSD" : -1.0, "rotation_matrix" : None })
+                                continue
+                        (aliLen, RMSD, rotMat) = entry
+                        results.append({ "object" : name, "alignment_length" : aliLen,
+                                         "RMSD" : RMSD, "rotation_matrix" : rotMat })
+                if int(transform):
+                        try:
+                                _self.lock(_self)
+                                for x in results:
+                                        if x["alignment_length"]:
+                                                _self.transform_object(x["object"],
+                                                                       x["rotation_matrix"],
+                                                                       state=0)
+                        finally:
+                                _self.unlock(None,_self)
+                results.sort(lambda a, b: cmp(a["alignment_length"] == 0, b["alignment_length"] == 0)
+                                          or cmp(a["RMSD"], b["RMSD"]))
+                if not quiet:
+                        for x in results:
+                                if x["alignment_length"]:
+                                        print " %-20s RMSD %8.3f over %4d residues" % (
+                                                x["object"], x["RMSD"], x["alignment_length"])
+                                else:
+                                        print " %-20s no alignment" % x["object"]
+                return results
+
         def alignto(target,method="cealign",quiet=1,_self=cmd):
                 """
 DESCRIPTION
@@ -24,6 +24,7 @@ if __name__=='pymol.importing':
           DEFAULT_ERROR, DEFAULT_SUCCESS, _raising, is_ok, is_error, \
           _load, is_list, space_sc, safe_list_eval, is_string, loadable
     import setting
+    import internal
     
     import selector
     try:
@@ -32,10 +33,12 @@ if __name__=='pymol.importing':
         m4x = None
 
     from pymol import parser
-    from chempy.sdf import SDF,SDFRec
+    from chempy.sdf import SDF,SDFRec,SDFIndex
     from chempy.cif import CIF,CIFRec
     from chempy import io,PseudoFile
     import pymol
+    from pymol import sessionfile
+    from pymol import fetchmirror
     import copy
     import traceback
     
@@ -271,6 +274,49 @@ PYMOL API
         lst.extend(list(arg))
         return apply(_self.load_object,lst,kw)
 
+    def load_coords(coords, selection, state=1, quiet=1, _self=cmd):
+        '''
+DESCRIPTION
+
+    "load_coords" replaces the coordinates of the atoms in a selection
+    for a single, existing state.  It is the inverse of "get_coords".
+
+PYMOL API
+
+    cmd.load_coords(coords, string selection [, int state [, int quiet ]])
+
+ARGUMENTS
+
+    coords = (N,3) numpy array, any buffer of packed float32 triples,
+    or a list of [x,y,z] lists, in the same atom order as "get_coords"
+
+    state = integer: 0 for the current state {default: 1}
+
+SEE ALSO
+
+    get_coords, load_traj
+    '''
+        import array
+        try:
+            import numpy
+            coords = numpy.ascontiguousarray(coords,numpy.float32)
+        except ImportError:
+            if is_list(coords):
+                flat = array.array('f')
+                for v in coords:
+                    flat.extend(v)
+                coords = flat
+        selection = selector.process(selection)
+        r = DEFAULT_ERROR
+        try:
+            _self.lock(_self)
+            r = _cmd.load_coords_str(_self._COb,"("+str(selection)+")",coords,
+                                     int(state)-1,int(quiet))
+        finally:
+            _self.unlock(r,_self)
+        if _self._raising(r,_self): raise pymol.CmdException
+        return r
+
     def load_traj(filename,object='',state=0,format='',interval=1,
                       average=1,start=1,stop=-1,max=-1,selection='all',image=1,
                       shift="[0.0,0.0,0.0]",plugin="",_self=cmd):
@@ -305,6 +351,12 @@ NOTES
     The average option is not a running average.  To perform this type of
     average, use the "smooth" command after loading the trajectory file.
 
+    When the "traj_lazy_cache" setting is greater than zero, trajectories
+    read through the VMD molfile plugins are only indexed at load time
+    and states are decoded on demand, keeping at most that many decoded
+    states in memory.  States edited with alter_state or load_coords
+    stay resident, and sessions store every state.
+
 SEE ALSO
 
     load
@@ -850,8 +902,13 @@ SEE ALSO
             # special handling of pse files
             if ftype == loadable.pse:
                 ftype = -1
-                r = _self.set_session(io.pkl.fromFile(fname),quiet=quiet,
+                if sessionfile.isChunked(fname):
+                    session = sessionfile.fromFile(fname)
+                else:
+                    session = io.pkl.fromFile(fname)
+                r = _self.set_session(session,quiet=quiet,
                                       partial=partial,steal=1)
+                session = None
                 if not partial:
                     fname = fname.replace("\\","/") # always use unix-like path separators	
                     _self.set("session_file",fname,quiet=1)
@@ -875,6 +932,367 @@ SEE ALSO
         if _self._raising(r,_self): raise pymol.CmdException
         return r
 
+    # load_many worker processes: each one parses files with its own
+    # headless PyMOL instance (see internal._pool_init) and hands back
+    # the objects as partial session data, which pickles and so travels
+    # between processes
+
+    def _load_many_job(job):
+        (fname, oname, format, discrete) = job
+        p_cmd = internal._pool_pymol.cmd
+        try:
+            try:
+                p_cmd.load(fname, oname, format=format, discrete=discrete,
+                           quiet=1, zoom=0)
+                return p_cmd.get_session(oname, partial=1, compress=0, cache=0)
+            except:
+                return None
+        finally:
+            p_cmd.delete('all')
+
+    def load_many(files, format='', discrete=-1, group='', processes=-1,
+                  quiet=1, _self=cmd):
+        '''
+DESCRIPTION
+
+    "load_many" loads a large number of molecular files, one object per
+    file, parsing them in parallel worker processes.
+
+USAGE
+
+    load_many files [, format [, discrete [, group [, processes ]]]]
+
+ARGUMENTS
+
+    files = string: file name or wildcard pattern (or, from the API, a
+    list of them)
+
+    format = string: file format {default: use file extensions}
+
+    group = string: group object to put the new objects into {default: }
+
+    processes = integer: number of worker processes {default: -1 =
+    number of processors}
+
+EXAMPLES
+
+    load_many docking/*.sdf, group=poses
+
+NOTES
+
+    Objects are named after their files, as with "load".  Files are
+    read by worker processes which each run their own PyMOL instance,
+    and all objects are then added in a single batch.  Files whose
+    object already exists are loaded with "load" afterwards, so their
+    states are appended as usual.  Where worker processes can't be
+    started (no fork), the files are loaded one after the other.
+
+PYMOL API
+
+    cmd.load_many(string or list files, string format, int discrete,
+                  string group, int processes, int quiet)
+
+SEE ALSO
+
+    load, group
+        '''
+        import glob
+        r = DEFAULT_ERROR
+        quiet = int(quiet)
+        processes = int(processes)
+        discrete = int(discrete)
+        if is_string(files):
+            files = [files]
+        fnames = []
+        for pattern in files:
+            pattern = _self.exp_path(string.strip(pattern))
+            found = glob.glob(pattern)
+            found.sort()
+            if not len(found) and os.path.exists(pattern):
+                found = [pattern]
+            fnames.extend(found)
+        if not len(fnames):
+            print " Error: no files found."
+            if _self._raising(r,_self): raise pymol.CmdException
+            return r
+        # object names as "load" makes them, but unique within the batch
+        onames = []
+        taken = {}
+        for fname in fnames:
+            oname = re.sub(r".*\/|.*\\","",fname) # strip path
+            oname = gz_ext_re.sub("",oname) # strip gz
+            oname = file_ext_re.sub("",oname) # strip extension
+            oname = safe_oname_re.sub("_",oname)
+            if not len(oname): # safety
+                oname = 'obj01'
+            if taken.has_key(oname):
+                cnt = 2
+                while taken.has_key("%s_%d"%(oname,cnt)):
+                    cnt = cnt + 1
+                oname = "%s_%d"%(oname,cnt)
+            taken[oname] = 1
+            onames.append(oname)
+        if processes < 0:
+            try:
+                import multiprocessing
+                processes = multiprocessing.cpu_count()
+            except:
+                processes = 1
+        # objects which already exist get their new states appended by
+        # "load" itself: partial sessions would replace them instead
+        existing = {}
+        for name in _self.get_names('objects'):
+            existing[name] = 1
+        pairs = []
+        serial = []
+        for fname, oname in zip(fnames, onames):
+            if existing.has_key(oname):
+                serial.append((fname, oname))
+            else:
+                pairs.append((fname, oname))
+        processes = min(processes, len(pairs))
+        pool = None
+        if (processes > 1) and hasattr(os,'fork'):
+            try:
+                pool = _self._pool_new(processes)
+            except:
+                traceback.print_exc()
+        r = DEFAULT_SUCCESS
+        if pool == None: # one by one, in this process
+            serial = zip(fnames, onames)
+        else:
+            if not quiet:
+                print " load_many: reading %d files in %d processes."%(len(pairs),processes)
+            jobs = map(lambda x,t=str(format),d=discrete:(x[0],x[1],t,d), pairs)
+            try:
+                chunk = max(1, min(64, len(jobs) / (4 * processes)))
+                results = pool.map(_load_many_job, jobs, chunk)
+            finally:
+                _self._pool_free(pool)
+            # merge the partial sessions so that all objects go in at once;
+            # color indices and unique ids are per worker instance, so
+            # only sessions with the same custom colors are merged
+            batch = []
+            merged = {}
+            for (fname, oname), result in zip(pairs, results):
+                if result == None:
+                    print " Error: unable to load '%s'."%fname
+                    r = DEFAULT_ERROR
+                elif len(result.get('unique_settings') or []):
+                    batch.append(result) # unique ids are per instance: keep apart
+                else:
+                    key = repr((result.get('colors'), result.get('color_ext')))
+                    session = merged.get(key)
+                    if session == None:
+                        merged[key] = result
+                        batch.append(result)
+                    else:
+                        session['names'].extend(result['names'])
+            results = None
+            merged = None
+            try:
+                _self.lock(_self)
+                for session in batch:
+                    if is_error(_self.set_session(session, partial=1, quiet=quiet,
+                                                  steal=1)):
+                        r = DEFAULT_ERROR
+            finally:
+                _self.unlock(r,_self)
+            batch = None
+            session = None
+        for fname, oname in serial:
+            if is_error(_self.load(fname, oname, format=format, discrete=discrete,
+                                   quiet=quiet, zoom=0)):
+                r = DEFAULT_ERROR
+        names = {}
+        for name in _self.get_names('objects'):
+            names[name] = 1
+        loaded = filter(lambda x,n=names:n.has_key(x), onames)
+        if len(group) and len(loaded):
+            _self.group(group, string.join(loaded,' '))
+        if len(loaded) and _self.get_setting_boolean('auto_zoom'):
+            _self.zoom(group or string.join(loaded,' '))
+        if not quiet:
+            print " load_many: %d of %d files loaded."%(len(loaded),len(fnames))
+        if _self._raising(r,_self): raise pymol.CmdException
+        return r
+
+    _sdf_filter_re = re.compile(r"^\s*([^<>=!]*[^<>=!\s])\s*(<=|>=|==|!=|<|>|=)\s*(.*\S)\s*$")
+
+    def _sdf_filter_test(op, value):
+        try:
+            value = float(value)
+        except ValueError:
+            pass
+        if op == '<':
+            return lambda x,v=value: x < v
+        elif op == '<=':
+            return lambda x,v=value: x <= v
+        elif op == '>':
+            return lambda x,v=value: x > v
+        elif op == '>=':
+            return lambda x,v=value: x >= v
+        elif op == '!=':
+            return lambda x,v=value: x != v
+        return lambda x,v=value: x == v
+
+    def load_sdf(filename, object='', records='', filter='', sort='',
+                 top=0, lazy=0, quiet=1, _self=cmd):
+        '''
+DESCRIPTION
+
+    "load_sdf" loads selected records of a multi-record SDF file as
+    the states of one object, without reading the rest of the file.
+
+USAGE
+
+    load_sdf filename [, object [, records [, filter [, sort [, top [, lazy ]]]]]]
+
+ARGUMENTS
+
+    filename = string: SDF file
+
+    object = string: name of the object {default: filename prefix}
+
+    records = string: 1-based record numbers and ranges, such as "1-10
+    25" {default: all records}
+
+    filter = string: data item condition, such as "score<-8.5" or
+    "series=A" {default: none}
+
+    sort = string: data item to order the records by; prefix it with
+    "-" for descending order {default: file order}
+
+    top = integer: keep only the first "top" records {default: 0 = all}
+
+    lazy = 0/1: read each record only once its state is visited
+    {default: 0}
+
+EXAMPLES
+
+    load_sdf screen.sdf, hits, sort=score, top=100
+    load_sdf screen.sdf, hits, filter=score<-9, lazy=1
+
+NOTES
+
+    On first use, the file is scanned once and an index of record
+    offsets and data item values is saved beside it as
+    "<filename>.idx", so that later loads seek directly to the
+    records they need.
+
+    With lazy=1, only the first and last states are read at once.
+    Other states are read when they are visited with "frame",
+    "forward", "backward" or "set state", and before they are read
+    back out by "get_coords", "get_model", "iterate_state" or "save".
+    "mplay" reads all remaining states before the movie starts.
+
+PYMOL API
+
+    cmd.load_sdf(string filename, string object, string records,
+                 string filter, string sort, int top, int lazy, int quiet)
+
+SEE ALSO
+
+    load, load_many
+        '''
+        r = DEFAULT_ERROR
+        quiet = int(quiet)
+        top = int(top)
+        lazy = int(lazy)
+        fname = _self.exp_path(filename)
+        try:
+            index = SDFIndex(fname)
+        except (IOError, OSError):
+            print " Error: unable to open '%s'."%fname
+            if _self._raising(r,_self): raise pymol.CmdException
+            return r
+        n_rec = len(index)
+        # record numbers
+        if len(string.strip(str(records))):
+            chosen = []
+            for spec in string.split(string.replace(str(records),',',' ')):
+                try:
+                    if '-' in spec[1:]:
+                        (first, last) = string.split(spec,'-',1)
+                        first = int(first)
+                        last = int(last)
+                    else:
+                        first = last = int(spec)
+                except ValueError:
+                    print " Error: invalid record specification '%s'."%spec
+                    index.close()
+                    if _self._raising(r,_self): raise pymol.CmdException
+                    return r
+                chosen.extend(range(max(first,1)-1, min(last,n_rec)))
+        else:
+            chosen = range(n_rec)
+        # data item filter
+        if len(string.strip(filter)):
+            match = _sdf_filter_re.match(filter)
+            if not match:
+                print " Error: invalid filter '%s'."%filter
+                index.close()
+                if _self._raising(r,_self): raise pymol.CmdException
+                return r
+            (kee, op, value) = match.groups()
+            passed = {}
+            for rec in index.select(kee, _sdf_filter_test(op, value)):
+                passed[rec] = 1
+            chosen = [ rec for rec in chosen if passed.has_key(rec) ]
+        # ordering
+        sort = string.strip(sort)
+        if len(sort):
+            if sort[0:1] == '-':
+                chosen = index.sort(sort[1:], chosen, reverse=1)
+            else:
+                chosen = index.sort(sort, chosen)
+        if top > 0:
+            chosen = chosen[:top]
+        if not len(chosen):
+            print " Error: no matching records in '%s'."%fname
+            index.close()
+            if _self._raising(r,_self): raise pymol.CmdException
+            return r
+        oname = string.strip(str(object))
+        if not len(oname):
+            oname = re.sub(r".*\/|.*\\","",fname) # strip path
+            oname = file_ext_re.sub("",oname) # strip extension
+            oname = safe_oname_re.sub("_",oname)
+            if not len(oname): # safety
+                oname = 'obj01'
+        if lazy and (len(chosen) > 2):
+            states = [ 1, len(chosen) ]
+        else:
+            states = range(1, len(chosen) + 1)
+            lazy = 0
+        try:
+            _self.lock(_self)
+            for state in states:
+                r = _load(oname,index.read_text(chosen[state-1]),state,
+                          loadable.sdf2str,0,1,quiet,zoom=0,_self=_self)
+                if is_error(r):
+                    break
+            _cmd.finish_object(_self._COb,str(oname))
+        finally:
+            _self.unlock(r,_self)
+        if lazy and not is_error(r):
+            loaded = {}
+            for state in states:
+                loaded[state] = 1
+            if getattr(_self._pymol,'_sdf_lazy',None) == None:
+                _self._pymol._sdf_lazy = {}
+            _self._pymol._sdf_lazy[oname] = (index, chosen, loaded)
+        else:
+            index.close()
+        if not is_error(r):
+            if _self.get_setting_boolean('auto_zoom'):
+                _self.zoom(oname)
+            if not quiet:
+                print " load_sdf: %d of %d records loaded into \"%s\"."%(
+                    len(chosen),n_rec,oname)
+        if _self._raising(r,_self): raise pymol.CmdException
+        return r
+
     def load_embedded(key=None, name=None, state=0, finish=1, discrete=1,
                       quiet=1, zoom=-1, multiplex=-2, _self=cmd):
         '''
@@ -1233,17 +1651,23 @@ PYMOL API
         if _self._raising(r,_self): raise pymol.CmdException
         return r
 
-    def _fetch(code,name,state,finish,discrete,multiplex,zoom,type,path,file,quiet,_self=cmd):
-        import urllib
-        import gzip
-        import os
-        import string
-        import time
-        import re
+    # worldwide servers
+    _fetch_hosts = { "pdb"  : "ftp://ftp.wwpdb.org/pub/pdb/",
+                     "pdbe" : "ftp://ftp.ebi.ac.uk/pub/databases/rcsb/pdb-remediated/", 
+                     "pdbj" : "ftp://pdb.protein.osaka-u.ac.jp/pub/pdb/" }
 
+    # paths to the PDBs on each server, by type (the same on all of them)
+    _fetch_host_paths = { "bio"  : "data/biounit/coordinates/divided/",
+                          "pdb"  : "data/structures/divided/pdb/",
+                          "cif"  : "data/structures/divided/structure_factors/",
+                          }
+
+    def _fetch_type(type):
         # file types can be: fofc, 2fofc, pdb, pdb1, pdb2, pdb3, etc...
         # bioType is the string representation of the type
         # typeExt is the file name extension based on type
+        bioType = None
+        typeExt = None
         if type == 'fofc':
             bioType = type
             typeExt = '_fofc.omap'
@@ -1259,51 +1683,151 @@ PYMOL API
         elif re.search("^pdb\d+$", type) != None:
             bioType = 'bio'
             typeExt = "." + re.search("^pdb\d+$", type).group()
-
-        # worldwide servers
-        fetchHosts = {  "pdb"  : "ftp://ftp.wwpdb.org/pub/pdb/",
-                        "pdbe" : "ftp://ftp.ebi.ac.uk/pub/databases/rcsb/pdb-remediated/", 
-                        "pdbj" : "ftp://pdb.protein.osaka-u.ac.jp/pub/pdb/" }
-        
-        # paths to the PDBs on each server, by type
-        hostPaths = { "pdb" :
-                      { "bio"  : "data/biounit/coordinates/divided/",
-                        "pdb"  : "data/structures/divided/pdb/",
-                        "cif"  : "data/structures/divided/structure_factors/",
-                        },
-                      "pdbe" :
-                      { "bio"  : "data/biounit/coordinates/divided/",
-                        "pdb"  : "data/structures/divided/pdb/",
-                        "cif"  : "data/structures/divided/structure_factors/",
-                        },
-                      "pdbj" :
-                      { "bio"  : "data/biounit/coordinates/divided/",
-                        "pdb"  : "data/structures/divided/pdb/",
-                        "cif"  : "data/structures/divided/structure_factors/",
-                        }
-                    }
-
-        # portion of the link after the code
-        hostPost = { "pdb" : { "pdb" : ".ent.gz",
-                               "bio" : typeExt+".gz",
-                               "cif" : "sf.ent.gz" },
-                     "pdbe": { "pdb" : ".ent.gz",
-                               "bio" : typeExt+".gz",
-                               "cif" : "sf.ent.gz" },
-                     "pdbj": { "pdb" : ".ent.gz",
-                               "bio" : typeExt+".gz",
-                               "cif" : "sf.ent.gz" }
-                   }
-
-        # users could set this to something nonsensical
+        return (bioType, typeExt)
+
+    def _fetch_remote(code,type,fetch_host):
+        # returns (url, path within the archive tree or None, gzipped)
+        (bioType, typeExt) = _fetch_type(type)
+        remoteCode = string.lower(code)
+        if bioType in [ 'pdb', 'bio', 'cif' ]:
+            # pdb files are: pdb3XYZ whereas pdb1 files are 1XYZ.pdb3
+            prePDB = ''
+            if type=='pdb':
+                prePDB = 'pdb'
+            elif type=="cif":
+                prePDB = 'r'
+            # portion of the link after the code, eg .pdb3.gz
+            remotePost = { "pdb" : ".ent.gz",
+                           "bio" : typeExt+".gz",
+                           "cif" : "sf.ent.gz" }[bioType]
+            # eg, data/structures/divided/pdb/fo/pdb1foo.ent.gz
+            remotePath = (_fetch_host_paths[bioType] + remoteCode[1:3] + "/" +
+                          prePDB + remoteCode + remotePost)
+            return (_fetch_hosts[fetch_host] + remotePath, remotePath, 1)
+        elif (bioType in ("fofc" ,"2fofc")) and (len(remoteCode)>=4):
+            # for ED maps,
+            # http://eds.bmc.uu.se/eds/dfs/cb/1cbs/1cbs.omap
+            # http://eds.bmc.uu.se/eds/dfs/cb/1cbs/1cbs_diff.omap
+            url = "http://eds.bmc.uu.se/eds/dfs/" + remoteCode[1:3] + "/" + remoteCode + "/" + remoteCode
+            if type=="2fofc":
+                url += ".omap"
+            else:  # default to fofc
+                url += "_diff.omap"
+            return (url, None, 0)
+        return None
+
+    def _fetch_options(_self=cmd):
+        # settings are read once, so that download threads need not
+        # call into PyMOL
         fetch_host = setting.get("fetch_host", _self=_self)
+        # users could set this to something nonsensical
         if fetch_host not in ( "pdb", "pdbe", "pdbj" ):
             fetch_host = "pdb"
-                        
-        fobj = None
-        fname = None
-        auto_close_file = 1
+        mirror = None
+        mirror_path = setting.get("fetch_mirror", _self=_self)
+        if len(mirror_path):
+            mirror = fetchmirror.get_mirror(_self.exp_path(mirror_path))
+        local_path = setting.get("fetch_local_path", _self=_self)
+        if len(local_path):
+            local_path = _self.exp_path(local_path)
+        offline = _self.get_setting_boolean("fetch_offline")
+        return (fetch_host, mirror, local_path, offline)
+
+    def _fetch_content(code,type,options,quiet=1):
+        # returns the (uncompressed) contents of the entry, or None;
+        # looks in the mirror and the local archive tree before going
+        # to the network, and never goes there when offline
+        import urllib
+        import gzip
+        import cStringIO
+        import time
+        (fetch_host, mirror, local_path, offline) = options
+        remote = _fetch_remote(code,type,fetch_host)
+        if remote == None:
+            return None
+        (url, remotePath, gzipped) = remote
+        key = string.lower(code)
+        raw = None
+        if mirror != None:
+            raw = mirror.get(type, key)
+        if (raw == None) and len(local_path) and remotePath:
+            # either a copy of the whole archive, or just of the divided/ part
+            for fname in (os.path.join(local_path, remotePath),
+                          os.path.join(local_path, string.split(remotePath,'divided/',1)[1])):
+                try:
+                    fp = open(fname,'rb')
+                    try:
+                        raw = fp.read()
+                    finally:
+                        fp.close()
+                    break
+                except IOError:
+                    pass
+        if (raw == None) and not offline:
+            tries = 0
+            while (raw == None) and (tries<3): # try loading URL up to 3 times
+                tries = tries + 1
+                try:
+                    filename = urllib.urlretrieve(url)[0]
+                except:
+                    pass
+                else:
+                    if os.path.exists(filename):
+                        if (os.path.getsize(filename) > 0): # If 0, then code was invalid
+                            raw = open(filename,'rb').read()
+                        try:
+                            os.remove(filename)
+                        except:
+                            pass
+                    if (raw != None) and not gzipped and (raw[0:1]=='<'): # file not found
+                        print "Electron density map for %s not found on server." % key
+                        return None
+                if raw == None:
+                    time.sleep(0.1)
+            if (raw != None) and (mirror != None):
+                mirror.put(type, key, raw)
+        if raw == None:
+            return None
+        if gzipped:
+            try:
+                raw = gzip.GzipFile(fileobj=cStringIO.StringIO(raw)).read()
+            except IOError:
+                print "Error-fetch: damaged file for '%s'."%code
+                return None
+        return raw
+
+    def _fetch_many(codes,type,options,n_thread,quiet=1):
+        # downloads on a bounded pool of threads; returns a dictionary of
+        # the contents by code, with None for the codes that failed
+        import Queue
+        import threading
+        queue = Queue.Queue()
+        for code in codes:
+            queue.put(code)
+        result = {}
+        def worker(queue=queue,result=result,type=type,options=options,quiet=quiet):
+            while 1:
+                try:
+                    code = queue.get_nowait()
+                except Queue.Empty:
+                    break
+                try:
+                    result[code] = _fetch_content(code,type,options,quiet)
+                except:
+                    traceback.print_exc()
+                    result[code] = None
+        threads = []
+        for a in range(min(n_thread,len(codes))):
+            t = threading.Thread(target=worker)
+            t.setDaemon(1)
+            t.start()
+            threads.append(t)
+        for t in threads:
+            t.join()
+        return result
 
+    def _fetch_file_name(code,type,path,file):
+        # local file name for the entry, where fetched files are kept
         if path and not file:
             file = 1
         if (file==1) or (file=='1') or (file=='auto'): 
@@ -1311,18 +1835,26 @@ PYMOL API
                 fname = os.path.join(path,string.lower(code))
             else:
                 fname = string.lower(code)
-                
+            return fname + _fetch_type(type)[1]
+        elif is_string(file):
+            return file
+        return None
+
+    def _fetch(code,name,state,finish,discrete,multiplex,zoom,type,path,file,quiet,
+               _self=cmd,options=None,content=None):
+        (bioType, typeExt) = _fetch_type(type)
+        fobj = None
+        fname = _fetch_file_name(code,type,path,file)
+        auto_close_file = 1
+
+        if fname == None:
+            if file and not is_string(file):
+                fobj = file
+                auto_close_file = 0
+        elif (file==1) or (file=='1') or (file=='auto') or (path and not file):
             if bioType in [ 'fofc', '2fofc', 'cif' ]:
-                fname += typeExt
                 if name in _self.get_names("objects"):  # if the PDB exists, don't over write it
                     name = name + "_" + bioType
-            else:
-                fname += typeExt
-        elif is_string(file):
-            fname = file
-        elif file:
-            fobj = file
-            auto_close_file = 0
         if fname and not fobj:
             # if the file's cached locally, use it
             if os.path.exists(fname):
@@ -1332,128 +1864,34 @@ PYMOL API
                 else:                    
                     return _self.load(fname,name,state,'pdb',finish,discrete,quiet,
                                   multiplex,zoom)
-        tries = 0
+        if content == None:
+            if options == None:
+                options = _fetch_options(_self)
+            content = _fetch_content(code,type,options,quiet)
         r = DEFAULT_ERROR
-        done = 0
-        
-        while (done == 0) and (tries<3): # try loading URL up to 3 times
-            tries = tries + 1
-            if bioType in [ 'pdb', 'bio', 'cif' ]:
-                # pdb files are: pdb3XYZ whereas pdb1 files are 1XYZ.pdb3
-                prePDB = ''
-                if type=='pdb':
-                    prePDB = 'pdb'
-                elif type=="cif":
-                    prePDB = 'r'
-
-                # eg, ftp://ftp.ebi.ac.uk/pub/databases/rcsb/pdb-remediated/data/structures/divided/pdb/
-                remotePre = fetchHosts[fetch_host] + hostPaths[fetch_host][bioType]
-                # eg, fo/pdb1foo
-                remoteCode = string.lower(code)[1:3] + "/" + prePDB + string.lower(code)
-                # eg, .pdb3.gz
-                remotePost = hostPost[fetch_host][bioType]
-                
-                try:
-                    #print "remotePre: %s" % remotePre
-                    #print "remoteCode: %s" % remoteCode
-                    #print "remotePost: %s" % remotePost
-                    url = remotePre + remoteCode + remotePost
-                    #print url
-                    
-                    if url!=None:
-                        filename = urllib.urlretrieve(url)[0]
-                except:
-#                    print traceback.print_exc()
-                    pass
-                else:
-                    if os.path.exists(filename):
-                        if (os.path.getsize(filename) > 0): # If 0, then pdb code was invalid
-                            try:
-                                abort = 0
-                                pdb_str = gzip.open(filename).read()
-                                if fname and not fobj:
-                                    fobj = open(fname,'wb')
-                                if fobj:
-                                    fobj.write(pdb_str)
-                                    fobj.flush()
-                                    if auto_close_file:
-                                        fobj.close()
-                                if bioType=="cif":
-                                    if not quiet:
-                                        print "Downloaded CIF file '%s' to' '%s'." % (name,fname)
-                                else:
-                                    r = _self.read_pdbstr(pdb_str,name,state,finish,
-                                                          discrete,quiet,zoom,multiplex)
-                                done = 1
-                            except IOError:
-#                                print traceback.print_exc()
-                                pass
-                        else:
-#                            print traceback.print_exc()
-                            pass
-                        try:
-                            os.remove(filename)
-                        except:
-                            pass
-            elif bioType in ("fofc" ,"2fofc"):
-            # for ED maps,
-            # http://eds.bmc.uu.se/eds/dfs/cb/1cbs/1cbs.omap
-            # http://eds.bmc.uu.se/eds/dfs/cb/1cbs/1cbs_diff.omap
-                url = None
-                remoteCode = string.lower(code)
-                if len(remoteCode)<4:
-                    pass
-                else:
-                    url = "http://eds.bmc.uu.se/eds/dfs/" + remoteCode[1:3] + "/" + remoteCode + "/" + remoteCode
-                    if type=="2fofc":
-                        url += ".omap"
-                    else:  # default to fofc
-                        url += "_diff.omap"
-
-                if url == None:
-                    pass
+        if content != None:
+            try:
+                if fname and not fobj:
+                    fobj = open(fname,'wb')
+                if fobj:
+                    fobj.write(content)
+                    fobj.flush()
+                    if auto_close_file:
+                        fobj.close()
+                if bioType=="cif":
+                    if not quiet:
+                        print "Downloaded CIF file '%s' to' '%s'." % (name,fname)
+                    r = DEFAULT_SUCCESS
+                elif bioType in ("fofc" ,"2fofc"):
+                    if name in _self.get_names("objects"):  # if the PDB exists, don't over write it
+                        name = name + "_" + type
+                    r = _self.load(fname, name, state, loadable.brix, finish, discrete, quiet, multiplex, zoom)
                 else:
-                    try:
-                        filename = urllib.urlretrieve(url)[0]
-                    except:
-                        pass
-                    else:
-                        if os.path.exists(filename):
-                            if (os.path.getsize(filename) > 0): # If 0, then map doesn't exist
-                                try:
-                                    abort = 0
-                                    map_str = open(filename,'rb').read()
-                                    if map_str[0]=='<':  # file not found
-                                        print "Electron density map for %s not found on server." % remoteCode
-                                        os.remove(filename)
-                                        break
-                                    if fname and not fobj:
-                                        fobj = open(fname,'wb')
-                                    if fobj:
-                                        fobj.write(map_str)
-                                        fobj.flush()
-                                        if auto_close_file:
-                                            fobj.close()
-                                    if name in _self.get_names("objects"):  # if the PDB exists, don't over write it
-                                        name = name + "_" + type
-                                    #print "r = _self.load(",fname, name, state, loadable.brix, finish, discrete, quiet, multiplex, zoom, ")"
-                                    r = _self.load(fname, name, state, loadable.brix, finish, discrete, quiet, multiplex, zoom)
-                                    done = 1
-                                except IOError:
-    #                                print traceback.print_exc()
-                                    pass
-                            else:
-    #                            print traceback.print_exc()
-                                pass
-                            try:
-                                os.remove(filename)
-                            except:
-                                pass
-                          
-            if done == 0:
-                time.sleep(0.1)
-        if done == 0:
-            r = DEFAULT_ERROR
+                    r = _self.read_pdbstr(content,name,state,finish,
+                                          discrete,quiet,zoom,multiplex)
+            except IOError:
+                r = DEFAULT_ERROR
+        if is_error(r):
             print "Error-fetch: unable to load '%s'."%code
         return r
     
@@ -1465,15 +1903,37 @@ PYMOL API
         if (name!='') and (len(code_list)>1) and (discrete<0):
             discrete = 1 # by default, select discrete  when loading
             # multiple PDB entries into a single object
+        code_list = filter(None,map(string.strip,code_list))
+        options = _fetch_options(_self)
+        contents = {}
+        n_thread = int(setting.get("fetch_threads", _self=_self))
+        if (len(code_list)>1) and (n_thread>1):
+            # download concurrently, then load in the order given
+            todo = []
+            for obj_code in code_list:
+                fname = _fetch_file_name(obj_code,type,path,file)
+                if not (fname and os.path.exists(fname)):
+                    todo.append(obj_code)
+            if len(todo)>1:
+                contents = _fetch_many(todo,type,options,n_thread,quiet)
         for obj_code in code_list:
-            obj_code = string.strip(obj_code)
-            if len(obj_code):
-                if name=='':
-                    obj_name = obj_code
-                else:
-                    obj_name = name
-                r = _fetch(obj_code,obj_name,state,finish,
-                           discrete,multiplex,zoom,type,path,file,quiet,_self)
+            if name=='':
+                obj_name = obj_code
+            else:
+                obj_name = name
+            if contents.has_key(obj_code) and (contents[obj_code] == None):
+                # already tried (and failed) in the batch -- don't retry
+                print "Error-fetch: unable to load '%s'."%obj_code
+                r = DEFAULT_ERROR
+                continue
+            r = _fetch(obj_code,obj_name,state,finish,
+                       discrete,multiplex,zoom,type,path,file,quiet,_self,
+                       options,contents.get(obj_code))
+        mirror = options[1]
+        if (mirror != None) and not quiet:
+            stats = mirror.get_stats()
+            print " fetch: mirror %d hits, %d misses, %d stored (this session)."%(
+                stats['hits'],stats['misses'],stats['stored'])
         return r
     
     def fetch(code, name='', state=0, finish=1, discrete=-1,
@@ -1514,6 +1974,13 @@ NOTES
 
     Fetch requires a direct connection to the internet and thus may
     not work behind certain types of network firewalls.
+
+    Several codes are downloaded at once, on up to "fetch_threads"
+    threads.  If "fetch_mirror" names a directory, downloads are kept
+    there (stored by content digest) and later fetches are served from
+    it.  "fetch_local_path" can point to a local copy of the wwPDB
+    archive tree, which is used before the network.  With
+    "fetch_offline" set, only the mirror and the local tree are used.
     
         '''
         import threading
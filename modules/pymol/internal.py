@@ -7,15 +7,152 @@ import traceback
 import thread
 import re
 import time
+import os
+import heapq
+import hashlib
+import cPickle
 import pymol
 
 from chempy import io
 
 from cmd import DEFAULT_ERROR, DEFAULT_SUCCESS, loadable, _load2str, Shortcut, \
-   is_string, is_ok
+   is_string, is_ok, repres
 
 # cache management:
 
+# Entries live in the _pymol._cache list (which is what gets saved in
+# sessions) and are found through a _CacheIndex, which maps the tuple
+# of input hash codes to the entries sharing it and orders the entries
+# for eviction with a lazily-updated heap:
+#
+#   cache_policy 0: least recently used entries are evicted first
+#   cache_policy 1: least frequently used (ties: least recently used)
+#
+# When cache_dir is set, entries are also written to that directory,
+# one file per entry named after a SHA-1 of the input, and read back
+# on a miss -- so results persist across sessions and processes.
+
+class _CacheIndex:
+
+    def __init__(self, cache, policy=0):
+        self.cache = cache
+        self.policy = policy
+        self.table = {}
+        self.heap = []
+        self.stamp = {} # id(entry) -> seq of its live heap item
+        self.seq = 0
+        for entry in cache:
+            while len(entry)<6:
+                entry.append(0)
+            self.table.setdefault(entry[1],[]).append(entry)
+        self.reorder(policy)
+
+    def reorder(self, policy):
+        self.policy = policy
+        self.heap = []
+        self.stamp = {}
+        for entry in self.cache:
+            self.touch(entry)
+
+    def touch(self, entry):
+        self.seq = self.seq + 1
+        if self.policy == 1:
+            item = (entry[4], entry[5], self.seq, entry)
+        else:
+            item = (entry[5], self.seq, entry)
+        self.stamp[id(entry)] = self.seq
+        heapq.heappush(self.heap, item)
+        if len(self.heap) > 4*len(self.cache) + 64:
+            # too many stale items: rebuild
+            self.reorder(self.policy)
+
+    def find(self, hash_code, input):
+        for entry in self.table.get(hash_code,()):
+            if entry[2] == input:
+                return entry
+        return None
+
+    def add(self, entry):
+        self.cache.append(entry)
+        self.table.setdefault(entry[1],[]).append(entry)
+        self.touch(entry)
+
+    def evict(self, cur_size, max_size):
+        # pop the lowest-priority entries until the size requirement is met
+        gone = {}
+        n_left = len(self.cache)
+        while (cur_size>max_size) and (n_left>1) and len(self.heap):
+            item = heapq.heappop(self.heap)
+            entry = item[-1]
+            if self.stamp.get(id(entry)) != item[-2]:
+                continue # stale
+            del self.stamp[id(entry)]
+            bucket = self.table[entry[1]]
+            bucket.remove(entry)
+            if not len(bucket):
+                del self.table[entry[1]]
+            gone[id(entry)] = 1
+            cur_size = cur_size - entry[0]
+            n_left = n_left - 1
+        if len(gone):
+            self.cache[:] = filter(lambda x,g=gone:not g.has_key(id(x)), self.cache)
+        return cur_size
+
+def _cache_index(_self=cmd, policy=None):
+    # (re)build the index whenever _pymol._cache has been replaced
+    _pymol = _self._pymol
+    index = getattr(_pymol,"_cache_index",None)
+    if (index == None) or (index.cache is not _pymol._cache):
+        if policy == None:
+            policy = 0
+        index = _CacheIndex(_pymol._cache, policy)
+        _pymol._cache_index = index
+    elif (policy != None) and (policy != index.policy):
+        index.reorder(policy)
+    return index
+
+def _cache_disk_path(cache_dir, entry):
+    try:
+        data = cPickle.dumps((entry[1],entry[2]),2)
+    except:
+        return None
+    return os.path.join(cache_dir, hashlib.sha1(data).hexdigest() + ".pkc")
+
+def _cache_disk_get(cache_dir, target):
+    path = _cache_disk_path(cache_dir, target)
+    if path and os.path.exists(path):
+        try:
+            f = open(path,'rb')
+            try:
+                (hash_code, input, output) = cPickle.load(f)
+            finally:
+                f.close()
+            if (hash_code == target[1]) and (input == target[2]):
+                return output
+        except:
+            pass # unreadable or truncated: treat as a miss
+    return None
+
+def _cache_disk_set(cache_dir, entry):
+    path = _cache_disk_path(cache_dir, entry)
+    if path and not os.path.exists(path):
+        try:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            # write then rename so that concurrent readers never see a partial file
+            tmp_path = path + ".%d.tmp"%os.getpid()
+            f = open(tmp_path,'wb')
+            try:
+                cPickle.dump((entry[1],entry[2],entry[3]),f,2)
+            finally:
+                f.close()
+            try:
+                os.rename(tmp_path,path)
+            except OSError:
+                os.remove(tmp_path) # another process got there first
+        except:
+            print " Cache-Warning: unable to write '%s'."%path
+
 def _cache_validate(_self=cmd):
     r = DEFAULT_SUCCESS
     try:
@@ -35,6 +172,7 @@ def _cache_clear(_self=cmd):
         _pymol = _self._pymol
         _pymol._cache = []
         _pymol._cache_memory = 0
+        _pymol._cache_index = None
     finally:
         _self.unlock_data(_self)
     return r
@@ -47,11 +185,12 @@ def _cache_mark(_self=cmd):
         _cache_validate(_self)
         for entry in _self._pymol._cache: 
             entry[5] = 0.0
+        _pymol._cache_index = None # order is now stale
     finally:
         _self.unlock_data(_self)
     return r
 
-def _cache_purge(max_size, _self=cmd):
+def _cache_purge(max_size, _self=cmd, policy=None):
     r = DEFAULT_SUCCESS
     try:
         _self.lock_data(_self)
@@ -60,16 +199,8 @@ def _cache_purge(max_size, _self=cmd):
         if len(_pymol._cache):
             cur_size = sum(x[0] for x in _pymol._cache)
             if max_size>=0: # purge to reduce size
-                now = time.time()
-                # sort by last access time
-                new_cache = map(lambda x:[(now-x[5])/x[4],x], _pymol._cache)
-                new_cache.sort()
-                new_cache = map(lambda x:x[1],new_cache)
-                # remove oldest entries one by one until size requirement is met
-                while (cur_size>max_size) and (len(new_cache)>1):
-                    entry = new_cache.pop() 
-                    cur_size = cur_size - entry[0]
-                _pymol._cache = new_cache
+                index = _cache_index(_self, policy)
+                cur_size = index.evict(cur_size, max_size)
                 _pymol._cache_memory = cur_size
             else: # purge to eliminate unused entries
                 new_cache = []
@@ -85,62 +216,269 @@ def _cache_purge(max_size, _self=cmd):
         _self.unlock_data(_self)
     return result
         
-def _cache_get(target, hash_size = None, _self=cmd):
+def _cache_get(target, hash_size = None, _self=cmd, max_size=0, policy=0, cache_dir=''):
     result = None
     try:
         _self.lock_data(_self)
+        _pymol = _self._pymol
+        _cache_validate(_self)
         try:
-            if hash_size == None:
-                hash_size = len(target[1])
-            key = target[1][0:hash_size]
-            # should optimize this with a dictionary lookup, key -> index in _cache
-            for entry in _self._pymol._cache:
-                if entry[1][0:hash_size] == key:
-                    if entry[2] == target[2]:
-                        while len(entry)<6:
-                            entry.append(0)
-                        entry[4] = entry[4] + 1 # access count
-                        entry[5] = time.time() # timestamp
-                        result = entry[3]
+            entry = None
+            if (hash_size == None) or (hash_size == len(target[1])):
+                entry = _cache_index(_self, policy).find(target[1], target[2])
+            else: # partial keys can't use the index
+                key = target[1][0:hash_size]
+                for cand in _pymol._cache:
+                    if (cand[1][0:hash_size] == key) and (cand[2] == target[2]):
+                        entry = cand
                         break
+            if entry != None:
+                while len(entry)<6:
+                    entry.append(0)
+                entry[4] = entry[4] + 1 # access count
+                entry[5] = time.time() # timestamp
+                _cache_index(_self).touch(entry)
+                result = entry[3]
+            elif len(cache_dir):
+                result = _cache_disk_get(cache_dir, target)
+                if result != None: # promote into memory
+                    entry = list(target[0:3]) + [result, 0, 0.0]
+                    for item in result:
+                        entry[0] = entry[0] + 1
+                        if isinstance(item,types.TupleType):
+                            entry[0] = entry[0] + len(item)
+                    _cache_set(entry, max_size, _self, policy)
+            if (result == None) and (getattr(_pymol,'_cache_pending',None) != None) \
+                    and (target[2][0] == "SurfaceJob"):
+                # left for the worker pool (see _surface_pool_rebuild)
+                bucket = _pymol._cache_pending.setdefault(target[1],[])
+                for cand in bucket:
+                    if cand[2] == target[2]:
+                        break
+                else:
+                    bucket.append(target)
+                result = 0
         except:
             traceback.print_exc()
     finally:
         _self.unlock_data(_self)
     return result
 
-def _cache_set(new_entry, max_size, _self=cmd):
+def _cache_set(new_entry, max_size, _self=cmd, policy=0, cache_dir=''):
     r = DEFAULT_SUCCESS
     try:
         _self.lock_data(_self)
         _pymol = _self._pymol
         _cache_validate(_self)
         try:
-            hash_size = len(new_entry[1])
-            key = new_entry[1][0:hash_size]
-            count = 0
-            found = 0
+            index = _cache_index(_self, policy)
             new_entry[4] = new_entry[4] + 1 # incr access count
             new_entry[5] = time.time() # timestamp
-            for entry in _pymol._cache: 
-                if entry[1][0:hash_size] == key:
-                    if entry[2] == new_entry[2]: # dupe (shouldn't happen)
-                        entry[3] = new_entry[3] 
-                        found = 1
-                        break
-                count = count + 1
-            if not found:
-                _pymol._cache.append(new_entry)
+            entry = index.find(new_entry[1], new_entry[2])
+            if entry != None: # dupe (shouldn't happen)
+                entry[3] = new_entry[3]
+                entry[5] = new_entry[5]
+                index.touch(entry)
+            else:
+                index.add(new_entry)
                 _pymol._cache_memory = _pymol._cache_memory + new_entry[0]
                 if max_size > 0:
                     if _pymol._cache_memory > max_size:
-                        _cache_purge(max_size, _self)
+                        _cache_purge(max_size, _self, policy)
+            if len(cache_dir):
+                _cache_disk_set(cache_dir, new_entry)
         except:
             traceback.print_exc()
     finally:
         _self.unlock_data(_self)
     return r
         
+# worker process pools (surface_pool, load_many): every worker runs its
+# own headless PyMOL instance, started by _pool_init after the fork
+
+_pool_pymol = None # the PyMOL instance of a worker process
+
+def _pool_init():
+    global _pool_pymol
+    import pymol2
+    _pool_pymol = pymol2.PyMOL()
+    _pool_pymol.start()
+
+def _pool_new(n_proc):
+    # WARNING: internal routine, subject to change
+    # returns a pool of n_proc such workers (raises if none can start)
+    import multiprocessing
+    return multiprocessing.Pool(n_proc, _pool_init)
+
+def _pool_free(pool):
+    # stops a pool's workers right away and reaps them
+    if pool != None:
+        pool.terminate()
+        pool.join()
+
+# surface worker pool:
+
+# When the surface_pool setting is greater than zero (and cache_mode is
+# 2), "rebuild" and "cache optimize" compute the surfaces missing from
+# the cache in that many worker processes, each with its own headless
+# PyMOL instance, instead of in this process.
+#
+# While _pymol._cache_pending is a dictionary, _cache_get answers a
+# miss on a surface job with 0, which leaves that surface empty, and
+# files the cache entry there (by hash codes).  The pending entries are
+# then run through _cmd.surface_job_run in the pool, their results are
+# stored with _cache_set, and the surfaces are rebuilt from the cache.
+# Results of background runs are applied by _surface_pool_apply, which
+# the parser runs on the main thread.  That rebuild never goes back to
+# the pool: a result evicted from the cache before it could be used is
+# recomputed in this process, so a small cache_max can't keep the same
+# jobs bouncing between the cache and the pool.
+
+def _surface_pool_job(input):
+    try:
+        return _cmd.surface_job_run(_pool_pymol._COb, input)
+    except:
+        traceback.print_exc()
+    return None
+
+def _surface_pool(_self=cmd):
+    # returns the worker pool, or None if disabled or unavailable
+    if int(_self.get('cache_mode')) < 2:
+        return None
+    _pymol = _self._pymol
+    n_proc = int(_self.get('surface_pool'))
+    current = getattr(_pymol,'_surface_pool',None)
+    if current != None:
+        if current[0] == n_proc:
+            return current[1]
+        _pool_free(current[1])
+        _pymol._surface_pool = None
+    if n_proc < 1:
+        return None
+    pool = None
+    if not hasattr(os,'fork'):
+        print " Surface-Warning: surface_pool requires fork(); computing surfaces in-process."
+    else:
+        try:
+            pool = _pool_new(n_proc)
+        except:
+            traceback.print_exc()
+            print " Surface-Warning: unable to start worker processes."
+    _pymol._surface_pool = (n_proc, pool) # failures are remembered too
+    return pool
+
+def _surface_pool_defer(_self=cmd):
+    # start deferring missed surface jobs (false if already doing so)
+    try:
+        _self.lock_data(_self)
+        _pymol = _self._pymol
+        if getattr(_pymol,'_cache_pending',None) != None:
+            return 0
+        _pymol._cache_pending = {}
+        return 1
+    finally:
+        _self.unlock_data(_self)
+
+def _surface_pool_collect(_self=cmd):
+    # stop deferring and return the pending cache entries
+    try:
+        _self.lock_data(_self)
+        _pymol = _self._pymol
+        pending = getattr(_pymol,'_cache_pending',None) or {}
+        _pymol._cache_pending = None
+    finally:
+        _self.unlock_data(_self)
+    result = []
+    for bucket in pending.values():
+        result.extend(bucket)
+    return result
+
+def _surface_pool_update(_self=cmd):
+    # bring the representations up to date before collecting
+    _self.refresh()
+    if thread.get_ident() != getattr(_self._pymol,'glutThread',None):
+        _self.sync()
+
+def _surface_pool_store(entries, outputs, _self=cmd):
+    max_size = int(_self.get('cache_max'))
+    policy = int(_self.get('cache_policy'))
+    cache_dir = _self.get('cache_dir')
+    cnt = 0
+    for entry, output in zip(entries, outputs):
+        if output != None:
+            entry[3] = output
+            for item in output:
+                entry[0] = entry[0] + 1
+                if isinstance(item,types.TupleType):
+                    entry[0] = entry[0] + len(item)
+            _cache_set(entry, max_size, _self, policy, cache_dir)
+            cnt = cnt + 1
+    return cnt
+
+def _surface_pool_apply(_self=cmd):
+    # WARNING: internal routine, subject to change
+    # stores the finished background runs and rebuilds their surfaces
+    # (queued by _surface_pool_run, executed on the main thread)
+    try:
+        _self.lock_data(_self)
+        _pymol = _self._pymol
+        done = getattr(_pymol,'_surface_pool_done',None) or []
+        _pymol._surface_pool_done = []
+    finally:
+        _self.unlock_data(_self)
+    for (entries, outputs, selection) in done:
+        if _surface_pool_store(entries, outputs, _self):
+            # not cmd.rebuild, which would defer the misses again
+            r = DEFAULT_ERROR
+            try:
+                _self.lock(_self)
+                r = _cmd.rebuild(_self._COb,selection,repres['surface'])
+            finally:
+                _self.unlock(r,_self)
+
+def _surface_pool_run(entries, wait=1, selection='all', _self=cmd):
+    # WARNING: internal routine, subject to change
+    # computes the pending entries in the pool and stores the results;
+    # with wait=0, returns at once and rebuilds the selection's surfaces
+    # once all results are in
+    pool = _surface_pool(_self)
+    if (pool == None) or not len(entries):
+        return 0
+    inputs = map(lambda x:x[2], entries)
+    if wait:
+        return _surface_pool_store(entries, pool.map(_surface_pool_job, inputs), _self)
+    def finish(outputs, entries=entries, selection=selection, _self=_self):
+        # runs in the pool's result handler: hand the results over to
+        # the main thread instead of touching the cache or the API here
+        try:
+            _self.lock_data(_self)
+            _pymol = _self._pymol
+            done = getattr(_pymol,'_surface_pool_done',None)
+            if done == None:
+                done = _pymol._surface_pool_done = []
+            done.append((entries, outputs, selection))
+        finally:
+            _self.unlock_data(_self)
+        # (cmd.do would block the result handler on the API lock)
+        t = threading.Thread(target=_self.do,
+                             args=("_ cmd._surface_pool_apply()",0,0))
+        t.setDaemon(1)
+        t.start()
+    pool.map_async(_surface_pool_job, inputs, callback=finish)
+    return len(entries)
+
+def _surface_pool_rebuild(selection='all', _self=cmd):
+    # WARNING: internal routine, subject to change
+    # after a rebuild: sends the surfaces missing from the cache to the
+    # worker pool, without waiting for them
+    if (_surface_pool(_self) == None) or not _surface_pool_defer(_self):
+        return 0
+    try:
+        _surface_pool_update(_self)
+    finally:
+        entries = _surface_pool_collect(_self)
+    return _surface_pool_run(entries, 0, selection, _self)
+
 # ray tracing threads
 
 def _ray_anti_spawn(thread_info,_self=cmd):
@@ -409,6 +747,79 @@ def _load(oname,finfo,state,ftype,finish,discrete,
             print "Load-Error: Unable to load file '%s'." % finfo
     return r
 
+# lazily materialized SDF states (see importing.load_sdf): the object
+# spans all states from the start, but records are only read from the
+# file once their state is needed -- by the frame/state hooks, movie
+# playback, or any command that reads coordinates back out
+
+def _sdf_lazy_update(_self=cmd, state=None):
+    # WARNING: internal routine, subject to change
+    # state == None: each object's current state, 0: all states,
+    # otherwise just that state
+    lazy = getattr(_self._pymol,'_sdf_lazy',None)
+    if not lazy:
+        return
+    names = {}
+    for name in _self.get_names('objects'):
+        names[name] = 1
+    wanted = {}
+    for oname in lazy.keys():
+        if not names.has_key(oname): 
+            continue
+        if state == None:
+            try:
+                wanted[oname] = (int(_self.get('state',oname)),)
+            except:
+                wanted[oname] = (_self.get_state(),)
+        elif state == 0:
+            wanted[oname] = range(1,len(lazy[oname][1])+1)
+        else:
+            wanted[oname] = (int(state),)
+    r = DEFAULT_SUCCESS
+    try:
+        _self.lock(_self)
+        for oname in lazy.keys():
+            (index, records, loaded) = lazy[oname]
+            if not names.has_key(oname): # object has been deleted
+                index.close()
+                del lazy[oname]
+                continue
+            for st in wanted[oname]:
+                if (0 < st <= len(records)) and not loaded.has_key(st):
+                    loaded[st] = 1
+                    try:
+                        r = _load(oname,index.read_text(records[st-1]),st,
+                                  loadable.sdf2str,1,1,1,zoom=0,_self=_self)
+                    except:
+                        traceback.print_exc()
+            if len(loaded) >= len(records):
+                index.close()
+                del lazy[oname]
+    finally:
+        _self.unlock(r,_self)
+
+def _sdf_lazy_rename(old_name=None, new_name=None, _self=cmd):
+    # WARNING: internal routine, subject to change
+    # keeps the lazy bookkeeping in step with the object names: call
+    # after delete/reinitialize (old_name == None drops every entry
+    # whose object is gone) and after set_name (moves the entry)
+    lazy = getattr(_self._pymol,'_sdf_lazy',None)
+    if not lazy:
+        return
+    names = {}
+    for name in _self.get_names('objects'):
+        names[name] = 1
+    if (old_name != None) and lazy.has_key(old_name) and \
+           names.has_key(new_name) and not names.has_key(old_name):
+        if lazy.has_key(new_name):
+            lazy[new_name][0].close()
+        lazy[new_name] = lazy[old_name]
+        del lazy[old_name]
+    for oname in lazy.keys():
+        if not names.has_key(oname):
+            lazy[oname][0].close()
+            del lazy[oname]
+
 # function keys and other specials
 
 def _special(k,x,y,m=0,_self=cmd): # INTERNAL (invoked when special key is pressed)
@@ -31,6 +31,7 @@ def get_command_keywords(self_cmd=cmd):
         'cartoon'       : [ self_cmd.cartoon           , 0 , 0 , ''  , parsing.STRICT ],
         'capture'       : [ self_cmd.capture           , 0 , 0 , ''  , parsing.STRICT ],
         'cealign'       : [ self_cmd.cealign	       , 0 , 0 , ''  , parsing.STRICT ],
+        'cealign_many'  : [ self_cmd.cealign_many      , 0 , 0 , ''  , parsing.STRICT ],
         'cd'            : [ self_cmd.cd                , 0 , 0 , ''  , parsing.STRICT ],
         'center'        : [ self_cmd.center            , 0 , 0 , ''  , parsing.STRICT ],     
         'check'         : [ self_cmd.check             , 0 , 0 , ''  , parsing.STRICT ],
@@ -100,6 +101,7 @@ def get_command_keywords(self_cmd=cmd):
         'get_distance'  : [ self_cmd.get_distance      , 0 , 0 , ''  , parsing.STRICT ],
         'get_extent'    : [ self_cmd.get_extent        , 0 , 0 , ''  , parsing.STRICT ],
         'get_position'  : [ self_cmd.get_position      , 0 , 0 , ''  , parsing.STRICT ],
+        'get_selector_stats' : [ self_cmd.get_selector_stats , 0 , 0 , ''  , parsing.STRICT ],
         'get_symmetry'  : [ self_cmd.get_symmetry      , 0 , 0 , ''  , parsing.STRICT ],
         'get_title'     : [ self_cmd.get_title         , 0 , 0 , ''  , parsing.STRICT ],   
         'get_type'      : [ self_cmd.get_type          , 0 , 0 , ''  , parsing.STRICT ],
@@ -134,6 +136,8 @@ def get_command_keywords(self_cmd=cmd):
         'load'          : [ self_cmd.load              , 0 , 0 , ''  , parsing.STRICT ],
         'space'         : [ self_cmd.space             , 0 , 0 , ''  , parsing.STRICT ],
         'load_embedded' : [ self_cmd.load_embedded     , 0 , 0 , ''  , parsing.STRICT ],
+        'load_many'     : [ self_cmd.load_many         , 0 , 0 , ''  , parsing.STRICT ],
+        'load_sdf'      : [ self_cmd.load_sdf          , 0 , 0 , ''  , parsing.STRICT ],
         'load_png'      : [ self_cmd.load_png          , 0 , 0 , ''  , parsing.STRICT ],
         'load_traj'     : [ self_cmd.load_traj         , 0 , 0 , ''  , parsing.STRICT ],
         'log'           : [ self_cmd.log               , 0 , 0 , ''  , parsing.STRICT ],
@@ -340,12 +344,14 @@ def fix_dict(keyword):
 
 def get_help_only_keywords(self_cmd=cmd):
     return {  
+        'alter_column'          : [ self_cmd.alter_column ],
         'api'                   : [ self_cmd.helping.api ],
         'editing'               : [ self_cmd.helping.editing ],  
         'edit_keys'             : [ self_cmd.helping.edit_keys ],
         'examples'              : [ self_cmd.helping.examples ],
         'faster'                : [ self_cmd.helping.faster ],
         'get_area'              : [ self_cmd.get_area ],
+        'get_coords'            : [ self_cmd.get_coords ],
         'get_movie_playing'     : [ self_cmd.get_movie_playing ],
         'get_model'             : [ self_cmd.get_model ],
         'get_mtl_obj'           : [ self_cmd.get_mtl_obj ],
@@ -360,6 +366,7 @@ def get_help_only_keywords(self_cmd=cmd):
         'get_version'           : [ self_cmd.get_version  ],            
         'keyboard'              : [ self_cmd.helping.keyboard   ],
         'launching'             : [ self_cmd.helping.launching  ],
+        'load_coords'           : [ self_cmd.load_coords  ],
         'load_model'            : [ self_cmd.load_model  ],
         'mouse'                 : [ self_cmd.helping.mouse  ],
         'movies'                : [ self_cmd.helping.movies  ],
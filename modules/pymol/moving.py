@@ -240,6 +240,7 @@ SEE ALSO
     mstop, mset, mdo, mclear, mmatrix
         '''
         r = DEFAULT_ERROR
+        _self._sdf_lazy_update(_self,0) # playback never calls the frame hooks
         try:
             _self.lock(_self)   
             r = _cmd.mplay(_self._COb,1)
@@ -478,6 +479,7 @@ SEE ALSO
             r = _cmd.frame(_self._COb,int(frame),int(trigger),int(scene))
         finally:
             _self.unlock(r,_self)
+        _self._sdf_lazy_update(_self)
         if _self._raising(r,_self): raise pymol.CmdException
         return r
 
@@ -802,6 +804,7 @@ SEE ALSO
             r = _cmd.set_frame(_self._COb,5,1)
         finally:
             _self.unlock(r,_self)
+        _self._sdf_lazy_update(_self)
         if _self._raising(r,_self): raise pymol.CmdException
         return r
 
@@ -829,6 +832,7 @@ SEE ALSO
             r = _cmd.set_frame(_self._COb,5,-1)
         finally:
             _self.unlock(r,_self)
+        _self._sdf_lazy_update(_self)
         if _self._raising(r,_self): raise pymol.CmdException
         return r
 
@@ -853,6 +857,7 @@ PYMOL API
             r = _cmd.set_frame(_self._COb,4,0)
         finally:
             _self.unlock(r,_self)
+        _self._sdf_lazy_update(_self)
         if _self._raising(r,_self): raise pymol.CmdException
         return r
 
@@ -867,6 +872,7 @@ internal
             r=_cmd.set_frame(_self._COb, int(mode), int(frame)-1)
         finally:
             _self.unlock(r,_self)
+        _self._sdf_lazy_update(_self)
         if _self._raising(r,_self): raise pymol.CmdException
         return r
 
@@ -890,6 +896,7 @@ PYMOL API
             r=_cmd.set_frame(_self._COb,6,0)
         finally:
             _self.unlock(r,_self)
+        _self._sdf_lazy_update(_self)
         if _self._raising(r,_self): raise pymol.CmdException
         return r
 
@@ -913,6 +920,7 @@ PYMOL API
             r = _cmd.set_frame(_self._COb,3,0)
         finally:
             _self.unlock(r,_self)
+        _self._sdf_lazy_update(_self)
         if _self._raising(r,_self): raise pymol.CmdException
         return r
 
@@ -18,7 +18,7 @@ if __name__=='pymol.querying':
     import pymol
     import cmd
     from cmd import _cmd,lock,unlock,Shortcut, \
-          _feedback,fb_module,fb_mask,is_list, \
+          _feedback,fb_module,fb_mask,is_list,is_string, \
           DEFAULT_ERROR, DEFAULT_SUCCESS, _raising, is_ok, is_error
 
     def auto_measure(_self=cmd):
@@ -887,7 +887,97 @@ DESCRIPTION
         if _raising(r,_self): raise pymol.CmdException
         return r
 
+
+    def get_coords(selection='all', state=1, quiet=1, _self=cmd):
+        '''
+DESCRIPTION
+
+    "get_coords" returns the coordinates of all atoms in a selection
+    for a single state as a float32 numpy array of shape (N,3).  Atoms
+    are in the same order as returned by "iterate".
+
+USAGE
+
+    get_coords [ selection [, state ]]
+
+ARGUMENTS
+
+    state = integer: 0 for the current state {default: 1}
+
+PYMOL API
+
+    cmd.get_coords(string selection, int state)
+
+SEE ALSO
+
+    load_coords, get_model
+    '''
+        import numpy
+        selection = selector.process(selection)
+        r = DEFAULT_ERROR
+        if int(state) > 0:
+            _self._sdf_lazy_update(_self,int(state))
+        else:
+            _self._sdf_lazy_update(_self)
+        try:
+            _self.lock(_self)
+            r = _cmd.get_coords_str(_self._COb,"("+str(selection)+")",int(state)-1)
+        finally:
+            _self.unlock(r,_self)
+        if _self._raising(r,_self): raise pymol.CmdException
+        if is_string(r):
+            # a copy: frombuffer over a string is read-only
+            r = numpy.fromstring(r,numpy.float32).reshape((-1,3))
+            if not quiet:
+                print " get_coords: %d atoms." % len(r)
+        return r
     
+    def get_selector_stats(quiet=1, _self=cmd):
+        '''
+DESCRIPTION
+
+    "get_selector_stats" reports how the selection engine has been
+    reusing its work: how often the atom table was built from scratch,
+    patched after objects were added, removed or resized, or reused
+    unchanged, and how often selection expressions were served from
+    the compiled-selection cache.
+
+USAGE
+
+    get_selector_stats
+
+PYMOL API
+
+    cmd.get_selector_stats()
+
+    Returns a dictionary with the keys "table_full",
+    "table_incremental", "table_reused", "parse_hits", "mask_hits",
+    "cache_misses" and "generation".
+
+NOTES
+
+    Cached selection results are discarded whenever the "generation"
+    counter advances, which happens when atoms, bonds, coordinates or
+    named selections change.
+    '''
+        r = DEFAULT_ERROR
+        try:
+            _self.lock(_self)
+            r = _cmd.get_selector_stats(_self._COb)
+        finally:
+            _self.unlock(r,_self)
+        if _self._raising(r,_self): raise pymol.CmdException
+        if is_list(r):
+            r = dict(zip(('table_full', 'table_incremental', 'table_reused',
+                          'parse_hits', 'mask_hits', 'cache_misses',
+                          'generation'), r))
+            if not quiet:
+                print " get_selector_stats: tables %d full, %d incremental, %d reused."%(
+                    r['table_full'], r['table_incremental'], r['table_reused'])
+                print " get_selector_stats: %d mask hits, %d parse hits, %d misses."%(
+                    r['mask_hits'], r['parse_hits'], r['cache_misses'])
+        return r
+
     def get_position(quiet=1, _self=cmd):
         '''
 DESCRIPTION
@@ -1044,6 +1134,10 @@ PYMOL API
         selection = selector.process(selection)
         #   
         r = DEFAULT_ERROR
+        if int(state) > 0:
+            _self._sdf_lazy_update(_self,int(state))
+        else:
+            _self._sdf_lazy_update(_self)
         try:
             _self.lock(_self)
             r = _cmd.get_model(_self._COb,"("+str(selection)+")",int(state)-1,str(ref),int(ref_state)-1)
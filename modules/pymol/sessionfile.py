@@ -0,0 +1,246 @@
+#A* -------------------------------------------------------------------
+#B* This file contains source code for the PyMOL computer program
+#C* Copyright (c) Schrodinger, LLC.
+#D* -------------------------------------------------------------------
+#E* It is unlawful to modify or remove this copyright notice.
+#F* -------------------------------------------------------------------
+#G* Please see the accompanying LICENSE file for further information.
+#H* -------------------------------------------------------------------
+#I* Additional authors of this source file include:
+#-*
+#-*
+#-*
+#Z* -------------------------------------------------------------------
+
+# Chunked session files
+#
+# Instead of a single pickle of the whole session dictionary, a chunked
+# session file holds a sequence of independently compressed chunks:
+#
+#   MAGIC
+#   chunk*                 (see _HEADER)
+#   end chunk              (kind == _END)
+#
+# Each top-level session item is one chunk, and each entry of
+# session['names'] is one chunk.  For molecular objects, every state
+# (coordinate set) is a chunk of its own, with the object chunk only
+# holding a skeleton.
+#
+# toFile() pickles each chunk straight into its compressor, so no
+# chunk ever exists as one big pickle string.  It still starts from the
+# complete session dictionary, since get_session builds all entries in
+# one call; entries are released as soon as they are written.
+#
+# fromFile() reads the chunk table and the small items, but leaves
+# objects and states on disk: they are represented by callables which
+# the session loader (ExecutiveSetNamedEntries and
+# ObjectMoleculeCSetFromPyList) invokes and releases one at a time, so
+# only a single object or state is ever unpickled in Python at once.
+# The coordinate sets themselves are all rebuilt while the session
+# loads; what is deferred is the Python copy of the data, not the
+# objects in PyMOL.
+
+import struct
+import zlib
+import cPickle
+
+MAGIC = "PyMOL-PSE-chunked\n\x00\x01"
+
+_END = 0
+_ITEM = 1       # session[key]
+_NAME = 2       # session['names'][index] (selections, etc.)
+_OBJECT = 3     # session['names'][index], states stripped
+_STATE = 4      # state "sub" of session['names'][index]
+
+_HEADER = "<BiiI"  # kind, index, sub, key length
+_LENGTH = "<Q"     # compressed length
+
+_BLOCK = 1048576   # compression block size
+
+_EXEC_OBJECT = 0   # cExecObject
+_OBJECT_MOLECULE = 1 # cObjectMolecule
+
+def isChunked(fname):
+    try:
+        fp = open(fname,'rb')
+        try:
+            return fp.read(len(MAGIC)) == MAGIC
+        finally:
+            fp.close()
+    except IOError:
+        return 0
+
+class _Compressor:
+
+    '''
+    File-like sink for cPickle.Pickler: buffers the (many small) pickle
+    writes into blocks and compresses them directly into fp.
+    '''
+
+    def __init__(self, fp, level):
+        self.fp = fp
+        self.z = zlib.compressobj(level)
+        self.pending = []
+        self.size = 0
+        self.length = 0
+
+    def write(self, data):
+        self.pending.append(data)
+        self.size = self.size + len(data)
+        if self.size >= _BLOCK:
+            self._compress()
+
+    def _compress(self):
+        out = self.z.compress("".join(self.pending))
+        self.pending = []
+        self.size = 0
+        if len(out):
+            self.fp.write(out)
+            self.length = self.length + len(out)
+
+    def close(self):
+        self._compress()
+        out = self.z.flush()
+        self.fp.write(out)
+        self.length = self.length + len(out)
+        return self.length
+
+def _write_chunk(fp, kind, index, sub, key, value, level):
+    fp.write(struct.pack(_HEADER, kind, index, sub, len(key)))
+    fp.write(key)
+    # length is patched in once the compressed size is known
+    length_pos = fp.tell()
+    fp.write(struct.pack(_LENGTH, 0))
+    sink = _Compressor(fp, level)
+    cPickle.Pickler(sink, 2).dump(value)
+    length = sink.close()
+    end_pos = fp.tell()
+    fp.seek(length_pos)
+    fp.write(struct.pack(_LENGTH, length))
+    fp.seek(end_pos)
+
+def _read_chunk(fp, offset, length):
+    fp.seek(offset)
+    z = zlib.decompressobj()
+    pieces = []
+    while length > 0:
+        data = fp.read(min(length, _BLOCK))
+        if not len(data):
+            raise IOError("truncated session chunk")
+        length = length - len(data)
+        pieces.append(z.decompress(data))
+    pieces.append(z.flush())
+    return cPickle.loads("".join(pieces))
+
+def toFile(session, fname, level=6):
+    '''
+    Writes a session dictionary (as returned by cmd.get_session with
+    compress=0) as a chunked session file.  The session is consumed:
+    entries are dropped as soon as they have been written.
+    '''
+    fp = open(fname,'wb')
+    try:
+        fp.write(MAGIC)
+        names = session.get('names',None)
+        for key in session.keys():
+            if key != 'names':
+                _write_chunk(fp, _ITEM, 0, 0, key, session[key], level)
+                del session[key]
+        if names != None:
+            for index in xrange(len(names)):
+                entry = names[index]
+                names[index] = None
+                if ((type(entry) == type([])) and (len(entry) > 5) and
+                    (entry[1] == _EXEC_OBJECT) and (entry[4] == _OBJECT_MOLECULE) and
+                    (type(entry[5]) == type([])) and (type(entry[5][4]) == type([]))):
+                    states = entry[5][4]
+                    entry[5][4] = len(states)
+                    _write_chunk(fp, _OBJECT, index, 0, str(entry[0]), entry, level)
+                    entry = None
+                    for sub in xrange(len(states)):
+                        _write_chunk(fp, _STATE, index, sub, "", states[sub], level)
+                        states[sub] = None
+                    states = None
+                elif (type(entry) == type([])) and (len(entry) > 1) and (entry[1] == _EXEC_OBJECT):
+                    _write_chunk(fp, _OBJECT, index, -1, str(entry[0]), entry, level)
+                else:
+                    _write_chunk(fp, _NAME, index, 0, "", entry, level)
+            session['names'] = names
+        fp.write(struct.pack(_HEADER, _END, 0, 0, 0))
+    finally:
+        fp.close()
+
+class _Chunk:
+
+    def __init__(self, fname, offset, length):
+        self.fname = fname
+        self.offset = offset
+        self.length = length
+
+    def read(self):
+        fp = open(self.fname,'rb')
+        try:
+            return _read_chunk(fp, self.offset, self.length)
+        finally:
+            fp.close()
+
+class _LazyState(_Chunk):
+
+    def __call__(self):
+        return self.read()
+
+class _LazyObject(_Chunk):
+
+    def __init__(self, fname, offset, length, split):
+        _Chunk.__init__(self, fname, offset, length)
+        self.split = split
+        self.states = []
+
+    def __call__(self):
+        entry = self.read()
+        if self.split:
+            # states are materialized by the object loader, one by one
+            entry[5][4] = self.states[:]
+        return entry
+
+def fromFile(fname):
+    '''
+    Reads a chunked session file.  Returns a session dictionary whose
+    object entries (and molecular states) are callables which load
+    their data from the file on demand.
+    '''
+    session = {}
+    names = {}
+    n_name = 0
+    fp = open(fname,'rb')
+    try:
+        if fp.read(len(MAGIC)) != MAGIC:
+            raise IOError("not a chunked session file")
+        header_size = struct.calcsize(_HEADER)
+        length_size = struct.calcsize(_LENGTH)
+        while 1:
+            header = fp.read(header_size)
+            if len(header) < header_size:
+                raise IOError("truncated session file")
+            (kind, index, sub, key_len) = struct.unpack(_HEADER, header)
+            if kind == _END:
+                break
+            key = fp.read(key_len)
+            (length,) = struct.unpack(_LENGTH, fp.read(length_size))
+            offset = fp.tell()
+            if kind == _ITEM:
+                session[key] = _read_chunk(fp, offset, length)
+            elif kind == _NAME:
+                names[index] = _read_chunk(fp, offset, length)
+            elif kind == _OBJECT:
+                names[index] = _LazyObject(fname, offset, length, sub >= 0)
+            elif kind == _STATE:
+                names[index].states.append(_LazyState(fname, offset, length))
+            if kind in (_NAME, _OBJECT):
+                n_name = max(n_name, index + 1)
+            fp.seek(offset + length)
+    finally:
+        fp.close()
+    if n_name or session.has_key('version'):
+        session['names'] = map(lambda a,n=names:n.get(a,None), range(n_name))
+    return session
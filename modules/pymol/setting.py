@@ -754,6 +754,21 @@ if __name__=='pymol.setting':
         suspend_undo                       = 708
         suspend_undo_atom_count            = 709
         pick_surface                       = 710
+        traj_lazy_cache                    = 711
+        ray_tile_size                      = 712
+        ray_retain_geometry                = 713
+        cache_policy                       = 714
+        cache_dir                          = 715
+        session_chunked                    = 716
+        surface_batch                      = 717
+        surface_pool                       = 718
+        fetch_mirror                       = 719
+        fetch_offline                      = 720
+        fetch_local_path                   = 721
+        fetch_threads                      = 722
+        lazy_ccp4_maps                     = 723
+        map_lod_points                     = 724
+        map_lod_delay                      = 725
 
     setting_sc = Shortcut(SettingIndex.__dict__.keys())
     
@@ -1109,6 +1124,8 @@ SEE ALSO
                     raise QuietException
             finally:
                 _self.unlock(r,_self)
+            if index == SettingIndex.state:
+                _self._sdf_lazy_update(_self)
         if _self._raising(r,_self): raise QuietException            
         return r
 
@@ -2406,9 +2406,16 @@ PYMOL API
 
     cmd.rebuild(string selection, string representation)
 
+NOTES
+
+    If the "surface_pool" setting is greater than zero and the cache
+    is enabled ("cache_mode" 2), surfaces missing from the cache are
+    computed by that many worker processes: they appear once they
+    are done, while PyMOL remains responsive.
+
 SEE ALSO
 
-    refresh
+    refresh, cache
     '''
         selection = selector.process(selection)
         representation = repres_sc.auto_err(representation,'representation')
@@ -2419,6 +2426,8 @@ SEE ALSO
             r = _cmd.rebuild(_self._COb,selection,repn)
         finally:
             _self.unlock(r,_self)
+        if is_ok(r) and (repn in (repres['everything'], repres['surface'])):
+            _self._surface_pool_rebuild(selection,_self=_self)
         if _self._raising(r,_self): raise QuietException
         return r
     
@@ -154,6 +154,17 @@ class Cmd:
         self._cache_clear = global_cmd._cache_clear
         self._cache_mark = global_cmd._cache_mark
         self._cache_purge = global_cmd._cache_purge
+        self._surface_pool = global_cmd._surface_pool
+        self._surface_pool_defer = global_cmd._surface_pool_defer
+        self._surface_pool_collect = global_cmd._surface_pool_collect
+        self._surface_pool_update = global_cmd._surface_pool_update
+        self._surface_pool_run = global_cmd._surface_pool_run
+        self._surface_pool_rebuild = global_cmd._surface_pool_rebuild
+        self._surface_pool_apply = global_cmd._surface_pool_apply
+        self._pool_new = global_cmd._pool_new
+        self._pool_free = global_cmd._pool_free
+        self._sdf_lazy_update = global_cmd._sdf_lazy_update
+        self._sdf_lazy_rename = global_cmd._sdf_lazy_rename
 
         # now we create the command langauge
 
@@ -249,6 +260,10 @@ class Cmd:
         k['_self']=self
         return apply(global_cmd.alter, a, k)
     
+    def alter_column(self, *a, **k):
+        k['_self']=self
+        return apply(global_cmd.alter_column, a, k)
+    
     def alter_list(self, *a, **k):
         k['_self']=self
         return apply(global_cmd.alter_list, a, k)
@@ -305,6 +320,10 @@ class Cmd:
         k['_self']=self
         return apply(global_cmd.cd, a, k)
     
+    def cealign_many(self, *a, **k):
+        k['_self']=self
+        return apply(global_cmd.cealign_many, a, k)
+    
     def center(self, *a, **k):
         k['_self']=self
         return apply(global_cmd.center, a, k)
@@ -569,6 +588,10 @@ class Cmd:
         k['_self']=self
         return apply(global_cmd.get_colorection, a, k)
     
+    def get_coords(self, *a, **k):
+        k['_self']=self
+        return apply(global_cmd.get_coords, a, k)
+    
     def get_dihedral(self, *a, **k):
         k['_self']=self
         return apply(global_cmd.get_dihedral, a, k)
@@ -681,6 +704,10 @@ class Cmd:
         k['_self']=self
         return apply(global_cmd.get_scene_list, a, k)
     
+    def get_selector_stats(self, *a, **k):
+        k['_self']=self
+        return apply(global_cmd.get_selector_stats, a, k)
+    
     def get_session(self, *a, **k):
         k['_self']=self
         return apply(global_cmd.get_session, a, k)
@@ -897,6 +924,10 @@ class Cmd:
         k['_self']=self
         return apply(global_cmd.load_object, a, k)
     
+    def load_many(self, *a, **k):
+        k['_self']=self
+        return apply(global_cmd.load_many, a, k)
+    
     def load_png(self, *a, **k):
         k['_self']=self
         return apply(global_cmd.load_png, a, k)
@@ -905,6 +936,10 @@ class Cmd:
         k['_self']=self
         return apply(global_cmd.load_raw, a, k)
     
+    def load_sdf(self, *a, **k):
+        k['_self']=self
+        return apply(global_cmd.load_sdf, a, k)
+    
     def load_traj(self, *a, **k):
         k['_self']=self
         return apply(global_cmd.load_traj, a, k)
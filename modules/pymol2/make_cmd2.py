@@ -12,6 +12,7 @@ if 1:
         'alias',
         'align',
         'alter',
+        'alter_column',
         'alter_list',
         'alter_state',
         'angle',
@@ -26,6 +27,7 @@ if 1:
         'capture',
         'cartoon',    
         'cd',
+        'cealign_many',
         'center',
         'check',
         'clean', 
@@ -92,6 +94,7 @@ if 1:
         'get_color_indices',
         'get_color_tuple',
         'get_colorection',
+        'get_coords',
         'get_dihedral',
         'get_distance',
         'get_editor_scheme',
@@ -120,6 +123,7 @@ if 1:
         'get_renderer',
         'get_scene_dict',
         'get_scene_list',
+        'get_selector_stats',
         'get_session',
         'get_setting_boolean', 
         'get_setting_float',   
@@ -170,8 +174,10 @@ if 1:
         'load_cgo',
         'load_coords',
         'load_embedded',
+        'load_many',
         'load_map',
         'load_model',
+        'load_sdf',
         'load_object',
         'load_png',
         'load_raw',
@@ -9,7 +9,7 @@
 
 # we make extensive use of Python's build-in in web infrastructure
 
-import BaseHTTPServer, cgi, urlparse
+import BaseHTTPServer, SocketServer, cgi, urlparse
 import StringIO, socket
 
 # we also rely upon Python's json infrastructure 
@@ -34,13 +34,34 @@ import types, os, sys, traceback, threading
 
 _json_mime_types = [ 'text/json', 'application/json' ]
 
-class _PymolHTTPRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+# most method calls accepted in one /batch request, since the API lock
+# is held for the whole batch
+
+_batch_max = 256
+
+class _PymolHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    # each connection is served by its own thread, so that a slow
+    # client or a long-running command doesn't hold up the others
 
-    # for now, we're using a single-threaded server
+    daemon_threads = True
+    allow_reuse_address = True
+
+class _PymolHTTPRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
 
     # our actual HTTP server class is private for the time being
     # if we need to, then we'll change this
 
+    # HTTP/1.1 keeps connections open between requests (responses are
+    # buffered so that they can be sent with a Content-Length)
+
+    protocol_version = "HTTP/1.1"
+    timeout = 60 # seconds before an idle connection is closed
+
+    conn_wfile = None # connection stream, while a response is buffered
+    json_body = None # parsed JSON document posted as the body
+    has_json_body = 0
+
     def do_GET(self):
         self.process_request()
 
@@ -57,20 +78,49 @@ class _PymolHTTPRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
         """
         # verify that the request is coming from this machine
         try:
-            host, port = self.client_address
-            if (host[0:6] != '127.0.'):
-                self.send_error(403,
-                                "Only localhost requests are allowed (not: %s)"
-                                % host)
-            else:
-                self.session = self.server.pymol_session # local session
-                self.callback = None 
-                self.parse_args()
-                self.process_urlpath()
+            self.begin_response()
+            try:
+                host, port = self.client_address
+                if (host[0:6] != '127.0.'):
+                    self.send_error(403,
+                                    "Only localhost requests are allowed (not: %s)"
+                                    % host)
+                else:
+                    self.session = self.server.pymol_session # local session
+                    self.callback = None 
+                    if self.parse_args():
+                        self.process_urlpath()
+            finally:
+                self.end_response()
         except socket.error:
             traceback.print_exc()
             print "broken pipe"
-            pass
+            self.close_connection = 1
+
+    def begin_response(self):
+        """
+        collect the response in memory until end_response
+        """
+        self.resp_code = 200
+        self.resp_mime = 'text/html'
+        self.conn_wfile = self.wfile
+        self.wfile = StringIO.StringIO()
+
+    def end_response(self):
+        """
+        send the collected response, with its length
+        """
+        if self.conn_wfile != None:
+            body = self.wfile.getvalue()
+            self.wfile = self.conn_wfile
+            self.conn_wfile = None
+            self.send_response(self.resp_code)
+            self.send_header('Content-type', self.resp_mime)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_no_cache_headers()
+            self.end_headers()
+            self.wfile.write(body)
+            self.wfile.flush()
         
     def parse_args(self):
         """
@@ -81,8 +131,25 @@ class _PymolHTTPRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
         would yield self.fs.getvalue("color")       as "blue"
         and           self.fs.getvalue("selection") as "benz"
         self.urlpath would be "/apply/pymol.cmd.color"
+        returns false (after sending a 400 error) if a JSON body
+        can't be parsed
         """
-        if (self.command == "POST"):
+        self.json_body = None
+        self.has_json_body = 0
+        content_type = (self.headers.getheader('Content-Type') or '')
+        if ((self.command == "POST") and
+            (content_type.split(';')[0].strip() in _json_mime_types)):
+            # a JSON document as the body: same as the _json argument
+            length = int(self.headers.getheader('Content-Length') or 0)
+            self.fs = None
+            self.urlpath = self.path
+            try:
+                self.json_body = json.loads(self.rfile.read(length))
+            except ValueError:
+                self.send_error(400,"Malformed JSON body.")
+                return 0
+            self.has_json_body = 1
+        elif (self.command == "POST"):
             self.fs = cgi.FieldStorage(fp=self.rfile, headers=self.headers,
                                        environ = {'REQUEST_METHOD':'POST'},
                                        keep_blank_values = 1)
@@ -95,6 +162,7 @@ class _PymolHTTPRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
             self.urlpath = path
         else:
             self.fs = None
+        return 1
 
     def process_urlpath(self):
         """
@@ -116,6 +184,8 @@ class _PymolHTTPRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
                 parts.append('')
             if (parts[1] == 'apply'): # calling a method
                 self.pymol_apply(parts[2])
+            elif (parts[1] == 'batch'): # calling a list of methods
+                self.pymol_batch()
             elif (parts[1] == 'getattr'): # retrieving a property
                 self.pymol_getattr(parts[2])
             elif (parts[1] == 'echo'): # for debugging purposes
@@ -207,39 +277,49 @@ class _PymolHTTPRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
                 self.wfile.write(json.dumps(json.loads(response),indent=4))
                 self.wfile.write("</pre>")
 
-    def pymol_apply(self,method):
+    def get_blocks(self,method):
+        """
+        gather the method calls of a request as a list of
+        [ name, args, kwds ] blocks, or return None (after sending an
+        error) if they can't be made out
         """
-        apply the appropriate method held in the session dictionary.
-        supply the method arguements in the form of key/value
-        """        
         args = None
         kwds = None
         query_kwds = {}
-        send_multi_result_list = False
-
-        for k in self.fs.keys():
-            if k[0:1] == '_': # leading-underscore argument (special handling)
-                if k == '_callback':
-                    self.callback = self.fs.getfirst(k)
-                elif k == '_json': # main path for Javascript API
-                    method = json.loads(self.fs.getfirst(k))
-                    # [ "my_method", [ arg1, ... ] , { 'key1' : 'val1, ... } ]
-                    # or 
-                    # [ [ "my_met1", [ arg1, ... ], { 'key1' : 'val1, ... } ], 
-                    #   [ "my_met2", [ arg1, ... ], { 'key1' : 'val1, ... } ] ]
-                elif k == '_method': # tentative, not in spec -- may disappear
-                    # a method name "my_method"
-                    method = json.loads(self.fs.getfirst(k))
-                elif k == '_args': # tentative, not in spec -- may disappear
-                    args = json.loads(self.fs.getfirst(k))
-                elif k == '_kwds': # tentative, not in spec -- may disappear
-                    kwds = json.loads(self.fs.getfirst(k))
-                # other underscore arguments are ignored (not passed on)
-            elif k[0:1] != '_':
-                query_kwds[k] = self.fs.getfirst(k)
-                
+
+        if self.has_json_body:
+            method = self.json_body
+        if self.fs != None:
+            keys = self.fs.keys()
+        else:
+            keys = []
+        try:
+            for k in keys:
+                if k[0:1] == '_': # leading-underscore argument (special handling)
+                    if k == '_callback':
+                        self.callback = self.fs.getfirst(k)
+                    elif k == '_json': # main path for Javascript API
+                        method = json.loads(self.fs.getfirst(k))
+                        # [ "my_method", [ arg1, ... ] , { 'key1' : 'val1, ... } ]
+                        # or 
+                        # [ [ "my_met1", [ arg1, ... ], { 'key1' : 'val1, ... } ], 
+                        #   [ "my_met2", [ arg1, ... ], { 'key1' : 'val1, ... } ] ]
+                    elif k == '_method': # tentative, not in spec -- may disappear
+                        # a method name "my_method"
+                        method = json.loads(self.fs.getfirst(k))
+                    elif k == '_args': # tentative, not in spec -- may disappear
+                        args = json.loads(self.fs.getfirst(k))
+                    elif k == '_kwds': # tentative, not in spec -- may disappear
+                        kwds = json.loads(self.fs.getfirst(k))
+                    # other underscore arguments are ignored (not passed on)
+                elif k[0:1] != '_':
+                    query_kwds[k] = self.fs.getfirst(k)
+        except ValueError: # malformed _json, _method, _args or _kwds
+            self.send_json_error(400,[ "Malformed JSON argument." ])
+            return None
+
         blocks = []            
-        if isinstance(method,types.StringType):
+        if isinstance(method,types.StringTypes):
             # method is merely a string 
             if kwds == None:
                 kwds = query_kwds
@@ -254,9 +334,32 @@ class _PymolHTTPRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
             else:
                 blocks = method
                 # contains [ [name, arg, kwds], [name, args, kwds], ... ]
-                send_multi_result_list = False # only return final result
         else:
             self.send_json_error(500,[ "Unable to apply method:", str(method)])
+            return None
+        return blocks
+
+    def get_block_args(self, block):
+        len_block = len(block)
+        if len_block>1:
+            args = tuple(block[1])
+        else:
+            args = ()
+        if len_block>2:
+            kwds = block[2]
+        else:
+            kwds = {}
+        return (args, kwds)
+
+    def pymol_apply(self,method):
+        """
+        apply the appropriate method held in the session dictionary.
+        supply the method arguements in the form of key/value
+        """        
+        send_multi_result_list = False # only return final result
+
+        blocks = self.get_blocks(method)
+        if blocks == None:
             return
 
         result = []
@@ -266,15 +369,7 @@ class _PymolHTTPRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
                     print 'applying: ' + str(block)
                 fn = self.session.get(block[0],None)
                 if fn != None:
-                    len_block = len(block)
-                    if len_block>1:
-                        args = tuple(block[1])
-                    else:
-                        args = ()
-                    if len_block>2:
-                        kwds = block[2]
-                    else:
-                        kwds = {}
+                    (args, kwds) = self.get_block_args(block)
                     try:
                         result.append( fn(*args, **kwds) )
                     except:
@@ -308,7 +403,7 @@ class _PymolHTTPRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
                     self.wfile.write("<p>PyMOL-HTTPd: Shutting down...</p>")
                     self.wfile.write("<p><i>Please close this window.</i></p>")
                     self.wfile.write("</body></html>")
-                    self.wfile.flush()
+                    self.end_response()
                     self.server.pymol_cmd.quit()
                     return
 
@@ -320,6 +415,47 @@ class _PymolHTTPRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
             self.send_json_result(None)
         return
 
+    def pymol_batch(self):
+        """
+        apply a list of methods while holding the API lock once, and
+        send back all of their results, each as { "status", "result" }.
+        a failing method doesn't stop the ones after it.  at most
+        _batch_max methods are accepted per request.
+        """
+        blocks = self.get_blocks('')
+        if blocks == None:
+            return
+        if len(blocks) > _batch_max:
+            self.send_json_error(400,[ "Too many methods in batch:",
+                                       len(blocks), _batch_max ])
+            return
+        self_cmd = self.server.pymol_cmd
+        result = []
+        self_cmd.lock(self_cmd)
+        try:
+            for block in blocks:
+                if self.server.pymol_logging:
+                    print 'applying: ' + str(block)
+                fn = self.session.get(block[0],None)
+                if (fn == None) or (block[0] == '_quit'):
+                    result.append({ 'status' : 'ERROR',
+                                    'result' : [ "Method not found:",
+                                                 str(block) ] })
+                    continue
+                (args, kwds) = self.get_block_args(block)
+                try:
+                    result.append({ 'status' : 'OK',
+                                    'result' : fn(*args, **kwds) })
+                except:
+                    fp = StringIO.StringIO()
+                    traceback.print_exc(file=fp)
+                    result.append({ 'status' : 'ERROR',
+                                    'result' : [ "Exception in: %s" % block[0] ] +
+                                    fp.getvalue().split('\n') })
+        finally:
+            self_cmd.unlock(None,self_cmd)
+        self.send_json_result(result)
+
     def send_doc(self):
         """
         send a document (file) in the current directory or any sub-directory
@@ -370,22 +506,28 @@ class _PymolHTTPRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
         else:
             return 'text/plain'
             
-    def send_error(self,errcode,errmsg):
-        self.send_response(errcode)
-        self.send_header('Content-type', 'text/plain')
-        self.send_header('Pragma','no-cache')
-        self.send_header('Cache-Control','no-cache, must-revalidate')
-        self.send_header('Expires','Sat, 10 Jan 2008 01:00:00 GMT')
-        self.end_headers()
+    def send_error(self,errcode,errmsg=None):
+        if errmsg == None: # as called by BaseHTTPRequestHandler
+            errmsg = self.responses.get(errcode,('Error',))[0]
+        self.send_resp_header(errcode, 'text/plain')
         self.wfile.write("PyMOL-HTTPd-Error: "+errmsg+"\n")
         
-    def send_resp_header(self, code=200, mime='text/html'):
-        self.send_response(code)
-        self.send_header('Content-type', mime)
+    def send_no_cache_headers(self):
         self.send_header('Pragma','no-cache')
         self.send_header('Cache-Control','no-cache, must-revalidate')
         self.send_header('Expires','Sat, 10 Jan 2008 01:00:00 GMT')
-        self.end_headers()
+
+    def send_resp_header(self, code=200, mime='text/html'):
+        if self.conn_wfile != None: # buffered: sent by end_response
+            self.resp_code = code
+            self.resp_mime = mime
+        else: # no length known, so the connection can't be kept
+            self.close_connection = 1
+            self.send_response(code)
+            self.send_header('Content-type', mime)
+            self.send_header('Connection', 'close')
+            self.send_no_cache_headers()
+            self.end_headers()
         
     def echo_args(self):
         """
@@ -669,8 +811,8 @@ class PymolHttpd:
 
         # END MACHINE-GENERATED CODE
 
-        self.server = BaseHTTPServer.HTTPServer(('', self.port),
-                                                _PymolHTTPRequestHandler)
+        self.server = _PymolHTTPServer(('', self.port),
+                                       _PymolHTTPRequestHandler)
         self.server.wrap_natives = wrap_natives
 
         if self.port == 0:
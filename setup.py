@@ -217,7 +217,7 @@ else: # unix style (linux, mac, ...)
             ("OPENGL_ES_2",None),
             ]
 
-    libs += ["png", "freetype"]
+    libs += ["png", "freetype", "pthread"]
 
     try:
         prefix_path = os.environ['PREFIX_PATH'].split(os.pathsep)
@@ -0,0 +1,40 @@
+# -c
+
+from chempy import io, models
+
+idx = io.pdb.fromFile("dat/pept.pdb")
+
+print "BEGIN-LOG"
+
+# Indexed -> Columnar -> Indexed must not lose precision on any column
+
+for a in idx.atom:
+   a.partial_charge = 0.1
+   a.formal_charge = -1.0
+   a.vdw = 1.7
+   a.elec_radius = 2.3
+
+col = models.Columnar()
+col.from_indexed(idx)
+print col.nAtom, col.nBond == idx.nBond
+
+print col.get_coord_array().dtype, col.get_coord_array().shape
+print col.get_coord_array().tolist() == idx.get_coord_list()
+
+back = models.Columnar().from_indexed(idx).convert_to_indexed()
+for attr in ('coord','name','resi','b','q','vdw','formal_charge','partial_charge','elec_radius'):
+   same = 1
+   for (a,b) in zip(idx.atom,back.atom):
+      if getattr(a,attr) != getattr(b,attr):
+         same = 0
+   print attr, same
+
+# writes through the proxies
+
+col.atom[0].coord = [0.1,0.2,0.3]
+col.atom[0].partial_charge = 0.123456789
+print col.atom[0].coord, col.atom[0].partial_charge
+col.delete_list([1,2])
+print col.nAtom, col.atom[0].coord == [0.1,0.2,0.3], col.atom[1].name == idx.atom[3].name
+
+print "END-LOG"
@@ -0,0 +1,35 @@
+# -c
+
+from pymol import cmd
+
+cmd.load("dat/pept.pdb","pept",quiet=1)
+cmd.create("pept","pept",1,2,quiet=1)
+
+print "BEGIN-LOG"
+
+xyz = cmd.get_coords("pept")
+orig = xyz.copy()
+print xyz.dtype, xyz.shape, xyz.flags.writeable
+
+# same atoms, same order as get_model
+
+crd = cmd.get_model("pept").get_coord_list()
+print max(map(lambda a,b:max(abs(a[0]-b[0]),abs(a[1]-b[1]),abs(a[2]-b[2])),xyz.tolist(),crd)) < 0.001
+
+# edit in place and write back into state 2 only
+
+xyz[:,0] += 10.0
+cmd.load_coords(xyz,"pept",state=2)
+shift = cmd.get_coords("pept",2) - cmd.get_coords("pept",1)
+print "%8.3f %8.3f"%(shift[:,0].min(),shift[:,0].max())
+print "%8.3f"%abs(cmd.get_coords("pept",2)[:,1:] - cmd.get_coords("pept",1)[:,1:]).max()
+
+# a subset, and plain lists
+
+sub = cmd.get_coords("pept and name CA",1)
+print sub.shape
+cmd.load_coords([[0.0,0.0,0.0]] * len(sub),"pept and name CA",state=1)
+print "%8.3f"%abs(cmd.get_coords("pept and name CA",1)).max()
+print (abs(cmd.get_coords("pept",1) - orig).max(1) > 0.001).sum()
+
+print "END-LOG"
@@ -0,0 +1,55 @@
+# -c
+
+import os
+from pymol import cmd, sessionfile
+
+print "BEGIN-LOG"
+
+# the container on its own: items, names, objects and their states
+
+session = {
+   'version' : 1770,
+   'settings' : range(10),
+   'names' : [
+      None,
+      ['cas', 1, 1, None, -1, ['selection data']],
+      ['obj', 0, 1, None, 1, ['skel', 1, 2, 3, [ range(5), [ 'big' ] * 1000 ], 'tail']],
+      ['map', 0, 1, None, 2, ['map data']],
+      ],
+   }
+sessionfile.toFile(session, "tmp/chunked.pse")
+print sessionfile.isChunked("tmp/chunked.pse"), sessionfile.isChunked("dat/pept.pdb")
+print session.keys()
+
+session = sessionfile.fromFile("tmp/chunked.pse")
+print session['version'], session['settings'] == range(10)
+names = session['names']
+print len(names), names[0], names[1]
+obj = names[2]()
+print obj[0], obj[5][0:4], obj[5][5], len(obj[5][4])
+print obj[5][4][0](), obj[5][4][1]() == [ 'big' ] * 1000
+print names[3]()
+
+# through save and load
+
+cmd.load("dat/pept.pdb","pept",quiet=1)
+cmd.create("pept","pept",1,2,quiet=1)
+cmd.alter_state(2,"pept","x=x+1.0",quiet=1)
+cmd.select("cas","name ca",quiet=1)
+cmd.set("line_width",5)
+before = map(lambda s:cmd.get_model("pept",state=s).get_coord_list(),(1,2))
+
+cmd.set("session_chunked",1)
+cmd.save("tmp/chunked.pse",quiet=1)
+print sessionfile.isChunked("tmp/chunked.pse")
+cmd.reinitialize()
+
+cmd.load("tmp/chunked.pse",quiet=1)
+print cmd.get_names("objects"), cmd.get_names("selections")
+print cmd.count_states("pept"), cmd.count_atoms("cas"), cmd.get_setting_float("line_width")
+after = map(lambda s:cmd.get_model("pept",state=s).get_coord_list(),(1,2))
+print before == after
+
+os.unlink("tmp/chunked.pse")
+
+print "END-LOG"
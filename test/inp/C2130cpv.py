@@ -0,0 +1,60 @@
+# -c
+
+import math
+import numpy
+from chempy import io, cpv
+
+crd = io.pdb.fromFile("dat/pept.pdb").get_coord_list()
+
+print "BEGIN-LOG"
+
+# block routines must agree with the scalar ones, vector by vector
+
+def same(block, scalar):
+   return numpy.allclose(block, scalar, rtol=0, atol=1e-6)
+
+a = crd[0:100]
+b = crd[1:101]
+c = crd[2:102]
+d = crd[3:103]
+(A, B, C, D) = map(numpy.array, (a, b, c, d))
+
+print same(cpv.distance(A,B), map(cpv.distance,a,b))
+print same(cpv.distance_sq(A,B), map(cpv.distance_sq,a,b))
+print same(cpv.length(A), map(cpv.length,a))
+print same(cpv.get_angle_formed_by(A,B,C), map(cpv.get_angle_formed_by,a,b,c))
+print same(cpv.get_dihedral(A,B,C,D), map(cpv.get_dihedral,a,b,c,d))
+
+# a single vector against a block
+
+print same(cpv.distance(A,b[0]), map(lambda x:cpv.distance(x,b[0]),a))
+
+# rotations and transforms
+
+axis = cpv.normalize(cpv.sub(b[0],a[0]))
+angles = numpy.arange(0.0,2*math.pi,math.pi/6)
+mats = cpv.rotation_matrix(angles,axis)
+print mats.shape
+print same(mats[3], cpv.rotation_matrix(angles[3],axis))
+print same(cpv.transform(mats[3],A), map(lambda x:cpv.transform(mats[3].tolist(),x),a))
+print same(cpv.inverse_transform(mats[3],A), map(lambda x:cpv.inverse_transform(mats[3].tolist(),x),a))
+print cpv.transform_array(mats,A).shape
+print same(cpv.transform_array(mats,A)[5], cpv.transform_array(mats[5].tolist(),a))
+print same(cpv.translate_array([1.0,2.0,3.0],A), cpv.translate_array([1.0,2.0,3.0],a))
+
+# superposition: recover a known rigid-body motion
+
+moved = cpv.translate_array([5.0,-3.0,1.0],cpv.transform(mats[2],A))
+fit = cpv.fit(moved,A)
+print "%8.3f"%fit[3]
+print same(cpv.fit_apply(fit,A), moved)
+# (the iterative list version only converges to about 0.1 A)
+print cpv.fit(moved.tolist(),a)[3] < 0.1
+
+# the torsion about a bond is unchanged by a rotation about that bond
+
+print same(cpv.get_dihedral(A,B,C,D),
+           cpv.get_dihedral(cpv.transform(mats[4],A),cpv.transform(mats[4],B),
+                            cpv.transform(mats[4],C),cpv.transform(mats[4],D)))
+
+print "END-LOG"
@@ -0,0 +1,80 @@
+# -c
+
+import os
+from chempy.sdf import SDF, SDFIndex
+from pymol import cmd
+
+print "BEGIN-LOG"
+
+def write(fname, records, mtime):
+   f = SDF(fname,'w')
+   for rec in records:
+      f.write(rec)
+   f.close()
+   os.utime(fname,(mtime,mtime))
+
+sdf = SDF("dat/ligs3d.sdf")
+records = []
+while 1:
+   rec = sdf.read()
+   if not rec:
+      break
+   records.append(rec)
+sdf.close()
+
+fname = "tmp/ligs.sdf"
+if os.path.exists(fname+".idx"):
+   os.unlink(fname+".idx")
+write(fname, records, 1000000000.25)
+
+# random access gives the same records as a sequential read
+
+index = SDFIndex(fname)
+print len(index), os.path.exists(fname+".idx")
+print map(lambda i,r=records,x=index:x.read(i).toList() == r[i].toList(), range(len(index)))
+print index.get_values("MOLID") == map(lambda r:r.get_single("MOLID"), records)
+index.close()
+
+# the cached index is reused as is
+
+cached = SDFIndex(fname)
+print cached.offset == index.offset, cached.props == index.props
+cached.close()
+
+# select and sort (ties keep file order, also when descending; the
+# HBD items are lists, compared as text, with four records at "[]")
+
+print index.select("SCORE",lambda x:x < -215.0)
+print index.sort("SCORE")
+print index.sort("SCORE",reverse=1)
+print index.sort("HBD")
+print index.sort("HBD",reverse=1)
+print index.sort("HBD",[9,5,3,2],reverse=1)
+
+# a same-size rewrite with another mtime invalidates the cached index
+
+records.reverse()
+write(fname, records, 1000000000.75)
+index = SDFIndex(fname)
+print index.get_values("MOLID") == map(lambda r:r.get_single("MOLID"), records)
+index.close()
+records.reverse()
+write(fname, records, 1000000000.25)
+
+# load_sdf: subsets, ordering and lazy states
+
+cmd.load_sdf(fname,"hits",sort="-SCORE",top=3)
+print cmd.count_states("hits")
+cmd.load_sdf(fname,"some",records="2-4 9")
+print cmd.count_states("some")
+cmd.load_sdf(fname,"all")
+cmd.load_sdf(fname,"lazy",lazy=1)
+print cmd.count_states("lazy")
+print (cmd.get_coords("lazy",5) == cmd.get_coords("all",5)).all()
+print cmd.get_model("lazy",state=7).get_coord_list() == cmd.get_model("all",state=7).get_coord_list()
+
+cmd.delete("all")
+os.unlink(fname)
+os.unlink(fname+".idx")
+
+print "END-LOG"
@@ -0,0 +1,90 @@
+# -c
+
+import os
+from chempy import io
+from chempy.cif import CIF
+from pymol import cmd
+
+pdb = io.pdb.fromFile("dat/pept.pdb")
+
+# write pept.pdb as mmCIF, with some quoted values and comments, then
+# the same plus a small chem_comp block with a text field and bonds
+
+f = open("tmp/pept.cif","w")
+f.write("data_pept\n#\n_cell.length_a 10.0\n")
+f.write("loop_\n_atom_site.group_PDB\n_atom_site.id\n_atom_site.type_symbol\n"
+        "_atom_site.label_atom_id\n_atom_site.label_comp_id\n_atom_site.label_asym_id\n"
+        "_atom_site.label_seq_id\n_atom_site.Cartn_x\n_atom_site.Cartn_y\n"
+        "_atom_site.Cartn_z\n_atom_site.occupancy\n_atom_site.B_iso_or_equiv\n")
+for i in xrange(len(pdb.atom)):
+   a = pdb.atom[i]
+   a.id = i + 1
+   resn = a.resn
+   if i % 3 == 0:
+      resn = "'%s'"%resn
+   name = a.name
+   if i % 5 == 0:
+      name = '"%s"'%name
+   f.write("ATOM %d %s %s %s %s %s %.3f %.3f %.3f %.2f %.2f # atom %d\n"%(
+      a.id,a.symbol,name,resn,a.chain or '.',a.resi,
+      a.coord[0],a.coord[1],a.coord[2],a.q,a.b,i))
+f.close()
+g = open("tmp/both.cif","w")
+g.write(open("tmp/pept.cif").read())
+g.write("""#
+data_ETH
+_chem_comp.id ETH
+_chem_comp.name
+;ethane, with a
+multi-line name
+;
+loop_
+_chem_comp_atom.comp_id
+_chem_comp_atom.atom_id
+_chem_comp_atom.type_symbol
+_chem_comp_atom.model_Cartn_x
+_chem_comp_atom.model_Cartn_y
+_chem_comp_atom.model_Cartn_z
+ETH C1 C 0.000 0.000 0.000
+ETH C2 C 1.540 0.000 0.000
+loop_
+_chem_comp_bond.comp_id
+_chem_comp_bond.atom_id_1
+_chem_comp_bond.atom_id_2
+_chem_comp_bond.value_order
+ETH C1 C2 SING
+""")
+g.close()
+
+print "BEGIN-LOG"
+
+cif = CIF("tmp/both.cif")
+rec = cif.read()
+print rec.data_name, len(rec.model.atom), rec.key_value
+same = 1
+for (a,b) in zip(pdb.atom,rec.model.atom):
+   for attr in ('id','symbol','name','resn','resi','q','b'):
+      if getattr(a,attr) != getattr(b,attr):
+         print a.index, attr, getattr(a,attr), getattr(b,attr)
+         same = 0
+   if max(map(lambda x,y:abs(x-y),a.coord,b.coord)) > 0.0005:
+      same = 0
+print same
+
+rec = cif.read()
+print rec.data_name, rec.key_value['_chem_comp_id'], repr(rec.key_value['_chem_comp_name'])
+print map(lambda a:a.name, rec.model.atom), map(lambda b:(b.index,b.order), rec.model.bond)
+print cif.read()
+cif.close()
+
+# and through cmd.load
+
+cmd.load("tmp/pept.cif","cif",quiet=1)
+cmd.load("dat/pept.pdb","pdb",quiet=1)
+print cmd.count_atoms("cif"), cmd.count_atoms("pdb")
+print abs(cmd.get_coords("cif") - cmd.get_coords("pdb")).max() < 0.001
+cmd.delete("all")
+os.unlink("tmp/pept.cif")
+os.unlink("tmp/both.cif")
+
+print "END-LOG"
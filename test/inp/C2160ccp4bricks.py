@@ -0,0 +1,85 @@
+# -c
+
+import os
+import numpy
+from pymol import cmd
+
+# a 40x40x40 CCP4 map (two gaussian blobs on a 1 A grid), large enough
+# for several 32^3 bricks
+
+n = 40
+g = numpy.indices((n,n,n)).astype(numpy.float32) # [z,y,x]
+data = (numpy.exp(-((g[2]-10)**2 + (g[1]-10)**2 + (g[0]-10)**2) / 18.0) +
+        numpy.exp(-((g[2]-30)**2 + (g[1]-28)**2 + (g[0]-25)**2) / 18.0)).astype(numpy.float32)
+
+header = numpy.zeros(256,numpy.int32)
+header[0:3] = n           # NC, NR, NS
+header[3] = 2             # mode: float32
+header[7:10] = n          # NX, NY, NZ
+header[16:19] = (1,2,3)   # MAPC, MAPR, MAPS
+fheader = header.view(numpy.float32)
+fheader[10:13] = float(n) # cell
+fheader[13:16] = 90.0
+fheader[19] = data.min()
+fheader[20] = data.max()
+fheader[21] = data.mean()
+fheader[54] = data.std()
+header[52] = numpy.fromstring("MAP ",numpy.int32)[0]
+
+f = open("tmp/blobs.ccp4","wb")
+f.write(header.tostring())
+f.write(data.tostring())
+f.close()
+
+cmd.set("normalize_ccp4_maps",0)
+cmd.load("tmp/blobs.ccp4","full",quiet=1)
+cmd.set("lazy_ccp4_maps",1)
+cmd.load("tmp/blobs.ccp4","lazy",quiet=1)
+cmd.set("lazy_ccp4_maps",0)
+cmd.pseudoatom("center",pos=[10.0,10.0,10.0])
+cmd.orient("full")
+
+print "BEGIN-LOG"
+
+print cmd.get_extent("full") == cmd.get_extent("lazy")
+
+# meshes carved around a point: only the bricks covering it are read
+
+def same_mesh():
+   cmd.disable("all")
+   cmd.enable("m_full")
+   a = cmd.get_vrml()
+   cmd.disable("m_full")
+   cmd.enable("m_lazy")
+   b = cmd.get_vrml()
+   cmd.disable("m_lazy")
+   return (a == b), (len(a) > len(empty))
+
+cmd.disable("all")
+empty = cmd.get_vrml()
+
+cmd.isomesh("m_full","full",0.5,"center",buffer=6.0,carve=6.0)
+cmd.isomesh("m_lazy","lazy",0.5,"center",buffer=6.0,carve=6.0)
+print same_mesh()
+
+# recontour around a moved center (the second blob, in other bricks)
+
+cmd.alter_state(1,"center","(x,y,z)=(25.0,28.0,30.0)")
+cmd.isomesh("m_full","full",0.5,"center",buffer=6.0,carve=6.0)
+cmd.isomesh("m_lazy","lazy",0.5,"center",buffer=6.0,carve=6.0)
+print same_mesh()
+
+# the whole field, read in full for the session, matches the file
+
+def field(name):
+   for entry in cmd.get_session(name)['names']:
+      if entry and entry[0] == name:
+         return entry[5][2][0][14][2][6]
+
+expect = data.transpose(2,1,0).flatten().tolist()
+print field("full") == expect, field("lazy") == expect
+
+cmd.delete("all")
+os.unlink("tmp/blobs.ccp4")
+
+print "END-LOG"